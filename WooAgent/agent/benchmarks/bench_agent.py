@@ -0,0 +1,84 @@
+"""
+Agent Turn Benchmarks
+
+Times full AgentService.process_message turns against local stand-ins for
+the OpenAI API and the MCP server, so the agent's own overhead can be
+measured with and without simulated network latency.
+"""
+
+import os
+import logging
+import tempfile
+from typing import List
+
+from harness import BenchmarkResult, run_case
+from fakes import FakeMCPServer, FakeOpenAIServer
+
+
+def run(quick: bool = False, latency_ms: float = 50.0) -> List[BenchmarkResult]:
+    """
+    Run the agent turn benchmarks.
+
+    Args:
+        quick (bool): Use fewer iterations
+        latency_ms (float): Simulated latency of every OpenAI and MCP request
+
+    Returns:
+        List[BenchmarkResult]: Results of every case, empty if the agent
+            dependencies are not installed
+    """
+    logging.getLogger('wooagent').setLevel(logging.ERROR)
+    iterations = 10 if quick else 50
+    results = []
+
+    with FakeOpenAIServer(latency_ms) as openai_server, FakeMCPServer(latency_ms) as mcp_server:
+        # The OpenAI SDK reads its endpoint from the environment
+        os.environ['OPENAI_BASE_URL'] = f"{openai_server.url}/v1"
+        try:
+            from services.agent_service import AgentService
+            from services.conversation_service import ConversationService
+        except ImportError as e:
+            print(f"agent benchmarks skipped: {e}")
+            return results
+
+        with tempfile.TemporaryDirectory() as storage_dir:
+            conversation_service = ConversationService(storage_dir=storage_dir)
+            try:
+                # The agents SDK is imported when the first agent is created
+                agent_service = AgentService(
+                    openai_api_key='benchmark',
+                    mcp_server_url=mcp_server.url,
+                    conversation_service=conversation_service,
+                    answer_cache_ttl=60
+                )
+            except ImportError as e:
+                print(f"agent benchmarks skipped: {e}")
+                conversation_service.close()
+                return results
+            conversation_id = agent_service.create_new_conversation()['conversation_id']
+            counter = iter(range(10 ** 9))
+
+            # Distinct questions, so neither the coalescer nor the answer cache applies
+            results.append(run_case(
+                f"agent.turn[{latency_ms:g}ms]",
+                lambda: agent_service.process_message(
+                    conversation_id, f"What is the price of product {next(counter)}?"),
+                iterations
+            ))
+            results.append(run_case(
+                f"agent.turn_new_conversation[{latency_ms:g}ms]",
+                lambda: agent_service.process_message(None, "List the latest orders"),
+                iterations
+            ))
+
+            # The same question in fresh conversations is answered from the answer cache
+            def cached_turn():
+                cid = agent_service.create_new_conversation()['conversation_id']
+                agent_service.process_message(cid, "How many products are in stock?")
+
+            results.append(run_case(f"agent.turn_cached[{latency_ms:g}ms]", cached_turn, iterations))
+
+            agent_service.agent_pool.close()
+            conversation_service.close()
+
+    return results
@@ -0,0 +1,106 @@
+"""
+Conversation Codec Benchmark
+
+Measures encode and decode throughput of conversation snapshots for each
+available JSON codec, against the original indented dictionary format.
+
+Usage:
+    python benchmarks/bench_codec.py [--messages 5000] [--repeat 20]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from models.conversation import Conversation  # noqa: E402
+from utils.json_codec import CODECS, get_codec  # noqa: E402
+
+
+def build_conversation(message_count: int) -> Conversation:
+    """
+    Build a conversation with alternating user and assistant messages of realistic length.
+
+    Args:
+        message_count (int): Number of messages
+
+    Returns:
+        Conversation: The conversation
+    """
+    conversation = Conversation(id='benchmark', metadata={'source': 'benchmark'})
+    for i in range(message_count):
+        if i % 2 == 0:
+            conversation.add_message('user', f"Show me the stock level and price of product #{i} please")
+        else:
+            conversation.add_message('assistant', f"Product #{i - 1} 'Cotton T-Shirt' costs $25.00 and has "
+                                                  f"{i % 97} units in stock. " * 4)
+    return conversation
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """
+    Get the best wall time of several runs of a function.
+
+    Args:
+        func (Callable[[], object]): Function to time
+        repeat (int): Number of runs
+
+    Returns:
+        float: Fastest run in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark conversation snapshot encoding and decoding.')
+    parser.add_argument('--messages', type=int, default=5000, help='Messages per conversation')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement; the fastest is reported')
+    args = parser.parse_args(argv)
+
+    conversation = build_conversation(args.messages)
+
+    def legacy_encode():
+        return json.dumps(conversation.to_dict(), indent=2).encode('utf-8')
+
+    legacy_data = legacy_encode()
+    rows = [(
+        'json (indented dicts)',
+        len(legacy_data),
+        measure(legacy_encode, args.repeat),
+        # Decoding includes reading every message, as the original eager loader did
+        measure(lambda: list(Conversation.from_dict(json.loads(legacy_data)).messages), args.repeat)
+    )]
+
+    for name in CODECS:
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            print(f"{name}: not installed, skipped")
+            continue
+        data = codec.dumps(conversation.to_record())
+        rows.append((
+            f"{name} (compact)",
+            len(data),
+            measure(lambda: codec.dumps(conversation.to_record()), args.repeat),
+            measure(lambda: list(Conversation.from_dict(codec.loads(data)).messages), args.repeat)
+        ))
+
+    print(f"{args.messages} messages, best of {args.repeat} runs")
+    print(f"{'format':<24}{'size KB':>10}{'encode ms':>12}{'decode ms':>12}{'encode MB/s':>14}{'decode MB/s':>14}")
+    for name, size, encode_time, decode_time in rows:
+        print(f"{name:<24}{size / 1024:>10.0f}{encode_time * 1000:>12.2f}{decode_time * 1000:>12.2f}"
+              f"{size / encode_time / 1e6:>14.1f}{size / decode_time / 1e6:>14.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Conversation Service Benchmarks
+
+Times ConversationService create, add, save, load and list operations and
+context building at several conversation sizes, on file storage in a
+temporary directory, and full-text searches over indexes of several sizes.
+"""
+
+import os
+import logging
+import tempfile
+from typing import List
+
+from harness import BenchmarkResult, run_case
+
+from models.conversation import Conversation, LazyMessageList, Message
+from services.conversation_service import ConversationService
+from storage.search import ConversationSearchIndex
+
+USER_TEXT = "Show me the stock level and price of product #{0} please"
+ASSISTANT_TEXT = "Product #{0} 'Cotton T-Shirt' costs $25.00 and has {1} units in stock. " * 4
+
+
+def message_records(count: int) -> List[list]:
+    """
+    Build alternating user and assistant message records of realistic length.
+
+    Args:
+        count (int): Number of messages
+
+    Returns:
+        List[list]: Compact message records, as stored on disk
+    """
+    records = []
+    for i in range(count):
+        if i % 2 == 0:
+            message = Message('user', USER_TEXT.format(i))
+        else:
+            message = Message('assistant', ASSISTANT_TEXT.format(i - 1, i % 97))
+        records.append(message.to_record())
+    return records
+
+
+def seed_conversation(service: ConversationService, message_count: int) -> Conversation:
+    """
+    Create and save a conversation holding a number of messages.
+
+    Args:
+        service (ConversationService): Service to create the conversation in
+        message_count (int): Number of messages
+
+    Returns:
+        Conversation: The saved conversation
+    """
+    conversation = service.create_conversation({'source': 'benchmark'})
+    conversation.messages = LazyMessageList(message_records(message_count))
+    service.save_conversation(conversation)
+    return conversation
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Run the conversation benchmarks.
+
+    Args:
+        quick (bool): Use smaller sizes and fewer iterations
+
+    Returns:
+        List[BenchmarkResult]: Results of every case
+    """
+    # Per-operation logging would dominate the timings
+    logging.getLogger('wooagent').setLevel(logging.ERROR)
+
+    message_sizes = (10, 1000) if quick else (10, 1000, 100000)
+    conversation_counts = (10, 1000) if quick else (10, 10000)
+    index_sizes = (10000,) if quick else (10000, 1000000)
+    iterations = 20 if quick else 100
+    results = []
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+        service = ConversationService(storage_dir=storage_dir)
+        results.append(run_case('conversation.create', lambda: service.create_conversation(), iterations))
+
+        for size in message_sizes:
+            # Large conversations get fewer iterations, so the suite finishes in minutes
+            repeat = max(5, iterations // (1 + size // 10000))
+            conversation = seed_conversation(service, size)
+            cid = conversation.id
+
+            results.append(run_case(
+                f"conversation.add_message[{size}]",
+                lambda: service.add_message(cid, 'user', USER_TEXT.format(size)),
+                repeat
+            ))
+            results.append(run_case(
+                f"conversation.save[{size}]",
+                lambda: service.save_conversation(conversation),
+                repeat
+            ))
+            results.append(run_case(
+                f"conversation.load[{size}]",
+                lambda _: service.get_conversation(cid),
+                repeat,
+                # Drop the cached copy so every call reads from storage
+                setup=lambda: service.active_conversations.pop(cid)
+            ))
+            loaded = service.get_conversation(cid)
+            results.append(run_case(
+                f"conversation.context[{size}]",
+                lambda: loaded.get_messages_for_context(max_messages=50),
+                repeat
+            ))
+            results.append(run_case(
+                f"conversation.context_full[{size}]",
+                lambda: loaded.get_messages_for_context(),
+                repeat
+            ))
+        service.close()
+
+    for count in conversation_counts:
+        with tempfile.TemporaryDirectory() as storage_dir:
+            service = ConversationService(storage_dir=storage_dir)
+            for _ in range(count):
+                seed_conversation(service, 10)
+            repeat = max(5, iterations // (1 + count // 1000))
+            results.append(run_case(
+                f"conversation.list_summaries[{count}]",
+                lambda: service.list_conversation_summaries(limit=20),
+                repeat
+            ))
+            results.append(run_case(
+                f"conversation.list[{count}]",
+                lambda: service.list_conversations(limit=20),
+                repeat
+            ))
+            service.close()
+
+    for size in index_sizes:
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = ConversationSearchIndex(os.path.join(index_dir, 'search.sqlite3'))
+            for start in range(0, size, 100):
+                conversation = Conversation(id=f"benchmark-{start}")
+                conversation.messages = LazyMessageList(message_records(100))
+                conversation.add_message('user', USER_TEXT.format(start))
+                index.replace(conversation)
+            # A rare word, and words found in every other message
+            results.append(run_case(
+                f"search.rare[{size}]",
+                lambda: index.search(f"product {size // 2}"),
+                iterations
+            ))
+            results.append(run_case(
+                f"search.common[{size}]",
+                lambda: index.search('cotton shirt stock'),
+                iterations
+            ))
+            results.append(run_case(
+                f"search.filtered[{size}]",
+                lambda: index.search('stock price', roles='user'),
+                iterations
+            ))
+            index.close()
+
+    return results
@@ -0,0 +1,128 @@
+"""
+Startup Benchmark
+
+Measures how long the agent server takes from process start until it answers
+``/health/live`` and until ``/health/ready`` reports the agent connected, for
+each startup mode, against a local stand-in for the MCP server.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--modes eager,background,lazy] [--latency-ms 50]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeMCPServer, FakeOpenAIServer  # noqa: E402
+from harness import SRC_DIR, BenchmarkResult, print_results  # noqa: E402
+
+
+def free_port() -> int:
+    """
+    Get a localhost port nothing is listening on.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def responds(url: str) -> bool:
+    """
+    Check whether a URL answers with a 200.
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def start_once(mode: str, env: dict, timeout: float) -> Optional[List[float]]:
+    """
+    Start the server once and time it until it is live and until it is ready.
+
+    Args:
+        mode (str): Value of AGENT_STARTUP
+        env (dict): Environment of the server process
+        timeout (float): Seconds to wait for readiness
+
+    Returns:
+        Optional[List[float]]: Milliseconds until live and until ready, None if it never got ready
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SRC_DIR, 'main.py')],
+        env={**env, 'AGENT_STARTUP': mode, 'AGENT_PORT': str(port)},
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    live = None
+    try:
+        while time.perf_counter() - started < timeout and process.poll() is None:
+            if live is None and responds(f"{base_url}/health/live"):
+                live = (time.perf_counter() - started) * 1000
+            if live is not None and responds(f"{base_url}/health/ready"):
+                return [live, (time.perf_counter() - started) * 1000]
+            time.sleep(0.005)
+        return None
+    finally:
+        process.terminate()
+        try:
+            _, stderr = process.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            _, stderr = process.communicate()
+        if live is None and stderr:
+            print(stderr.decode('utf-8', 'replace')[-2000:], file=sys.stderr)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark agent server startup.')
+    parser.add_argument('--runs', type=int, default=5, help='Server starts per mode')
+    parser.add_argument('--modes', default='eager,background,lazy', help='Comma-separated AGENT_STARTUP modes')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Simulated latency of the MCP server')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for a server to get ready')
+    args = parser.parse_args(argv)
+
+    results = []
+    with FakeOpenAIServer(args.latency_ms) as openai_server, FakeMCPServer(args.latency_ms) as mcp_server, \
+            tempfile.TemporaryDirectory() as work_dir:
+        env = {
+            **os.environ,
+            'OPENAI_API_KEY': 'benchmark',
+            'OPENAI_BASE_URL': f"{openai_server.url}/v1",
+            'MCP_SERVER_URL': mcp_server.url,
+            'AGENT_HOST': '127.0.0.1',
+            'CATALOG_MIRROR_PATH': '',
+            'CONVERSATION_STORAGE_DIR': os.path.join(work_dir, 'conversations'),
+            'CONVERSATION_SEARCH_PATH': os.path.join(work_dir, 'conversation_search.sqlite3'),
+            'LOG_FILE': os.path.join(work_dir, 'agent.log'),
+        }
+        for mode in args.modes.split(','):
+            live = BenchmarkResult(f"startup.{mode}.live")
+            ready = BenchmarkResult(f"startup.{mode}.ready")
+            for _ in range(args.runs):
+                timings = start_once(mode, env, args.timeout)
+                if timings is None:
+                    print(f"{mode}: server did not get ready within {args.timeout:g}s", file=sys.stderr)
+                    return 1
+                live.samples.append(timings[0])
+                ready.samples.append(timings[1])
+            results.extend([live, ready])
+
+    print_results(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
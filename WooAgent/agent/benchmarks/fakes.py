@@ -0,0 +1,234 @@
+"""
+Local Service Stand-ins
+
+This module runs fake OpenAI and MCP servers on localhost with configurable
+latency, so full agent turns can be benchmarked without network access or
+API costs.
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+PRODUCTS = [
+    {'id': i, 'name': f"Product {i}", 'price': f"{10 + i}.00", 'stock_quantity': i * 3}
+    for i in range(1, 21)
+]
+ORDERS = [{'id': 1000 + i, 'status': 'processing', 'total': f"{25 + i}.00"} for i in range(10)]
+COUPONS = [{'id': 1, 'code': 'SUMMER2025', 'amount': '20', 'discount_type': 'percent'}]
+
+REPLY = "Here are the products you asked about: Product 1 costs $11.00 and Product 2 costs $12.00."
+
+
+class FakeServer:
+    """
+    A threaded HTTP server running in the background.
+    """
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, latency_ms: float = 0.0):
+        """
+        Initialize the server on a free localhost port.
+
+        Args:
+            latency_ms (float): Delay added before every response
+        """
+        self.latency_ms = latency_ms
+        self.requests = 0
+        server = self
+
+        class Handler(self.handler_class):
+            fake = server
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'FakeServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """
+    Request handler helpers shared by the fakes.
+    """
+    fake: FakeServer
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _delay(self):
+        self.fake.requests += 1
+        if self.fake.latency_ms:
+            time.sleep(self.fake.latency_ms / 1000)
+
+    def _send_json(self, payload: Any, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_POST(self):
+        request = self._read_body()
+        self._delay()
+        if not self.path.endswith('/chat/completions'):
+            self._send_json({'error': {'message': f"Unknown path {self.path}"}}, status=404)
+            return
+
+        model = request.get('model', 'gpt-4')
+        prompt_tokens = sum(len(str(m.get('content', ''))) // 4 for m in request.get('messages', []))
+        if request.get('stream'):
+            self._stream(model)
+            return
+
+        self._send_json({
+            'id': 'chatcmpl-benchmark',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': REPLY},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': len(REPLY) // 4,
+                'total_tokens': prompt_tokens + len(REPLY) // 4
+            }
+        })
+
+    def _stream(self, model: str):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for word in REPLY.split(' '):
+            chunk = {
+                'id': 'chatcmpl-benchmark',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class FakeOpenAIServer(FakeServer):
+    """
+    Answers ``POST /v1/chat/completions`` with a fixed reply, streamed if requested.
+
+    Point the OpenAI SDK at it with ``OPENAI_BASE_URL=<url>/v1``.
+    """
+    handler_class = _OpenAIHandler
+
+
+def _rest_lookup(path: str) -> Tuple[int, Any]:
+    """
+    Resolve a WooCommerce REST path of the MCP server's HTTP API to canned data.
+    """
+    parts = [p for p in path.split('?')[0].split('/') if p]
+    if parts[:1] != ['api'] or len(parts) < 2:
+        return 404, {'error': 'Not found'}
+    collections = {'products': PRODUCTS, 'orders': ORDERS, 'coupons': COUPONS}
+    if parts[1] == 'health':
+        return 200, {'status': 'ok'}
+    items = collections.get(parts[1])
+    if items is None:
+        return 404, {'error': 'Not found'}
+    if len(parts) == 2:
+        return 200, items
+    for item in items:
+        if str(item['id']) == parts[2]:
+            return 200, item
+    return 404, {'error': 'Not found'}
+
+
+class _MCPHandler(_JSONHandler):
+    def do_GET(self):
+        self._delay()
+        status, payload = _rest_lookup(self.path)
+        self._send_json(payload, status)
+
+    def do_PUT(self):
+        request = self._read_body()
+        self._delay()
+        status, payload = _rest_lookup(self.path)
+        if status == 200 and isinstance(payload, dict):
+            payload = {**payload, **request}
+        self._send_json(payload, status)
+
+    def do_POST(self):
+        request = self._read_body()
+        self._delay()
+        if self.path.startswith('/api/'):
+            self._send_json({'id': 9999, **request}, 201)
+            return
+        self._send_json(self._json_rpc(request))
+
+    def _json_rpc(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer the MCP JSON-RPC methods a tool client needs.
+        """
+        method = request.get('method')
+        if method == 'initialize':
+            result = {'protocolVersion': '2024-11-05', 'capabilities': {'tools': {}},
+                      'serverInfo': {'name': 'fake-woocommerce', 'version': '1.0'}}
+        elif method == 'tools/list':
+            result = {'tools': [
+                {'name': name, 'description': name.replace('_', ' '), 'inputSchema': {'type': 'object'}}
+                for name in ('list_products', 'get_product', 'list_orders', 'get_order', 'list_coupons')
+            ]}
+        elif method == 'tools/call':
+            params = request.get('params') or {}
+            name = params.get('name', '')
+            arguments = params.get('arguments') or {}
+            collection = name.split('_', 1)[-1].rstrip('s') + 's'
+            path = f"/api/{collection}" + (f"/{arguments['id']}" if 'id' in arguments else '')
+            _, payload = _rest_lookup(path)
+            result = {'content': [{'type': 'text', 'text': json.dumps(payload)}]}
+        else:
+            result = {}
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+
+
+class FakeMCPServer(FakeServer):
+    """
+    Serves the MCP server's HTTP API (``/api/products`` etc.) and minimal MCP
+    JSON-RPC (``initialize``, ``tools/list``, ``tools/call``) from canned data.
+    """
+    handler_class = _MCPHandler
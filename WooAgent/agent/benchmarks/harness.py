@@ -0,0 +1,186 @@
+"""
+Benchmark Harness
+
+This module times benchmark cases, summarizes their latency percentiles and
+compares them against a stored baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Get a percentile of samples by linear interpolation.
+
+    Args:
+        samples (List[float]): Samples, in any order
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The percentile, or 0.0 if there are no samples
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Latency samples of one benchmark case, in milliseconds.
+    """
+    name: str
+    samples: List[float] = field(default_factory=list)
+
+    @property
+    def p50(self) -> float:
+        return percentile(self.samples, 0.50)
+
+    @property
+    def p95(self) -> float:
+        return percentile(self.samples, 0.95)
+
+    @property
+    def p99(self) -> float:
+        return percentile(self.samples, 0.99)
+
+    @property
+    def throughput(self) -> float:
+        """Operations per second at the mean latency."""
+        total = sum(self.samples)
+        return len(self.samples) / (total / 1000) if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the result to a dictionary format.
+
+        Returns:
+            Dict[str, Any]: Iterations, percentiles and throughput
+        """
+        return {
+            'iterations': len(self.samples),
+            'p50_ms': round(self.p50, 4),
+            'p95_ms': round(self.p95, 4),
+            'p99_ms': round(self.p99, 4),
+            'ops_per_sec': round(self.throughput, 1)
+        }
+
+
+def run_case(name: str, func: Callable[[], Any], iterations: int = 100, warmup: int = 3,
+             setup: Optional[Callable[[], Any]] = None) -> BenchmarkResult:
+    """
+    Time a benchmark case.
+
+    Args:
+        name (str): Name of the case
+        func (Callable[[], Any]): Operation to time; receives the value of ``setup`` if given
+        iterations (int): Number of timed runs
+        warmup (int): Untimed runs before timing starts
+        setup (Optional[Callable[[], Any]]): Untimed preparation run before every call
+
+    Returns:
+        BenchmarkResult: The samples of every timed run
+    """
+    result = BenchmarkResult(name)
+    for index in range(warmup + iterations):
+        if setup is not None:
+            argument = setup()
+            started = time.perf_counter()
+            func(argument)
+        else:
+            started = time.perf_counter()
+            func()
+        elapsed = (time.perf_counter() - started) * 1000
+        if index >= warmup:
+            result.samples.append(elapsed)
+    return result
+
+
+def print_results(results: List[BenchmarkResult]):
+    """
+    Print a table of benchmark results.
+
+    Args:
+        results (List[BenchmarkResult]): Results to print
+    """
+    width = max([len(r.name) for r in results] + [10]) + 2
+    print(f"{'case':<{width}}{'n':>7}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'ops/s':>12}")
+    for r in results:
+        print(f"{r.name:<{width}}{len(r.samples):>7}{r.p50:>12.3f}{r.p95:>12.3f}{r.p99:>12.3f}{r.throughput:>12.1f}")
+
+
+def save_baseline(path: str, results: List[BenchmarkResult]):
+    """
+    Store results as the baseline for later runs, merging with cases already stored.
+
+    Args:
+        path (str): Path to the baseline JSON file
+        results (List[BenchmarkResult]): Results to store
+    """
+    baseline = load_baseline(path)
+    baseline['machine'] = f"{platform.node()} {platform.machine()} Python {platform.python_version()}"
+    baseline.setdefault('cases', {}).update({r.name: r.to_dict() for r in results})
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    """
+    Load a stored baseline.
+
+    Args:
+        path (str): Path to the baseline JSON file
+
+    Returns:
+        Dict[str, Any]: The baseline, empty if the file does not exist
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(results: List[BenchmarkResult], baseline: Dict[str, Any],
+                        tolerance: float = 0.2) -> List[str]:
+    """
+    Compare results with a baseline and describe the regressions.
+
+    A case regresses when its p50 or p95 is more than ``tolerance`` slower
+    than the baseline's. Cases missing from the baseline are not compared.
+
+    Args:
+        results (List[BenchmarkResult]): Results of this run
+        baseline (Dict[str, Any]): Baseline loaded with ``load_baseline``
+        tolerance (float): Allowed slowdown as a fraction
+
+    Returns:
+        List[str]: One line per regression, empty if there are none
+    """
+    regressions = []
+    cases = baseline.get('cases', {})
+    for result in results:
+        stored = cases.get(result.name)
+        if not stored:
+            continue
+        for key, current in (('p50_ms', result.p50), ('p95_ms', result.p95)):
+            previous = stored.get(key) or 0
+            if previous and current > previous * (1 + tolerance):
+                regressions.append(
+                    f"{result.name}: {key[:3]} {current:.3f}ms vs baseline {previous:.3f}ms "
+                    f"(+{(current / previous - 1) * 100:.0f}%)"
+                )
+    return regressions
@@ -0,0 +1,72 @@
+"""
+Benchmark Runner
+
+Runs the benchmark suites, prints p50/p95/p99 latencies and compares them
+with a stored baseline.
+
+Usage:
+    python benchmarks/run.py [--suite conversations|agent|all] [--quick]
+                             [--latency-ms 50] [--baseline benchmarks/baseline.json]
+                             [--save-baseline] [--tolerance 0.2]
+
+Exits with status 1 if any case is slower than the baseline by more than the
+tolerance.
+"""
+
+import os
+import sys
+import argparse
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import compare_to_baseline, load_baseline, print_results, save_baseline  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the agent hot paths.')
+    parser.add_argument('--suite', choices=('conversations', 'agent', 'all'), default='all',
+                        help='Benchmarks to run')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes and fewer iterations')
+    parser.add_argument('--latency-ms', type=float, default=50.0,
+                        help='Simulated latency of the fake OpenAI and MCP servers')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline, as a fraction')
+    args = parser.parse_args(argv)
+
+    results = []
+    if args.suite in ('conversations', 'all'):
+        import bench_conversations
+        results.extend(bench_conversations.run(quick=args.quick))
+    if args.suite in ('agent', 'all'):
+        import bench_agent
+        results.extend(bench_agent.run(quick=args.quick, latency_ms=args.latency_ms))
+
+    print_results(results)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions against {args.baseline} ({baseline.get('machine', 'unknown machine')}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
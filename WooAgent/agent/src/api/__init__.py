@@ -0,0 +1,9 @@
+"""
+API Package
+
+This package contains the HTTP front end for the WooAgent application.
+"""
+
+from .server import create_app, run_server
+
+__all__ = ['create_app', 'run_server']
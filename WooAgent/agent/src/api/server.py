@@ -0,0 +1,659 @@
+"""
+Agent HTTP Server
+
+This module exposes the AgentService over HTTP for the integration layer.
+"""
+
+import os
+import json
+import time
+import signal
+import threading
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import web
+
+from services.batch_runner import BatchRunner, validate_task
+from services.catalog_sync import verify_webhook_signature
+from utils.concurrency import RateLimiter
+from utils.logging_config import shutdown_logging, use_worker_log_file
+from utils.metrics import REGISTRY
+from utils.tracing import current_trace_id, start_trace
+
+logger = logging.getLogger('wooagent')
+
+AGENT_SERVICE_KEY = web.AppKey('agent_service', object)
+LIMITER_KEY = web.AppKey('limiter', object)
+EXECUTOR_KEY = web.AppKey('executor', ThreadPoolExecutor)
+CATALOG_SYNC_KEY = web.AppKey('catalog_sync', object)
+WEBHOOK_SECRET_KEY = web.AppKey('webhook_secret', str)
+METRICS_RUNNER_KEY = web.AppKey('metrics_runner', web.AppRunner)
+BATCH_CONCURRENCY_KEY = web.AppKey('batch_concurrency', int)
+BATCH_LOCK_KEY = web.AppKey('batch_lock', asyncio.Lock)
+
+
+class ServerBusyError(Exception):
+    """
+    Raised when the agent server cannot accept more work.
+    """
+
+
+class ConcurrencyLimiter:
+    """
+    Bounds the number of agent turns running at once and the number waiting.
+
+    Up to ``max_workers`` turns run concurrently; up to ``max_queue`` more may
+    wait for a free worker. Anything beyond that is rejected immediately so a
+    traffic spike does not pile up requests behind the caller's timeout.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_workers (int): Maximum number of turns processed concurrently
+            max_queue (int): Maximum number of turns waiting for a worker
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._pending = 0
+        self._running = 0
+
+    @property
+    def running(self) -> int:
+        """Number of turns currently being processed."""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Number of turns waiting for a free worker."""
+        return self._pending - self._running
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Reserve a worker slot for the duration of the block.
+
+        Raises:
+            ServerBusyError: If both the workers and the queue are full
+        """
+        if self._pending >= self.max_workers + self.max_queue:
+            raise ServerBusyError("Agent is at capacity, please retry shortly")
+
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                self._running += 1
+                try:
+                    yield
+                finally:
+                    self._running -= 1
+        finally:
+            self._pending -= 1
+
+
+def _error_response(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    """
+    Build an error response in the format expected by the integration layer.
+
+    Args:
+        status (int): HTTP status code
+        message (str): Error message
+        headers (Optional[Dict[str, str]]): Extra response headers
+
+    Returns:
+        web.Response: JSON error response
+    """
+    return web.json_response({'success': False, 'message': message}, status=status, headers=headers)
+
+
+async def _read_json(request: web.Request) -> Dict[str, Any]:
+    """
+    Read a JSON object from the request body.
+
+    Args:
+        request (web.Request): Incoming request
+
+    Returns:
+        Dict[str, Any]: Parsed body, empty if no body was sent
+
+    Raises:
+        web.HTTPBadRequest: If the body is not a JSON object
+    """
+    if not request.can_read_body:
+        return {}
+    try:
+        data = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text='{"success": false, "message": "Invalid JSON body"}',
+                                 content_type='application/json')
+    if not isinstance(data, dict):
+        raise web.HTTPBadRequest(text='{"success": false, "message": "JSON body must be an object"}',
+                                 content_type='application/json')
+    return data
+
+
+async def _run_blocking(func, *args, executor: Optional[ThreadPoolExecutor] = None):
+    """
+    Run a blocking AgentService call off the event loop.
+
+    Args:
+        func: Callable to run
+        *args: Positional arguments for the callable
+        executor (Optional[ThreadPoolExecutor]): Executor to use, defaults to the loop's executor
+
+    Returns:
+        Any: The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    # Run in a copy of this context, so the call logs the request's trace ID
+    return await loop.run_in_executor(executor, contextvars.copy_context().run, func, *args)
+
+
+@web.middleware
+async def trace_middleware(request: web.Request, handler) -> web.StreamResponse:
+    """
+    Trace each request under the caller's ``X-Request-ID``, or a new ID, and return it.
+    """
+    with start_trace(request.headers.get('X-Request-ID')) as trace:
+        response = await handler(request)
+        if not response.prepared:
+            response.headers['X-Request-ID'] = trace.trace_id
+        return response
+
+
+async def health(request: web.Request) -> web.Response:
+    """
+    Report server status and current load.
+    """
+    limiter: ConcurrencyLimiter = request.app[LIMITER_KEY]
+    return web.json_response({
+        'status': 'ok',
+        'timestamp': datetime.now().isoformat(),
+        'workers': limiter.max_workers,
+        'running': limiter.running,
+        'queued': limiter.queued
+    })
+
+
+async def liveness(request: web.Request) -> web.Response:
+    """
+    Report that the server is up and its event loop responsive.
+    """
+    return web.json_response({'status': 'ok'})
+
+
+async def readiness(request: web.Request) -> web.Response:
+    """
+    Report whether the agent is connected and requests will be answered without a cold start.
+    """
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    if not agent_service.ready:
+        return web.json_response({'status': 'starting'}, status=503)
+    return web.json_response({'status': 'ready'})
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """
+    Report turn, tool call and storage metrics in the Prometheus text format.
+    """
+    return web.Response(
+        body=REGISTRY.render().encode('utf-8'),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+
+async def post_message(request: web.Request) -> web.Response:
+    """
+    Process a user message and return the agent's reply.
+
+    Retries of one submission can send the same ``request_id`` (or
+    ``Idempotency-Key`` header) to get the original reply.
+    """
+    data = await _read_json(request)
+    message = data.get('message')
+    if not message or not isinstance(message, str):
+        return _error_response(400, 'Message is required')
+
+    conversation_id = data.get('conversation_id') or ''
+    request_id = data.get('request_id') or request.headers.get('Idempotency-Key')
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    limiter: ConcurrencyLimiter = request.app[LIMITER_KEY]
+
+    try:
+        async with limiter.slot():
+            result = await _run_blocking(agent_service.process_message, conversation_id, message, request_id,
+                                         executor=request.app[EXECUTOR_KEY])
+    except ServerBusyError as e:
+        logger.warning("Rejected message for conversation %s: server busy", conversation_id or '<new>')
+        return _error_response(429, str(e), headers={'Retry-After': '1'})
+
+    return web.json_response(result)
+
+
+async def post_message_stream(request: web.Request) -> web.StreamResponse:
+    """
+    Process a user message and stream the agent's reply as server-sent events.
+
+    Each event is sent as ``event: <type>`` with the JSON event as its data;
+    see AgentService.stream_message for the event types.
+    """
+    data = await _read_json(request)
+    message = data.get('message')
+    if not message or not isinstance(message, str):
+        return _error_response(400, 'Message is required')
+
+    conversation_id = data.get('conversation_id') or ''
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    limiter: ConcurrencyLimiter = request.app[LIMITER_KEY]
+
+    try:
+        async with limiter.slot():
+            response = web.StreamResponse(headers={
+                'Content-Type': 'text/event-stream',
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no',
+                'X-Request-ID': current_trace_id()
+            })
+            await response.prepare(request)
+
+            async for event in agent_service.stream_message(conversation_id, message,
+                                                            executor=request.app[EXECUTOR_KEY]):
+                payload = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                await response.write(payload.encode('utf-8'))
+
+            await response.write_eof()
+            return response
+    except ServerBusyError as e:
+        logger.warning("Rejected message for conversation %s: server busy", conversation_id or '<new>')
+        return _error_response(429, str(e), headers={'Retry-After': '1'})
+
+
+async def post_batch(request: web.Request) -> web.StreamResponse:
+    """
+    Run a batch of agent tasks in this process and stream their results as JSON lines.
+
+    The body holds ``tasks`` (see ``validate_task``) and optionally
+    ``turns_per_minute``. Tasks share this process's agents and outbound
+    scheduler with interactive requests, whose calls go first. Results are
+    written one per line as tasks finish. One batch runs at a time; if the
+    client disconnects, tasks not yet started are dropped.
+    """
+    data = await _read_json(request)
+    tasks = data.get('tasks')
+    if not isinstance(tasks, list) or not tasks:
+        return _error_response(400, 'tasks must be a non-empty list')
+    try:
+        for position, task in enumerate(tasks, 1):
+            validate_task(task, position)
+        turns_per_minute = float(data.get('turns_per_minute') or 0)
+    except ValueError as e:
+        return _error_response(400, f"Invalid batch: {e}")
+
+    lock: asyncio.Lock = request.app[BATCH_LOCK_KEY]
+    if lock.locked():
+        return _error_response(409, 'A batch is already running', headers={'Retry-After': '60'})
+
+    async with lock:
+        runner = BatchRunner(
+            request.app[AGENT_SERVICE_KEY],
+            concurrency=request.app[BATCH_CONCURRENCY_KEY],
+            rate_limiter=RateLimiter(turns_per_minute / 60, burst=1) if turns_per_minute > 0 else None
+        )
+        response = web.StreamResponse(headers={
+            'Content-Type': 'application/x-ndjson',
+            'X-Request-ID': current_trace_id()
+        })
+        await response.prepare(request)
+
+        loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def run():
+            try:
+                for result in runner.results(tasks, stop=stop):
+                    loop.call_soon_threadsafe(results.put_nowait, result)
+            finally:
+                loop.call_soon_threadsafe(results.put_nowait, None)
+
+        # The runner has threads of its own, so this one only waits on them
+        job = loop.run_in_executor(None, contextvars.copy_context().run, run)
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                await response.write((json.dumps(result, ensure_ascii=False) + '\n').encode('utf-8'))
+        finally:
+            stop.set()
+            await job
+
+        await response.write_eof()
+        return response
+
+
+async def list_conversations(request: web.Request) -> web.Response:
+    """
+    List recent conversations.
+
+    Supports ``limit``, a ``cursor`` from the ``X-Next-Cursor`` header of the
+    previous page, and ``metadata.<key>=<value>`` filters.
+    """
+    try:
+        limit = int(request.query.get('limit', 10))
+    except ValueError:
+        return _error_response(400, 'limit must be an integer')
+    if limit < 1:
+        return _error_response(400, 'limit must be positive')
+
+    cursor = request.query.get('cursor')
+    metadata_filter = {
+        key[len('metadata.'):]: value
+        for key, value in request.query.items()
+        if key.startswith('metadata.')
+    }
+
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    try:
+        page = await _run_blocking(agent_service.list_conversations_page, limit, cursor, metadata_filter)
+    except ValueError as e:
+        return _error_response(400, str(e))
+
+    headers = {'X-Next-Cursor': page['next_cursor']} if page['next_cursor'] else None
+    return web.json_response(page['conversations'], headers=headers)
+
+
+async def search_conversations(request: web.Request) -> web.Response:
+    """
+    Search the messages of all conversations.
+
+    Takes the words to find in ``q``, and supports ``limit``, ``role`` (repeatable),
+    ``since`` and ``until`` (ISO 8601) and ``conversation_id``.
+    """
+    query = request.query.get('q', '').strip()
+    if not query:
+        return _error_response(400, 'q is required')
+    try:
+        limit = int(request.query.get('limit', 10))
+    except ValueError:
+        return _error_response(400, 'limit must be an integer')
+    if not 1 <= limit <= 100:
+        return _error_response(400, 'limit must be between 1 and 100')
+
+    filters: Dict[str, Any] = {
+        key: request.query[key] for key in ('since', 'until', 'conversation_id') if key in request.query
+    }
+    if 'role' in request.query:
+        filters['role'] = request.query.getall('role')
+
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    try:
+        found = await _run_blocking(agent_service.search_conversations, query, limit, filters)
+    except ValueError as e:
+        return _error_response(400, str(e))
+    if not found['enabled']:
+        return _error_response(404, 'Conversation search is not enabled')
+    return web.json_response(found['results'])
+
+
+async def get_conversation(request: web.Request) -> web.Response:
+    """
+    Get the message history of a conversation.
+    """
+    conversation_id = request.match_info['conversation_id']
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    history = await _run_blocking(agent_service.get_conversation_history, conversation_id)
+    if history is None:
+        return _error_response(404, 'Conversation not found')
+
+    return web.json_response({
+        'conversation_id': conversation_id,
+        'messages': history
+    })
+
+
+async def create_conversation(request: web.Request) -> web.Response:
+    """
+    Create a new conversation.
+    """
+    data = await _read_json(request)
+    metadata = data.get('metadata') or {}
+    if not isinstance(metadata, dict):
+        return _error_response(400, 'metadata must be an object')
+
+    agent_service = request.app[AGENT_SERVICE_KEY]
+    conversation = await _run_blocking(agent_service.create_new_conversation, metadata)
+    return web.json_response(conversation, status=201)
+
+
+async def woocommerce_webhook(request: web.Request) -> web.Response:
+    """
+    Apply a WooCommerce webhook delivery to the catalog mirror.
+
+    Deliveries are checked against ``X-WC-Webhook-Signature`` when a webhook
+    secret is configured. WooCommerce's ping on webhook creation carries no
+    topic and is acknowledged without effect.
+    """
+    body = await request.read()
+    secret = request.app[WEBHOOK_SECRET_KEY]
+    if secret and not verify_webhook_signature(body, request.headers.get('X-WC-Webhook-Signature'), secret):
+        return _error_response(401, 'Invalid webhook signature')
+
+    topic = request.headers.get('X-WC-Webhook-Topic')
+    if not topic:
+        return web.json_response({'success': True, 'applied': False})
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return _error_response(400, 'Invalid JSON body')
+    if not isinstance(payload, dict):
+        return _error_response(400, 'JSON body must be an object')
+
+    catalog_sync = request.app[CATALOG_SYNC_KEY]
+    applied = await _run_blocking(catalog_sync.apply_webhook, topic, payload)
+    return web.json_response({'success': True, 'applied': applied})
+
+
+async def _shutdown_executor(app: web.Application):
+    """
+    Stop the worker pool when the application shuts down.
+    """
+    app[EXECUTOR_KEY].shutdown(wait=False, cancel_futures=True)
+
+
+def create_app(agent_service, max_workers: int = 8, max_queue: int = 32,
+               catalog_sync=None, webhook_secret: str = '', batch_concurrency: int = 2) -> web.Application:
+    """
+    Create the HTTP application around an agent service.
+
+    Args:
+        agent_service: The AgentService handling requests
+        max_workers (int): Maximum number of agent turns processed concurrently
+        max_queue (int): Maximum number of agent turns waiting for a worker
+        catalog_sync: The CatalogSync that WooCommerce webhooks are applied to, if any
+        webhook_secret (str): Secret WooCommerce signs webhook deliveries with
+        batch_concurrency (int): Maximum number of batch tasks running at once, in
+            addition to ``max_workers`` interactive turns
+
+    Returns:
+        web.Application: Configured application
+    """
+    app = web.Application(middlewares=[trace_middleware])
+    app[AGENT_SERVICE_KEY] = agent_service
+    app[LIMITER_KEY] = ConcurrencyLimiter(max_workers, max_queue)
+    app[EXECUTOR_KEY] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='agent-worker')
+    app[BATCH_CONCURRENCY_KEY] = batch_concurrency
+    app[BATCH_LOCK_KEY] = asyncio.Lock()
+    app.on_cleanup.append(_shutdown_executor)
+
+    app.router.add_get('/health', health)
+    app.router.add_get('/health/live', liveness)
+    app.router.add_get('/health/ready', readiness)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_post('/message', post_message)
+    app.router.add_post('/message/stream', post_message_stream)
+    app.router.add_get('/conversations', list_conversations)
+    app.router.add_post('/conversations', create_conversation)
+    app.router.add_get('/conversations/{conversation_id}', get_conversation)
+    app.router.add_get('/search', search_conversations)
+    app.router.add_post('/batch', post_batch)
+
+    if catalog_sync is not None:
+        app[CATALOG_SYNC_KEY] = catalog_sync
+        app[WEBHOOK_SECRET_KEY] = webhook_secret
+        app.router.add_post('/webhooks/woocommerce', woocommerce_webhook)
+
+    return app
+
+
+def create_metrics_app() -> web.Application:
+    """
+    Create an application serving only this process's ``/metrics``.
+
+    Returns:
+        web.Application: Configured application
+    """
+    app = web.Application()
+    app.router.add_get('/metrics', metrics)
+    return app
+
+
+def _start_metrics_server(host: str, port: int) -> Callable[[web.Application], Awaitable[None]]:
+    """
+    Build a startup hook serving this process's metrics on a port of its own.
+    """
+    async def start(app: web.Application):
+        runner = web.AppRunner(create_metrics_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        app[METRICS_RUNNER_KEY] = runner
+        logger.info("Serving this process's metrics on %s:%s", host, port)
+
+    return start
+
+
+async def _stop_metrics_server(app: web.Application):
+    """
+    Stop the metrics server when the application shuts down.
+    """
+    runner = app.get(METRICS_RUNNER_KEY)
+    if runner is not None:
+        await runner.cleanup()
+
+
+def run_server(agent_service, host: str = '0.0.0.0', port: int = 5000,
+               max_workers: int = 8, max_queue: int = 32, catalog_sync=None, webhook_secret: str = '',
+               reuse_port: bool = False, metrics_port: Optional[int] = None, batch_concurrency: int = 2):
+    """
+    Run the HTTP server until interrupted.
+
+    Args:
+        agent_service: The AgentService handling requests
+        host (str): Interface to bind to
+        port (int): Port to listen on
+        max_workers (int): Maximum number of agent turns processed concurrently
+        max_queue (int): Maximum number of agent turns waiting for a worker
+        catalog_sync: The CatalogSync that WooCommerce webhooks are applied to, if any
+        webhook_secret (str): Secret WooCommerce signs webhook deliveries with
+        reuse_port (bool): Share the port with other processes, which the kernel
+            then balances connections across
+        metrics_port (Optional[int]): Port serving only this process's ``/metrics``, for
+            scraping each worker process when several share ``port``
+        batch_concurrency (int): Maximum number of batch tasks running at once
+    """
+    app = create_app(agent_service, max_workers=max_workers, max_queue=max_queue,
+                     catalog_sync=catalog_sync, webhook_secret=webhook_secret,
+                     batch_concurrency=batch_concurrency)
+    if metrics_port is not None:
+        app.on_startup.append(_start_metrics_server(host, metrics_port))
+        app.on_cleanup.append(_stop_metrics_server)
+    logger.info("Starting agent server on %s:%s (workers=%s, queue=%s)", host, port, max_workers, max_queue)
+    web.run_app(app, host=host, port=port, print=None, reuse_port=reuse_port or None)
+
+
+def run_workers(serve: Callable[[int], None], processes: int, restart_delay: float = 1.0) -> int:
+    """
+    Run a server in several forked worker processes and supervise them.
+
+    Each worker calls ``serve(index)``, which builds its own services after the
+    fork and serves until told to stop, typically ``run_server`` with
+    ``reuse_port``. A worker that exits while the supervisor is running is
+    restarted. SIGTERM or SIGINT to the supervisor stops every worker. Each
+    worker logs to a file of its own, named by ``worker_log_file``.
+
+    Workers share nothing in memory. Request coalescing and the answer cache
+    are per process, so duplicates that reach different workers are each run;
+    only tool-cache generations are shared, through ``SharedGenerations``.
+
+    Args:
+        serve (Callable[[int], None]): Runs one worker, given its index from 0
+        processes (int): Number of worker processes
+        restart_delay (float): Seconds to wait before restarting a worker that exited
+
+    Returns:
+        int: 0 once every worker has stopped
+    """
+    workers: Dict[int, int] = {}
+    stopping = False
+
+    def start(index: int):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            use_worker_log_file(index)
+            code = 0
+            try:
+                serve(index)
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                logger.exception("Worker %s failed", index)
+                code = 1
+            finally:
+                # os._exit skips atexit handlers, so write out queued log records first
+                shutdown_logging()
+                logging.shutdown()
+                os._exit(code)
+        workers[pid] = index
+        logger.info("Started worker %s (pid %s)", index, pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for index in range(processes):
+        start(index)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning("Worker %s (pid %s) exited with status %s, restarting", index, pid,
+                       os.waitstatus_to_exitcode(status))
+        time.sleep(restart_delay)
+        if not stopping:
+            start(index)
+
+    logger.info("All workers stopped")
+    return 0
@@ -0,0 +1,112 @@
+"""
+WooAgent - Batch Entry Point
+
+This module runs the agent over a JSONL file of tasks, appending a result per
+task to a JSONL results file. Rerunning with the same results file resumes an
+interrupted job.
+
+With ``--server`` the tasks run in the agent server, where interactive
+requests take precedence over them for OpenAI and MCP capacity. Without it
+they run in this process, which does not share the server's rate limits.
+
+Usage:
+    python src/batch.py tasks.jsonl results.jsonl --server http://localhost:5000 --turns-per-minute 60
+    python src/batch.py tasks.jsonl results.jsonl --concurrency 4 --turns-per-minute 60
+"""
+
+import os
+import sys
+import logging
+import argparse
+import urllib.error
+
+from main import create_agent_service, create_scheduler
+from services.batch_runner import BatchRunner, load_tasks, run_on_server
+from utils.concurrency import RateLimiter
+from utils.logging_config import setup_logging
+
+logger = logging.getLogger('wooagent')
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run the agent over a JSONL file of tasks')
+    parser.add_argument('tasks', help='JSONL file with one {"message": ...} task per line')
+    parser.add_argument('results', help='JSONL file results are appended to')
+    parser.add_argument('--server', help='run the tasks in the agent server at this URL, behind its '
+                                         'interactive requests (concurrency: AGENT_BATCH_CONCURRENCY there)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='tasks running at once without --server (default 4)')
+    parser.add_argument('--turns-per-minute', type=float, default=0,
+                        help='maximum tasks started per minute, bounding OpenAI requests (default unlimited)')
+    parser.add_argument('--tool-calls-per-second', type=float, default=0,
+                        help='maximum tool calls sent to WooCommerce per second, without --server '
+                             '(default unlimited)')
+    parser.add_argument('--restart', action='store_true',
+                        help='discard the results file and run every task again')
+    args = parser.parse_args(argv)
+    if args.server and args.tool_calls_per_second:
+        parser.error('--tool-calls-per-second does not apply with --server, which uses MCP_RATE_LIMIT')
+    return args
+
+
+def run_in_server(args: argparse.Namespace) -> int:
+    """
+    Run the batch in the agent server.
+    """
+    try:
+        summary = run_on_server(args.server, load_tasks(args.tasks), args.results, resume=not args.restart,
+                                turns_per_minute=args.turns_per_minute)
+    except KeyboardInterrupt:
+        logger.warning("Batch stopped; rerun with the same results file to resume")
+        return 130
+    except ValueError as e:
+        logger.error("Invalid tasks file: %s", e)
+        return 1
+    except urllib.error.URLError as e:
+        logger.error("Agent server did not run the batch: %s", e)
+        return 1
+
+    print(f"{summary.succeeded} succeeded, {summary.failed} failed, {summary.skipped} skipped")
+    return 0 if summary.failed == 0 else 2
+
+
+def main(argv=None) -> int:
+    """
+    Entry point for batch jobs.
+    """
+    args = parse_args(argv)
+    # Load environment variables and configure logging
+    setup_logging()
+    if args.server:
+        return run_in_server(args)
+
+    missing_env_vars = [var for var in ('OPENAI_API_KEY', 'MCP_SERVER_URL') if not os.getenv(var)]
+    if missing_env_vars:
+        logger.error("Missing required environment variables: %s", ', '.join(missing_env_vars))
+        return 1
+
+    turn_rate_limiter = RateLimiter(args.turns_per_minute / 60, burst=1) if args.turns_per_minute > 0 else None
+
+    agent_service = create_agent_service(
+        agent_pool_size=args.concurrency,
+        scheduler=create_scheduler(mcp_rate=args.tool_calls_per_second or None)
+    )
+    try:
+        runner = BatchRunner(agent_service, concurrency=args.concurrency, rate_limiter=turn_rate_limiter)
+        summary = runner.run(load_tasks(args.tasks), args.results, resume=not args.restart)
+    except KeyboardInterrupt:
+        logger.warning("Batch stopped; rerun with the same results file to resume")
+        return 130
+    except ValueError as e:
+        logger.error("Invalid tasks file: %s", e)
+        return 1
+    finally:
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+    print(f"{summary.succeeded} succeeded, {summary.failed} failed, {summary.skipped} skipped")
+    return 0 if summary.failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
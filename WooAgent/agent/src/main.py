@@ -1,65 +1,226 @@
 """
 WooAgent - Main Entry Point
 
-This module initializes and runs the WooCommerce AI agent.
+This module initializes the WooCommerce AI agent and serves it over HTTP.
 """
 
 import os
 import sys
 import logging
-from dotenv import load_dotenv
-
-# Configure logging
-from utils.logging_config import setup_logging
-logger = setup_logging()
+from typing import Optional
 
 # Import services
 from services.agent_service import AgentService
+from services.conversation_service import ConversationService
+from services.catalog_sync import CatalogSync
+from services.storage_maintenance import StorageMaintenance
+from services.tool_cache import ToolResultCache
+from storage import CatalogMirror, ConversationSearchIndex, SharedGenerations, create_storage
+from utils.metrics import REGISTRY
+from utils.outbound import CircuitBreaker, OutboundScheduler, RetryPolicy, Upstream
+from api.server import run_server, run_workers
+from utils.logging_config import setup_logging
+
+# Logging is configured by main(), so importing this module has no side effects
+logger = logging.getLogger('wooagent')
+
+def _env_number(name: str, kind=float):
+    value = os.getenv(name)
+    return kind(value) if value else None
+
+def create_scheduler(mcp_rate: Optional[float] = None) -> OutboundScheduler:
+    """
+    Create the scheduler for calls to OpenAI and the MCP server from environment variables.
+    
+    Args:
+        mcp_rate (Optional[float]): MCP calls per second, overriding MCP_RATE_LIMIT
+        
+    Returns:
+        OutboundScheduler: The scheduler
+    """
+    retry = RetryPolicy(
+        max_attempts=int(os.getenv('OUTBOUND_MAX_ATTEMPTS', '3')),
+        max_delay=float(os.getenv('OUTBOUND_MAX_BACKOFF', '20'))
+    )
+    return OutboundScheduler(
+        Upstream(
+            'openai',
+            rate=_env_number('OPENAI_RATE_LIMIT'),
+            max_concurrency=_env_number('OPENAI_MAX_CONCURRENCY', int),
+            retry=retry
+        ),
+        Upstream(
+            'mcp',
+            rate=mcp_rate or _env_number('MCP_RATE_LIMIT'),
+            max_concurrency=_env_number('MCP_MAX_CONCURRENCY', int),
+            retry=retry,
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('MCP_BREAKER_THRESHOLD', '5')),
+                reset_timeout=float(os.getenv('MCP_BREAKER_RESET', '30'))
+            )
+        )
+    )
+
+def create_agent_service(**options) -> AgentService:
+    """
+    Create the agent service and its conversation store from environment variables.
+    
+    Args:
+        **options: AgentService arguments overriding those from the environment
+        
+    Returns:
+        AgentService: The agent service
+    """
+    # Initialize the conversation store
+    storage_backend = os.getenv('CONVERSATION_STORAGE', 'file')
+    if storage_backend == 'sqlite':
+        storage = create_storage('sqlite', path=os.getenv('CONVERSATION_DB_PATH', 'conversations.sqlite3'))
+    else:
+        storage = create_storage(
+            storage_backend,
+            storage_dir=os.getenv('CONVERSATION_STORAGE_DIR', 'conversations'),
+            compact_threshold=int(os.getenv('CONVERSATION_COMPACT_THRESHOLD', '100')),
+            write_behind=os.getenv('CONVERSATION_WRITE_BEHIND', 'false').lower() == 'true',
+            flush_interval=float(os.getenv('CONVERSATION_FLUSH_INTERVAL', '1.0')),
+            fsync=os.getenv('CONVERSATION_FSYNC', 'never'),
+            codec=os.getenv('CONVERSATION_JSON_CODEC') or None,
+            archive_compression=os.getenv('CONVERSATION_ARCHIVE_COMPRESSION') or None
+        )
+    
+    # Index every message for full-text search
+    search_path = os.getenv('CONVERSATION_SEARCH_PATH', 'conversation_search.sqlite3')
+    search_index = ConversationSearchIndex(search_path) if search_path else None
+    
+    conversation_service = ConversationService(
+        storage=storage,
+        search_index=search_index,
+        max_cached=int(os.getenv('CONVERSATION_CACHE_SIZE', '1000')),
+        cache_ttl=float(os.getenv('CONVERSATION_CACHE_TTL', '3600')),
+        cache_max_bytes=int(os.getenv('CONVERSATION_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    )
+    
+    settings = dict(
+        openai_api_key=os.getenv('OPENAI_API_KEY'),
+        mcp_server_url=os.getenv('MCP_SERVER_URL'),
+        conversation_service=conversation_service,
+        context_max_tokens=int(os.getenv('CONTEXT_MAX_TOKENS', '6000')),
+        answer_cache_ttl=float(os.getenv('ANSWER_CACHE_TTL', '60')),
+        agent_pool_size=int(os.getenv('AGENT_MAX_WORKERS', '8')),
+        coalesce_window=float(os.getenv('AGENT_COALESCE_WINDOW', '30')),
+        tool_fan_out=int(os.getenv('AGENT_TOOL_FAN_OUT', '4')),
+        tool_call_timeout=float(os.getenv('AGENT_TOOL_TIMEOUT', '30')),
+        scheduler=create_scheduler(),
+        model=os.getenv('AGENT_MODEL', 'gpt-4'),
+        fast_model=os.getenv('AGENT_FAST_MODEL') or None,
+        router_model=os.getenv('AGENT_ROUTER_MODEL') or None,
+        startup=os.getenv('AGENT_STARTUP', 'eager')
+    )
+    settings.update(options)
+    return AgentService(**settings)
+
+def serve(worker_index: int = 0, processes: int = 1):
+    """
+    Build the services and serve the agent over HTTP until interrupted.
+    
+    Args:
+        worker_index (int): Index of this worker process; only worker 0 polls the catalog
+            and maintains conversation storage
+        processes (int): Number of worker processes sharing the port
+    """
+    # Mirror the store catalog locally, kept fresh by polling and webhooks
+    catalog_mirror = None
+    catalog_sync = None
+    catalog_path = os.getenv('CATALOG_MIRROR_PATH', 'catalog.sqlite3')
+    if catalog_path:
+        catalog_mirror = CatalogMirror(catalog_path, max_age=float(os.getenv('CATALOG_MAX_AGE', '300')))
+        catalog_sync = CatalogSync(
+            catalog_mirror,
+            os.getenv('MCP_SERVER_URL'),
+            interval=float(os.getenv('CATALOG_SYNC_INTERVAL', '60')),
+            reconcile_interval=float(os.getenv('CATALOG_RECONCILE_INTERVAL', '240'))
+        )
+        if worker_index == 0:
+            catalog_sync.start()
+    
+    # Workers drop cached tool results when another worker changes the store, and
+    # label their metrics so each worker's series stay apart
+    options = {}
+    if processes > 1:
+        REGISTRY.set_constant_labels(worker=str(worker_index))
+        shared = SharedGenerations(os.getenv('CACHE_GENERATIONS_PATH', 'cache_generations.sqlite3'))
+        options['tool_cache'] = ToolResultCache(shared=shared)
+    
+    # Each worker serves its own metrics on the port after the previous worker's
+    metrics_port = int(os.getenv('AGENT_METRICS_PORT') or 0)
+    
+    # Initialize the agent service, with one pooled agent per worker thread and batch task
+    max_workers = int(os.getenv('AGENT_MAX_WORKERS', '8'))
+    batch_concurrency = int(os.getenv('AGENT_BATCH_CONCURRENCY', '2'))
+    agent_service = create_agent_service(agent_pool_size=max_workers + batch_concurrency,
+                                         catalog_mirror=catalog_mirror, **options)
+    logger.info("Agent service initialized successfully")
+    
+    # Archive idle conversations and delete those past retention
+    maintenance = StorageMaintenance(
+        agent_service.conversation_service,
+        interval=float(os.getenv('CONVERSATION_MAINTENANCE_INTERVAL', '3600')),
+        archive_after=_env_number('CONVERSATION_ARCHIVE_AFTER'),
+        retain_for=_env_number('CONVERSATION_RETENTION')
+    )
+    if worker_index == 0:
+        maintenance.start()
+    
+    try:
+        # Serve the agent until interrupted
+        run_server(
+            agent_service,
+            host=os.getenv('AGENT_HOST', '0.0.0.0'),
+            port=int(os.getenv('AGENT_PORT', '5000')),
+            max_workers=max_workers,
+            max_queue=int(os.getenv('AGENT_MAX_QUEUE', '32')),
+            catalog_sync=catalog_sync,
+            webhook_secret=os.getenv('WOOCOMMERCE_WEBHOOK_SECRET', ''),
+            reuse_port=processes > 1,
+            metrics_port=metrics_port + worker_index if metrics_port else None,
+            batch_concurrency=batch_concurrency
+        )
+    finally:
+        maintenance.stop()
+        if catalog_sync is not None:
+            catalog_sync.stop()
+            catalog_mirror.close()
+        agent_service.close()
+        agent_service.conversation_service.close()
 
 def main():
     """
     Main entry point for the WooAgent application.
     """
-    # Load environment variables
-    load_dotenv()
+    # Load environment variables and configure logging
+    setup_logging()
     
     # Check for required environment variables
     required_env_vars = ['OPENAI_API_KEY', 'MCP_SERVER_URL']
     missing_env_vars = [var for var in required_env_vars if not os.getenv(var)]
     
     if missing_env_vars:
-        logger.error(f"Missing required environment variables: {', '.join(missing_env_vars)}")
+        logger.error("Missing required environment variables: %s", ', '.join(missing_env_vars))
         logger.error("Please set these variables in your .env file")
         return 1
     
+    # Worker processes must share conversations through a store that checks versions
+    processes = int(os.getenv('AGENT_PROCESSES', '1'))
+    if processes > 1 and os.getenv('CONVERSATION_STORAGE', 'file') != 'sqlite':
+        logger.error("AGENT_PROCESSES > 1 requires CONVERSATION_STORAGE=sqlite")
+        return 1
+    
     try:
-        # Initialize the agent service
-        agent_service = AgentService(
-            openai_api_key=os.getenv('OPENAI_API_KEY'),
-            mcp_server_url=os.getenv('MCP_SERVER_URL')
-        )
-        logger.info("Agent service initialized successfully")
-        
-        # Create a new conversation
-        conversation = agent_service.create_new_conversation()
-        conversation_id = conversation['conversation_id']
-        logger.info(f"Created new conversation with ID: {conversation_id}")
-        
-        # For demonstration purposes, we'll process a simple request
-        message = "List the first 5 products in the store"
-        logger.info(f"Sending message: {message}")
-        
-        response = agent_service.process_message(conversation_id, message)
-        
-        if response['success']:
-            logger.info(f"Agent response: {response['response']}")
-        else:
-            logger.error(f"Error: {response.get('error', 'Unknown error')}")
-            return 1
-        
+        if processes > 1:
+            return run_workers(lambda index: serve(index, processes), processes)
+        serve()
         return 0
     except Exception as e:
-        logger.error(f"Unhandled exception: {str(e)}")
+        logger.error("Unhandled exception: %s", e)
         return 1
 
 if __name__ == "__main__":
@@ -4,6 +4,6 @@ Models Package
 This package contains data models for the WooAgent application.
 """
 
-from .conversation import Message, Conversation
+from .conversation import Message, LazyMessageList, Conversation, ConversationSummary
 
-__all__ = ['Message', 'Conversation']
+__all__ = ['Message', 'LazyMessageList', 'Conversation', 'ConversationSummary']
@@ -4,19 +4,101 @@ Conversation Model
 This module defines the data structures for conversation memory.
 """
 
+import sys
+import time
+from collections.abc import MutableSequence
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Union
+from datetime import datetime, timedelta, timezone
+
+# Version of the compact storage form written by Conversation.to_record
+RECORD_VERSION = 2
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_us(value: datetime) -> int:
+    """
+    Convert a datetime to integer microseconds since the epoch.
+
+    A naive datetime is taken as local time; in the hour repeated when DST
+    ends, its ``fold`` tells the two apart.
+    """
+    if value.tzinfo is None:
+        value = value.astimezone(timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_epoch_us(value: int) -> datetime:
+    """
+    Convert integer microseconds since the epoch to a naive local datetime.
+    """
+    seconds, microseconds = divmod(value, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=microseconds)
 
 
-@dataclass
 class Message:
     """
     Represents a single message in a conversation.
+    
+    Messages are numerous, so they use ``__slots__``, share interned role
+    strings and store their timestamp as integer microseconds since the epoch
+    (UTC); ``timestamp`` converts it to a local datetime on access, and
+    ``timestamp_utc`` to an aware one, which is what gets serialized.
     """
-    role: str  # 'user', 'assistant', or 'system'
-    content: str
-    timestamp: datetime = field(default_factory=datetime.now)
+    __slots__ = ('role', 'content', 'timestamp_us', 'token_count')
+    
+    def __init__(self, role: str, content: str, timestamp: Optional[datetime] = None,
+                 timestamp_us: Optional[int] = None):
+        """
+        Initialize the message.
+        
+        Args:
+            role (str): 'user', 'assistant', or 'system'
+            content (str): Content of the message
+            timestamp (Optional[datetime]): When the message was sent, defaults to now
+            timestamp_us (Optional[int]): The same as microseconds since the epoch, used instead if given
+        """
+        self.role = sys.intern(role)
+        self.content = content
+        if timestamp_us is None:
+            timestamp_us = _to_epoch_us(timestamp) if timestamp is not None else time.time_ns() // 1000
+        self.timestamp_us = timestamp_us
+        # Cached token count of the content, filled in on first use (not persisted)
+        self.token_count: Optional[int] = None
+    
+    @property
+    def timestamp(self) -> datetime:
+        """When the message was sent, as a naive local datetime."""
+        return _from_epoch_us(self.timestamp_us)
+    
+    @property
+    def timestamp_utc(self) -> datetime:
+        """When the message was sent, as an aware UTC datetime."""
+        return _EPOCH + self.timestamp_us * _MICROSECOND
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.role, self.content, self.timestamp_us) == (other.role, other.content, other.timestamp_us)
+    
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r}, timestamp={self.timestamp!r})"
+    
+    def get_token_count(self, counter: Callable[[str], int]) -> int:
+        """
+        Get the token count of the message content, computing it once.
+        
+        Args:
+            counter (Callable[[str], int]): Function counting the tokens in a text
+            
+        Returns:
+            int: Number of tokens in the content
+        """
+        if self.token_count is None:
+            self.token_count = counter(self.content)
+        return self.token_count
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -28,9 +110,35 @@ class Message:
         return {
             'role': self.role,
             'content': self.content,
-            'timestamp': self.timestamp.isoformat()
+            'timestamp': self.timestamp_utc.isoformat()
         }
     
+    def to_record(self) -> List[Any]:
+        """
+        Convert the message to its compact storage form.
+        
+        Returns:
+            List[Any]: ``[role, content, timestamp_us]``
+        """
+        return [self.role, self.content, self.timestamp_us]
+    
+    @classmethod
+    def from_record(cls, record: Union[List[Any], Dict[str, Any]]) -> 'Message':
+        """
+        Create a Message instance from its compact storage form or a dictionary.
+        
+        Args:
+            record (Union[List[Any], Dict[str, Any]]): ``[role, content, timestamp_us]``,
+                or a dictionary as written by ``to_dict``
+            
+        Returns:
+            Message: New Message instance
+        """
+        if isinstance(record, dict):
+            return cls.from_dict(record)
+        role, content, timestamp_us = record
+        return cls(role, content, timestamp_us=timestamp_us)
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Message':
         """
@@ -50,16 +158,160 @@ class Message:
         )
 
 
+class LazyMessageList(MutableSequence):
+    """
+    List of messages that decodes stored message dictionaries on first access.
+    
+    A conversation loaded from storage keeps its messages as the records
+    (dictionaries or compact lists) they were read as; only the messages
+    actually read are turned into Message objects. Counting, appending and
+    re-serializing untouched messages never decode them.
+    """
+    __slots__ = ('_items',)
+    
+    def __init__(self, items: Iterable[Union[Message, List[Any], Dict[str, Any]]] = ()):
+        """
+        Initialize the list.
+        
+        Args:
+            items (Iterable[Union[Message, List[Any], Dict[str, Any]]]): Messages or stored message records
+        """
+        self._items: List[Union[Message, List[Any], Dict[str, Any]]] = list(items)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(len(self._items)))]
+        if index < 0:
+            index += len(self._items)
+        if not 0 <= index < len(self._items):
+            raise IndexError('message index out of range')
+        return self._decode(index)
+    
+    def __setitem__(self, index, value):
+        self._items[index] = value
+    
+    def __delitem__(self, index):
+        del self._items[index]
+    
+    def __iter__(self) -> Iterator[Message]:
+        for index in range(len(self._items)):
+            yield self._decode(index)
+    
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (LazyMessageList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"LazyMessageList({len(self._items)} messages)"
+    
+    def insert(self, index: int, value: Message):
+        self._items.insert(index, value)
+    
+    def append(self, value: Message):
+        self._items.append(value)
+    
+    def content_lengths(self) -> Iterator[int]:
+        """
+        Get the content length of each message without decoding it.
+        
+        Yields:
+            int: Length of each message's content
+        """
+        for item in self._items:
+            if isinstance(item, Message):
+                yield len(item.content)
+            elif isinstance(item, dict):
+                yield len(item['content'])
+            else:
+                yield len(item[1])
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """
+        Convert every message to a dictionary, reusing undecoded dictionaries as they are.
+        
+        Returns:
+            List[Dict[str, Any]]: Dictionary representations of the messages
+        """
+        return [
+            item if isinstance(item, dict) else
+            (item if isinstance(item, Message) else Message.from_record(item)).to_dict()
+            for item in self._items
+        ]
+    
+    def to_records(self) -> List[List[Any]]:
+        """
+        Convert every message to its compact storage form, reusing undecoded records as they are.
+        
+        Returns:
+            List[List[Any]]: ``[role, content, timestamp_us]`` for each message
+        """
+        return [
+            item if isinstance(item, list) else
+            (item if isinstance(item, Message) else Message.from_dict(item)).to_record()
+            for item in self._items
+        ]
+    
+    def _decode(self, index: int) -> Message:
+        item = self._items[index]
+        if not isinstance(item, Message):
+            item = Message.from_record(item)
+            self._items[index] = item
+        return item
+
+
 @dataclass
+class ConversationSummary:
+    """
+    Represents the listing details of a conversation, without its messages.
+    """
+    id: str
+    created_at: datetime
+    updated_at: datetime
+    message_count: int
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the summary to a dictionary format.
+        
+        Returns:
+            Dict[str, Any]: Dictionary representation of the summary
+        """
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'message_count': self.message_count,
+            'metadata': self.metadata
+        }
+
+
+@dataclass(slots=True)
 class Conversation:
     """
     Represents a conversation with message history.
+    
+    ``messages`` is a LazyMessageList, so a conversation loaded from storage
+    only decodes the messages that are read.
+    
+    ``version`` counts the writes of the conversation to storage. Storage
+    backends shared between processes refuse to write a conversation whose
+    version is not the stored one, i.e. one that changed since it was loaded.
     """
     id: str
-    messages: List[Message] = field(default_factory=list)
+    messages: LazyMessageList = field(default_factory=LazyMessageList)
     metadata: Dict[str, Any] = field(default_factory=dict)
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    version: int = 0
+    
+    def __post_init__(self):
+        if not isinstance(self.messages, LazyMessageList):
+            self.messages = LazyMessageList(self.messages)
     
     def add_message(self, role: str, content: str) -> Message:
         """
@@ -93,6 +345,26 @@ class Conversation:
         
         return [{'role': msg.role, 'content': msg.content} for msg in messages]
     
+    @property
+    def etag(self) -> str:
+        """Entity tag identifying this version of the conversation."""
+        return f'"{self.id}.{self.version}"'
+    
+    def summary(self) -> ConversationSummary:
+        """
+        Get the listing details of the conversation.
+        
+        Returns:
+            ConversationSummary: Summary of the conversation
+        """
+        return ConversationSummary(
+            id=self.id,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            message_count=len(self.messages),
+            metadata=self.metadata
+        )
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert the conversation to a dictionary format.
@@ -102,10 +374,31 @@ class Conversation:
         """
         return {
             'id': self.id,
-            'messages': [msg.to_dict() for msg in self.messages],
+            'messages': self.messages.to_dicts(),
+            'metadata': self.metadata,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'version': self.version
+        }
+    
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Convert the conversation to its compact storage form.
+        
+        Messages are stored as ``[role, content, timestamp_us]`` lists rather
+        than dictionaries with ISO timestamps. ``from_dict`` reads both forms.
+        
+        Returns:
+            Dict[str, Any]: Compact representation of the conversation
+        """
+        return {
+            'v': RECORD_VERSION,
+            'id': self.id,
             'metadata': self.metadata,
             'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
+            'updated_at': self.updated_at.isoformat(),
+            'version': self.version,
+            'messages': self.messages.to_records()
         }
     
     @classmethod
@@ -119,7 +412,8 @@ class Conversation:
         Returns:
             Conversation: New Conversation instance
         """
-        messages = [Message.from_dict(msg) for msg in data.get('messages', [])]
+        # Messages are decoded when first read
+        messages = LazyMessageList(data.get('messages', []))
         created_at = datetime.fromisoformat(data['created_at']) if 'created_at' in data else datetime.now()
         updated_at = datetime.fromisoformat(data['updated_at']) if 'updated_at' in data else datetime.now()
         
@@ -128,5 +422,6 @@ class Conversation:
             messages=messages,
             metadata=data.get('metadata', {}),
             created_at=created_at,
-            updated_at=updated_at
+            updated_at=updated_at,
+            version=data.get('version', 0)
         )
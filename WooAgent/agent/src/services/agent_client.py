@@ -0,0 +1,169 @@
+"""
+Agent Client
+
+This module wraps the OpenAI client given to each agent, so the service sees
+the model requests the agent SDK makes while it runs and the tool calls each
+model step asks for. Each model request takes its own turn on the 'openai'
+upstream, so the tool calls between them do not hold OpenAI capacity.
+"""
+
+import json
+import logging
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.tool_cache import ToolCall
+from utils.outbound import Upstream
+
+logger = logging.getLogger('wooagent')
+
+
+def _never(error: BaseException) -> bool:
+    return False
+
+
+def _first_choice(response: Any) -> Any:
+    choices = getattr(response, 'choices', None)
+    return choices[0] if choices else None
+
+
+def _parse_tool_calls(pending: List[List[str]]) -> List[ToolCall]:
+    """
+    Parse (name, JSON arguments) pairs, stopping at the first call whose arguments are not valid JSON.
+    """
+    calls = []
+    for name, arguments in pending:
+        try:
+            parsed = json.loads(arguments) if arguments else {}
+        except ValueError:
+            break
+        if not name or not isinstance(parsed, dict):
+            break
+        calls.append((name, parsed))
+    return calls
+
+
+def step_tool_calls(response: Any) -> List[ToolCall]:
+    """
+    Get the tool calls a chat completion asks for.
+
+    Args:
+        response (Any): A chat completion
+
+    Returns:
+        List[ToolCall]: (tool name, arguments) pairs, in the order the model gave them
+    """
+    message = getattr(_first_choice(response), 'message', None)
+    pending = []
+    for tool_call in getattr(message, 'tool_calls', None) or ():
+        function = getattr(tool_call, 'function', None)
+        pending.append([getattr(function, 'name', None) or '', getattr(function, 'arguments', None) or ''])
+    return _parse_tool_calls(pending)
+
+
+class AgentClient:
+    """
+    The OpenAI client of one agent.
+
+    Chat completions pass through to the shared client, each one through the
+    upstream: a request is retried on transient failures, since it changes
+    nothing, while a streamed one holds its turn until the stream ends. Once a
+    response has been received, or a stream has ended, the tool calls it asks
+    for are handed to the agent's tool ``prefetch``, before the agent SDK makes
+    the calls one at a time. Everything else is delegated to the shared
+    client.
+    """
+
+    def __init__(self, client: Any, tool: Any, upstream: Optional[Upstream] = None, retry: bool = True):
+        """
+        Initialize the client.
+
+        Args:
+            client (Any): The shared ``openai.OpenAI`` client
+            tool (Any): The tool registered with the agent
+            upstream (Optional[Upstream]): Paces and retries the requests, if given
+            retry (bool): Retry transient failures; if False, a request is made once
+                and its failure raised straight away
+        """
+        self.client = client
+        self.tool = tool
+        self.upstream = upstream
+        self.retry = retry
+        self.chat = _Chat(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def create_completion(self, *args, **kwargs) -> Any:
+        """
+        Request a chat completion, passing the tool calls of the response to the tool.
+
+        Returns:
+            Any: The completion, or an iterator over its chunks when streaming
+        """
+        if kwargs.get('stream'):
+            return self._watch_stream(args, kwargs)
+        if self.upstream is None:
+            response = self.client.chat.completions.create(*args, **kwargs)
+        else:
+            response = self.upstream.call(lambda: self.client.chat.completions.create(*args, **kwargs),
+                                          retryable=None if self.retry else _never)
+        self._step(step_tool_calls(response))
+        return response
+
+    def _watch_stream(self, args: tuple, kwargs: Dict[str, Any]) -> Iterator[Any]:
+        """
+        Request and relay a streamed completion, then pass its tool calls on.
+
+        The upstream turn is held from the request until the last chunk has
+        been read, and released before the tool calls start.
+        """
+        pending: Dict[int, List[str]] = {}
+        with self.upstream.slot() if self.upstream is not None else nullcontext():
+            for chunk in self.client.chat.completions.create(*args, **kwargs):
+                delta = getattr(_first_choice(chunk), 'delta', None)
+                for tool_call in getattr(delta, 'tool_calls', None) or ():
+                    call = pending.setdefault(getattr(tool_call, 'index', None) or 0, ['', ''])
+                    function = getattr(tool_call, 'function', None)
+                    call[0] += getattr(function, 'name', None) or ''
+                    call[1] += getattr(function, 'arguments', None) or ''
+                yield chunk
+        self._step(_parse_tool_calls([pending[index] for index in sorted(pending)]))
+
+    def _step(self, calls: List[ToolCall]):
+        prefetch = getattr(self.tool, 'prefetch', None)
+        if not callable(prefetch):
+            return
+        try:
+            prefetch(calls)
+        except Exception as e:
+            # The agent makes the calls itself, so a failed prefetch only costs time
+            logger.warning("Error prefetching the tool calls of a model step: %s", e)
+
+
+class _Chat:
+    """
+    ``client.chat`` of an AgentClient.
+    """
+
+    def __init__(self, owner: AgentClient):
+        self.owner = owner
+        self.completions = _Completions(owner)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.owner.client.chat, name)
+
+
+class _Completions:
+    """
+    ``client.chat.completions`` of an AgentClient.
+    """
+
+    def __init__(self, owner: AgentClient):
+        self.owner = owner
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.owner.client.chat.completions, name)
+
+    def create(self, *args, **kwargs) -> Any:
+        return self.owner.create_completion(*args, **kwargs)
@@ -0,0 +1,320 @@
+"""
+Agent Pool
+
+This module shares the OpenAI client across the process and keeps a pool of
+ready agents, each with its own MCP tool connection, that requests check out
+instead of building their own.
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from utils.lazy import lazy_import
+
+logger = logging.getLogger('wooagent')
+
+# The OpenAI SDK is slow to import; it is loaded when the first client is created
+OpenAI = lazy_import('openai', 'OpenAI')
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key: str, max_connections: int = 32, keepalive_expiry: float = 60.0) -> Any:
+    """
+    Get the process-wide OpenAI client for an API key, creating it on first use.
+
+    The client keeps its HTTP connections alive between requests, so turns
+    after the first skip the TCP and TLS handshakes.
+
+    Args:
+        api_key (str): OpenAI API key
+        max_connections (int): Maximum concurrent connections to the API
+        keepalive_expiry (float): Seconds an idle connection is kept open
+
+    Returns:
+        Any: The shared ``openai.OpenAI`` client
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = OpenAI(api_key=api_key, **_http_client_options(max_connections, keepalive_expiry))
+            _clients[api_key] = client
+        return client
+
+
+def _http_client_options(max_connections: int, keepalive_expiry: float) -> Dict[str, Any]:
+    """
+    Build an HTTP client with explicit keep-alive limits, if the OpenAI SDK exposes one.
+    """
+    try:
+        import httpx
+        from openai import DefaultHttpxClient
+    except ImportError:
+        return {}
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+    return {'http_client': DefaultHttpxClient(limits=limits)}
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Check whether an error that ended a request points at the agent's MCP connection.
+
+    Errors from the OpenAI client, including its own connection errors, and
+    errors carrying an HTTP status say nothing about the MCP connection.
+
+    Args:
+        error (BaseException): The error the request raised
+
+    Returns:
+        bool: True for connection failures, timeouts and closed streams
+    """
+    if type(error).__module__.split('.')[0] == 'openai' or getattr(error, 'status_code', None) is not None:
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError, EOFError)):
+        return True
+    name = type(error).__name__
+    return any(marker in name for marker in ('Connect', 'Transport', 'Timeout', 'Closed'))
+
+
+class AgentPoolTimeout(Exception):
+    """
+    Raised when no agent becomes available within the checkout timeout.
+    """
+
+
+@dataclass
+class PoolStats:
+    """
+    Counters describing agent pool usage.
+    """
+    created: int = 0
+    reconnects: int = 0
+    checkouts: int = 0
+    waits: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the stats to a dictionary format.
+
+        Returns:
+            Dict[str, Any]: Dictionary representation of the stats
+        """
+        return {
+            'created': self.created,
+            'reconnects': self.reconnects,
+            'checkouts': self.checkouts,
+            'waits': self.waits
+        }
+
+
+class _PooledAgent:
+    """
+    An agent and the MCP tool connection registered with it.
+    """
+    __slots__ = ('agent', 'tool', 'checked_at', 'suspect')
+
+    def __init__(self, agent: Any, tool: Any):
+        self.agent = agent
+        self.tool = tool
+        self.checked_at = time.monotonic()
+        self.suspect = False
+
+
+class AgentPool:
+    """
+    Pool of ready-to-use agents, each bound to its own MCP tool connection.
+
+    Agents are created lazily up to ``size`` and reused most-recently-released
+    first, so a warm connection is preferred. Before an agent is handed out its
+    MCP connection is health-checked if the last check is older than
+    ``health_check_interval`` or the previous request using it failed with a
+    connection error; an unhealthy connection is closed and replaced with a
+    fresh agent.
+    """
+
+    def __init__(self, connect: Callable[[], Any], build_agent: Callable[[Any], Any], size: int = 8,
+                 health_check_interval: float = 30.0, checkout_timeout: Optional[float] = 30.0,
+                 connection_error: Callable[[BaseException], bool] = is_connection_error):
+        """
+        Initialize the pool.
+
+        Args:
+            connect (Callable[[], Any]): Opens a new MCP tool connection
+            build_agent (Callable[[Any], Any]): Builds an agent using a tool connection
+            size (int): Maximum number of agents
+            health_check_interval (float): Seconds between health checks of an idle connection
+            checkout_timeout (Optional[float]): Seconds to wait for a free agent, None to wait forever
+            connection_error (Callable[[BaseException], bool]): Tells whether an error that
+                ended a request makes the agent's connection worth checking before reuse
+        """
+        self.connect = connect
+        self.build_agent = build_agent
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.connection_error = connection_error
+        self.stats = PoolStats()
+
+        self._idle: 'queue.LifoQueue[_PooledAgent]' = queue.LifoQueue()
+        self._count = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self, count: int = 1):
+        """
+        Create agents ahead of the first request.
+
+        Args:
+            count (int): Number of agents to have ready, at most the pool size
+        """
+        while True:
+            with self._lock:
+                if self._count >= min(count, self.size):
+                    return
+                self._count += 1
+            try:
+                pooled = self._create()
+            except Exception:
+                with self._lock:
+                    self._count -= 1
+                raise
+            self._idle.put(pooled)
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """
+        Borrow an agent for the duration of a request.
+
+        Yields:
+            Any: An agent with a healthy MCP connection
+
+        Raises:
+            AgentPoolTimeout: If no agent is free within ``checkout_timeout``
+        """
+        pooled = self._acquire()
+        try:
+            yield pooled.agent
+        except Exception as e:
+            # Rate limits, model errors and escalations leave the connection as it was
+            if self.connection_error(e):
+                pooled.suspect = True
+            raise
+        finally:
+            self._release(pooled)
+
+    def close(self):
+        """
+        Close the MCP connections of all idle agents.
+        """
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_tool(pooled.tool)
+
+    def _acquire(self) -> _PooledAgent:
+        with self._lock:
+            self.stats.checkouts += 1
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+                if self._count < self.size:
+                    self._count += 1
+                    create = True
+                else:
+                    create = False
+                    self.stats.waits += 1
+
+        if pooled is None:
+            if create:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._lock:
+                        self._count -= 1
+                    raise
+            try:
+                pooled = self._idle.get(timeout=self.checkout_timeout)
+            except queue.Empty:
+                raise AgentPoolTimeout(f"No agent available after {self.checkout_timeout}s")
+
+        return self._ensure_healthy(pooled)
+
+    def _release(self, pooled: _PooledAgent):
+        if self._closed:
+            self._close_tool(pooled.tool)
+            return
+        self._idle.put(pooled)
+
+    def _create(self) -> _PooledAgent:
+        tool = self.connect()
+        pooled = _PooledAgent(self.build_agent(tool), tool)
+        with self._lock:
+            self.stats.created += 1
+        return pooled
+
+    def _ensure_healthy(self, pooled: _PooledAgent) -> _PooledAgent:
+        """
+        Health-check an agent's connection if it is due, replacing the agent if the check fails.
+        """
+        now = time.monotonic()
+        if not pooled.suspect and now - pooled.checked_at < self.health_check_interval:
+            return pooled
+
+        if self._check_tool(pooled.tool, pooled.suspect):
+            pooled.checked_at = now
+            pooled.suspect = False
+            return pooled
+
+        logger.warning("MCP connection failed its health check, reconnecting")
+        self._close_tool(pooled.tool)
+        try:
+            replacement = self._create()
+        except Exception:
+            with self._lock:
+                self._count -= 1
+            raise
+        with self._lock:
+            self.stats.reconnects += 1
+        return replacement
+
+    @staticmethod
+    def _check_tool(tool: Any, suspect: bool) -> bool:
+        """
+        Check an MCP connection with its own health check, if it has one.
+
+        A connection without a health check is trusted unless the last request
+        using it failed with a connection error.
+        """
+        check = getattr(tool, 'health_check', None) or getattr(tool, 'ping', None)
+        if not callable(check):
+            return not suspect
+        try:
+            return check() is not False
+        except Exception as e:
+            logger.warning("MCP health check failed: %s", e)
+            return False
+
+    @staticmethod
+    def _close_tool(tool: Any):
+        close = getattr(tool, 'close', None)
+        if not callable(close):
+            return
+        try:
+            close()
+        except Exception as e:
+            logger.warning("Error closing MCP connection: %s", e)
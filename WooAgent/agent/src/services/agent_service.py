@@ -5,113 +5,657 @@ This module provides services for managing the AI agent.
 """
 
 import os
+import time
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
-from openai import OpenAI
-from openai_agents import Agent, MCPTool
+import threading
+import contextvars
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Any, Iterator, Optional, List
 
 from models.conversation import Conversation
+from services.agent_client import AgentClient
+from services.agent_pool import AgentPool, get_openai_client
+from services.answer_cache import AnswerCache
+from services.catalog_sync import CatalogTool
+from services.context_builder import ContextBuilder
 from services.conversation_service import ConversationService
+from services.model_router import (ESCALATE_REPLY, ESCALATIONS, FAST, FULL, TIER_SECONDS, EscalationRequired,
+                                   ModelClassifier, ModelRouter, ModelTier, RestrictedTool, RouteDecision,
+                                   is_escalation_reply)
+from services.tool_cache import READ_ONLY_TOOLS, CachedMCPTool, ToolResultCache
+from storage.catalog import CatalogMirror
+from utils.concurrency import RequestCoalescer
+from utils.lazy import lazy_import
+from utils.metrics import ERRORS, TOKENS, TURN_SECONDS, timed_model_call, timed_stage
+from utils.outbound import CircuitBreaker, OutboundScheduler, Upstream
+from utils.tracing import Trace, start_trace
 
 logger = logging.getLogger('wooagent')
 
+# The agents SDK is slow to import; it is loaded when the first agent is created
+Agent = lazy_import('openai_agents', 'Agent')
+MCPTool = lazy_import('openai_agents', 'MCPTool')
+
+# When the first agent and its MCP connection are created: before the service is
+# returned, in a background thread, or by the first request
+STARTUP_MODES = ('eager', 'background', 'lazy')
+
+# Seconds between attempts of a background warm-up that failed
+WARM_UP_RETRY_DELAY = 5.0
+
+SYSTEM_PROMPT = """
+You are WooAgent, an AI assistant specialized in managing WooCommerce stores.
+You can help with various tasks related to products, orders, customers, coupons, and other WooCommerce features.
+
+When asked about store information or to perform actions, use the appropriate WooCommerce tools.
+Always try to understand the user's intent and use the most appropriate tool for the job.
+
+IMPORTANT GUIDELINES:
+1. Always verify information before making changes to the store.
+2. When creating or updating products, confirm important details with the user.
+3. For critical operations like deleting items or processing refunds, ask for confirmation.
+4. Maintain context throughout the conversation and refer back to previous items discussed.
+5. Provide clear, concise responses focusing on the requested information.
+
+EXAMPLES OF TASKS:
+
+Products:
+- "Show me all products in the store" → Use list_products tool
+- "Create a new t-shirt product priced at $25" → Use create_product with appropriate parameters
+- "Update the stock of Product X to 50 units" → Use update_product_stock
+- "What's the current price of Product Y?" → Use get_product to retrieve information
+
+Orders:
+- "Show me recent orders" → Use list_orders
+- "Get details for order #1234" → Use get_order
+- "Update order #1234 status to completed" → Use update_order
+- "Process a refund for order #1234" → Use create_order_refund
+
+Customers:
+- "Show me a list of customers" → Use list_customers
+- "Get details for customer with email example@email.com" → Use get_customer
+- "Create a new customer account" → Use create_customer
+
+Coupons:
+- "Create a 20% off coupon valid for 30 days" → Use create_coupon
+- "List all active coupons" → Use list_coupons
+- "Delete coupon SUMMER2025" → Use delete_coupon
+
+Always respond in a helpful, professional manner and focus on providing the specific information or action the user requested.
+"""
+
+FAST_SYSTEM_PROMPT = f"""
+You are WooAgent, an assistant answering questions about a WooCommerce store.
+Look up what the user asks for with the tools you have ({', '.join(sorted(READ_ONLY_TOOLS))})
+and answer briefly with the information found.
+
+If the request needs anything else, such as changing the store, several steps or reasoning
+over many records, reply with exactly {ESCALATE_REPLY} and nothing more.
+"""
+
 class AgentService:
     """
     Service for managing the AI agent.
     """
     
-    def __init__(self, openai_api_key: str, mcp_server_url: str):
+    def __init__(self, openai_api_key: str, mcp_server_url: str,
+                 conversation_service: Optional[ConversationService] = None,
+                 context_max_tokens: int = 6000, tool_cache: Optional[ToolResultCache] = None,
+                 answer_cache_ttl: float = 60, agent_pool_size: int = 8, coalesce_window: float = 30,
+                 tool_fan_out: int = 4, tool_call_timeout: Optional[float] = 30,
+                 catalog_mirror: Optional[CatalogMirror] = None,
+                 scheduler: Optional[OutboundScheduler] = None, model: str = "gpt-4",
+                 fast_model: Optional[str] = None, router_model: Optional[str] = None,
+                 startup: str = 'eager'):
         """
         Initialize the agent service.
         
         Args:
             openai_api_key (str): OpenAI API key
             mcp_server_url (str): URL of the MCP server
+            conversation_service (Optional[ConversationService]): Conversation store to use,
+                defaults to one with the standard settings
+            context_max_tokens (int): Token budget for the system prompt and conversation
+                history sent to the model each turn
+            tool_cache (Optional[ToolResultCache]): Cache for read-only tool results,
+                defaults to one with the standard TTLs
+            answer_cache_ttl (float): Seconds a cached answer to a repeated question may be
+                served for while the store data is unchanged; 0 disables the answer cache
+            agent_pool_size (int): Maximum number of agents, and MCP connections, in use at once
+            coalesce_window (float): Seconds a reply is reused for a duplicate submission
+            tool_fan_out (int): Maximum read-only tool calls of one model step run concurrently;
+                1 runs them one at a time
+            tool_call_timeout (Optional[float]): Seconds a tool call run concurrently may take
+            catalog_mirror (Optional[CatalogMirror]): Local copy of the store catalog to answer
+                product, order, customer and coupon lookups from while it is fresh
+            scheduler (Optional[OutboundScheduler]): Paces and retries calls to the 'openai' and
+                'mcp' upstreams; defaults to retries only, with a circuit breaker on the MCP server
+            model (str): Model handling any request
+            fast_model (Optional[str]): Faster model for plain lookups, limited to read-only
+                tools; None sends every turn to ``model``
+            router_model (Optional[str]): Small model classifying the messages the routing
+                heuristics cannot place; None sends those to ``model``
+            startup (str): 'eager' connects the first agent before returning, so configuration
+                errors surface at startup; 'background' connects it in a background thread;
+                'lazy' leaves it to the first request
+        
+        Raises:
+            ValueError: If the startup mode is unknown
         """
+        if startup not in STARTUP_MODES:
+            raise ValueError(f"Unknown startup mode '{startup}', expected one of {', '.join(STARTUP_MODES)}")
+        
         self.openai_api_key = openai_api_key
+        self.startup = startup
         self.mcp_server_url = mcp_server_url
-        self.openai_client = OpenAI(api_key=openai_api_key)
-        self.agent = None
-        self.conversation_service = ConversationService()
+        self.conversation_service = conversation_service or ConversationService()
+        self.context_builder = ContextBuilder(max_tokens=context_max_tokens, system_prompt=SYSTEM_PROMPT)
+        self.tool_cache = tool_cache or ToolResultCache()
+        self.answer_cache = AnswerCache(ttl=answer_cache_ttl, data_version=self.tool_cache.generations)
+        self.agent_pool = AgentPool(self._connect_tool, self._create_agent, size=agent_pool_size)
+        self.coalescer = RequestCoalescer(window=coalesce_window)
+        self.tool_fan_out = tool_fan_out
+        self.tool_call_timeout = tool_call_timeout
+        self.catalog_mirror = catalog_mirror
+        self.scheduler = scheduler or OutboundScheduler(
+            Upstream('openai'),
+            Upstream('mcp', breaker=CircuitBreaker())
+        )
+        self.router = ModelRouter(
+            full=ModelTier(FULL, model, SYSTEM_PROMPT),
+            fast=ModelTier(FAST, fast_model, FAST_SYSTEM_PROMPT, frozenset(READ_ONLY_TOOLS),
+                           retry=False) if fast_model else None,
+            classifier=ModelClassifier(lambda: self.openai_client, router_model, self.scheduler.get('openai'))
+            if fast_model and router_model else None
+        )
+        self.tool_executor = ThreadPoolExecutor(
+            max_workers=tool_fan_out * agent_pool_size,
+            thread_name_prefix='tool-call'
+        ) if tool_fan_out > 1 else None
+        self._warm_up_stop = threading.Event()
+        self._warm_up_thread: Optional[threading.Thread] = None
         
-        # Initialize the agent
-        self._initialize_agent()
+        if startup == 'eager':
+            # Initialize the first agent, so configuration errors surface at startup
+            self._initialize_agent()
+        elif startup == 'background':
+            self.start_warm_up()
+    
+    @property
+    def openai_client(self) -> Any:
+        """
+        The process-wide OpenAI client, created on first use.
+        """
+        return get_openai_client(self.openai_api_key)
+    
+    @property
+    def ready(self) -> bool:
+        """
+        Whether the service should be sent requests: once an agent has been connected, or
+        straight away when started lazily, as then only a request connects one.
+        """
+        return self.startup == 'lazy' or self.agent_pool.stats.created > 0
+    
+    def start_warm_up(self):
+        """
+        Connect the first agent in a background thread, retrying until it succeeds or the
+        service is closed.
+        """
+        if self._warm_up_thread is not None:
+            return
+        self._warm_up_thread = threading.Thread(target=self._warm_up, name='agent-warm-up', daemon=True)
+        self._warm_up_thread.start()
+    
+    def _warm_up(self):
+        while not self._warm_up_stop.is_set():
+            try:
+                self._initialize_agent()
+                return
+            except Exception:
+                self._warm_up_stop.wait(WARM_UP_RETRY_DELAY)
     
     def _initialize_agent(self):
         """
         Initialize the OpenAI agent with tools.
         """
         try:
-            # Create the agent
-            self.agent = Agent(
-                client=self.openai_client,
-                model="gpt-4",
+            self.agent_pool.warm(1)
+            logger.info("Agent initialized successfully")
+        except Exception as e:
+            logger.error("Failed to initialize agent: %s", e)
+            raise
+    
+    def _connect_tool(self) -> Any:
+        """
+        Open a connection to the MCP server.
+        
+        Returns:
+            Any: The WooCommerce MCP tool
+        """
+        tool = MCPTool("WooCommerceTools", server_url=self.mcp_server_url)
+        if self.catalog_mirror is not None:
+            tool = CatalogTool(tool, self.catalog_mirror)
+        return tool
+    
+    def _create_agent(self, woocommerce_tool: Any) -> Dict[str, Any]:
+        """
+        Create an agent per model tier using the shared OpenAI client and an MCP tool connection.
+        
+        Args:
+            woocommerce_tool (Any): The WooCommerce MCP tool
+            
+        Returns:
+            Dict[str, Any]: The configured agents, by tier name
+        """
+        # Route tool calls through the result cache, running batches of lookups concurrently
+        tool = CachedMCPTool(
+            woocommerce_tool,
+            self.tool_cache,
+            executor=self.tool_executor,
+            fan_out=self.tool_fan_out,
+            call_timeout=self.tool_call_timeout,
+            upstream=self.scheduler.get('mcp')
+        )
+        
+        agents = {}
+        for name, tier in self.router.tiers.items():
+            tier_tool = RestrictedTool(tool, tier.tools) if tier.tools is not None else tool
+
+            # Create the agent, with a client that schedules each model request and starts
+            # the lookups of each model step together
+            agent = Agent(
+                client=AgentClient(self.openai_client, tier_tool, self.scheduler.get('openai'), retry=tier.retry),
+                model=tier.model,
                 tools=[]
             )
-            
-            # Connect to MCP server
-            woocommerce_tool = MCPTool("WooCommerceTools", server_url=self.mcp_server_url)
-            self.agent.register_tool(woocommerce_tool)
+            agent.register_tool(tier_tool)
             
             # Set system prompt
-            system_prompt = """
-            You are WooAgent, an AI assistant specialized in managing WooCommerce stores.
-            You can help with various tasks related to products, orders, customers, coupons, and other WooCommerce features.
-            
-            When asked about store information or to perform actions, use the appropriate WooCommerce tools.
-            Always try to understand the user's intent and use the most appropriate tool for the job.
-            
-            IMPORTANT GUIDELINES:
-            1. Always verify information before making changes to the store.
-            2. When creating or updating products, confirm important details with the user.
-            3. For critical operations like deleting items or processing refunds, ask for confirmation.
-            4. Maintain context throughout the conversation and refer back to previous items discussed.
-            5. Provide clear, concise responses focusing on the requested information.
-            
-            EXAMPLES OF TASKS:
-            
-            Products:
-            - "Show me all products in the store" → Use list_products tool
-            - "Create a new t-shirt product priced at $25" → Use create_product with appropriate parameters
-            - "Update the stock of Product X to 50 units" → Use update_product_stock
-            - "What's the current price of Product Y?" → Use get_product to retrieve information
-            
-            Orders:
-            - "Show me recent orders" → Use list_orders
-            - "Get details for order #1234" → Use get_order
-            - "Update order #1234 status to completed" → Use update_order
-            - "Process a refund for order #1234" → Use create_order_refund
-            
-            Customers:
-            - "Show me a list of customers" → Use list_customers
-            - "Get details for customer with email example@email.com" → Use get_customer
-            - "Create a new customer account" → Use create_customer
-            
-            Coupons:
-            - "Create a 20% off coupon valid for 30 days" → Use create_coupon
-            - "List all active coupons" → Use list_coupons
-            - "Delete coupon SUMMER2025" → Use delete_coupon
-            
-            Always respond in a helpful, professional manner and focus on providing the specific information or action the user requested.
-            """
-            
-            self.agent.set_system_prompt(system_prompt)
-            logger.info("Agent initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize agent: {str(e)}")
-            raise
+            agent.set_system_prompt(tier.system_prompt)
+            agents[name] = agent
+        return agents
     
-    def process_message(self, conversation_id: str, message: str) -> Dict[str, Any]:
+    def process_message(self, conversation_id: str, message: str,
+                        request_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a user message and get a response from the agent.
         
+        Turns in the same conversation run one at a time, in arrival order. A
+        duplicate submission (same conversation and message, or same request ID)
+        that arrives while the original is running, or shortly after it with no
+        turn in between, gets the original's result instead of running again.
+        
         Args:
             conversation_id (str): ID of the conversation
             message (str): User message
+            request_id (Optional[str]): Client-supplied ID identifying retries of one submission
             
         Returns:
             Dict[str, Any]: Response containing the agent's reply and metadata
         """
+        if not conversation_id and not request_id:
+            # Nothing ties two submissions for new conversations to the same client
+            return self._process_turn(conversation_id, message)
+        
+        return self.coalescer.run(
+            (conversation_id, request_id or message),
+            lambda: self._process_turn(conversation_id, message),
+            is_current=self._is_latest_reply
+        )
+    
+    def _process_turn(self, conversation_id: str, message: str) -> Dict[str, Any]:
+        """
+        Run one turn of a conversation while holding the conversation's lock.
+        
+        Args:
+            conversation_id (str): ID of the conversation
+            message (str): User message
+            
+        Returns:
+            Dict[str, Any]: Response containing the agent's reply and metadata
+        """
+        with start_trace() as trace, self._turn_lock(conversation_id):
+            conversation = self._start_turn(conversation_id, message)
+            
+            # Answer repeated read-only questions without running the agent
+            cached = self.answer_cache.lookup(conversation, message)
+            if cached is not None:
+                result = {**self._complete_turn(conversation, cached), 'cached': True}
+            else:
+                result = self._run_turn(conversation, message)
+            
+            self._record_turn(trace, result)
+            return result
+    
+    def _run_turn(self, conversation: Conversation, message: str) -> Dict[str, Any]:
+        """
+        Run the agent for a turn whose user message has been stored.
+        
+        Args:
+            conversation (Conversation): The conversation
+            message (str): User message
+            
+        Returns:
+            Dict[str, Any]: Response containing the agent's reply and metadata
+        """
+        try:
+            # Get conversation context, trimmed to the token budget
+            with timed_stage('context'):
+                context, prompt_tokens = self.context_builder.build_with_tokens(conversation)
+            TOKENS.inc(prompt_tokens, kind='prompt')
+            
+            # Process with the agent of the model tier the message needs
+            decision = self.router.route(message)
+            generations = self.tool_cache.generations()
+            started_at = time.monotonic()
+            with self.agent_pool.checkout() as agents, timed_model_call():
+                response = self._run_routed(agents, decision, message, context)
+            TOKENS.inc(self.context_builder.token_counter(response), kind='completion')
+            self.answer_cache.store(conversation, message, response, generations,
+                                    (time.monotonic() - started_at) * 1000)
+            
+            return self._complete_turn(conversation, response)
+        except Exception as e:
+            return self._fail_turn(conversation, e)
+    
+    def _run_routed(self, agents: Dict[str, Any], decision: RouteDecision, message: str,
+                    context: List[Dict[str, str]]) -> str:
+        """
+        Run the agent of the chosen tier, handing the turn to the full model if the fast one cannot answer.
+        
+        The fast tier only has read-only tools, so running the full model after it never repeats a write.
+        
+        Args:
+            agents (Dict[str, Any]): The agents of each tier
+            decision (RouteDecision): The routing decision for the turn
+            message (str): User message
+            context (List[Dict[str, str]]): Conversation context
+            
+        Returns:
+            str: The agent's reply
+        """
+        if decision.tier == FAST:
+            started = time.perf_counter()
+            try:
+                response = agents[FAST].run(message, context=context)
+            except EscalationRequired as e:
+                cause, detail = 'tool', e
+            except Exception as e:
+                cause, detail = 'error', e
+            else:
+                if not is_escalation_reply(response):
+                    TIER_SECONDS.observe(time.perf_counter() - started, tier=FAST, outcome='ok')
+                    return response
+                cause, detail = 'declined', 'the fast model declined'
+            TIER_SECONDS.observe(time.perf_counter() - started, tier=FAST, outcome='escalated')
+            ESCALATIONS.inc(cause=cause)
+            logger.info("Escalating turn to the full model: %s", detail)
+        
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = agents[FULL].run(message, context=context)
+            outcome = 'ok'
+            return response
+        finally:
+            TIER_SECONDS.observe(time.perf_counter() - started, tier=FULL, outcome=outcome)
+    
+    def _record_turn(self, trace: Trace, result: Dict[str, Any]):
+        """
+        Record the duration of a finished turn and log where the time went.
+        
+        Args:
+            trace (Trace): The turn's trace
+            result (Dict[str, Any]): Result of the turn
+        """
+        if result.get('cached'):
+            outcome = 'cached'
+        else:
+            outcome = 'ok' if result.get('success') else 'error'
+        TURN_SECONDS.observe(trace.elapsed(), outcome=outcome)
+        
+        if logger.isEnabledFor(logging.INFO):
+            breakdown = trace.breakdown_ms()
+            timings = ', '.join(f"{stage}={ms}ms" for stage, ms in breakdown.items())
+            logger.info("Turn in conversation %s (%s): %s", result.get('conversation_id'), outcome, timings,
+                        extra={'timings_ms': breakdown})
+    
+    def _is_latest_reply(self, result: Dict[str, Any]) -> bool:
+        """
+        Check that a turn result is still the newest reply in its conversation.
+        
+        Args:
+            result (Dict[str, Any]): Result of an earlier turn
+            
+        Returns:
+            bool: True if the turn succeeded and no message was added since
+        """
+        if not result.get('success'):
+            return False
+        conversation = self.conversation_service.get_conversation(result['conversation_id'])
+        if not conversation or not conversation.messages:
+            return False
+        last = conversation.messages[-1]
+        return last.role == 'assistant' and last.content == result['response']
+    
+    async def stream_message(self, conversation_id: str, message: str,
+                             executor: Optional[Executor] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user message, yielding the agent's reply as it is generated.
+        
+        The turn runs on a worker thread; events are relayed as they arrive:
+        
+        - ``{'type': 'start', 'conversation_id': ...}`` once the user message is stored
+        - ``{'type': 'delta', 'content': ...}`` for each piece of the reply
+        - tool-call and other events from the agent, passed through as dictionaries
+        - ``{'type': 'done', ...}`` with the same fields as ``process_message`` plus
+          ``time_to_first_token_ms``, after the reply has been stored
+        - ``{'type': 'error', ...}`` instead of ``done`` if the turn failed
+        
+        The assistant message is stored once the reply is complete, even if the
+        caller stops consuming events early.
+        
+        Args:
+            conversation_id (str): ID of the conversation
+            message (str): User message
+            executor (Optional[Executor]): Executor to run the turn on, defaults to the loop's
+            
+        Yields:
+            Dict[str, Any]: Turn events
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        
+        def emit(event: Optional[Dict[str, Any]]):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        
+        # Run in a copy of this context, so the turn logs the request's trace ID
+        turn = loop.run_in_executor(executor, contextvars.copy_context().run,
+                                    self._run_streaming_turn, conversation_id, message, emit)
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        await turn
+    
+    def _run_streaming_turn(self, conversation_id: str, message: str,
+                            emit: Callable[[Optional[Dict[str, Any]]], None]):
+        """
+        Run a turn with the agent's streaming API, emitting events and a final None.
+        
+        Falls back to a single delta holding the full reply if the agent cannot stream.
+        
+        Args:
+            conversation_id (str): ID of the conversation
+            message (str): User message
+            emit (Callable[[Optional[Dict[str, Any]]], None]): Receives each event
+        """
+        started_at = time.monotonic()
+        first_token_at = None
+        conversation = None
+        
+        # Turns in one conversation run one at a time, in arrival order
+        with start_trace() as trace, self._turn_lock(conversation_id):
+            try:
+                conversation = self._start_turn(conversation_id, message)
+                emit({'type': 'start', 'conversation_id': conversation.id})
+                
+                cached = self.answer_cache.lookup(conversation, message)
+                generations = self.tool_cache.generations()
+                chunks = []
+                context = None
+                model_timer = nullcontext()
+                if cached is None:
+                    with timed_stage('context'):
+                        context, prompt_tokens = self.context_builder.build_with_tokens(conversation)
+                    TOKENS.inc(prompt_tokens, kind='prompt')
+                    model_timer = timed_model_call()
+                    decision = self.router.route(message)
+                
+                with nullcontext() if cached is not None else self.agent_pool.checkout() as agents, model_timer:
+                    if cached is not None:
+                        stream = [cached]
+                    else:
+                        stream = self._stream_routed(agents, decision, message, context)
+                    
+                    for event in stream:
+                        if isinstance(event, str):
+                            if not event:
+                                continue
+                            if first_token_at is None:
+                                first_token_at = time.monotonic()
+                            chunks.append(event)
+                            emit({'type': 'delta', 'content': event})
+                        elif isinstance(event, dict):
+                            emit(event if 'type' in event else {'type': 'event', 'data': event})
+                        else:
+                            emit({'type': 'event', 'data': str(event)})
+                
+                result = self._complete_turn(conversation, ''.join(chunks))
+                if cached is not None:
+                    result['cached'] = True
+                else:
+                    TOKENS.inc(self.context_builder.token_counter(result['response']), kind='completion')
+                    self.answer_cache.store(conversation, message, result['response'], generations,
+                                            (time.monotonic() - started_at) * 1000)
+                if first_token_at is not None:
+                    result['time_to_first_token_ms'] = round((first_token_at - started_at) * 1000, 1)
+                    logger.info("Streamed reply for conversation %s: first token after %sms",
+                                conversation.id, result['time_to_first_token_ms'])
+                self._record_turn(trace, result)
+                emit({'type': 'done', **result})
+            except Exception as e:
+                if conversation is None:
+                    logger.error("Error starting turn for conversation %s: %s", conversation_id, e)
+                    ERRORS.inc(stage='turn')
+                    emit({'type': 'error', 'conversation_id': conversation_id, 'error': str(e), 'success': False})
+                else:
+                    result = self._fail_turn(conversation, e)
+                    self._record_turn(trace, result)
+                    emit({'type': 'error', **result})
+            finally:
+                emit(None)
+    
+    def _stream_routed(self, agents: Dict[str, Any], decision: RouteDecision, message: str,
+                       context: List[Dict[str, str]]) -> Iterator[Any]:
+        """
+        Stream the reply of the chosen tier's agent, handing the turn to the full
+        model if the fast one cannot answer before its reply has started.
+        
+        The start of the fast tier's reply is held back until it cannot be the
+        escalation reply.
+        
+        Args:
+            agents (Dict[str, Any]): The agents of each tier
+            decision (RouteDecision): The routing decision for the turn
+            message (str): User message
+            context (List[Dict[str, str]]): Conversation context
+            
+        Yields:
+            Any: Pieces of the reply and other agent events
+        """
+        if decision.tier == FAST:
+            started = time.perf_counter()
+            held = ''
+            committed = False
+            try:
+                for event in self._stream_agent(agents[FAST], message, context):
+                    if committed or not isinstance(event, str):
+                        yield event
+                        continue
+                    held += event
+                    if ESCALATE_REPLY.startswith(held.strip().rstrip('.').upper()):
+                        continue
+                    committed = True
+                    yield held
+                if committed or not is_escalation_reply(held):
+                    if not committed:
+                        yield held
+                    TIER_SECONDS.observe(time.perf_counter() - started, tier=FAST, outcome='ok')
+                    return
+                cause, detail = 'declined', 'the fast model declined'
+            except EscalationRequired as e:
+                if committed:
+                    raise
+                cause, detail = 'tool', e
+            except Exception as e:
+                if committed:
+                    raise
+                cause, detail = 'error', e
+            TIER_SECONDS.observe(time.perf_counter() - started, tier=FAST, outcome='escalated')
+            ESCALATIONS.inc(cause=cause)
+            logger.info("Escalating turn to the full model: %s", detail)
+        
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield from self._stream_agent(agents[FULL], message, context)
+            outcome = 'ok'
+        finally:
+            TIER_SECONDS.observe(time.perf_counter() - started, tier=FULL, outcome=outcome)
+    
+    @staticmethod
+    def _stream_agent(agent: Any, message: str, context: List[Dict[str, str]]) -> Iterator[Any]:
+        """
+        Stream an agent's reply, or yield it whole if the agent cannot stream.
+        """
+        run_stream = getattr(agent, 'run_stream', None)
+        if run_stream is None:
+            yield agent.run(message, context=context)
+        else:
+            yield from run_stream(message, context=context)
+    
+    def _turn_lock(self, conversation_id: str):
+        """
+        Get the lock a turn holds so turns in one conversation run one at a time.
+        
+        A turn without a conversation ID starts a conversation no other turn can
+        address yet, so it takes no lock; sharing the lock of the empty ID would
+        run every new conversation one at a time.
+        
+        Args:
+            conversation_id (str): ID of the conversation, empty for a new one
+            
+        Returns:
+            ContextManager: The conversation's lock, or a no-op for a new conversation
+        """
+        return self.conversation_service.lock(conversation_id) if conversation_id else nullcontext()
+    
+    def _start_turn(self, conversation_id: str, message: str) -> Conversation:
+        """
+        Get or create the conversation for a turn and store the user message.
+        
+        Args:
+            conversation_id (str): ID of the conversation
+            message (str): User message
+            
+        Returns:
+            Conversation: The conversation the turn belongs to
+        """
         # Get or create conversation
         conversation = self.conversation_service.get_conversation(conversation_id)
         if not conversation:
@@ -119,35 +663,52 @@ class AgentService:
         
         # Add user message to conversation
         self.conversation_service.add_message(conversation.id, 'user', message)
+        return conversation
+    
+    def _complete_turn(self, conversation: Conversation, response: str) -> Dict[str, Any]:
+        """
+        Store the agent's reply and build the turn result.
         
-        try:
-            # Get conversation context
-            context = conversation.get_messages_for_context()
-            
-            # Process with agent
-            response = self.agent.run(message, context=context)
-            
-            # Add assistant message to conversation
-            self.conversation_service.add_message(conversation.id, 'assistant', response)
-            
-            return {
-                'conversation_id': conversation.id,
-                'response': response,
-                'success': True
-            }
-        except Exception as e:
-            error_message = f"Error processing message: {str(e)}"
-            logger.error(error_message)
+        Args:
+            conversation (Conversation): The conversation
+            response (str): The agent's reply
             
-            # Add error message to conversation
-            self.conversation_service.add_message(conversation.id, 'system', error_message)
+        Returns:
+            Dict[str, Any]: Response containing the agent's reply and metadata
+        """
+        # Add assistant message to conversation
+        self.conversation_service.add_message(conversation.id, 'assistant', response)
+        
+        return {
+            'conversation_id': conversation.id,
+            'response': response,
+            'success': True
+        }
+    
+    def _fail_turn(self, conversation: Conversation, error: Exception) -> Dict[str, Any]:
+        """
+        Record a failed turn in the conversation and build the error result.
+        
+        Args:
+            conversation (Conversation): The conversation
+            error (Exception): The error that ended the turn
             
-            return {
-                'conversation_id': conversation.id,
-                'response': "I'm sorry, I encountered an error while processing your request.",
-                'error': str(e),
-                'success': False
-            }
+        Returns:
+            Dict[str, Any]: Response describing the failure
+        """
+        error_message = f"Error processing message: {str(error)}"
+        logger.error(error_message)
+        ERRORS.inc(stage='turn')
+        
+        # Add error message to conversation
+        self.conversation_service.add_message(conversation.id, 'system', error_message)
+        
+        return {
+            'conversation_id': conversation.id,
+            'response': "I'm sorry, I encountered an error while processing your request.",
+            'error': str(error),
+            'success': False
+        }
     
     def get_conversation_history(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
         """
@@ -163,7 +724,7 @@ class AgentService:
         if not conversation:
             return None
         
-        return [msg.to_dict() for msg in conversation.messages]
+        return [dict(msg) for msg in conversation.messages.to_dicts()]
     
     def list_conversations(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -175,26 +736,96 @@ class AgentService:
         Returns:
             List[Dict[str, Any]]: List of conversation summaries
         """
-        conversations = self.conversation_service.list_conversations(limit)
+        return self.list_conversations_page(limit)['conversations']
+    
+    def list_conversations_page(self, limit: int = 10, cursor: Optional[str] = None,
+                                metadata_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        List a page of conversations, most recently updated first.
         
-        return [{
-            'id': conv.id,
-            'created_at': conv.created_at.isoformat(),
-            'updated_at': conv.updated_at.isoformat(),
-            'message_count': len(conv.messages),
-            'metadata': conv.metadata
-        } for conv in conversations]
+        Args:
+            limit (int): Maximum number of conversations to return
+            cursor (Optional[str]): Cursor from a previous page, to continue after it
+            metadata_filter (Optional[Dict[str, Any]]): Metadata values the conversations must match
+            
+        Returns:
+            Dict[str, Any]: Conversation summaries and the cursor of the next page, if any
+        """
+        summaries, next_cursor = self.conversation_service.list_conversation_summaries(
+            limit, cursor=cursor, metadata_filter=metadata_filter
+        )
+        
+        return {
+            'conversations': [summary.to_dict() for summary in summaries],
+            'next_cursor': next_cursor
+        }
     
-    def create_new_conversation(self) -> Dict[str, Any]:
+    def search_conversations(self, query: str, limit: int = 10,
+                             filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Search the messages of all conversations, e.g. to find where an order was refunded.
+        
+        Args:
+            query (str): Words to look for; every word must appear, matched after stemming
+            limit (int): Maximum number of results
+            filters (Optional[Dict[str, Any]]): Any of 'role' (a role or list of roles),
+                'since' and 'until' (datetimes or ISO 8601 strings) and 'conversation_id'
+            
+        Returns:
+            Dict[str, Any]: Whether search is enabled, and the matching messages with their
+                conversation ID, a snippet and a score, best first
+            
+        Raises:
+            ValueError: If a filter is unknown or a date is invalid
+        """
+        filters = dict(filters or {})
+        unknown = set(filters) - {'role', 'since', 'until', 'conversation_id'}
+        if unknown:
+            raise ValueError(f"Unknown search filter: {', '.join(sorted(unknown))}")
+        roles = filters.get('role')
+        if isinstance(roles, str):
+            roles = [roles]
+        dates = {}
+        for key in ('since', 'until'):
+            value = filters.get(key)
+            if isinstance(value, str):
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    raise ValueError(f"{key} must be an ISO 8601 date or time")
+            dates[key] = value
+        
+        hits = self.conversation_service.search_conversations(
+            query, limit, roles=roles, conversation_id=filters.get('conversation_id'), **dates
+        )
+        
+        return {
+            'enabled': hits is not None,
+            'results': [hit.to_dict() for hit in hits or []]
+        }
+    
+    def create_new_conversation(self, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Create a new conversation.
         
+        Args:
+            metadata (Optional[Dict[str, Any]]): Optional metadata for the conversation
+            
         Returns:
             Dict[str, Any]: New conversation details
         """
-        conversation = self.conversation_service.create_conversation()
+        conversation = self.conversation_service.create_conversation(metadata)
         
         return {
             'conversation_id': conversation.id,
             'created_at': conversation.created_at.isoformat()
         }
+    
+    def close(self):
+        """
+        Stop warming up, close the pooled agents' MCP connections and stop the tool call workers.
+        """
+        self._warm_up_stop.set()
+        self.agent_pool.close()
+        if self.tool_executor is not None:
+            self.tool_executor.shutdown(wait=False, cancel_futures=True)
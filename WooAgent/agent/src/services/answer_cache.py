@@ -0,0 +1,280 @@
+"""
+Answer Cache
+
+This module caches the agent's answers to repeated questions, so that a
+question asked again while the store data behind it is unchanged can be
+answered without running the agent.
+"""
+
+import re
+import math
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from models.conversation import Conversation
+from services.intents import CONFIRMATION, WRITE_INTENT
+from utils.cache import BoundedCache
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger('wooagent')
+
+Embedder = Callable[[str], Sequence[float]]
+
+LOOKUPS = REGISTRY.counter(
+    'wooagent_answer_cache_lookups_total', 'Answer cache lookups by outcome', ('outcome',))
+LATENCY_SAVED_SECONDS = REGISTRY.counter(
+    'wooagent_answer_cache_latency_saved_seconds_total', 'Agent time saved by answers served from the cache')
+
+# Questions that refer back to earlier turns; their answer depends on the conversation
+REFERENTIAL = re.compile(
+    r'\b(it|its|that|this|these|those|them|they|he|she|him|her|his|one|ones|'
+    r'more|again|same|above|previous|else|other)\b'
+)
+
+# Shorter messages are replies like "2" or "the first", whose meaning depends on the conversation
+MIN_QUESTION_WORDS = 3
+
+_PUNCTUATION = re.compile(r'[^\w\s#$%.-]|(?<!\d)\.|\.(?!\d)')
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a question for exact matching.
+
+    Case, punctuation (except in numbers, ids and prices) and whitespace are
+    ignored, so "Show me recent orders!" and "show me  recent orders" match.
+
+    Args:
+        text (str): The question
+
+    Returns:
+        str: Normalized question
+    """
+    return ' '.join(_PUNCTUATION.sub(' ', text.lower()).split())
+
+
+def _cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _awaits_reply(conversation: Conversation) -> bool:
+    """
+    Check whether the agent's last reply in a conversation asked the user a question.
+    """
+    messages = conversation.messages
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].role == 'assistant':
+            return messages[index].content.rstrip().endswith('?')
+    return False
+
+
+@dataclass
+class CachedAnswer:
+    """
+    An answer stored in the cache.
+    """
+    question: str
+    response: str
+    generations: Dict[str, int]
+    latency_ms: float
+    embedding: Optional[Sequence[float]] = None
+
+
+@dataclass
+class AnswerCacheStats:
+    """
+    Counters describing answer cache effectiveness.
+    """
+    lookups: int = 0
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    stale: int = 0
+    bypassed: int = 0
+    latency_saved_ms: float = 0.0
+
+    @property
+    def hits(self) -> int:
+        """Lookups answered from the cache."""
+        return self.exact_hits + self.semantic_hits
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from the cache."""
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the stats to a dictionary format.
+
+        Returns:
+            Dict[str, Any]: Dictionary representation of the stats
+        """
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'stale': self.stale,
+            'bypassed': self.bypassed,
+            'hit_rate': self.hit_rate,
+            'latency_saved_ms': round(self.latency_saved_ms, 1)
+        }
+
+
+class AnswerCache:
+    """
+    Cache of agent answers keyed by normalized question.
+
+    A question is looked up by exact normalized match first and, if an
+    ``embedder`` is configured, by embedding similarity second. An answer is
+    only served while it is younger than ``ttl`` and no mutating tool call has
+    changed the store data since it was generated, as tracked by the generation
+    counters of the tool result cache (``data_version``).
+
+    Questions with a mutating intent, questions referring back to earlier turns,
+    confirmations and other short replies, messages answering a question the
+    agent asked, and conversations whose metadata sets ``answer_cache`` to false
+    bypass the cache entirely.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 500,
+                 data_version: Optional[Callable[[], Dict[str, int]]] = None,
+                 embedder: Optional[Embedder] = None, similarity_threshold: float = 0.92):
+        """
+        Initialize the answer cache.
+
+        Args:
+            ttl (float): Seconds an answer may be served for; 0 disables the cache
+            max_entries (int): Maximum number of cached answers
+            data_version (Optional[Callable[[], Dict[str, int]]]): Returns the current
+                generation of each entity type; answers are stale once it changes
+            embedder (Optional[Embedder]): Embeds a question for similarity matching
+            similarity_threshold (float): Minimum cosine similarity for a semantic match
+        """
+        self.ttl = ttl
+        self.data_version = data_version or dict
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.stats = AnswerCacheStats()
+
+        self._answers: BoundedCache[CachedAnswer] = BoundedCache(max_entries=max_entries)
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether answers are cached at all."""
+        return self.ttl > 0
+
+    def is_cacheable(self, conversation: Conversation, question: str) -> bool:
+        """
+        Check whether a question may be answered from, and stored in, the cache.
+
+        Args:
+            conversation (Conversation): The conversation the question belongs to
+            question (str): The question
+
+        Returns:
+            bool: False for mutating intents, follow-up questions, replies and opted-out conversations
+        """
+        if not self.enabled or conversation.metadata.get('answer_cache') is False:
+            return False
+        normalized = normalize_question(question)
+        if len(normalized.split()) < MIN_QUESTION_WORDS or CONFIRMATION.match(normalized):
+            return False
+        # Questions asking the agent to change the store are never answered from the cache
+        if WRITE_INTENT.search(normalized) or REFERENTIAL.search(normalized):
+            return False
+        return not _awaits_reply(conversation)
+
+    def lookup(self, conversation: Conversation, question: str) -> Optional[str]:
+        """
+        Find a fresh cached answer to a question.
+
+        Args:
+            conversation (Conversation): The conversation the question belongs to
+            question (str): The question
+
+        Returns:
+            Optional[str]: The cached answer, or None if there is none or it may not be used
+        """
+        if not self.is_cacheable(conversation, question):
+            if self.enabled:
+                self._count('bypassed')
+                LOOKUPS.inc(outcome='bypassed')
+            return None
+
+        self._count('lookups')
+        normalized = normalize_question(question)
+        key, answer = normalized, self._answers.get(normalized)
+        kind = 'exact_hits'
+        if answer is None and self.embedder is not None:
+            key, answer = self._nearest(normalized)
+            kind = 'semantic_hits'
+        if answer is None:
+            LOOKUPS.inc(outcome='miss')
+            return None
+
+        if answer.generations != self.data_version():
+            self._answers.pop(key)
+            self._count('stale')
+            LOOKUPS.inc(outcome='stale')
+            return None
+
+        with self._stats_lock:
+            setattr(self.stats, kind, getattr(self.stats, kind) + 1)
+            self.stats.latency_saved_ms += answer.latency_ms
+        LOOKUPS.inc(outcome='exact_hit' if kind == 'exact_hits' else 'semantic_hit')
+        LATENCY_SAVED_SECONDS.inc(answer.latency_ms / 1000)
+        logger.info("Answered from cache for conversation %s", conversation.id)
+        return answer.response
+
+    def store(self, conversation: Conversation, question: str, response: str,
+              generations: Dict[str, int], latency_ms: float):
+        """
+        Cache the agent's answer to a question.
+
+        The answer is dropped if the store data changed while it was generated,
+        e.g. because the question turned out to trigger a mutating tool.
+
+        Args:
+            conversation (Conversation): The conversation the question belongs to
+            question (str): The question
+            response (str): The agent's answer
+            generations (Dict[str, int]): ``data_version()`` from before the agent ran
+            latency_ms (float): Time the agent took to answer
+        """
+        if not response or not self.is_cacheable(conversation, question):
+            return
+        if generations != self.data_version():
+            return
+
+        normalized = normalize_question(question)
+        embedding = self.embedder(normalized) if self.embedder is not None else None
+        self._answers.put(
+            normalized,
+            CachedAnswer(normalized, response, dict(generations), latency_ms, embedding),
+            ttl=self.ttl
+        )
+
+    def _nearest(self, normalized: str) -> Tuple[Optional[str], Optional[CachedAnswer]]:
+        """
+        Find the cached answer whose question is most similar to ``normalized``.
+        """
+        embedding = self.embedder(normalized)
+        best_key, best_answer, best_score = None, None, self.similarity_threshold
+        for key in self._answers.keys():
+            answer = self._answers.peek(key)
+            if answer is None or answer.embedding is None:
+                continue
+            score = _cosine_similarity(embedding, answer.embedding)
+            if score >= best_score:
+                best_key, best_answer, best_score = key, answer, score
+        return best_key, best_answer
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self.stats, counter, getattr(self.stats, counter) + 1)
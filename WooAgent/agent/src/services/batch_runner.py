@@ -0,0 +1,333 @@
+"""
+Batch Runner
+
+This module runs lists of agent tasks in the background of interactive
+traffic, with bounded concurrency, rate limiting and a results file that
+doubles as a checkpoint.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import AbstractSet, Any, Callable, Dict, Iterable, Iterator, Optional
+
+from utils.concurrency import RateLimiter
+from utils.outbound import BATCH, priority
+
+logger = logging.getLogger('wooagent')
+
+
+@dataclass
+class BatchSummary:
+    """
+    Outcome counts of a batch run.
+    """
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+
+def validate_task(task: Any, position: int) -> Dict[str, Any]:
+    """
+    Check a task and give it an ID.
+
+    A task is an object with a ``message`` and optionally an ``id``,
+    ``conversation_id`` and ``metadata`` for the task's conversation, which is
+    created for the task unless a ``conversation_id`` is given. A task
+    without an ``id`` is identified by its position.
+
+    Args:
+        task (Any): The task as decoded from JSON
+        position (int): Line number or index of the task, from 1
+
+    Returns:
+        Dict[str, Any]: The task, with its ``id`` as a string
+
+    Raises:
+        ValueError: If the task has no message
+    """
+    if not isinstance(task, dict) or not isinstance(task.get('message'), str) or not task['message']:
+        raise ValueError("has no message")
+    task['id'] = str(task.get('id', position))
+    return task
+
+
+def load_tasks(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read tasks from a JSONL file, as described in ``validate_task``.
+
+    Tasks without an ``id`` are identified by their line number. Blank lines
+    are skipped.
+
+    Args:
+        path (str): Path to the tasks file
+
+    Returns:
+        Iterator[Dict[str, Any]]: The tasks, in file order
+
+    Raises:
+        ValueError: If a line is not a task
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                task = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number} of {path} is not JSON: {e}")
+            try:
+                yield validate_task(task, line_number)
+            except ValueError as e:
+                raise ValueError(f"Line {line_number} of {path} {e}")
+
+
+def completed_task_ids(path: str) -> AbstractSet[str]:
+    """
+    Get the IDs of tasks a results file records as succeeded.
+
+    Args:
+        path (str): Path to the results file
+
+    Returns:
+        AbstractSet[str]: IDs of succeeded tasks, empty if the file does not exist
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # The last line of an interrupted run may be partly written
+                continue
+            if isinstance(result, dict) and result.get('success'):
+                completed.add(str(result.get('id')))
+    return completed
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def append_results(results_path: str,
+                   run: Callable[[AbstractSet[str], BatchSummary], Iterable[Dict[str, Any]]],
+                   resume: bool = True) -> BatchSummary:
+    """
+    Append the results of a batch run to a JSONL file, one line per task as it finishes.
+
+    Args:
+        results_path (str): Path of the results file
+        run (Callable[[AbstractSet[str], BatchSummary], Iterable[Dict[str, Any]]]): Runs the
+            tasks not in the given set of IDs, counting outcomes in the summary, and yields results
+        resume (bool): Skip tasks the results file records as succeeded
+
+    Returns:
+        BatchSummary: Outcome counts of this run
+    """
+    summary = BatchSummary()
+    done_ids = completed_task_ids(results_path) if resume else set()
+    if not resume and os.path.exists(results_path):
+        os.remove(results_path)
+
+    with open(results_path, 'a', encoding='utf-8') as results:
+        if results.tell() > 0 and not _ends_with_newline(results_path):
+            # Start after the partial line an interruption left
+            results.write('\n')
+        for result in run(done_ids, summary):
+            results.write(json.dumps(result, ensure_ascii=False) + '\n')
+            results.flush()
+
+    logger.info("Batch finished: %s succeeded, %s failed, %s skipped",
+                summary.succeeded, summary.failed, summary.skipped)
+    return summary
+
+
+def run_on_server(server_url: str, tasks: Iterable[Dict[str, Any]], results_path: str, resume: bool = True,
+                  turns_per_minute: float = 0) -> BatchSummary:
+    """
+    Run tasks in a running agent server, appending their results to a JSONL file.
+
+    The server runs them alongside its interactive requests, which go first
+    for OpenAI and MCP capacity. Resuming works as with ``BatchRunner.run``.
+
+    Args:
+        server_url (str): Base URL of the agent server, e.g. http://localhost:5000
+        tasks (Iterable[Dict[str, Any]]): Tasks as produced by load_tasks
+        results_path (str): Path of the results file
+        resume (bool): Skip tasks the results file records as succeeded
+        turns_per_minute (float): Maximum tasks started per minute, 0 for no limit
+
+    Returns:
+        BatchSummary: Outcome counts of this run
+
+    Raises:
+        urllib.error.URLError: If the server cannot be reached or refuses the batch
+    """
+    tasks = list(tasks)
+
+    def run(skip_ids: AbstractSet[str], summary: BatchSummary) -> Iterator[Dict[str, Any]]:
+        remaining = [task for task in tasks if task['id'] not in skip_ids]
+        summary.skipped += len(tasks) - len(remaining)
+        if not remaining:
+            return
+        request = urllib.request.Request(
+            server_url.rstrip('/') + '/batch',
+            data=json.dumps({'tasks': remaining, 'turns_per_minute': turns_per_minute}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                if result.get('success'):
+                    summary.succeeded += 1
+                else:
+                    summary.failed += 1
+                yield result
+
+    return append_results(results_path, run, resume)
+
+
+class BatchRunner:
+    """
+    Runs tasks through an AgentService and appends a result line per task.
+
+    Up to ``concurrency`` tasks run at once; tasks in the same conversation
+    still take turns. Their OpenAI and MCP calls go in the batch lane of the
+    agent service's scheduler, so when the runner lives in the server process
+    interactive requests are served first. Each result is written as soon as
+    its task finishes, so an interrupted run can be resumed with the same
+    results file: tasks it records as succeeded are skipped and failed ones
+    run again.
+    """
+
+    def __init__(self, agent_service, concurrency: int = 4, rate_limiter: Optional[RateLimiter] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            agent_service: The AgentService to run tasks with
+            concurrency (int): Maximum number of tasks running at once
+            rate_limiter (Optional[RateLimiter]): Limits how often tasks start, and so
+                the rate of model requests
+        """
+        self.agent_service = agent_service
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter
+
+    def run(self, tasks: Iterable[Dict[str, Any]], results_path: str, resume: bool = True) -> BatchSummary:
+        """
+        Run tasks, appending their results to a JSONL file.
+
+        Args:
+            tasks (Iterable[Dict[str, Any]]): Tasks as produced by load_tasks
+            results_path (str): Path of the results file
+            resume (bool): Skip tasks the results file records as succeeded
+
+        Returns:
+            BatchSummary: Outcome counts of this run
+        """
+        return append_results(results_path, lambda skip_ids, summary: self.results(tasks, skip_ids, summary),
+                              resume)
+
+    def results(self, tasks: Iterable[Dict[str, Any]], skip_ids: AbstractSet[str] = frozenset(),
+                summary: Optional[BatchSummary] = None,
+                stop: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Run tasks, yielding each one's result as soon as it finishes.
+
+        If the caller is interrupted, the results of the tasks already running
+        are still yielded before KeyboardInterrupt is raised again, so a
+        resumed run does not repeat them.
+
+        Args:
+            tasks (Iterable[Dict[str, Any]]): Tasks as produced by load_tasks
+            skip_ids (AbstractSet[str]): IDs of tasks not to run
+            summary (Optional[BatchSummary]): Outcome counts to update
+            stop (Optional[threading.Event]): Once set, no further tasks are started
+
+        Yields:
+            Dict[str, Any]: Task results, in the order the tasks finish
+        """
+        summary = summary if summary is not None else BatchSummary()
+        pending = iter(tasks)
+        in_flight: Dict[Future, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch') as executor:
+            try:
+                while True:
+                    while len(in_flight) < self.concurrency and not (stop is not None and stop.is_set()):
+                        task = next(pending, None)
+                        if task is None:
+                            break
+                        if task['id'] in skip_ids:
+                            summary.skipped += 1
+                            continue
+                        in_flight[executor.submit(self._run_task, task)] = task
+
+                    if not in_flight:
+                        break
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield self._result(in_flight.pop(future), future, summary)
+            except KeyboardInterrupt:
+                # Keep the results of tasks already running, so resuming does not repeat them
+                logger.warning("Batch interrupted, waiting for %s running tasks", len(in_flight))
+                for future in list(in_flight):
+                    future.cancel()
+                for future in wait(in_flight).done:
+                    if not future.cancelled():
+                        yield self._result(in_flight[future], future, summary)
+                raise
+
+    def _run_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        started = time.perf_counter()
+        conversation_id = task.get('conversation_id') or ''
+        if not conversation_id:
+            # A conversation of its own, so the task runs alongside the others
+            metadata = {**(task.get('metadata') or {}), 'batch_task_id': task['id']}
+            conversation_id = self.agent_service.create_new_conversation(metadata)['conversation_id']
+
+        with priority(BATCH):
+            result = self.agent_service.process_message(conversation_id, task['message'],
+                                                        request_id=f"batch-{task['id']}")
+        record = {
+            'id': task['id'],
+            'conversation_id': result.get('conversation_id'),
+            'success': bool(result.get('success')),
+            'response': result.get('response'),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        if not record['success']:
+            record['error'] = result.get('error')
+        return record
+
+    @staticmethod
+    def _result(task: Dict[str, Any], future: Future, summary: BatchSummary) -> Dict[str, Any]:
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error("Batch task %s failed: %s", task['id'], e)
+            result = {'id': task['id'], 'success': False, 'error': str(e)}
+
+        if result['success']:
+            summary.succeeded += 1
+        else:
+            summary.failed += 1
+        return result
@@ -0,0 +1,376 @@
+"""
+Catalog Sync
+
+This module keeps the local catalog mirror up to date from the MCP server's
+WooCommerce HTTP API, and serves the agent's lookups from the mirror when it
+is fresh.
+"""
+
+import json
+import time
+import base64
+import hmac
+import hashlib
+import inspect
+import logging
+import threading
+import urllib.parse
+import urllib.request
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from services.tool_cache import MUTATING_TOOLS
+from storage.catalog import CATALOG_ENTITIES, CatalogMirror
+
+logger = logging.getLogger('wooagent')
+
+# Read tools answered from the mirror: tool name -> entity type
+MIRRORED_GET_TOOLS = {f"get_{entity}": entity for entity in CATALOG_ENTITIES}
+MIRRORED_SEARCH_TOOLS = {f"list_{collection}": entity for entity, collection in CATALOG_ENTITIES.items()}
+
+# Tools that change an entity, whose mirrored copy is dropped so the next read goes live
+MUTATING_PREFIXES = ('create_', 'update_', 'delete_')
+
+Fetch = Callable[[str, Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def _http_fetch(base_url: str, timeout: float = 30.0) -> Fetch:
+    """
+    Build a function getting a page of a collection from the MCP server's HTTP API.
+    """
+    def fetch(collection: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        url = f"{base_url.rstrip('/')}/api/{collection}?{urllib.parse.urlencode(params)}"
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.loads(response.read())
+    return fetch
+
+
+def _tool_result(data: Any) -> Dict[str, Any]:
+    """
+    Wrap data the way the MCP server returns tool results.
+    """
+    return {'content': [{'type': 'text', 'text': json.dumps(data)}]}
+
+
+def _result_data(result: Any) -> Any:
+    """
+    Get the JSON data out of an MCP tool result, or None if it holds none.
+    """
+    if isinstance(result, dict) and 'content' not in result:
+        return result
+    content = result.get('content') if isinstance(result, dict) else getattr(result, 'content', None)
+    for item in content or ():
+        text = item.get('text') if isinstance(item, dict) else getattr(item, 'text', None)
+        if text:
+            try:
+                return json.loads(text)
+            except ValueError:
+                return None
+    return None
+
+
+def _related_ids(entity: str, record: Any) -> Set[str]:
+    """
+    Get the IDs of the records of an entity type that a record refers to,
+    e.g. the products in an order's line items or its customer.
+    """
+    if not isinstance(record, dict):
+        return set()
+    if entity == 'product':
+        return {
+            str(item['product_id']) for item in record.get('line_items') or ()
+            if isinstance(item, dict) and item.get('product_id')
+        }
+    value = record.get(f"{entity}_id")
+    return {str(value)} if value else set()
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """
+    Check the ``X-WC-Webhook-Signature`` of a WooCommerce webhook delivery.
+
+    Args:
+        body (bytes): Raw request body
+        signature (Optional[str]): Value of the signature header
+        secret (str): Secret configured for the webhook
+
+    Returns:
+        bool: True if the signature matches
+    """
+    if not signature:
+        return False
+    expected = base64.b64encode(hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()).decode('ascii')
+    return hmac.compare_digest(expected, signature)
+
+
+class CatalogSync:
+    """
+    Polls WooCommerce for entities modified since the last sync.
+
+    The first sync of an entity type copies every record; later ones ask only
+    for records with ``modified_after`` the newest modification seen. Since
+    that never reports deletions, every ``reconcile_interval`` seconds the IDs
+    of all records are listed and mirrored records missing from the list are
+    dropped. A sync that fails leaves the entity type's records to go stale,
+    and readers fall back to live calls.
+    """
+
+    def __init__(self, mirror: CatalogMirror, base_url: str, interval: float = 60.0,
+                 page_size: int = 100, fetch: Optional[Fetch] = None, reconcile_interval: float = 240.0):
+        """
+        Initialize the sync.
+
+        Args:
+            mirror (CatalogMirror): Mirror to keep up to date
+            base_url (str): URL of the MCP server's HTTP API
+            interval (float): Seconds between syncs in the background
+            page_size (int): Records requested per page
+            fetch (Optional[Fetch]): Gets a page of a collection, defaults to HTTP
+            reconcile_interval (float): Seconds between listings of every ID; keep it
+                below the mirror's ``max_age``, or the mirror is only used for records
+                fetched recently
+        """
+        self.mirror = mirror
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        self.page_size = page_size
+        self.fetch = fetch or _http_fetch(base_url)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync_entity(self, entity: str) -> int:
+        """
+        Copy the records of one entity type changed since its last sync.
+
+        Args:
+            entity (str): Entity type
+
+        Returns:
+            int: Number of records copied
+        """
+        collection = CATALOG_ENTITIES[entity]
+        cursor = self.mirror.sync_cursor(entity)
+        newest = cursor
+        params: Dict[str, Any] = {}
+        if cursor:
+            params['modified_after'] = cursor
+            params['dates_are_gmt'] = 'true'
+
+        started_at = time.time()
+        copied = 0
+        ids = []
+        for records in self._pages(collection, params):
+            copied += self.mirror.upsert(entity, records)
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                ids.append(record.get('id'))
+                modified = record.get('date_modified_gmt')
+                if modified and (newest is None or modified > newest):
+                    newest = modified
+
+        self.mirror.mark_synced(entity, newest)
+        if not cursor:
+            # A full copy lists every record, so it reconciles too
+            self.mirror.reconcile(entity, ids, started_at)
+        return copied
+
+    def reconcile_entity(self, entity: str) -> int:
+        """
+        Drop mirrored records of one entity type that the store no longer has.
+
+        Args:
+            entity (str): Entity type
+
+        Returns:
+            int: Number of records dropped
+        """
+        started_at = time.time()
+        ids = []
+        for records in self._pages(CATALOG_ENTITIES[entity], {'_fields': 'id'}):
+            ids.extend(record.get('id') for record in records if isinstance(record, dict))
+        return self.mirror.reconcile(entity, ids, started_at)
+
+    def _pages(self, collection: str, params: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Get every page of a collection, in ID order.
+        """
+        params = {**params, 'per_page': self.page_size, 'orderby': 'id', 'order': 'asc'}
+        page = 1
+        while True:
+            records = self.fetch(collection, {**params, 'page': page})
+            if not isinstance(records, list):
+                raise ValueError(f"Unexpected response listing {collection}")
+            yield records
+            if len(records) < self.page_size:
+                return
+            page += 1
+
+    def sync_all(self) -> Dict[str, int]:
+        """
+        Sync every entity type, skipping those that fail.
+
+        Returns:
+            Dict[str, int]: Records copied per entity type that synced
+        """
+        copied = {}
+        for entity in CATALOG_ENTITIES:
+            try:
+                copied[entity] = self.sync_entity(entity)
+                if self.mirror.reconciled_at(entity) <= time.time() - self.reconcile_interval:
+                    self.reconcile_entity(entity)
+            except Exception as e:
+                logger.warning("Catalog sync of %s failed: %s", entity, e)
+        logger.info("Catalog sync copied %s", copied)
+        return copied
+
+    def start(self):
+        """
+        Sync in a background thread every ``interval`` seconds until stopped.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='catalog-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background sync.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def apply_webhook(self, topic: str, payload: Dict[str, Any]) -> bool:
+        """
+        Apply a WooCommerce webhook delivery (e.g. ``product.updated``) to the mirror.
+
+        Args:
+            topic (str): Value of the ``X-WC-Webhook-Topic`` header
+            payload (Dict[str, Any]): The delivered record
+
+        Returns:
+            bool: True if the delivery concerned a mirrored entity type
+        """
+        entity, _, event = topic.partition('.')
+        if entity not in CATALOG_ENTITIES or payload.get('id') is None:
+            return False
+        if event == 'deleted':
+            self.mirror.remove(entity, payload['id'])
+        else:
+            self.mirror.upsert(entity, [payload])
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_all()
+            self._stop.wait(self.interval)
+
+
+class CatalogTool:
+    """
+    Wraps an MCP tool so that lookups are answered from the catalog mirror when it is fresh.
+
+    ``get_<entity>`` calls are served from a fresh mirrored record and
+    ``list_<entities>`` calls whose only filter is ``search`` from the full-text
+    index. Everything else, and anything stale or missing, goes to the MCP
+    server; records it returns are copied into the mirror, and records a
+    mutating call touches are dropped from it, along with the records it
+    changes indirectly, such as the products and customer of an order.
+    """
+
+    def __init__(self, tool: Any, mirror: CatalogMirror):
+        """
+        Initialize the wrapper.
+
+        Args:
+            tool (Any): The MCP tool to wrap
+            mirror (CatalogMirror): The catalog mirror
+        """
+        self.tool = tool
+        self.mirror = mirror
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.tool, name)
+
+    def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """
+        Call a tool, answering lookups from the mirror when possible.
+
+        Args:
+            name (str): Name of the tool
+            arguments (Optional[Dict[str, Any]]): Tool arguments
+            **kwargs: Further options passed to the wrapped tool
+
+        Returns:
+            Any: The tool's result, awaitable if the wrapped tool is asynchronous
+        """
+        arguments = arguments or {}
+        mirrored = self._lookup(name, arguments)
+        if mirrored is not None:
+            result = _tool_result(mirrored)
+            return self._resolved(result) if inspect.iscoroutinefunction(self.tool.call_tool) else result
+
+        result = self.tool.call_tool(name, arguments, **kwargs)
+        if inspect.isawaitable(result):
+            return self._complete_async(name, arguments, result)
+        self._record(name, arguments, result)
+        return result
+
+    def _lookup(self, name: str, arguments: Dict[str, Any]) -> Any:
+        try:
+            if name in MIRRORED_GET_TOOLS and set(arguments) == {'id'}:
+                return self.mirror.get(MIRRORED_GET_TOOLS[name], arguments['id'])
+            if name in MIRRORED_SEARCH_TOOLS and arguments.get('search') and \
+                    set(arguments) <= {'search', 'per_page'}:
+                return self.mirror.search(MIRRORED_SEARCH_TOOLS[name], str(arguments['search']),
+                                          limit=int(arguments.get('per_page') or 10))
+        except Exception as e:
+            logger.warning("Catalog mirror lookup for %s failed: %s", name, e)
+        return None
+
+    async def _complete_async(self, name: str, arguments: Dict[str, Any], pending) -> Any:
+        result = await pending
+        self._record(name, arguments, result)
+        return result
+
+    @staticmethod
+    async def _resolved(result: Any) -> Any:
+        return result
+
+    def _record(self, name: str, arguments: Dict[str, Any], result: Any):
+        """
+        Copy records a live call returned into the mirror, or drop what a mutation touched.
+        """
+        try:
+            if name.startswith(MUTATING_PREFIXES):
+                self._drop_touched(name, arguments, result)
+                return
+
+            entity = MIRRORED_GET_TOOLS.get(name) or MIRRORED_SEARCH_TOOLS.get(name)
+            data = _result_data(result) if entity else None
+            if isinstance(data, dict) and not data.get('error'):
+                self.mirror.upsert(entity, [data])
+            elif isinstance(data, list):
+                self.mirror.upsert(entity, data)
+        except Exception as e:
+            logger.warning("Catalog mirror update for %s failed: %s", name, e)
+
+    def _drop_touched(self, name: str, arguments: Dict[str, Any], result: Any):
+        """
+        Drop the records a mutating call changed, directly or, as listed in
+        ``MUTATING_TOOLS``, indirectly.
+        """
+        entity, related = MUTATING_TOOLS.get(name, (name.split('_', 1)[1].split('_')[0], ()))
+        entity_id = arguments.get('id') or arguments.get(f"{entity}_id")
+        # The related records may be named in the call, its result or the record as it was
+        sources = [arguments, _result_data(result)]
+        if entity in CATALOG_ENTITIES and entity_id is not None:
+            sources.append(self.mirror.peek(entity, entity_id))
+            self.mirror.remove(entity, entity_id)
+        for other in related:
+            if other not in CATALOG_ENTITIES:
+                continue
+            for other_id in set().union(*(_related_ids(other, source) for source in sources)):
+                self.mirror.remove(other, other_id)
@@ -0,0 +1,182 @@
+"""
+Context Builder
+
+This module selects the conversation history sent to the model so that it
+fits a token budget.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.conversation import Conversation, Message
+from utils.cache import BoundedCache
+from utils.tokens import MESSAGE_OVERHEAD_TOKENS, count_tokens
+
+logger = logging.getLogger('wooagent')
+
+# Roles included in the model context; 'system' messages in a conversation are
+# error notices recorded for the user, not instructions for the model
+CONTEXT_ROLES = ('user', 'assistant')
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+Summarizer = Callable[[Optional[str], List[Message]], str]
+
+
+def extractive_summary(previous_summary: Optional[str], messages: List[Message],
+                       max_chars_per_message: int = 200) -> str:
+    """
+    Summarize messages by keeping the start of each one.
+
+    Args:
+        previous_summary (Optional[str]): Summary of the messages before these
+        messages (List[Message]): Messages to add to the summary
+        max_chars_per_message (int): Characters kept from each message
+
+    Returns:
+        str: Updated summary
+    """
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        content = ' '.join(message.content.split())
+        if len(content) > max_chars_per_message:
+            content = content[:max_chars_per_message].rstrip() + '...'
+        lines.append(f"{message.role}: {content}")
+    return '\n'.join(lines)
+
+
+class ContextBuilder:
+    """
+    Builds model context from a conversation within a token budget.
+
+    The most recent turns are included verbatim, newest first, until the budget
+    is used up. Older turns are folded into a rolling summary that is extended
+    incrementally as turns fall out of the window, rather than re-summarized
+    each turn. Token counts are cached on each Message, so a turn only counts
+    the tokens of messages it has not seen before.
+    """
+
+    def __init__(self, max_tokens: int = 6000, system_prompt: str = '', summary_max_tokens: int = 500,
+                 summarizer: Optional[Summarizer] = None, token_counter: Callable[[str], int] = count_tokens,
+                 max_tracked_conversations: int = 1000):
+        """
+        Initialize the context builder.
+
+        Args:
+            max_tokens (int): Token budget for the system prompt, summary and history together
+            system_prompt (str): The agent's system prompt, counted against the budget
+            summary_max_tokens (int): Maximum size of the rolling summary of older turns
+            summarizer (Optional[Summarizer]): Extends a summary with more messages,
+                defaults to an extractive summary
+            token_counter (Callable[[str], int]): Counts the tokens in a text
+            max_tracked_conversations (int): Conversations whose rolling summary is kept in memory
+        """
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer or extractive_summary
+        self.token_counter = token_counter
+        self.system_prompt_tokens = token_counter(system_prompt) + MESSAGE_OVERHEAD_TOKENS if system_prompt else 0
+
+        # conversation id -> (number of messages covered, summary text)
+        self._summaries: BoundedCache[Tuple[int, str]] = BoundedCache(max_entries=max_tracked_conversations)
+
+    def build(self, conversation: Conversation) -> List[Dict[str, str]]:
+        """
+        Get the messages of a conversation to send as model context.
+
+        Args:
+            conversation (Conversation): The conversation
+
+        Returns:
+            List[Dict[str, str]]: Message dictionaries with 'role' and 'content'
+        """
+        return self.build_with_tokens(conversation)[0]
+
+    def build_with_tokens(self, conversation: Conversation) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Get the model context of a conversation and the tokens it uses.
+
+        Args:
+            conversation (Conversation): The conversation
+
+        Returns:
+            Tuple[List[Dict[str, str]], int]: The context, and its token count
+                including the system prompt
+        """
+        messages = conversation.messages
+        budget = self.max_tokens - self.system_prompt_tokens
+
+        start = self._window_start(messages, budget)
+        summary = ''
+        if start > 0:
+            # Not everything fits: reserve room for the summary and shrink the window
+            start = max(start, self._window_start(messages, budget - self.summary_max_tokens))
+            summary = self._summary_for(conversation, start)
+
+        context = [{'role': 'system', 'content': SUMMARY_PREFIX + summary}] if summary else []
+        context.extend(self._format(messages, start))
+
+        # Counts of the window's messages were cached while choosing it
+        tokens = self.system_prompt_tokens + sum(
+            self._message_tokens(m) for m in messages[start:] if m.role in CONTEXT_ROLES)
+        if summary:
+            tokens += self.token_counter(SUMMARY_PREFIX + summary) + MESSAGE_OVERHEAD_TOKENS
+        return context, tokens
+
+    def _message_tokens(self, message: Message) -> int:
+        return message.get_token_count(self.token_counter) + MESSAGE_OVERHEAD_TOKENS
+
+    def _window_start(self, messages: List[Message], budget: int) -> int:
+        """
+        Find the index of the oldest message in the newest run of messages that fits the budget.
+        The latest message is always included, even if it alone exceeds the budget.
+        """
+        used = 0
+        included = 0
+        start = len(messages)
+        for index in range(len(messages) - 1, -1, -1):
+            message = messages[index]
+            if message.role not in CONTEXT_ROLES:
+                start = index
+                continue
+            used += self._message_tokens(message)
+            if used > budget and included:
+                break
+            included += 1
+            start = index
+        return start
+
+    def _summary_for(self, conversation: Conversation, start: int) -> str:
+        """
+        Get the rolling summary of the messages before ``start``, extending the cached one.
+        """
+        covered, summary = self._summaries.get(conversation.id) or (0, '')
+        if covered > start:
+            # The window grew back (e.g. a larger budget); summarize from scratch
+            covered, summary = 0, ''
+
+        if covered < start:
+            new_messages = [m for m in conversation.messages[covered:start] if m.role in CONTEXT_ROLES]
+            if new_messages:
+                summary = self._truncate(self.summarizer(summary or None, new_messages))
+            covered = start
+            self._summaries.put(conversation.id, (covered, summary))
+
+        return summary
+
+    def _truncate(self, summary: str) -> str:
+        """
+        Trim a summary to the summary budget, dropping its oldest lines first.
+        """
+        lines = summary.split('\n')
+        while len(lines) > 1 and self.token_counter('\n'.join(lines)) > self.summary_max_tokens:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _format(messages: List[Message], start: int) -> List[Dict[str, str]]:
+        return [
+            {'role': msg.role, 'content': msg.content}
+            for msg in messages[start:]
+            if msg.role in CONTEXT_ROLES
+        ]
@@ -4,14 +4,42 @@ Conversation Service
 This module provides services for managing conversations.
 """
 
-import os
-import json
 import uuid
 import logging
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from datetime import datetime
 
-from models.conversation import Conversation, Message
+from models.conversation import Conversation, ConversationSummary, Message
+from storage.base import ConversationStorage, VersionConflictError
+from storage.file_storage import FileConversationStorage
+from storage.search import ConversationSearchIndex, SearchHit
+from utils.cache import BoundedCache
+from utils.concurrency import KeyedLocks
+from utils.metrics import ERRORS, REGISTRY, STORAGE_SECONDS, timed_stage
+
+# Rough per-message overhead (object headers, role, timestamp) used for cache sizing
+MESSAGE_OVERHEAD_BYTES = 200
+
+# Attempts at appending a message to a conversation other processes keep changing
+MAX_CONFLICT_RETRIES = 3
+
+RELOADS = REGISTRY.counter(
+    'wooagent_conversation_reloads_total',
+    'Cached conversations reloaded because another process changed them', ('reason',))
+
+
+def estimate_conversation_size(conversation: Conversation) -> int:
+    """
+    Estimate the memory held by a conversation from its message content.
+    
+    Args:
+        conversation (Conversation): The conversation to measure
+        
+    Returns:
+        int: Estimated size in bytes
+    """
+    messages = conversation.messages
+    return sum(messages.content_lengths()) + MESSAGE_OVERHEAD_BYTES * (len(messages) + 1)
 
 logger = logging.getLogger('wooagent')
 
@@ -20,20 +48,73 @@ class ConversationService:
     Service for managing conversations.
     """
     
-    def __init__(self, storage_dir: str = 'conversations'):
+    def __init__(self, storage_dir: str = 'conversations', compact_threshold: int = 100,
+                 write_behind: bool = False, flush_interval: float = 1.0, fsync: str = 'never',
+                 max_cached: int = 1000, cache_ttl: Optional[float] = 3600,
+                 cache_max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 storage: Optional[ConversationStorage] = None,
+                 search_index: Optional[ConversationSearchIndex] = None):
         """
         Initialize the conversation service.
         
+        Conversations are persisted through a storage backend, by default the
+        file layout under ``storage_dir`` (see FileConversationStorage).
+        
+        Loaded conversations are kept in a bounded LRU cache. Conversations that
+        have never been written to storage are saved before they are evicted.
+        
+        With a storage backend shared between processes, a cached conversation
+        is checked against the stored version on every lookup and reloaded if
+        another process changed it. A message whose write conflicts with such a
+        change is added to the reloaded conversation instead.
+        
         Args:
             storage_dir (str): Directory to store conversation files
+            compact_threshold (int): Journaled messages that trigger a snapshot rewrite
+            write_behind (bool): Write journal entries from a background thread
+            flush_interval (float): Maximum seconds a write-behind entry stays unwritten
+            fsync (str): Journal fsync policy ('always', 'periodic' or 'never')
+            max_cached (int): Maximum number of conversations kept in memory
+            cache_ttl (Optional[float]): Seconds an unused conversation stays in memory
+            cache_max_bytes (Optional[int]): Memory budget for cached conversations
+            storage (Optional[ConversationStorage]): Storage backend to use instead of
+                the file storage; the file storage options are ignored when given
+            search_index (Optional[ConversationSearchIndex]): Full-text index every added
+                message is fed to; None disables search
+        """
+        self.storage = storage or FileConversationStorage(
+            storage_dir,
+            compact_threshold=compact_threshold,
+            write_behind=write_behind,
+            flush_interval=flush_interval,
+            fsync=fsync
+        )
+        self.active_conversations: BoundedCache[Conversation] = BoundedCache(
+            max_entries=max_cached,
+            ttl=cache_ttl,
+            max_bytes=cache_max_bytes,
+            sizeof=estimate_conversation_size,
+            on_evict=self._on_evict
+        )
+        self.search_index = search_index
+        # Conversations created in memory that have not been saved yet
+        self._unsaved = set()
+        self._locks = KeyedLocks()
+    
+    def lock(self, conversation_id: str):
         """
-        self.storage_dir = storage_dir
-        self.active_conversations: Dict[str, Conversation] = {}
+        Get a context manager serializing changes to one conversation.
         
-        # Create storage directory if it doesn't exist
-        if not os.path.exists(storage_dir):
-            os.makedirs(storage_dir)
-            logger.info(f"Created conversation storage directory: {storage_dir}")
+        The lock is reentrant, so a caller holding it for a whole agent turn can
+        still add messages through this service.
+        
+        Args:
+            conversation_id (str): ID of the conversation
+            
+        Returns:
+            ContextManager: Holds the conversation's lock while active
+        """
+        return self._locks.hold(conversation_id)
     
     def create_conversation(self, metadata: Optional[Dict] = None) -> Conversation:
         """
@@ -51,8 +132,9 @@ class ConversationService:
             metadata=metadata or {}
         )
         
-        self.active_conversations[conversation_id] = conversation
-        logger.info(f"Created new conversation with ID: {conversation_id}")
+        self._unsaved.add(conversation_id)
+        self.active_conversations.put(conversation_id, conversation)
+        logger.info("Created new conversation with ID: %s", conversation_id)
         
         return conversation
     
@@ -67,29 +149,68 @@ class ConversationService:
             Optional[Conversation]: The conversation if found, None otherwise
         """
         # Check if conversation is already loaded
-        if conversation_id in self.active_conversations:
-            return self.active_conversations[conversation_id]
+        conversation = self.active_conversations.get(conversation_id)
+        if conversation and not self._is_stale(conversation):
+            return conversation
         
-        # Try to load conversation from file
-        conversation_path = os.path.join(self.storage_dir, f"{conversation_id}.json")
-        if os.path.exists(conversation_path):
-            try:
-                with open(conversation_path, 'r') as f:
-                    conversation_data = json.load(f)
-                
-                conversation = Conversation.from_dict(conversation_data)
-                self.active_conversations[conversation_id] = conversation
-                logger.info(f"Loaded conversation from file: {conversation_id}")
+        with self.lock(conversation_id):
+            # Another thread may have loaded it while we waited
+            conversation = self.active_conversations.peek(conversation_id)
+            if conversation is None or self._is_stale(conversation):
+                conversation = self._load_conversation(conversation_id)
+            if conversation:
+                self.active_conversations.put(conversation_id, conversation)
                 return conversation
-            except Exception as e:
-                logger.error(f"Error loading conversation {conversation_id}: {str(e)}")
+            # Deleted by another process
+            self.active_conversations.pop(conversation_id)
         
-        logger.warning(f"Conversation not found: {conversation_id}")
+        logger.warning("Conversation not found: %s", conversation_id)
         return None
     
+    def _is_stale(self, conversation: Conversation) -> bool:
+        """
+        Check whether another process changed a cached conversation in shared storage.
+        
+        Args:
+            conversation (Conversation): The cached conversation
+            
+        Returns:
+            bool: True if the stored version differs from the cached one
+        """
+        if not self.storage.shared or conversation.id in self._unsaved:
+            return False
+        try:
+            stale = self.storage.version(conversation.id) != conversation.version
+        except Exception as e:
+            logger.error("Error checking version of conversation %s: %s", conversation.id, e)
+            ERRORS.inc(stage='storage')
+            return False
+        if stale:
+            logger.debug("Conversation %s changed in another process, reloading", conversation.id)
+            RELOADS.inc(reason='stale')
+        return stale
+    
+    def _load_conversation(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Load a conversation from storage without caching it.
+        
+        Args:
+            conversation_id (str): ID of the conversation to load
+            
+        Returns:
+            Optional[Conversation]: The conversation if found, None otherwise
+        """
+        try:
+            with timed_stage('persistence', STORAGE_SECONDS, operation='load'):
+                return self.storage.get(conversation_id)
+        except Exception as e:
+            logger.error("Error loading conversation %s: %s", conversation_id, e)
+            ERRORS.inc(stage='storage')
+            return None
+    
     def save_conversation(self, conversation: Conversation) -> bool:
         """
-        Save a conversation to storage.
+        Save the full state of a conversation to storage.
         
         Args:
             conversation (Conversation): The conversation to save
@@ -97,15 +218,22 @@ class ConversationService:
         Returns:
             bool: True if successful, False otherwise
         """
-        conversation_path = os.path.join(self.storage_dir, f"{conversation.id}.json")
         try:
-            with open(conversation_path, 'w') as f:
-                json.dump(conversation.to_dict(), f, indent=2)
+            with timed_stage('persistence', STORAGE_SECONDS, operation='save'):
+                self.storage.save(conversation)
+            self._unsaved.discard(conversation.id)
             
-            logger.info(f"Saved conversation to file: {conversation.id}")
+            logger.debug("Saved conversation: %s", conversation.id)
             return True
+        except VersionConflictError as e:
+            # Drop the outdated copy so the next lookup loads the stored one
+            logger.warning("Not saving conversation %s: %s", conversation.id, e)
+            self.active_conversations.pop(conversation.id)
+            RELOADS.inc(reason='conflict')
+            return False
         except Exception as e:
-            logger.error(f"Error saving conversation {conversation.id}: {str(e)}")
+            logger.error("Error saving conversation %s: %s", conversation.id, e)
+            ERRORS.inc(stage='storage')
             return False
     
     def add_message(self, conversation_id: str, role: str, content: str) -> Optional[Message]:
@@ -122,15 +250,81 @@ class ConversationService:
         """
         conversation = self.get_conversation(conversation_id)
         if not conversation:
-            logger.warning(f"Cannot add message: Conversation {conversation_id} not found")
+            logger.warning("Cannot add message: Conversation %s not found", conversation_id)
             return None
         
-        message = conversation.add_message(role, content)
-        self.save_conversation(conversation)
+        with self.lock(conversation_id):
+            message = conversation.add_message(role, content)
+            self.active_conversations.resize(conversation_id, len(content) + MESSAGE_OVERHEAD_BYTES)
+            
+            if conversation_id in self._unsaved:
+                # First write of a new conversation stores it whole, with its metadata
+                self.save_conversation(conversation)
+            else:
+                try:
+                    self._append(conversation, message)
+                except VersionConflictError:
+                    message = self._add_to_stored(conversation_id, role, content)
+                except Exception as e:
+                    logger.error("Error storing message for conversation %s: %s", conversation_id, e)
+                    ERRORS.inc(stage='storage')
+            
+            if message is not None and self.search_index is not None:
+                self._index_message(conversation_id, message)
         
-        logger.info(f"Added {role} message to conversation {conversation_id}")
+        logger.debug("Added %s message to conversation %s", role, conversation_id)
         return message
     
+    def _index_message(self, conversation_id: str, message: Message):
+        try:
+            with timed_stage('persistence', STORAGE_SECONDS, operation='index'):
+                self.search_index.add(conversation_id, message)
+        except Exception as e:
+            logger.error("Error indexing message for conversation %s: %s", conversation_id, e)
+            ERRORS.inc(stage='storage')
+    
+    def _append(self, conversation: Conversation, message: Message):
+        with timed_stage('persistence', STORAGE_SECONDS, operation='append'):
+            self.storage.append(conversation, message)
+    
+    def _add_to_stored(self, conversation_id: str, role: str, content: str) -> Optional[Message]:
+        """
+        Add a message to the stored state of a conversation another process changed.
+        
+        The caller must hold the conversation's lock. The reloaded conversation
+        replaces the cached one.
+        
+        Args:
+            conversation_id (str): ID of the conversation
+            role (str): Role of the message sender
+            content (str): Content of the message
+            
+        Returns:
+            Optional[Message]: The added message, None if it could not be stored
+        """
+        for _ in range(MAX_CONFLICT_RETRIES):
+            RELOADS.inc(reason='conflict')
+            conversation = self._load_conversation(conversation_id)
+            if conversation is None:
+                logger.warning("Cannot add message: conversation %s was deleted", conversation_id)
+                self.active_conversations.pop(conversation_id)
+                return None
+            message = conversation.add_message(role, content)
+            try:
+                self._append(conversation, message)
+            except VersionConflictError:
+                continue
+            except Exception as e:
+                logger.error("Error storing message for conversation %s: %s", conversation_id, e)
+                ERRORS.inc(stage='storage')
+            self.active_conversations.put(conversation_id, conversation)
+            return message
+        
+        logger.error("Cannot add message: conversation %s keeps changing in storage", conversation_id)
+        ERRORS.inc(stage='storage')
+        self.active_conversations.pop(conversation_id)
+        return None
+    
     def list_conversations(self, limit: int = 10) -> List[Conversation]:
         """
         List recent conversations.
@@ -142,17 +336,184 @@ class ConversationService:
             List[Conversation]: List of conversations
         """
         conversations = []
+        summaries, _ = self.list_conversation_summaries(limit)
         
-        # List conversation files
-        if os.path.exists(self.storage_dir):
-            files = [f for f in os.listdir(self.storage_dir) if f.endswith('.json')]
-            files.sort(key=lambda f: os.path.getmtime(os.path.join(self.storage_dir, f)), reverse=True)
-            
-            # Load conversations
-            for file in files[:limit]:
-                conversation_id = file.replace('.json', '')
-                conversation = self.get_conversation(conversation_id)
-                if conversation:
-                    conversations.append(conversation)
+        # Load conversations, without pulling them into the cache just to list them
+        for summary in summaries:
+            conversation = self.active_conversations.peek(summary.id) or self._load_conversation(summary.id)
+            if conversation:
+                conversations.append(conversation)
         
         return conversations
+    
+    def list_conversation_summaries(self, limit: int = 10, cursor: Optional[str] = None,
+                                    metadata_filter: Optional[Dict[str, Any]] = None
+                                    ) -> Tuple[List[ConversationSummary], Optional[str]]:
+        """
+        List conversation summaries, most recently updated first.
+        
+        Args:
+            limit (int): Maximum number of conversations to return
+            cursor (Optional[str]): Cursor from a previous page, to continue after it
+            metadata_filter (Optional[Dict[str, Any]]): Metadata values the conversations must match
+            
+        Returns:
+            Tuple[List[ConversationSummary], Optional[str]]: The page of summaries and the
+                cursor for the next page, or None if there are no more
+        """
+        return self.storage.list(limit, cursor=cursor, metadata_filter=metadata_filter)
+    
+    def delete_conversation(self, conversation_id: str) -> bool:
+        """
+        Delete a conversation from memory and storage.
+        
+        Args:
+            conversation_id (str): ID of the conversation to delete
+            
+        Returns:
+            bool: True if the conversation existed
+        """
+        cached = self.active_conversations.pop(conversation_id) is not None
+        self._unsaved.discard(conversation_id)
+        try:
+            stored = self.storage.delete(conversation_id)
+            if self.search_index is not None:
+                self.search_index.remove(conversation_id)
+        except Exception as e:
+            logger.error("Error deleting conversation %s: %s", conversation_id, e)
+            ERRORS.inc(stage='storage')
+            return False
+        
+        logger.info("Deleted conversation: %s", conversation_id)
+        return cached or stored
+    
+    def search_conversations(self, query: str, limit: int = 10, roles: Optional[List[str]] = None,
+                             since: Optional[datetime] = None, until: Optional[datetime] = None,
+                             conversation_id: Optional[str] = None) -> Optional[List[SearchHit]]:
+        """
+        Find the messages best matching a query, across all conversations.
+        
+        Args:
+            query (str): Words to look for; every word must appear, matched after stemming
+            limit (int): Maximum number of hits
+            roles (Optional[List[str]]): Only messages of these roles
+            since (Optional[datetime]): Only messages sent at or after this time
+            until (Optional[datetime]): Only messages sent before this time
+            conversation_id (Optional[str]): Only messages of this conversation
+            
+        Returns:
+            Optional[List[SearchHit]]: The matching messages, best first, or None if search is disabled
+        """
+        if self.search_index is None:
+            return None
+        with STORAGE_SECONDS.time(operation='search'):
+            return self.search_index.search(query, limit, roles=roles, since=since, until=until,
+                                            conversation_id=conversation_id)
+    
+    def run_maintenance(self, archive_before: Optional[datetime] = None,
+                        delete_before: Optional[datetime] = None, batch_size: int = 100) -> Dict[str, int]:
+        """
+        Delete conversations past their retention and archive idle ones.
+        
+        Each conversation is handled under its lock and skipped if it was
+        updated meanwhile or has never been saved.
+        
+        Args:
+            archive_before (Optional[datetime]): Archive conversations last updated before this, None to skip
+            delete_before (Optional[datetime]): Delete conversations last updated before this, None to skip
+            batch_size (int): Conversations fetched from storage at a time
+            
+        Returns:
+            Dict[str, int]: Number of conversations deleted and archived
+        """
+        counts = {'deleted': 0, 'archived': 0}
+        
+        def run(find, before, action, apply):
+            while True:
+                try:
+                    conversation_ids = find(before, batch_size)
+                except Exception as e:
+                    logger.error("Error finding conversations to %s: %s", action, e)
+                    ERRORS.inc(stage='storage')
+                    return
+                done = 0
+                for conversation_id in conversation_ids:
+                    with self.lock(conversation_id):
+                        cached = self.active_conversations.peek(conversation_id)
+                        if conversation_id in self._unsaved or (cached and cached.updated_at >= before):
+                            continue
+                        if apply(conversation_id):
+                            done += 1
+                counts[f"{action}d"] += done
+                # Stop at the last batch, or when everything left is being skipped
+                if len(conversation_ids) < batch_size or not done:
+                    return
+        
+        def archive(conversation_id: str) -> bool:
+            try:
+                archived = self.storage.archive(conversation_id)
+            except Exception as e:
+                logger.error("Error archiving conversation %s: %s", conversation_id, e)
+                ERRORS.inc(stage='storage')
+                return False
+            if archived:
+                self.active_conversations.pop(conversation_id)
+            return archived
+        
+        if delete_before is not None:
+            run(self.storage.expired_conversations, delete_before, 'delete', self.delete_conversation)
+        if archive_before is not None:
+            run(self.storage.idle_conversations, archive_before, 'archive', archive)
+        
+        if counts['deleted'] or counts['archived']:
+            logger.info("Conversation maintenance deleted %s and archived %s conversations",
+                        counts['deleted'], counts['archived'])
+        return counts
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the in-memory conversation cache.
+        
+        Returns:
+            Dict[str, Any]: Hit/miss/eviction counters and current usage
+        """
+        stats = self.active_conversations.stats.to_dict()
+        stats['entries'] = len(self.active_conversations)
+        stats['bytes'] = self.active_conversations.total_bytes
+        return stats
+    
+    def flush(self):
+        """
+        Write any buffered changes to storage.
+        """
+        self.storage.flush()
+    
+    def close(self):
+        """
+        Persist unsaved conversations, flush pending writes and stop background persistence.
+        """
+        for conversation_id in list(self._unsaved):
+            conversation = self.active_conversations.peek(conversation_id)
+            if conversation:
+                self.save_conversation(conversation)
+        self.storage.close()
+        if self.search_index is not None:
+            self.search_index.close()
+    
+    def _on_evict(self, conversation_id: str, conversation: Conversation):
+        """
+        Persist a conversation that is being dropped from the cache if it was never saved.
+        
+        The cache keeps serving the conversation until this returns. The save
+        runs under the conversation's lock; if another thread holds it, that
+        thread is working on the conversation and stores it itself, so waiting
+        (and risking a lock-order deadlock with it) is not needed.
+        
+        Args:
+            conversation_id (str): ID of the evicted conversation
+            conversation (Conversation): The evicted conversation
+        """
+        with self._locks.hold(conversation_id, blocking=False) as held:
+            if held and conversation_id in self._unsaved:
+                self.save_conversation(conversation)
+        logger.debug("Evicted conversation from cache: %s", conversation_id)
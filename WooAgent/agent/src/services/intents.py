@@ -0,0 +1,22 @@
+"""
+Message Intents
+
+This module holds the patterns that recognize what a user message asks for,
+shared by the model router and the answer cache.
+"""
+
+import re
+
+# Words asking for a change to the store
+WRITE_INTENT = re.compile(
+    r'\b(create|add|update|change|set|edit|modify|rename|delete|remove|cancel|refund|issue|apply|'
+    r'mark|make|complete|process|approve|assign|adjust|increase|decrease|reduce|raise|lower|'
+    r'restock|publish|unpublish|archive|send)\b',
+    re.IGNORECASE
+)
+
+# Replies to a question the agent asked, usually confirming a change
+CONFIRMATION = re.compile(
+    r'^\s*(yes|yep|yeah|ok|okay|sure|confirm(ed)?|go ahead|do it|proceed|no|nope)\b',
+    re.IGNORECASE
+)
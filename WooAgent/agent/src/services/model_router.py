@@ -0,0 +1,267 @@
+"""
+Model Router
+
+This module decides per turn whether a fast, cheap model can answer a message
+or the full model is needed, and limits what the fast tier may do.
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from itertools import takewhile
+from typing import Any, Callable, Dict, FrozenSet, Optional, Sequence
+
+from services.intents import CONFIRMATION, WRITE_INTENT
+from utils.metrics import REGISTRY
+from utils.outbound import Upstream
+
+logger = logging.getLogger('wooagent')
+
+FAST = 'fast'
+FULL = 'full'
+
+# What the fast tier replies when a request is beyond it
+ESCALATE_REPLY = 'ESCALATE'
+
+ROUTES = REGISTRY.counter(
+    'wooagent_model_routes_total', 'Agent turns by the model tier chosen and why', ('tier', 'reason'))
+ESCALATIONS = REGISTRY.counter(
+    'wooagent_model_escalations_total', 'Turns the fast tier handed to the full model', ('cause',))
+TIER_SECONDS = REGISTRY.histogram(
+    'wooagent_model_tier_seconds', 'Duration of agent runs by model tier', ('tier', 'outcome'))
+
+# Signs of a request with several steps or that needs reasoning over results
+_COMPLEX_PATTERN = re.compile(
+    r'\b(then|after that|afterwards|compare|why|analy[sz]e|summari[sz]e|recommend|suggest|report|'
+    r'trend|each|every|all of)\b',
+    re.IGNORECASE
+)
+# Plain lookups
+_LOOKUP_PATTERN = re.compile(
+    r'^\s*(what|what\'s|whats|how much|how many|show|list|get|find|look up|lookup|is|are|does|do|'
+    r'which|who|when|where|check|give me)\b|\b(price|stock|status|details?)\b',
+    re.IGNORECASE
+)
+
+CLASSIFIER_PROMPT = (
+    "You route messages sent to a WooCommerce store assistant. Reply 'fast' if the message only asks to "
+    "look up store data (a product, order, customer or coupon, or a list of them) and needs no changes "
+    "and no multi-step reasoning. Otherwise reply 'full'. Reply with one word."
+)
+
+
+class EscalationRequired(Exception):
+    """
+    Raised when the fast tier attempts something only the full model may do.
+    """
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """
+    A model and what agents running on it are given.
+    """
+    name: str
+    model: str
+    system_prompt: str
+    # Names of the tools the tier may call; None allows every tool
+    tools: Optional[FrozenSet[str]] = None
+    # Whether failed model requests are retried; a tier that can hand the turn on should not wait
+    retry: bool = True
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """
+    The tier chosen for a turn and the reason, as recorded in the routing metrics.
+    """
+    tier: str
+    reason: str
+
+
+def classify_message(message: str) -> Optional[RouteDecision]:
+    """
+    Route a message with local heuristics.
+
+    Args:
+        message (str): User message
+
+    Returns:
+        Optional[RouteDecision]: The decision, or None if the heuristics cannot tell
+    """
+    text = message.strip()
+    if len(text) <= 40 and CONFIRMATION.match(text):
+        return RouteDecision(FULL, 'confirmation')
+    if len(text) > 300:
+        return RouteDecision(FULL, 'long')
+    if WRITE_INTENT.search(text):
+        return RouteDecision(FULL, 'write')
+    if _COMPLEX_PATTERN.search(text) or text.count('?') > 1 or len(re.findall(r'[.!?]\s+\S', text)) > 1:
+        return RouteDecision(FULL, 'multi_step')
+    if len(text) <= 160 and _LOOKUP_PATTERN.search(text):
+        return RouteDecision(FAST, 'lookup')
+    return None
+
+
+class ModelClassifier:
+    """
+    Asks a small model whether a message is a plain lookup.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], model: str, upstream: Optional[Upstream] = None,
+                 timeout: float = 5.0):
+        """
+        Initialize the classifier.
+
+        Args:
+            get_client (Callable[[], Any]): Returns the OpenAI client, called when a message
+                is first classified
+            model (str): Model to classify with
+            upstream (Optional[Upstream]): Schedules the request with other OpenAI calls
+            timeout (float): Seconds to wait for the answer
+        """
+        self.get_client = get_client
+        self.model = model
+        self.upstream = upstream
+        self.timeout = timeout
+
+    def __call__(self, message: str) -> Optional[str]:
+        """
+        Classify a message.
+
+        Args:
+            message (str): User message
+
+        Returns:
+            Optional[str]: FAST or FULL, None if the model could not be asked or gave another answer
+        """
+        def ask():
+            return self.get_client().chat.completions.create(
+                model=self.model,
+                messages=[{'role': 'system', 'content': CLASSIFIER_PROMPT}, {'role': 'user', 'content': message}],
+                max_tokens=2,
+                temperature=0,
+                timeout=self.timeout
+            )
+
+        try:
+            if self.upstream is not None:
+                with self.upstream.slot():
+                    completion = ask()
+            else:
+                completion = ask()
+            answer = completion.choices[0].message.content.strip().lower()
+        except Exception as e:
+            logger.warning("Model classifier failed, using the full model: %s", e)
+            return None
+        return answer if answer in (FAST, FULL) else None
+
+
+class ModelRouter:
+    """
+    Chooses the model tier for each turn.
+
+    Local heuristics decide first: anything that may change the store, has
+    several steps or answers a question the agent asked goes to the full
+    model, and short lookups go to the fast one. Messages the heuristics
+    cannot place are given to the classifier if there is one, and otherwise
+    to the full model. Without a fast tier every turn uses the full model.
+    """
+
+    def __init__(self, full: ModelTier, fast: Optional[ModelTier] = None,
+                 classifier: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        Initialize the router.
+
+        Args:
+            full (ModelTier): The tier that can handle any request
+            fast (Optional[ModelTier]): The tier for simple lookups, None to disable routing
+            classifier (Optional[Callable[[str], Optional[str]]]): Classifies messages the
+                heuristics cannot, returning FAST, FULL or None
+        """
+        self.tiers: Dict[str, ModelTier] = {FULL: full}
+        if fast is not None:
+            self.tiers[FAST] = fast
+        self.classifier = classifier
+
+    def route(self, message: str) -> RouteDecision:
+        """
+        Choose the tier for a turn and record the decision.
+
+        Args:
+            message (str): User message
+
+        Returns:
+            RouteDecision: The chosen tier and why
+        """
+        decision = self._decide(message)
+        ROUTES.inc(tier=decision.tier, reason=decision.reason)
+        logger.debug("Routing turn to the %s model (%s)", decision.tier, decision.reason)
+        return decision
+
+    def _decide(self, message: str) -> RouteDecision:
+        if FAST not in self.tiers:
+            return RouteDecision(FULL, 'single_tier')
+        decision = classify_message(message)
+        if decision is not None:
+            return decision
+        if self.classifier is not None:
+            tier = self.classifier(message)
+            if tier is not None:
+                return RouteDecision(tier, 'classifier')
+        return RouteDecision(FULL, 'default')
+
+
+class RestrictedTool:
+    """
+    Wraps a tool so that only a subset of its tools may be called.
+
+    Calling any other tool raises EscalationRequired, ending the fast tier's
+    run before it can do something only the full model should.
+    """
+
+    def __init__(self, tool: Any, allowed: FrozenSet[str]):
+        """
+        Initialize the wrapper.
+
+        Args:
+            tool (Any): The tool to wrap
+            allowed (FrozenSet[str]): Names of the tools that may be called
+        """
+        self.tool = tool
+        self.allowed = allowed
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.tool, name)
+
+    def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        self._check(name)
+        return self.tool.call_tool(name, arguments, **kwargs)
+
+    def call_tools(self, calls: Sequence[Any]) -> Any:
+        for name, _ in calls:
+            self._check(name)
+        return self.tool.call_tools(calls)
+
+    def prefetch(self, calls: Sequence[Any]):
+        # Only the calls before the first one this tier may not make
+        self.tool.prefetch(list(takewhile(lambda call: call[0] in self.allowed, calls)))
+
+    def _check(self, name: str):
+        if name not in self.allowed:
+            raise EscalationRequired(f"Tool {name} is not available to the fast model")
+
+
+def is_escalation_reply(reply: Any) -> bool:
+    """
+    Check whether a reply of the fast tier hands the request on.
+
+    Args:
+        reply (Any): The agent's reply
+
+    Returns:
+        bool: True for an empty reply or the escalation marker
+    """
+    if not isinstance(reply, str):
+        return False
+    return not reply.strip() or reply.strip().rstrip('.').upper() == ESCALATE_REPLY
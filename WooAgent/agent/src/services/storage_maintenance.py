@@ -0,0 +1,98 @@
+"""
+Storage Maintenance
+
+This module periodically archives idle conversations and deletes those past
+their retention period.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from services.conversation_service import ConversationService
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger('wooagent')
+
+MAINTAINED = REGISTRY.counter(
+    'wooagent_conversations_maintained_total', 'Conversations archived or deleted by maintenance', ('action',))
+
+
+class StorageMaintenance:
+    """
+    Runs conversation maintenance in the background.
+
+    Conversations not updated for ``archive_after`` seconds are moved to the
+    storage's cold tier, if it has one, and conversations not updated for
+    ``retain_for`` seconds are deleted, archived or not.
+    """
+
+    def __init__(self, conversation_service: ConversationService, interval: float = 3600.0,
+                 archive_after: Optional[float] = None, retain_for: Optional[float] = None,
+                 batch_size: int = 100):
+        """
+        Initialize the maintenance task.
+
+        Args:
+            conversation_service (ConversationService): Service owning the conversations
+            interval (float): Seconds between runs in the background
+            archive_after (Optional[float]): Idle seconds before a conversation is archived, None to never archive
+            retain_for (Optional[float]): Idle seconds before a conversation is deleted, None to keep forever
+            batch_size (int): Conversations fetched from storage at a time
+        """
+        self.conversation_service = conversation_service
+        self.interval = interval
+        self.archive_after = archive_after
+        self.retain_for = retain_for
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Archive and delete the conversations that are due.
+
+        Args:
+            now (Optional[datetime]): Time to measure idleness from, defaults to now
+
+        Returns:
+            Dict[str, int]: Number of conversations deleted and archived
+        """
+        now = now or datetime.now()
+        counts = self.conversation_service.run_maintenance(
+            archive_before=now - timedelta(seconds=self.archive_after) if self.archive_after else None,
+            delete_before=now - timedelta(seconds=self.retain_for) if self.retain_for else None,
+            batch_size=self.batch_size
+        )
+        for action, count in counts.items():
+            if count:
+                MAINTAINED.inc(count, action=action)
+        return counts
+
+    def start(self):
+        """
+        Run maintenance in a background thread every ``interval`` seconds until stopped.
+        """
+        if self._thread is not None or not (self.archive_after or self.retain_for):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='storage-maintenance', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background maintenance.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Conversation maintenance failed: %s", e)
+            self._stop.wait(self.interval)
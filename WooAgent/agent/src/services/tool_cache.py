@@ -0,0 +1,613 @@
+"""
+Tool Result Cache
+
+This module caches the results of read-only WooCommerce tool calls made by
+the agent, and invalidates them when a mutating tool touches the same entity.
+"""
+
+import json
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from concurrent.futures import Executor
+from itertools import takewhile
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from storage.generations import SharedGenerations
+from utils.cache import BoundedCache
+from utils.concurrency import run_bounded
+from utils.metrics import ERRORS, TOOL_CALL_SECONDS, record_stage
+from utils.outbound import Upstream
+
+logger = logging.getLogger('wooagent')
+
+# Read-only tools: tool name -> (entity type, seconds a result stays fresh)
+READ_ONLY_TOOLS: Dict[str, Tuple[str, float]] = {
+    'list_products': ('product', 30),
+    'get_product': ('product', 60),
+    'list_orders': ('order', 15),
+    'get_order': ('order', 15),
+    'list_customers': ('customer', 60),
+    'get_customer': ('customer', 120),
+    'list_coupons': ('coupon', 60),
+    'get_coupon': ('coupon', 120),
+}
+
+# Mutating tools: tool name -> (entity type, other entity types it may change)
+# Orders change stock levels and customer totals, so touching an order drops
+# every cached product and customer result as well.
+MUTATING_TOOLS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'create_product': ('product', ()),
+    'update_product': ('product', ()),
+    'update_product_stock': ('product', ()),
+    'delete_product': ('product', ()),
+    'create_order': ('order', ('product', 'customer')),
+    'update_order': ('order', ('product', 'customer')),
+    'create_order_refund': ('order', ('product', 'customer')),
+    'create_customer': ('customer', ()),
+    'update_customer': ('customer', ()),
+    'create_coupon': ('coupon', ()),
+    'update_coupon': ('coupon', ()),
+    'delete_coupon': ('coupon', ()),
+}
+
+# Argument names that identify the entity a tool call is about
+ENTITY_ID_ARGUMENTS = ('id', 'product_id', 'order_id', 'customer_id', 'coupon_id')
+
+# (entity type, entity id); an id of None tags results covering many entities, i.e. lists
+Tag = Tuple[str, Optional[str]]
+
+# A tool call: (tool name, arguments)
+ToolCall = Tuple[str, Optional[Dict[str, Any]]]
+
+
+def canonicalize_arguments(arguments: Optional[Dict[str, Any]]) -> str:
+    """
+    Serialize tool arguments so that equivalent calls produce the same key.
+
+    Keys are sorted, arguments set to None are dropped and entity ids are
+    compared as strings, so ``{"id": 12}`` and ``{"id": "12"}`` match.
+
+    Args:
+        arguments (Optional[Dict[str, Any]]): Tool arguments
+
+    Returns:
+        str: Canonical JSON text of the arguments
+    """
+    normalized = {}
+    for name, value in (arguments or {}).items():
+        if value is None:
+            continue
+        if name in ENTITY_ID_ARGUMENTS and isinstance(value, (int, float)):
+            value = str(value)
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def _entity_id(arguments: Optional[Dict[str, Any]]) -> Optional[str]:
+    for name in ENTITY_ID_ARGUMENTS:
+        value = (arguments or {}).get(name)
+        if value is not None:
+            return str(value)
+    return None
+
+
+def _estimate_size(result: Any) -> int:
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return len(repr(result))
+
+
+def _is_error_result(result: Any) -> bool:
+    if isinstance(result, dict):
+        return bool(result.get('isError') or result.get('error'))
+    return bool(getattr(result, 'isError', False))
+
+
+class ToolResultCache:
+    """
+    Bounded cache of read-only tool results with per-tool TTLs.
+
+    Every cached result is tagged with the entity it describes: ``get_*``
+    results with the entity id, ``list_*`` results with the entity type only.
+    A mutating call drops the results for the entity it touched and every list
+    of that entity type, plus everything for the entity types it affects
+    indirectly (see ``MUTATING_TOOLS``).
+
+    Each entity type also has a generation counter that a mutation bumps. A
+    read records the generation before calling the tool and its result is only
+    cached if no mutation of that entity type happened in the meantime.
+
+    With ``shared`` generations, mutations are also recorded for other worker
+    processes, and theirs invalidate this cache at most ``poll_interval``
+    seconds after they happened.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: Optional[int] = 8 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, shared: Optional[SharedGenerations] = None,
+                 poll_interval: float = 0.5):
+        """
+        Initialize the tool result cache.
+
+        Args:
+            max_entries (int): Maximum number of cached results
+            max_bytes (Optional[int]): Maximum total estimated size of cached results
+            ttls (Optional[Dict[str, float]]): Per-tool TTL overrides, in seconds
+            shared (Optional[SharedGenerations]): Mutation counters shared with other processes
+            poll_interval (float): Seconds between checks of the shared counters
+        """
+        self.ttls = {name: ttl for name, (_, ttl) in READ_ONLY_TOOLS.items()}
+        self.ttls.update(ttls or {})
+
+        self._tags: Dict[Tag, Set[Hashable]] = {}
+        self._key_tags: Dict[Hashable, Tag] = {}
+        self._generations: Dict[str, int] = {}
+        self._shared = shared
+        self._shared_seen: Dict[str, int] = {}
+        self._shared_checked = float('-inf')
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._results: BoundedCache[Any] = BoundedCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=_estimate_size,
+            on_evict=lambda key, value: self._untag(key)
+        )
+
+    @property
+    def stats(self):
+        """Hit, miss, eviction and expiry counters of the underlying cache."""
+        return self._results.stats
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        """
+        Check whether results of a tool may be cached.
+
+        Args:
+            tool_name (str): Name of the tool
+
+        Returns:
+            bool: True for read-only tools with a positive TTL
+        """
+        return tool_name in READ_ONLY_TOOLS and self.ttls.get(tool_name, 0) > 0
+
+    def get(self, tool_name: str, arguments: Optional[Dict[str, Any]]) -> Tuple[bool, Any]:
+        """
+        Look up the cached result of a tool call.
+
+        Args:
+            tool_name (str): Name of the tool
+            arguments (Optional[Dict[str, Any]]): Tool arguments
+
+        Returns:
+            Tuple[bool, Any]: Whether the result was cached, and the result
+        """
+        if not self.is_cacheable(tool_name):
+            return False, None
+        key = (tool_name, canonicalize_arguments(arguments))
+        self._sync_shared()
+        with self._lock:
+            if key not in self._results:
+                self._results.get(key)  # records the miss and drops an expired entry
+                return False, None
+            return True, self._results.get(key)
+
+    def generation(self, tool_name: str) -> int:
+        """
+        Get the generation of the entity type a tool reads or writes.
+
+        Args:
+            tool_name (str): Name of the tool
+
+        Returns:
+            int: Number of mutations of the entity type seen so far
+        """
+        entity = (READ_ONLY_TOOLS.get(tool_name) or MUTATING_TOOLS.get(tool_name) or (tool_name,))[0]
+        self._sync_shared()
+        with self._lock:
+            return self._generations.get(entity, 0)
+
+    def generations(self) -> Dict[str, int]:
+        """
+        Get the generation of every entity type that has been mutated.
+
+        Returns:
+            Dict[str, int]: Entity type -> number of mutations seen so far
+        """
+        self._sync_shared()
+        with self._lock:
+            return dict(self._generations)
+
+    def put(self, tool_name: str, arguments: Optional[Dict[str, Any]], result: Any,
+            generation: Optional[int] = None):
+        """
+        Cache the result of a read-only tool call. Error results are not cached.
+
+        Args:
+            tool_name (str): Name of the tool
+            arguments (Optional[Dict[str, Any]]): Tool arguments
+            result (Any): The tool's result
+            generation (Optional[int]): ``generation(tool_name)`` from before the call;
+                the result is discarded if a mutation happened since
+        """
+        if not self.is_cacheable(tool_name) or _is_error_result(result):
+            return
+
+        entity, _ = READ_ONLY_TOOLS[tool_name]
+        tag = (entity, _entity_id(arguments) if tool_name.startswith('get_') else None)
+        key = (tool_name, canonicalize_arguments(arguments))
+        with self._lock:
+            if generation is not None and generation != self._generations.get(entity, 0):
+                return
+            self._tags.setdefault(tag, set()).add(key)
+            self._key_tags[key] = tag
+            self._results.put(key, result, ttl=self.ttls[tool_name])
+
+    def record_mutation(self, tool_name: str, arguments: Optional[Dict[str, Any]]) -> int:
+        """
+        Invalidate cached results a mutating tool call may have made stale.
+
+        Args:
+            tool_name (str): Name of the tool
+            arguments (Optional[Dict[str, Any]]): Tool arguments
+
+        Returns:
+            int: Number of cached results dropped
+        """
+        if tool_name not in MUTATING_TOOLS:
+            return 0
+
+        entity, related = MUTATING_TOOLS[tool_name]
+        entity_id = _entity_id(arguments)
+        if self._shared is not None:
+            try:
+                shared = self._shared.bump((entity,) + related)
+            except Exception as e:
+                logger.error("Error recording %s for other workers: %s", tool_name, e)
+            else:
+                with self._lock:
+                    # Unless other processes' mutations came in between, which the next sync applies
+                    for changed, generation in shared.items():
+                        if generation == self._shared_seen.get(changed, 0) + 1:
+                            self._shared_seen[changed] = generation
+        with self._lock:
+            for changed in (entity,) + related:
+                self._generations[changed] = self._generations.get(changed, 0) + 1
+
+            tags = [(entity, None)]
+            if entity_id is not None:
+                tags.append((entity, entity_id))
+            tags.extend(tag for tag in self._tags if tag[0] in related)
+
+            dropped = 0
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._key_tags.pop(key, None)
+                    if key in self._results:
+                        dropped += 1
+                    self._results.pop(key)
+
+        if dropped:
+            logger.debug("Tool %s invalidated %s cached results", tool_name, dropped)
+        return dropped
+
+    def clear(self):
+        """
+        Drop every cached result.
+        """
+        with self._lock:
+            self._tags.clear()
+            self._key_tags.clear()
+            for key in self._results.keys():
+                self._results.pop(key)
+
+    def _sync_shared(self):
+        """
+        Apply mutations other processes recorded since the last check, at most
+        once per ``poll_interval``.
+        """
+        if self._shared is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._shared_checked < self.poll_interval:
+                return
+            self._shared_checked = now
+        try:
+            current = self._shared.read()
+        except Exception as e:
+            logger.error("Error reading shared cache generations: %s", e)
+            return
+
+        with self._lock:
+            changed = [entity for entity, generation in current.items()
+                       if generation > self._shared_seen.get(entity, 0)]
+            for entity in changed:
+                self._shared_seen[entity] = current[entity]
+                self._generations[entity] = self._generations.get(entity, 0) + 1
+                for tag in [tag for tag in self._tags if tag[0] == entity]:
+                    for key in self._tags.pop(tag):
+                        self._key_tags.pop(key, None)
+                        self._results.pop(key)
+        if changed:
+            logger.debug("Other workers changed %s; dropped cached results", ', '.join(changed))
+
+    def _untag(self, key: Hashable):
+        with self._lock:
+            tag = self._key_tags.pop(key, None)
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+def _record_call_time(name: str, cached: bool, seconds: float, as_stage: bool = True):
+    """
+    Record the duration of a tool call in the tool histogram and, unless it is
+    part of a batch timed as a whole, as tool time of the current turn.
+    """
+    TOOL_CALL_SECONDS.observe(seconds, tool=name, cached='true' if cached else 'false')
+    if as_stage:
+        record_stage('tools', seconds)
+
+
+def _error_result(message: str) -> Dict[str, Any]:
+    return {'isError': True, 'error': message}
+
+
+def _batch_groups(calls: Sequence[ToolCall]) -> List[Tuple[int, int]]:
+    """
+    Split a batch into runs of consecutive read-only calls, with each other call on its own.
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) index ranges, in order
+    """
+    groups = []
+    start = 0
+    for index, (name, _) in enumerate(calls):
+        if name not in READ_ONLY_TOOLS:
+            if start < index:
+                groups.append((start, index))
+            groups.append((index, index + 1))
+            start = index + 1
+    if start < len(calls):
+        groups.append((start, len(calls)))
+    return groups
+
+
+class CachedMCPTool:
+    """
+    Wraps an MCP tool so that its read-only calls are served from a ToolResultCache.
+
+    Tool invocations go through ``call_tool(name, arguments)``; everything else
+    (name, schema, connection handling) is delegated to the wrapped tool, so the
+    wrapper can be registered with the agent in its place.
+
+    The agent SDK makes the tool calls of a model step one after another. When
+    the agent's client reports the step's calls through ``prefetch``, its
+    read-only lookups run together first and ``call_tool`` hands out their
+    results, so the step waits for the slowest lookup instead of all of them.
+    """
+
+    def __init__(self, tool: Any, cache: ToolResultCache, executor: Optional[Executor] = None,
+                 fan_out: int = 4, call_timeout: Optional[float] = 30.0,
+                 upstream: Optional[Upstream] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            tool (Any): The MCP tool to wrap
+            cache (ToolResultCache): Cache for the tool's read-only results
+            executor (Optional[Executor]): Runs the calls of a batch concurrently;
+                without one, batches of a synchronous tool run one call at a time
+            fan_out (int): Maximum calls of one batch running at once
+            call_timeout (Optional[float]): Seconds a call in a batch may take
+            upstream (Optional[Upstream]): Schedules the calls that reach the MCP server;
+                read-only calls that fail transiently are retried, mutating ones are not
+        """
+        self.tool = tool
+        self.cache = cache
+        self.executor = executor
+        self.fan_out = fan_out
+        self.call_timeout = call_timeout
+        self.upstream = upstream
+        self._prefetched: Dict[Tuple[str, str], List[Any]] = {}
+        self._prefetch_lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.tool, name)
+
+    def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """
+        Call a tool, using a cached result for read-only tools when one is fresh.
+
+        Args:
+            name (str): Name of the tool
+            arguments (Optional[Dict[str, Any]]): Tool arguments
+            **kwargs: Further options passed to the wrapped tool
+
+        Returns:
+            Any: The tool's result, awaitable if the wrapped tool is asynchronous
+        """
+        if not kwargs:
+            found, result = self._claim_prefetched(name, arguments)
+            if found:
+                return result
+        return self._call(name, arguments, kwargs, as_stage=True)
+
+    def prefetch(self, calls: Sequence[ToolCall]):
+        """
+        Run the read-only calls a model step asked for together, ahead of the agent making them.
+
+        Only the read-only calls before the step's first other call are run, so
+        no lookup moves ahead of a write. Their results are handed out by
+        ``call_tool`` until the next step, which drops any left unclaimed.
+        Failed calls are not kept, so the agent's own call makes them again.
+        Does nothing for an asynchronous tool or without an executor.
+
+        Args:
+            calls (Sequence[ToolCall]): The step's (tool name, arguments) pairs, in order
+        """
+        with self._prefetch_lock:
+            self._prefetched.clear()
+        reads = list(takewhile(lambda call: call[0] in READ_ONLY_TOOLS, calls))
+        if (len(reads) < 2 or self.executor is None or self.fan_out <= 1
+                or inspect.iscoroutinefunction(self.tool.call_tool)):
+            return
+
+        results = self.call_tools(reads)
+        with self._prefetch_lock:
+            for (name, arguments), result in zip(reads, results):
+                if not _is_error_result(result):
+                    self._prefetched.setdefault((name, canonicalize_arguments(arguments)), []).append(result)
+        logger.debug("Prefetched %s tool calls of a model step", len(reads))
+
+    def _claim_prefetched(self, name: str, arguments: Optional[Dict[str, Any]]) -> Tuple[bool, Any]:
+        with self._prefetch_lock:
+            if not self._prefetched:
+                return False, None
+            results = self._prefetched.get((name, canonicalize_arguments(arguments)))
+            if not results:
+                return False, None
+            return True, results.pop(0)
+
+    def call_tools(self, calls: Sequence[ToolCall]) -> Any:
+        """
+        Make several tool calls, running independent read-only calls concurrently.
+
+        Consecutive read-only calls run at the same time, up to ``fan_out`` at
+        once. A mutating call waits for the calls before it, and the calls
+        after it wait for it, so reads and writes keep their order. A call that
+        fails or takes longer than ``call_timeout`` yields an error result
+        (``{'isError': True, 'error': ...}``) instead of failing the batch.
+
+        Args:
+            calls (Sequence[ToolCall]): (tool name, arguments) pairs
+
+        Returns:
+            Any: The results in call order, awaitable if the wrapped tool is asynchronous
+        """
+        if inspect.iscoroutinefunction(self.tool.call_tool):
+            return self._call_tools_async(calls)
+
+        started = time.perf_counter()
+        results: List[Any] = [None] * len(calls)
+        for start, end in _batch_groups(calls):
+            group = calls[start:end]
+            if self.executor is not None:
+                funcs = [lambda call=call: self._call(call[0], call[1], {}, as_stage=False) for call in group]
+                outcomes = run_bounded(funcs, self.executor, self.fan_out, self.call_timeout)
+                for offset, (call, future) in enumerate(zip(group, outcomes)):
+                    try:
+                        results[start + offset] = future.result()
+                    except Exception as e:
+                        results[start + offset] = self._failed(call[0], e)
+            else:
+                for offset, (name, arguments) in enumerate(group):
+                    try:
+                        results[start + offset] = self._call(name, arguments, {}, as_stage=False)
+                    except Exception as e:
+                        results[start + offset] = self._failed(name, e)
+
+        # The batch counts as tool time of the turn once, for its wall time
+        record_stage('tools', time.perf_counter() - started)
+        return results
+
+    async def _call_tools_async(self, calls: Sequence[ToolCall]) -> List[Any]:
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, self.fan_out))
+
+        async def run(name: str, arguments: Optional[Dict[str, Any]]) -> Any:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self._call(name, arguments, {}, as_stage=False),
+                                                  self.call_timeout)
+                except Exception as e:
+                    return self._failed(name, e)
+
+        results: List[Any] = []
+        for start, end in _batch_groups(calls):
+            results.extend(await asyncio.gather(*(run(name, arguments) for name, arguments in calls[start:end])))
+
+        record_stage('tools', time.perf_counter() - started)
+        return results
+
+    @staticmethod
+    def _failed(name: str, error: Exception) -> Dict[str, Any]:
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+            # Errors raised by the tool are counted where it was called
+            ERRORS.inc(stage='tool')
+            error = 'timed out'
+        logger.warning("Tool call %s in batch failed: %s", name, error)
+        return _error_result(f"Tool {name} failed: {error}")
+
+    def _call(self, name: str, arguments: Optional[Dict[str, Any]], kwargs: Dict[str, Any],
+              as_stage: bool) -> Any:
+        is_async = inspect.iscoroutinefunction(self.tool.call_tool)
+
+        started = time.perf_counter()
+        found, result = self.cache.get(name, arguments)
+        if found:
+            logger.debug("Tool cache hit for %s", name)
+            _record_call_time(name, True, time.perf_counter() - started, as_stage)
+            return self._resolved(result) if is_async else result
+
+        # Invalidate before a mutating call as well as after it, so a read that
+        # overlaps the mutation sees the generation change and is not cached
+        self.cache.record_mutation(name, arguments)
+        generation = self.cache.generation(name)
+        mutating = name in MUTATING_TOOLS
+        try:
+            result = self._send(name, arguments, kwargs, is_async, mutating)
+        except Exception:
+            ERRORS.inc(stage='tool')
+            raise
+        finally:
+            if not is_async:
+                _record_call_time(name, False, time.perf_counter() - started, as_stage)
+        if inspect.isawaitable(result):
+            return self._complete_async(name, arguments, result, generation, started, as_stage)
+        self._record(name, arguments, result, generation)
+        return result
+
+    def _send(self, name: str, arguments: Optional[Dict[str, Any]], kwargs: Dict[str, Any],
+              is_async: bool, mutating: bool) -> Any:
+        def send():
+            return self.tool.call_tool(name, arguments, **kwargs)
+
+        if self.upstream is None:
+            return send()
+        # A write that failed may still have been applied, so only reads are retried
+        retryable = (lambda error: False) if mutating else None
+        if is_async:
+            return self.upstream.call_async(send, retryable)
+        return self.upstream.call(send, retryable)
+
+    async def _complete_async(self, name: str, arguments: Optional[Dict[str, Any]], pending,
+                              generation: int, started: float, as_stage: bool = True) -> Any:
+        try:
+            result = await pending
+        except Exception:
+            ERRORS.inc(stage='tool')
+            raise
+        finally:
+            _record_call_time(name, False, time.perf_counter() - started, as_stage)
+        self._record(name, arguments, result, generation)
+        return result
+
+    @staticmethod
+    async def _resolved(result: Any) -> Any:
+        return result
+
+    def _record(self, name: str, arguments: Optional[Dict[str, Any]], result: Any, generation: int):
+        if name in MUTATING_TOOLS:
+            self.cache.record_mutation(name, arguments)
+        else:
+            self.cache.put(name, arguments, result, generation=generation)
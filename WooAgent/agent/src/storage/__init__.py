@@ -0,0 +1,51 @@
+"""
+Storage Package
+
+This package contains the conversation storage backends and their archive, the
+conversation search index, the catalog mirror and the cache generations shared
+between worker processes for the WooAgent application.
+"""
+
+from .base import ConversationStorage
+from .archive import ConversationArchive
+from .file_storage import FileConversationStorage
+from .sqlite_storage import SQLiteConversationStorage
+from .catalog import CatalogMirror
+from .search import ConversationSearchIndex
+from .generations import SharedGenerations
+
+STORAGE_BACKENDS = ('file', 'sqlite')
+
+
+def create_storage(backend: str = 'file', **options) -> ConversationStorage:
+    """
+    Create a conversation storage backend by name.
+
+    Args:
+        backend (str): 'file' for JSON files in a directory, 'sqlite' for a SQLite database
+        **options: Keyword arguments for the backend's constructor
+
+    Returns:
+        ConversationStorage: The storage backend
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend == 'file':
+        return FileConversationStorage(**options)
+    if backend == 'sqlite':
+        return SQLiteConversationStorage(**options)
+    raise ValueError(f"Unknown storage backend '{backend}', expected one of {', '.join(STORAGE_BACKENDS)}")
+
+
+__all__ = [
+    'ConversationStorage',
+    'FileConversationStorage',
+    'SQLiteConversationStorage',
+    'ConversationArchive',
+    'CatalogMirror',
+    'ConversationSearchIndex',
+    'SharedGenerations',
+    'STORAGE_BACKENDS',
+    'create_storage'
+]
@@ -0,0 +1,354 @@
+"""
+Conversation Archive
+
+This module keeps idle conversations in compressed segment files, the cold
+tier behind the file storage's directory of active conversations.
+"""
+
+import os
+import gzip
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from models.conversation import Conversation, ConversationSummary
+from storage.index import summary_row
+from utils.json_codec import JSONCodec, get_codec
+
+logger = logging.getLogger('wooagent')
+
+CATALOG_FILENAME = 'archive.sqlite3'
+
+CATALOG_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS archived (
+        id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        message_count INTEGER NOT NULL,
+        metadata TEXT NOT NULL,
+        segment TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_archived_segment ON archived (segment)'
+)
+
+# Compression name -> (segment file extension, compress, decompress)
+Compressor = Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def _gzip_compressor() -> Compressor:
+    return '.gz', lambda data: gzip.compress(data, compresslevel=6), gzip.decompress
+
+
+def _zstd_compressor() -> Compressor:
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=9)
+    local = threading.local()
+
+    def decompress(data: bytes) -> bytes:
+        # Decompressors are not thread-safe; keep one per thread
+        decompressor = getattr(local, 'decompressor', None)
+        if decompressor is None:
+            decompressor = local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(data)
+
+    return '.zst', compressor.compress, decompress
+
+
+_COMPRESSORS: Dict[str, Callable[[], Compressor]] = {
+    'zstd': _zstd_compressor,
+    'gzip': _gzip_compressor,
+}
+_EXTENSIONS = {'.zst': 'zstd', '.gz': 'gzip'}
+
+
+def get_compressor(name: Optional[str] = None) -> Tuple[str, Compressor]:
+    """
+    Get a compressor by name, or zstd if it is installed and gzip otherwise.
+
+    Args:
+        name (Optional[str]): 'zstd' or 'gzip'; None picks the best available
+
+    Returns:
+        Tuple[str, Compressor]: The compression name and its (extension, compress, decompress)
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If zstd is requested but the zstandard package is not installed
+    """
+    if name is not None:
+        if name not in _COMPRESSORS:
+            raise ValueError(f"Unknown compression '{name}', expected one of {', '.join(_COMPRESSORS)}")
+        return name, _COMPRESSORS[name]()
+    try:
+        return 'zstd', _zstd_compressor()
+    except ImportError:
+        return 'gzip', _gzip_compressor()
+
+
+class ConversationArchive:
+    """
+    Stores conversations as compressed records appended to segment files.
+
+    Each conversation is compressed on its own, so one can be read back
+    without decompressing the rest of its segment. A catalog next to the
+    segments maps conversation IDs to their record and keeps their summaries,
+    so archived conversations can still be listed. A record is dropped when
+    its conversation is rehydrated, archived again or deleted. A segment file
+    is deleted once none of its records is in use, and compacted once less
+    than ``compact_ratio`` of it is: its remaining records are copied to the
+    segment being written and the old file deleted.
+    """
+
+    def __init__(self, archive_dir: str, compression: Optional[str] = None,
+                 segment_max_bytes: int = 64 * 1024 * 1024, codec: Optional[JSONCodec] = None,
+                 compact_ratio: float = 0.5):
+        """
+        Initialize the archive, creating the directory and catalog if needed.
+
+        Args:
+            archive_dir (str): Directory holding segments and the catalog
+            compression (Optional[str]): 'zstd' or 'gzip' for new records, defaults to
+                zstd if the zstandard package is installed; segments of either kind can be read
+            segment_max_bytes (int): Size after which new records go to a new segment
+            codec (Optional[JSONCodec]): JSON codec, defaults to the fastest available
+            compact_ratio (float): Fraction of a segment's bytes still in use below which
+                it is compacted; 0 only deletes segments nothing uses
+        """
+        self.archive_dir = archive_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_ratio = compact_ratio
+        self.codec = codec or get_codec()
+        self.compression, (self._extension, self._compress, decompress) = get_compressor(compression)
+        self._decompressors = {self._extension: decompress}
+        if not os.path.exists(archive_dir):
+            os.makedirs(archive_dir)
+
+        self._lock = threading.Lock()
+        self._segment: Optional[str] = None
+        self._conn = sqlite3.connect(os.path.join(archive_dir, CATALOG_FILENAME),
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in CATALOG_SCHEMA:
+            self._conn.execute(statement)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM archived WHERE id = ?', (conversation_id,)
+            ).fetchone() is not None
+
+    def put(self, conversation: Conversation):
+        """
+        Archive a conversation, replacing any archived copy.
+
+        The record is written and synced to its segment before the catalog
+        points to it, so a crash never leaves the catalog pointing at nothing.
+
+        Args:
+            conversation (Conversation): The conversation to archive
+        """
+        data = self._compress(self.codec.dumps(conversation.to_record()))
+        with self._lock:
+            segment = self._current_segment()
+            offset = self._append(segment, [data])[0]
+
+            previous = self._conn.execute(
+                'SELECT segment FROM archived WHERE id = ?', (conversation.id,)
+            ).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO archived '
+                '(id, created_at, updated_at, message_count, metadata, segment, offset, length) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                summary_row(conversation.summary()) + (segment, offset, len(data))
+            )
+            if previous is not None:
+                self._release_segment(previous[0])
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Read an archived conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            Optional[Conversation]: The conversation, None if it is not archived
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT segment, offset, length FROM archived WHERE id = ?', (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            segment, offset, length = row
+            with open(os.path.join(self.archive_dir, segment), 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+
+        return Conversation.from_dict(self.codec.loads(self._decompress(segment, data)))
+
+    def remove(self, conversation_id: str) -> bool:
+        """
+        Drop a conversation from the archive.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            bool: True if the conversation was archived
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT segment FROM archived WHERE id = ?', (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            self._conn.execute('DELETE FROM archived WHERE id = ?', (conversation_id,))
+            self._release_segment(row[0])
+            return True
+
+    def summaries(self) -> Iterator[ConversationSummary]:
+        """
+        Get the summaries of every archived conversation.
+
+        Yields:
+            ConversationSummary: Summary of each archived conversation
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, created_at, updated_at, message_count, metadata FROM archived'
+            ).fetchall()
+        for conversation_id, created_at, updated_at, message_count, metadata in rows:
+            yield ConversationSummary(
+                id=conversation_id,
+                created_at=datetime.fromisoformat(created_at),
+                updated_at=datetime.fromisoformat(updated_at),
+                message_count=message_count,
+                metadata=json.loads(metadata)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the size of the archive.
+
+        Returns:
+            Dict[str, int]: Archived conversations, segment files, their total bytes and
+                how many of those belong to no archived conversation
+        """
+        with self._lock:
+            conversations, live_bytes = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM archived'
+            ).fetchone()
+            segments = [name for name in os.listdir(self.archive_dir) if name.startswith('segment-')]
+            total_bytes = sum(os.path.getsize(os.path.join(self.archive_dir, name)) for name in segments)
+        return {
+            'conversations': conversations,
+            'segments': len(segments),
+            'bytes': total_bytes,
+            'dead_bytes': total_bytes - live_bytes
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _decompress(self, segment: str, data: bytes) -> bytes:
+        """
+        Decompress a record with the compression its segment was written with.
+        """
+        extension = os.path.splitext(segment)[1]
+        decompress = self._decompressors.get(extension)
+        if decompress is None:
+            if extension not in _EXTENSIONS:
+                raise ValueError(f"Unknown archive segment format: {segment}")
+            decompress = self._decompressors[extension] = _COMPRESSORS[_EXTENSIONS[extension]]()[2]
+        return decompress(data)
+
+    def _current_segment(self) -> str:
+        """
+        Get the segment new records go to, starting a new one when it is full. The caller must hold the lock.
+        """
+        if self._segment is not None:
+            path = os.path.join(self.archive_dir, self._segment)
+            if os.path.exists(path) and os.path.getsize(path) < self.segment_max_bytes:
+                return self._segment
+        self._segment = f"segment-{time.time_ns()}{self._extension}"
+        return self._segment
+
+    def _append(self, segment: str, records: List[bytes]) -> List[int]:
+        """
+        Append records to a segment and sync it. The caller must hold the lock.
+
+        Returns:
+            List[int]: Offset of each record
+        """
+        offsets = []
+        with open(os.path.join(self.archive_dir, segment), 'ab') as f:
+            for data in records:
+                offsets.append(f.tell())
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return offsets
+
+    def _release_segment(self, segment: str):
+        """
+        Delete a segment no record points to any more, or compact one mostly unused.
+        The caller must hold the lock.
+        """
+        if segment == self._segment:
+            return
+        path = os.path.join(self.archive_dir, segment)
+        if not os.path.exists(path):
+            return
+        records, live_bytes = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM archived WHERE segment = ?', (segment,)
+        ).fetchone()
+        if records and live_bytes >= self.compact_ratio * os.path.getsize(path):
+            return
+        if records:
+            self._compact_segment(segment)
+        os.remove(path)
+        logger.debug("Removed %s archive segment %s", 'compacted' if records else 'unused', segment)
+
+    def _compact_segment(self, segment: str):
+        """
+        Move a segment's records to the current segment. The caller must hold the lock.
+
+        The copies are synced before the catalog points to them, so a crash
+        leaves at worst unused copies behind, never a record pointing at nothing.
+        """
+        rows = self._conn.execute(
+            'SELECT id, offset, length FROM archived WHERE segment = ? ORDER BY offset', (segment,)
+        ).fetchall()
+        records = []
+        with open(os.path.join(self.archive_dir, segment), 'rb') as f:
+            for _, offset, length in rows:
+                f.seek(offset)
+                records.append(f.read(length))
+        if os.path.splitext(segment)[1] != self._extension:
+            records = [self._compress(self._decompress(segment, data)) for data in records]
+
+        target = self._current_segment()
+        offsets = self._append(target, records)
+        self._conn.execute('BEGIN')
+        try:
+            self._conn.executemany(
+                'UPDATE archived SET segment = ?, offset = ?, length = ? WHERE id = ?',
+                [(target, offset, len(data), row[0]) for row, offset, data in zip(rows, offsets, records)]
+            )
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        logger.info("Compacted archive segment %s: moved %s records to %s", segment, len(rows), target)
+
@@ -0,0 +1,199 @@
+"""
+Conversation Storage Interface
+
+This module defines the interface implemented by conversation storage backends.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models.conversation import Conversation, ConversationSummary, Message
+
+
+class VersionConflictError(Exception):
+    """
+    Raised when writing a conversation that another process changed since it was loaded.
+    """
+
+
+class ConversationStorage(ABC):
+    """
+    Persistent store for conversations.
+
+    Backends are used from several worker threads at once and must be thread-safe.
+    A successful ``save`` or ``append`` sets ``conversation.version`` to the
+    version it stored.
+
+    Backends with ``shared`` set may also be used by several processes at
+    once. They check that the conversation's version is still the stored one
+    before writing it and raise VersionConflictError otherwise. Whether those
+    processes may run on different hosts depends on the backend.
+    """
+
+    shared = False
+
+    @abstractmethod
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Load a conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            Optional[Conversation]: The conversation if found, None otherwise
+        """
+
+    @abstractmethod
+    def save(self, conversation: Conversation):
+        """
+        Store the full state of a conversation, replacing any previous version.
+
+        Args:
+            conversation (Conversation): The conversation to save
+
+        Raises:
+            VersionConflictError: If the conversation changed in storage since it was loaded
+        """
+
+    @abstractmethod
+    def append(self, conversation: Conversation, message: Message):
+        """
+        Store a message that was just added to a saved conversation.
+
+        Args:
+            conversation (Conversation): The conversation, already containing the message
+            message (Message): The newly added message
+
+        Raises:
+            VersionConflictError: If the conversation changed in storage since it was loaded
+        """
+
+    @abstractmethod
+    def list(self, limit: int = 10, cursor: Optional[str] = None,
+             metadata_filter: Optional[Dict[str, Any]] = None) -> Tuple[List[ConversationSummary], Optional[str]]:
+        """
+        List conversation summaries, most recently updated first.
+
+        Args:
+            limit (int): Maximum number of conversations to return
+            cursor (Optional[str]): Cursor from a previous page, to continue after it
+            metadata_filter (Optional[Dict[str, Any]]): Metadata values the conversations must match
+
+        Returns:
+            Tuple[List[ConversationSummary], Optional[str]]: The page of summaries and the
+                cursor for the next page, or None if there are no more
+
+        Raises:
+            ValueError: If the cursor or a filter key is invalid
+        """
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> bool:
+        """
+        Delete a conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            bool: True if the conversation existed
+        """
+
+    def version(self, conversation_id: str) -> Optional[int]:
+        """
+        Get the stored version of a conversation.
+
+        Backends should override this with something cheaper than loading the
+        conversation, as shared backends are asked on every cache hit.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            Optional[int]: The stored version, None if the conversation does not exist
+        """
+        conversation = self.get(conversation_id)
+        return conversation.version if conversation is not None else None
+
+    def expired_conversations(self, updated_before: datetime, limit: int = 100) -> List[str]:
+        """
+        Find conversations, archived or not, last updated before a time.
+
+        Backends should override this; the default pages through every conversation.
+
+        Args:
+            updated_before (datetime): Only conversations last updated before this
+            limit (int): Maximum number of IDs to return
+
+        Returns:
+            List[str]: Conversation IDs, least recently updated first
+        """
+        expired = []
+        cursor = None
+        while True:
+            summaries, cursor = self.list(500, cursor=cursor)
+            expired.extend(summary for summary in summaries if summary.updated_at < updated_before)
+            if cursor is None:
+                break
+        expired.sort(key=lambda summary: summary.updated_at)
+        return [summary.id for summary in expired[:limit]]
+
+    def idle_conversations(self, updated_before: datetime, limit: int = 100) -> List[str]:
+        """
+        Find conversations not yet archived that were last updated before a time.
+
+        Backends without a cold tier return none.
+
+        Args:
+            updated_before (datetime): Only conversations last updated before this
+            limit (int): Maximum number of IDs to return
+
+        Returns:
+            List[str]: Conversation IDs, least recently updated first
+        """
+        return []
+
+    def archive(self, conversation_id: str) -> bool:
+        """
+        Move a conversation to cold storage. It can still be loaded and listed;
+        loading it moves it back.
+
+        Backends without a cold tier leave it where it is.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            bool: True if the conversation was archived
+        """
+        return False
+
+    def save_many(self, conversations: Iterable[Conversation]) -> int:
+        """
+        Store many conversations, e.g. when migrating between backends.
+
+        Versions are not checked; the conversations replace whatever is stored.
+
+        Args:
+            conversations (Iterable[Conversation]): Conversations to save
+
+        Returns:
+            int: Number of conversations saved
+        """
+        count = 0
+        for conversation in conversations:
+            self.save(conversation)
+            count += 1
+        return count
+
+    def flush(self):
+        """
+        Write any buffered changes to durable storage.
+        """
+
+    def close(self):
+        """
+        Flush buffered changes and release resources.
+        """
@@ -0,0 +1,384 @@
+"""
+Catalog Mirror
+
+This module keeps a local copy of WooCommerce products, orders, customers
+and coupons in a SQLite database, with full-text search over their names,
+SKUs and contact details.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger('wooagent')
+
+# Entity type -> WooCommerce REST collection
+CATALOG_ENTITIES = {
+    'product': 'products',
+    'order': 'orders',
+    'customer': 'customers',
+    'coupon': 'coupons',
+}
+
+# Fields of each entity that full-text search looks at; dotted names reach into nested objects
+SEARCH_FIELDS = {
+    'product': ('name', 'sku', 'slug', 'short_description'),
+    'order': ('number', 'status', 'billing.first_name', 'billing.last_name', 'billing.email'),
+    'customer': ('first_name', 'last_name', 'email', 'username'),
+    'coupon': ('code', 'description'),
+}
+
+CATALOG_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS catalog (
+        entity TEXT NOT NULL,
+        id TEXT NOT NULL,
+        data TEXT NOT NULL,
+        modified TEXT,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (entity, id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS catalog_sync (
+        entity TEXT PRIMARY KEY,
+        cursor TEXT,
+        synced_at REAL NOT NULL,
+        reconciled_at REAL NOT NULL DEFAULT 0
+    )
+    ''',
+)
+
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(entity UNINDEXED, id UNINDEXED, body)"
+
+
+def _field(record: Dict[str, Any], path: str) -> str:
+    value: Any = record
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return ''
+        value = value.get(part)
+    return '' if value is None else str(value)
+
+
+def _search_text(entity: str, record: Dict[str, Any]) -> str:
+    return ' '.join(_field(record, name) for name in SEARCH_FIELDS.get(entity, ()))
+
+
+def _fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query matching every word as a prefix.
+    """
+    words = [word.replace('"', '') for word in text.split()]
+    return ' '.join(f'"{word}"*' for word in words if word)
+
+
+class CatalogMirror:
+    """
+    Local copy of WooCommerce entities with per-entity freshness tracking.
+
+    Polling for changes does not reveal deletions, so the set of records is
+    only known to be current as of the last reconcile against the store's
+    list of IDs. A record counts as fresh while it was fetched, or both its
+    entity type was polled for changes and reconciled, less than ``max_age``
+    seconds ago. Readers treat stale and missing records alike and fetch them
+    from WooCommerce.
+    """
+
+    def __init__(self, path: str = 'catalog.sqlite3', max_age: float = 300.0):
+        """
+        Initialize the mirror, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+            max_age (float): Seconds a mirrored record may be served for
+        """
+        self.path = path
+        self.max_age = max_age
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # Worker processes share the mirror; wait out each other's writes
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        for statement in CATALOG_SCHEMA:
+            self._conn.execute(statement)
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(catalog_sync)')]
+        if 'reconciled_at' not in columns:
+            # Mirrors created before reconciling existed
+            self._conn.execute('ALTER TABLE catalog_sync ADD COLUMN reconciled_at REAL NOT NULL DEFAULT 0')
+        try:
+            self._conn.execute(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite was built without FTS5; catalog search falls back to LIKE")
+            self.has_fts = False
+
+    def upsert(self, entity: str, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Store or replace records of one entity type.
+
+        Args:
+            entity (str): Entity type, e.g. 'product'
+            records (Iterable[Dict[str, Any]]): WooCommerce records, each with an 'id'
+
+        Returns:
+            int: Number of records stored
+        """
+        now = time.time()
+        rows = [
+            (entity, str(record['id']), json.dumps(record),
+             record.get('date_modified_gmt') or record.get('date_modified'), now)
+            for record in records
+            if isinstance(record, dict) and record.get('id') is not None
+        ]
+        if not rows:
+            return 0
+
+        def write():
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO catalog (entity, id, data, modified, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            if self.has_fts:
+                self._conn.executemany('DELETE FROM catalog_fts WHERE entity = ? AND id = ?',
+                                       ((row[0], row[1]) for row in rows))
+                self._conn.executemany(
+                    'INSERT INTO catalog_fts (entity, id, body) VALUES (?, ?, ?)',
+                    ((row[0], row[1], _search_text(entity, json.loads(row[2]))) for row in rows)
+                )
+
+        with self._lock:
+            self._transaction(write)
+        return len(rows)
+
+    def remove(self, entity: str, entity_id: Any) -> bool:
+        """
+        Drop a record, e.g. after it was deleted or changed in WooCommerce.
+
+        Args:
+            entity (str): Entity type
+            entity_id (Any): ID of the record
+
+        Returns:
+            bool: True if the record was mirrored
+        """
+        removed = []
+
+        def write():
+            cursor = self._conn.execute('DELETE FROM catalog WHERE entity = ? AND id = ?', (entity, str(entity_id)))
+            removed.append(cursor.rowcount > 0)
+            if self.has_fts:
+                self._conn.execute('DELETE FROM catalog_fts WHERE entity = ? AND id = ?', (entity, str(entity_id)))
+
+        with self._lock:
+            self._transaction(write)
+        return removed[0]
+
+    def reconcile(self, entity: str, ids: Iterable[Any], listed_at: float) -> int:
+        """
+        Drop the records the store no longer has, given every ID it lists.
+
+        Records fetched after the listing started are kept, since the listing
+        may have missed them.
+
+        Args:
+            entity (str): Entity type
+            ids (Iterable[Any]): IDs of every record of the type in the store
+            listed_at (float): Time the listing of IDs started
+
+        Returns:
+            int: Number of records dropped
+        """
+        keep = {str(entity_id) for entity_id in ids}
+        removed = []
+
+        def write():
+            stale = [
+                entity_id for entity_id, in self._conn.execute(
+                    'SELECT id FROM catalog WHERE entity = ? AND fetched_at < ?', (entity, listed_at))
+                if entity_id not in keep
+            ]
+            self._conn.executemany('DELETE FROM catalog WHERE entity = ? AND id = ?',
+                                   ((entity, entity_id) for entity_id in stale))
+            if self.has_fts:
+                self._conn.executemany('DELETE FROM catalog_fts WHERE entity = ? AND id = ?',
+                                       ((entity, entity_id) for entity_id in stale))
+            self._conn.execute(
+                'INSERT OR IGNORE INTO catalog_sync (entity, cursor, synced_at) VALUES (?, NULL, 0)', (entity,))
+            self._conn.execute('UPDATE catalog_sync SET reconciled_at = ? WHERE entity = ?', (listed_at, entity))
+            removed.append(len(stale))
+
+        with self._lock:
+            self._transaction(write)
+        if removed[0]:
+            logger.info("Catalog reconcile dropped %s deleted %s records", removed[0], entity)
+        return removed[0]
+
+    def reconciled_at(self, entity: str) -> float:
+        """
+        Get when an entity type was last reconciled against the store's IDs.
+
+        Args:
+            entity (str): Entity type
+
+        Returns:
+            float: Epoch seconds, 0 if it never was
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT reconciled_at FROM catalog_sync WHERE entity = ?', (entity,)).fetchone()
+        return row[0] if row else 0.0
+
+    def peek(self, entity: str, entity_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Get a mirrored record however old it is, e.g. to see what a change to it touches.
+
+        Args:
+            entity (str): Entity type
+            entity_id (Any): ID of the record
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, None if it is not mirrored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM catalog WHERE entity = ? AND id = ?', (entity, str(entity_id))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, entity: str, entity_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Get a fresh mirrored record.
+
+        Args:
+            entity (str): Entity type
+            entity_id (Any): ID of the record
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, None if it is missing or stale
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, fetched_at FROM catalog WHERE entity = ? AND id = ?', (entity, str(entity_id))
+            ).fetchone()
+            current_at = self._current_at(entity)
+        if row is None or max(row[1], current_at) < time.time() - self.max_age:
+            return None
+        return json.loads(row[0])
+
+    def search(self, entity: str, text: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Search mirrored records by name, SKU, code or contact details.
+
+        Only an entity type recently polled and reconciled can be searched:
+        otherwise a record missing from the mirror would silently be missing
+        from the results, or a deleted one included.
+
+        Args:
+            entity (str): Entity type
+            text (str): Words to look for, each matched as a prefix
+            limit (int): Maximum number of records
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Matching records, best first, or None
+                if the entity type has not been synced and reconciled within ``max_age``
+        """
+        query = _fts_query(text)
+        with self._lock:
+            if self._current_at(entity) < time.time() - self.max_age:
+                return None
+            if not query:
+                return []
+            if self.has_fts:
+                rows = self._conn.execute(
+                    '''
+                    SELECT c.data FROM catalog_fts f JOIN catalog c ON c.entity = f.entity AND c.id = f.id
+                    WHERE f.body MATCH ? AND f.entity = ?
+                    ORDER BY f.rank LIMIT ?
+                    ''',
+                    (query, entity, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    'SELECT data FROM catalog WHERE entity = ? AND data LIKE ? LIMIT ?',
+                    (entity, f"%{text}%", limit)
+                ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def sync_cursor(self, entity: str) -> Optional[str]:
+        """
+        Get the modification time up to which an entity type has been synced.
+
+        Args:
+            entity (str): Entity type
+
+        Returns:
+            Optional[str]: GMT timestamp in WooCommerce's format, None before the first sync
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT cursor FROM catalog_sync WHERE entity = ?', (entity,)).fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self, entity: str, cursor: Optional[str]):
+        """
+        Record a completed sync of an entity type.
+
+        Args:
+            entity (str): Entity type
+            cursor (Optional[str]): Latest modification time seen
+        """
+        with self._lock:
+            self._conn.execute(
+                '''
+                INSERT INTO catalog_sync (entity, cursor, synced_at) VALUES (?, ?, ?)
+                ON CONFLICT (entity) DO UPDATE SET cursor = excluded.cursor, synced_at = excluded.synced_at
+                ''',
+                (entity, cursor, time.time())
+            )
+
+    def count(self, entity: str) -> int:
+        """
+        Count the mirrored records of an entity type.
+
+        Args:
+            entity (str): Entity type
+
+        Returns:
+            int: Number of records
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM catalog WHERE entity = ?', (entity,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _current_at(self, entity: str) -> float:
+        """
+        Get the time up to which every mirrored record of an entity type is known
+        to be unchanged and not deleted. The caller must hold the lock.
+        """
+        row = self._conn.execute(
+            'SELECT MIN(synced_at, reconciled_at) FROM catalog_sync WHERE entity = ?', (entity,)
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def _transaction(self, operation):
+        """
+        Run an operation in a write transaction. The caller must hold the lock.
+        """
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            operation()
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
@@ -0,0 +1,355 @@
+"""
+File Conversation Storage
+
+This module stores each conversation as a JSON snapshot plus an append-only
+journal in a directory, with a SQLite summary index for listing.
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models.conversation import Conversation, ConversationSummary, Message
+from storage.archive import ConversationArchive
+from storage.base import ConversationStorage
+from storage.index import ConversationIndex
+from storage.journal import ConversationJournal, fsync_directory, read_journal_file
+from utils.json_codec import JSONCodec, get_codec
+
+logger = logging.getLogger('wooagent')
+
+INDEX_FILENAME = 'index.sqlite3'
+ARCHIVE_DIRNAME = 'archive'
+
+
+def load_conversation_files(snapshot_path: str, journal_records: List[Any],
+                            codec: Optional[JSONCodec] = None) -> Conversation:
+    """
+    Build a conversation from its snapshot file and journaled message records.
+
+    Snapshots may be in the compact form or the older indented dictionary form.
+
+    Args:
+        snapshot_path (str): Path to the conversation's JSON snapshot
+        journal_records (List[Any]): Messages journaled since the snapshot
+        codec (Optional[JSONCodec]): JSON codec, defaults to the fastest available
+
+    Returns:
+        Conversation: The conversation with the journal replayed on top of the snapshot;
+            each journaled message counts as one version
+    """
+    with open(snapshot_path, 'rb') as f:
+        conversation_data = (codec or get_codec()).loads(f.read())
+
+    conversation = Conversation.from_dict(conversation_data)
+
+    # Replay messages journaled since the snapshot was written
+    for record in journal_records:
+        message = Message.from_record(record)
+        conversation.messages.append(message)
+        conversation.updated_at = max(conversation.updated_at, message.timestamp)
+        conversation.version += 1
+
+    return conversation
+
+
+def iter_conversation_files(storage_dir: str, include_archived: bool = False) -> Iterator[Conversation]:
+    """
+    Read every conversation in a storage directory without opening its index.
+
+    Args:
+        storage_dir (str): Directory holding conversation files
+        include_archived (bool): Also read the conversations in the directory's archive
+
+    Yields:
+        Conversation: Each readable conversation; unreadable files are logged and skipped
+    """
+    active = set()
+    for filename in sorted(os.listdir(storage_dir)):
+        if not filename.endswith('.json'):
+            continue
+        conversation_id = filename[:-len('.json')]
+        active.add(conversation_id)
+        try:
+            yield load_conversation_files(
+                os.path.join(storage_dir, filename),
+                read_journal_file(os.path.join(storage_dir, f"{conversation_id}.jsonl"))
+            )
+        except Exception as e:
+            logger.error("Error loading conversation %s: %s", conversation_id, e)
+
+    archive_dir = os.path.join(storage_dir, ARCHIVE_DIRNAME)
+    if not include_archived or not os.path.isdir(archive_dir):
+        return
+    archive = ConversationArchive(archive_dir)
+    try:
+        for summary in archive.summaries():
+            if summary.id in active:
+                continue
+            try:
+                conversation = archive.get(summary.id)
+            except Exception as e:
+                logger.error("Error loading archived conversation %s: %s", summary.id, e)
+                continue
+            if conversation is not None:
+                yield conversation
+    finally:
+        archive.close()
+
+
+class FileConversationStorage(ConversationStorage):
+    """
+    Stores conversations as files in a directory.
+
+    Messages are appended to a per-conversation journal; the full snapshot is
+    only rewritten once ``compact_threshold`` messages have accumulated.
+
+    A summary index next to the conversation files is kept up to date on
+    every write, so conversations can be listed without loading them.
+
+    Idle conversations can be moved to compressed segments in an ``archive``
+    subdirectory (see ``archive``), keeping the directory of active
+    conversations small. Loading an archived conversation moves it back.
+
+    Only one process may use a storage directory at a time: versions are
+    counted but not checked.
+    """
+
+    def __init__(self, storage_dir: str = 'conversations', compact_threshold: int = 100,
+                 write_behind: bool = False, flush_interval: float = 1.0, fsync: str = 'never',
+                 codec: Optional[str] = None, archive_compression: Optional[str] = None):
+        """
+        Initialize the file storage.
+
+        Args:
+            storage_dir (str): Directory to store conversation files
+            compact_threshold (int): Journaled messages that trigger a snapshot rewrite
+            write_behind (bool): Write journal entries from a background thread
+            flush_interval (float): Maximum seconds a write-behind entry stays unwritten
+            fsync (str): Journal fsync policy ('always', 'periodic' or 'never')
+            codec (Optional[str]): JSON codec name ('orjson', 'msgspec' or 'json'),
+                defaults to the fastest available
+            archive_compression (Optional[str]): Compression of archived conversations
+                ('zstd' or 'gzip'), defaults to zstd if the zstandard package is installed
+        """
+        self.storage_dir = storage_dir
+        self.compact_threshold = compact_threshold
+        self.codec = get_codec(codec)
+
+        # Create storage directory if it doesn't exist
+        if not os.path.exists(storage_dir):
+            os.makedirs(storage_dir)
+            logger.info("Created conversation storage directory: %s", storage_dir)
+
+        self.journal = ConversationJournal(
+            storage_dir,
+            write_behind=write_behind,
+            flush_interval=flush_interval,
+            fsync=fsync,
+            fsync_interval=flush_interval,
+            codec=self.codec
+        )
+
+        self.archive_store = ConversationArchive(
+            os.path.join(storage_dir, ARCHIVE_DIRNAME),
+            compression=archive_compression,
+            codec=self.codec
+        )
+
+        index_path = os.path.join(storage_dir, INDEX_FILENAME)
+        index_exists = os.path.exists(index_path)
+        self.index = ConversationIndex(index_path)
+        if not index_exists:
+            self.rebuild_index()
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        conversation_path = self._snapshot_path(conversation_id)
+        if not os.path.exists(conversation_path):
+            return self._rehydrate(conversation_id)
+
+        try:
+            conversation = load_conversation_files(conversation_path, self.journal.read(conversation_id), self.codec)
+            logger.debug("Loaded conversation from file: %s", conversation_id)
+            return conversation
+        except Exception as e:
+            logger.error("Error loading conversation %s: %s", conversation_id, e)
+            return None
+
+    def save(self, conversation: Conversation):
+        # The snapshot records the version it creates
+        conversation.version += 1
+        try:
+            self.journal.compact(conversation.id, lambda: self._write_snapshot(conversation))
+        except Exception:
+            conversation.version -= 1
+            raise
+        self._update_index(self.index.upsert, conversation.summary())
+        # A conversation archived while it was held in memory is active again
+        self.archive_store.remove(conversation.id)
+
+    def append(self, conversation: Conversation, message: Message):
+        if ((self.journal.length(conversation.id) or 0) + 1 >= self.compact_threshold
+                or not os.path.exists(self._snapshot_path(conversation.id))):
+            self.save(conversation)
+            return
+
+        self.journal.append(conversation.id, message.to_record())
+        conversation.version += 1
+        self._update_index(self.index.record_message, conversation.id, conversation.updated_at)
+
+    def list(self, limit: int = 10, cursor: Optional[str] = None,
+             metadata_filter: Optional[Dict[str, Any]] = None) -> Tuple[List[ConversationSummary], Optional[str]]:
+        return self.index.query(limit, cursor=cursor, metadata_filter=metadata_filter)
+
+    def delete(self, conversation_id: str) -> bool:
+        conversation_path = self._snapshot_path(conversation_id)
+        existed = os.path.exists(conversation_path)
+        self.journal.delete(conversation_id)
+        if existed:
+            os.remove(conversation_path)
+        archived = self.archive_store.remove(conversation_id)
+        self._update_index(self.index.remove, conversation_id)
+        return existed or archived
+
+    def expired_conversations(self, updated_before: datetime, limit: int = 100) -> List[str]:
+        return self.index.updated_before(updated_before, limit)
+
+    def idle_conversations(self, updated_before: datetime, limit: int = 100) -> List[str]:
+        return self.index.updated_before(updated_before, limit, archived=False)
+
+    def archive(self, conversation_id: str) -> bool:
+        """
+        Move a conversation's snapshot and journal into a compressed archive segment.
+
+        The caller must make sure the conversation is not written meanwhile.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            bool: True if the conversation was archived, False if it is not active
+        """
+        conversation_path = self._snapshot_path(conversation_id)
+        if not os.path.exists(conversation_path):
+            return False
+
+        conversation = load_conversation_files(conversation_path, self.journal.read(conversation_id), self.codec)
+        # The archived copy is durable before the active files are removed
+        self.archive_store.put(conversation)
+        self.journal.delete(conversation_id)
+        os.remove(conversation_path)
+        self._update_index(self.index.set_archived, [conversation_id], True)
+        logger.debug("Archived conversation: %s", conversation_id)
+        return True
+
+    def rebuild_index(self) -> int:
+        """
+        Rebuild the summary index from the conversation files on disk.
+
+        Returns:
+            int: Number of conversations indexed
+        """
+        count = 0
+
+        active = set()
+
+        def summaries():
+            nonlocal count
+            for conversation in iter_conversation_files(self.storage_dir):
+                count += 1
+                active.add(conversation.id)
+                yield conversation.summary()
+
+        self.index.upsert_many(summaries())
+
+        # Archived conversations, unless an interrupted archive run left them active as well
+        archived = [summary for summary in self.archive_store.summaries() if summary.id not in active]
+        self.index.upsert_many(archived)
+        self.index.set_archived(summary.id for summary in archived)
+        count += len(archived)
+
+        logger.info("Rebuilt conversation index with %s conversations", count)
+        return count
+
+    def flush(self):
+        self.journal.flush()
+
+    def close(self):
+        self.journal.close()
+        self.index.close()
+        self.archive_store.close()
+
+    def _snapshot_path(self, conversation_id: str) -> str:
+        """
+        Get the snapshot file path for a conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            str: Path to the snapshot file
+        """
+        return os.path.join(self.storage_dir, f"{conversation_id}.json")
+
+    def _write_snapshot(self, conversation: Conversation):
+        """
+        Write a conversation's snapshot file.
+
+        Args:
+            conversation (Conversation): The conversation to write
+        """
+        conversation_path = self._snapshot_path(conversation.id)
+        durable = self.journal.fsync != 'never'
+        # Write to a temporary file first so a crash never leaves a half-written snapshot
+        temp_path = f"{conversation_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self.codec.dumps(conversation.to_record()))
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, conversation_path)
+        if durable:
+            # Compaction deletes the journal next; the rename must be on disk first
+            fsync_directory(self.storage_dir)
+
+    def _rehydrate(self, conversation_id: str) -> Optional[Conversation]:
+        """
+        Move an archived conversation back to the active directory.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            Optional[Conversation]: The conversation, None if it is not archived either
+        """
+        try:
+            conversation = self.archive_store.get(conversation_id)
+        except Exception as e:
+            logger.error("Error loading archived conversation %s: %s", conversation_id, e)
+            return None
+        if conversation is None:
+            return None
+
+        self.journal.compact(conversation_id, lambda: self._write_snapshot(conversation))
+        self.archive_store.remove(conversation_id)
+        self._update_index(self.index.set_archived, [conversation_id], False)
+        logger.info("Rehydrated archived conversation: %s", conversation_id)
+        return conversation
+
+    def _update_index(self, operation, *args):
+        """
+        Apply an update to the summary index, logging rather than failing on errors.
+
+        The index only holds derived data, so a failed update must not fail the write
+        it accompanies; ``rebuild_index`` can restore it from the files.
+
+        Args:
+            operation: Index method to call
+            *args: Arguments for the index method
+        """
+        try:
+            operation(*args)
+        except sqlite3.Error as e:
+            logger.error("Error updating conversation index: %s", e)
@@ -0,0 +1,92 @@
+"""
+Shared Cache Generations
+
+This module keeps per-entity-type mutation counters in a SQLite file, so
+worker processes can tell when another process changed store data their
+caches hold.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS generations (
+        entity TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL
+    )
+'''
+
+
+class SharedGenerations:
+    """
+    Mutation counters per entity type ('product', 'order', ...) shared by processes.
+
+    A process bumps the counters of the entity types a mutation touched; the
+    others read them to invalidate their cached results of those types. Like
+    the SQLite conversation store, the file only works for processes on one
+    host.
+    """
+
+    def __init__(self, path: str = 'cache_generations.sqlite3'):
+        """
+        Initialize the counters, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute(SCHEMA)
+
+    def bump(self, entities: Iterable[str]) -> Dict[str, int]:
+        """
+        Record a mutation of some entity types.
+
+        Args:
+            entities (Iterable[str]): Entity types that changed
+
+        Returns:
+            Dict[str, int]: The new generation of each entity type
+        """
+        entities = list(entities)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO generations (entity, generation) VALUES (?, 1) '
+                    'ON CONFLICT (entity) DO UPDATE SET generation = generation + 1',
+                    ((entity,) for entity in entities)
+                )
+                placeholders = ', '.join('?' for _ in entities)
+                rows = self._conn.execute(
+                    f'SELECT entity, generation FROM generations WHERE entity IN ({placeholders})', entities
+                ).fetchall()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return dict(rows)
+
+    def read(self) -> Dict[str, int]:
+        """
+        Get the generation of every entity type that has been mutated.
+
+        Returns:
+            Dict[str, int]: Entity type -> number of mutations recorded
+        """
+        with self._lock:
+            return dict(self._conn.execute('SELECT entity, generation FROM generations').fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,308 @@
+"""
+Conversation Index
+
+This module maintains a summary index of stored conversations so they can be
+listed without loading their messages.
+"""
+
+import re
+import json
+import base64
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models.conversation import ConversationSummary
+
+logger = logging.getLogger('wooagent')
+
+_METADATA_KEY_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+CONVERSATIONS_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        message_count INTEGER NOT NULL,
+        metadata TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at DESC, id DESC)'
+)
+
+UPSERT_SUMMARY_SQL = (
+    'INSERT OR REPLACE INTO conversations (id, created_at, updated_at, message_count, metadata) '
+    'VALUES (?, ?, ?, ?, ?)'
+)
+
+
+def encode_cursor(updated_at: str, conversation_id: str) -> str:
+    """
+    Encode a listing position as an opaque cursor.
+
+    Args:
+        updated_at (str): ISO timestamp of the last returned conversation
+        conversation_id (str): ID of the last returned conversation
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    raw = json.dumps([updated_at, conversation_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): Cursor string
+
+    Returns:
+        Tuple[str, str]: The (updated_at, conversation_id) position
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        updated_at, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return str(updated_at), str(conversation_id)
+
+
+def summary_row(summary: ConversationSummary) -> Tuple[str, str, str, int, str]:
+    """
+    Convert a summary to a row of the conversations table.
+
+    Args:
+        summary (ConversationSummary): Summary to convert
+
+    Returns:
+        Tuple[str, str, str, int, str]: Values for UPSERT_SUMMARY_SQL
+    """
+    return (
+        summary.id,
+        summary.created_at.isoformat(),
+        summary.updated_at.isoformat(),
+        summary.message_count,
+        json.dumps(summary.metadata)
+    )
+
+
+def query_summaries(conn: sqlite3.Connection, limit: int = 10, cursor: Optional[str] = None,
+                    metadata_filter: Optional[Dict[str, Any]] = None
+                    ) -> Tuple[List[ConversationSummary], Optional[str]]:
+    """
+    Query a conversations table, most recently updated first.
+
+    Args:
+        conn (sqlite3.Connection): Connection to a database with the conversations table
+        limit (int): Maximum number of conversations to return
+        cursor (Optional[str]): Cursor returned by a previous call, to continue after it
+        metadata_filter (Optional[Dict[str, Any]]): Metadata values the conversations must match
+
+    Returns:
+        Tuple[List[ConversationSummary], Optional[str]]: The page of summaries and the
+            cursor for the next page, or None if this is the last page
+
+    Raises:
+        ValueError: If the cursor or a filter key is invalid
+    """
+    clauses = []
+    params: List[Any] = []
+
+    if cursor:
+        updated_at, conversation_id = decode_cursor(cursor)
+        clauses.append('(updated_at < ? OR (updated_at = ? AND id < ?))')
+        params.extend([updated_at, updated_at, conversation_id])
+
+    for key, value in (metadata_filter or {}).items():
+        if not _METADATA_KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid metadata filter key: {key}")
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        clauses.append('json_extract(metadata, ?) = ?')
+        params.extend([f'$."{key}"', value])
+
+    sql = 'SELECT id, created_at, updated_at, message_count, metadata FROM conversations'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += ' ORDER BY updated_at DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+
+    return [_summary_from_row(row) for row in rows], next_cursor
+
+
+def _summary_from_row(row: Tuple[str, str, str, int, str]) -> ConversationSummary:
+    conversation_id, created_at, updated_at, message_count, metadata = row
+    return ConversationSummary(
+        id=conversation_id,
+        created_at=datetime.fromisoformat(created_at),
+        updated_at=datetime.fromisoformat(updated_at),
+        message_count=message_count,
+        metadata=json.loads(metadata)
+    )
+
+
+class ConversationIndex:
+    """
+    SQLite index of conversation summaries ordered by last update.
+
+    The index holds one row per conversation with its timestamps, message count
+    and metadata, and is updated whenever a conversation is saved or a message
+    is appended.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the index, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in CONVERSATIONS_SCHEMA:
+            self._conn.execute(statement)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(conversations)')}
+        if 'archived' not in columns:
+            self._conn.execute('ALTER TABLE conversations ADD COLUMN archived INTEGER NOT NULL DEFAULT 0')
+
+    def upsert(self, summary: ConversationSummary):
+        """
+        Insert or replace the summary of a conversation, marking it as not archived.
+
+        Args:
+            summary (ConversationSummary): Summary to store
+        """
+        with self._lock:
+            self._conn.execute(UPSERT_SUMMARY_SQL, summary_row(summary))
+
+    def upsert_many(self, summaries: Iterable[ConversationSummary]):
+        """
+        Insert or replace many summaries in a single transaction.
+
+        Args:
+            summaries (Iterable[ConversationSummary]): Summaries to store
+        """
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(UPSERT_SUMMARY_SQL, (summary_row(summary) for summary in summaries))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def record_message(self, conversation_id: str, updated_at: datetime):
+        """
+        Account for a message appended to a conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+            updated_at (datetime): New last-update time of the conversation
+        """
+        with self._lock:
+            self._conn.execute(
+                'UPDATE conversations SET message_count = message_count + 1, updated_at = ? WHERE id = ?',
+                (updated_at.isoformat(), conversation_id)
+            )
+
+    def set_archived(self, conversation_ids: Iterable[str], archived: bool = True):
+        """
+        Mark conversations as moved to or from the archive.
+
+        Args:
+            conversation_ids (Iterable[str]): IDs of the conversations
+            archived (bool): Whether they are archived
+        """
+        with self._lock:
+            self._conn.executemany(
+                'UPDATE conversations SET archived = ? WHERE id = ?',
+                ((int(archived), conversation_id) for conversation_id in conversation_ids)
+            )
+
+    def updated_before(self, before: datetime, limit: int = 100, archived: Optional[bool] = None) -> List[str]:
+        """
+        Find the conversations least recently updated before a time.
+
+        Args:
+            before (datetime): Only conversations last updated before this
+            limit (int): Maximum number of IDs to return
+            archived (Optional[bool]): Only archived (True) or only active (False) conversations
+
+        Returns:
+            List[str]: Conversation IDs, least recently updated first
+        """
+        sql = 'SELECT id FROM conversations WHERE updated_at < ?'
+        params: List[Any] = [before.isoformat()]
+        if archived is not None:
+            sql += ' AND archived = ?'
+            params.append(int(archived))
+        sql += ' ORDER BY updated_at, id LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    def remove(self, conversation_id: str):
+        """
+        Remove a conversation from the index.
+
+        Args:
+            conversation_id (str): ID of the conversation
+        """
+        with self._lock:
+            self._conn.execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
+
+    def count(self) -> int:
+        """
+        Count the indexed conversations.
+
+        Returns:
+            int: Number of conversations in the index
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM conversations').fetchone()[0]
+
+    def query(self, limit: int = 10, cursor: Optional[str] = None,
+              metadata_filter: Optional[Dict[str, Any]] = None) -> Tuple[List[ConversationSummary], Optional[str]]:
+        """
+        List conversations, most recently updated first.
+
+        Args:
+            limit (int): Maximum number of conversations to return
+            cursor (Optional[str]): Cursor returned by a previous call, to continue after it
+            metadata_filter (Optional[Dict[str, Any]]): Metadata values the conversations must match
+
+        Returns:
+            Tuple[List[ConversationSummary], Optional[str]]: The page of summaries and the
+                cursor for the next page, or None if this is the last page
+
+        Raises:
+            ValueError: If the cursor or a filter key is invalid
+        """
+        with self._lock:
+            return query_summaries(self._conn, limit, cursor, metadata_filter)
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,350 @@
+"""
+Conversation Journal
+
+This module provides an append-only, per-conversation message journal.
+"""
+
+import os
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.json_codec import JSONCodec, get_codec
+
+logger = logging.getLogger('wooagent')
+
+FSYNC_POLICIES = ('always', 'periodic', 'never')
+
+
+def read_journal_file(path: str, codec: Optional[JSONCodec] = None) -> List[Any]:
+    """
+    Read the message records of a journal file.
+
+    Args:
+        path (str): Path to the journal file
+        codec (Optional[JSONCodec]): JSON codec, defaults to the fastest available
+
+    Returns:
+        List[Any]: Message records in append order, empty if the file does not exist
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+
+    loads = (codec or get_codec()).loads
+    with open(path, 'rb') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(loads(line))
+            except ValueError:
+                # A torn final line from a crash mid-write; everything before it is intact
+                logger.warning("Skipping corrupt line %s of journal %s", line_number, path)
+    return records
+
+
+def fsync_directory(path: str):
+    """
+    Fsync a directory, so that files renamed into or removed from it stay so after a crash.
+
+    Args:
+        path (str): Path to the directory
+    """
+    if os.name != 'posix':
+        # Directories cannot be opened for syncing elsewhere; renames are durable on return
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ConversationJournal:
+    """
+    Append-only journal holding one compact JSON line per message.
+
+    Each conversation has a ``<id>.jsonl`` file next to its snapshot. New
+    messages are appended to the journal instead of rewriting the snapshot;
+    the conversation service folds the journal back into the snapshot from
+    time to time (compaction).
+
+    In write-behind mode appends are queued in memory and written in batches
+    by a background thread at least every ``flush_interval`` seconds, which
+    bounds how much can be lost on a crash. With the 'periodic' fsync policy
+    the same thread also syncs written journals every ``fsync_interval``
+    seconds, so a write is never left unsynced for long because no other
+    write followed it.
+    """
+
+    def __init__(self, storage_dir: str, write_behind: bool = False, flush_interval: float = 1.0,
+                 fsync: str = 'never', fsync_interval: float = 1.0, max_pending: int = 1000,
+                 codec: Optional[JSONCodec] = None):
+        """
+        Initialize the journal.
+
+        Args:
+            storage_dir (str): Directory holding the journal files
+            write_behind (bool): Queue appends and write them from a background thread
+            flush_interval (float): Maximum seconds a queued append waits before being written
+            fsync (str): 'always' to fsync every write, 'periodic' to fsync writes every
+                ``fsync_interval`` seconds and on close, 'never' to leave it to the OS
+            fsync_interval (float): Seconds between fsyncs for the 'periodic' policy
+            max_pending (int): Number of queued appends that triggers an early flush
+            codec (Optional[JSONCodec]): JSON codec for records, defaults to the fastest available
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy '{fsync}', expected one of {', '.join(FSYNC_POLICIES)}")
+
+        self.storage_dir = storage_dir
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_pending = max_pending
+        self.codec = codec or get_codec()
+
+        # _lock guards the in-memory queue; _io_lock serializes file writes so the
+        # background writer never blocks appends while it is doing disk I/O
+        self._lock = threading.RLock()
+        self._io_lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending: Dict[str, List[bytes]] = {}
+        self._pending_count = 0
+        self._lengths: Dict[str, int] = {}
+        self._unsynced = set()
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+
+        if write_behind or fsync == 'periodic':
+            self._writer = threading.Thread(target=self._run_writer, name='conversation-journal', daemon=True)
+            self._writer.start()
+
+    def journal_path(self, conversation_id: str) -> str:
+        """
+        Get the journal file path for a conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            str: Path to the journal file
+        """
+        return os.path.join(self.storage_dir, f"{conversation_id}.jsonl")
+
+    def length(self, conversation_id: str) -> Optional[int]:
+        """
+        Get the number of journaled messages not yet compacted.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            Optional[int]: Number of entries, or None if the journal has not been read yet
+        """
+        with self._lock:
+            return self._lengths.get(conversation_id)
+
+    def append(self, conversation_id: str, record: Any):
+        """
+        Append a message record to a conversation's journal.
+
+        Args:
+            conversation_id (str): ID of the conversation
+            record (Any): Serialized message
+        """
+        line = self.codec.dumps(record) + b'\n'
+        if not self.write_behind or self._closed:
+            with self._io_lock:
+                self._write_lines(conversation_id, [line])
+                self._maybe_fsync_periodic()
+                with self._lock:
+                    self._lengths[conversation_id] = self._lengths.get(conversation_id, 0) + 1
+            return
+
+        with self._lock:
+            self._lengths[conversation_id] = self._lengths.get(conversation_id, 0) + 1
+            self._pending.setdefault(conversation_id, []).append(line)
+            self._pending_count += 1
+            if self._pending_count >= self.max_pending:
+                self._wakeup.notify()
+
+    def read(self, conversation_id: str) -> List[Any]:
+        """
+        Read every journaled message record of a conversation, including queued ones.
+
+        Args:
+            conversation_id (str): ID of the conversation
+
+        Returns:
+            List[Any]: Message records in append order
+        """
+        with self._io_lock, self._lock:
+            records = read_journal_file(self.journal_path(conversation_id), self.codec)
+            records.extend(self.codec.loads(line) for line in self._pending.get(conversation_id, []))
+            self._lengths[conversation_id] = len(records)
+            return records
+
+    def compact(self, conversation_id: str, write_snapshot: Callable[[], None]):
+        """
+        Replace a conversation's journal with a fresh snapshot.
+
+        The snapshot writer runs under the journal lock, so no queued append can
+        land in the journal between writing the snapshot and truncating the journal.
+        Unless the fsync policy is 'never', the writer must make the snapshot
+        durable before returning, since the journal is deleted right after.
+
+        Args:
+            conversation_id (str): ID of the conversation
+            write_snapshot (Callable[[], None]): Writes the full conversation snapshot
+        """
+        with self._io_lock, self._lock:
+            write_snapshot()
+            dropped = self._pending.pop(conversation_id, [])
+            self._pending_count -= len(dropped)
+            path = self.journal_path(conversation_id)
+            if os.path.exists(path):
+                os.remove(path)
+            self._unsynced.discard(path)
+            self._lengths[conversation_id] = 0
+
+    def delete(self, conversation_id: str):
+        """
+        Discard a conversation's journal, including queued appends.
+
+        Args:
+            conversation_id (str): ID of the conversation
+        """
+        with self._io_lock, self._lock:
+            dropped = self._pending.pop(conversation_id, [])
+            self._pending_count -= len(dropped)
+            path = self.journal_path(conversation_id)
+            if os.path.exists(path):
+                os.remove(path)
+            self._unsynced.discard(path)
+            self._lengths.pop(conversation_id, None)
+
+    def flush(self):
+        """
+        Write all queued appends to disk.
+
+        Raises:
+            OSError: If a journal could not be written; its appends stay queued
+                for the next flush
+        """
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_count = 0
+
+            failed: Dict[str, List[bytes]] = {}
+            error = None
+            for conversation_id, lines in pending.items():
+                try:
+                    self._write_lines(conversation_id, lines)
+                except OSError as e:
+                    logger.error("Error writing journal for conversation %s: %s", conversation_id, e)
+                    failed[conversation_id] = lines
+                    error = e
+
+            if failed:
+                # Put the lines back ahead of anything appended since, keeping their order
+                with self._lock:
+                    for conversation_id, lines in failed.items():
+                        self._pending[conversation_id] = lines + self._pending.get(conversation_id, [])
+                        self._pending_count += len(lines)
+                raise error
+
+            self._maybe_fsync_periodic()
+
+    def close(self):
+        """
+        Flush queued appends, fsync journals not yet synced and stop the background writer.
+
+        Raises:
+            OSError: If queued appends could not be written
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+        with self._io_lock:
+            self._fsync_unsynced()
+
+    def _write_lines(self, conversation_id: str, lines: List[bytes]):
+        """
+        Append lines to a journal file, fsyncing if the policy requires it.
+        """
+        path = self.journal_path(conversation_id)
+        # Unbuffered, so a failed write leaves nothing behind to be written on close
+        with open(path, 'ab', buffering=0) as f:
+            offset = f.tell()
+            try:
+                data = memoryview(b''.join(lines))
+                while data:
+                    data = data[f.write(data):]
+                if self.fsync == 'always':
+                    os.fsync(f.fileno())
+            except OSError:
+                # Drop a partial write, so the lines can be written again whole
+                f.truncate(offset)
+                raise
+        if self.fsync == 'periodic':
+            self._unsynced.add(path)
+
+    def _maybe_fsync_periodic(self):
+        """
+        Fsync journals written since the last sync if the periodic interval has elapsed.
+        """
+        if self.fsync != 'periodic' or not self._unsynced:
+            return
+        if time.monotonic() - self._last_fsync < self.fsync_interval:
+            return
+        self._fsync_unsynced()
+
+    def _fsync_unsynced(self):
+        """
+        Fsync every journal written since the last sync.
+        """
+        for path in list(self._unsynced):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                # Compacted away since it was written
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._unsynced.discard(path)
+        self._last_fsync = time.monotonic()
+
+    def _run_writer(self):
+        """
+        Background loop flushing queued appends every ``flush_interval`` seconds,
+        or only syncing every ``fsync_interval`` seconds without write-behind.
+        """
+        interval = self.flush_interval if self.write_behind else self.fsync_interval
+        failed = False
+        while True:
+            with self._lock:
+                if not self._closed and (failed or self._pending_count < self.max_pending):
+                    self._wakeup.wait(timeout=interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                failed = False
+            except OSError as e:
+                # Failed appends stay queued; wait a full interval before trying them again
+                logger.error("Error flushing conversation journals: %s", e)
+                failed = True
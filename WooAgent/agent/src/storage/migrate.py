@@ -0,0 +1,68 @@
+"""
+Conversation Storage Migration
+
+This module bulk-imports a directory of conversation files into a SQLite
+conversation database.
+
+Usage (from the ``src`` directory):
+
+    python -m storage.migrate conversations conversations.sqlite3
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+from storage.file_storage import iter_conversation_files
+from storage.sqlite_storage import SQLiteConversationStorage
+
+logger = logging.getLogger('wooagent')
+
+
+def migrate_directory(source_dir: str, target: SQLiteConversationStorage, batch_size: int = 500) -> int:
+    """
+    Import every conversation in a file storage directory into a SQLite storage.
+
+    Conversations already present in the target are replaced, so an interrupted
+    migration can simply be run again. Archived conversations are imported too.
+
+    Args:
+        source_dir (str): Directory holding ``<id>.json`` snapshots and ``<id>.jsonl`` journals
+        target (SQLiteConversationStorage): Storage to import into
+        batch_size (int): Number of conversations written per transaction
+
+    Returns:
+        int: Number of conversations imported
+    """
+    return target.save_many(iter_conversation_files(source_dir, include_archived=True), batch_size=batch_size)
+
+
+def main(argv=None) -> int:
+    """
+    Command-line entry point for the migration.
+    """
+    parser = argparse.ArgumentParser(description='Import a conversations directory into a SQLite database.')
+    parser.add_argument('source_dir', help='Directory of conversation JSON files')
+    parser.add_argument('database', help='Path of the SQLite database to import into')
+    parser.add_argument('--batch-size', type=int, default=500, help='Conversations per transaction')
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.source_dir):
+        parser.error(f"source directory not found: {args.source_dir}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    start = time.monotonic()
+    target = SQLiteConversationStorage(args.database)
+    try:
+        count = migrate_directory(args.source_dir, target, batch_size=args.batch_size)
+    finally:
+        target.close()
+
+    logger.info("Imported %s conversations into %s in %.1fs", count, args.database, time.monotonic() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Conversation Search Indexing
+
+This module indexes every conversation in a storage backend for full-text
+search, for conversations stored before the index existed.
+
+Usage (from the ``src`` directory):
+
+    python -m storage.reindex ../conversations ../conversation_search.sqlite3
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from typing import Iterable, Iterator
+
+from models.conversation import Conversation
+from storage.base import ConversationStorage
+from storage.file_storage import iter_conversation_files
+from storage.search import ConversationSearchIndex
+from storage.sqlite_storage import SQLiteConversationStorage
+
+logger = logging.getLogger('wooagent')
+
+
+def stored_conversations(storage: ConversationStorage, batch_size: int = 500) -> Iterator[Conversation]:
+    """
+    Read every conversation in a storage backend, a page of summaries at a time.
+
+    Args:
+        storage (ConversationStorage): Storage to read conversations from
+        batch_size (int): Conversations listed at a time
+
+    Yields:
+        Conversation: Each stored conversation
+    """
+    cursor = None
+    while True:
+        summaries, cursor = storage.list(batch_size, cursor=cursor)
+        for summary in summaries:
+            conversation = storage.get(summary.id)
+            if conversation is not None:
+                yield conversation
+        if cursor is None:
+            return
+
+
+def index_conversations(conversations: Iterable[Conversation], index: ConversationSearchIndex) -> int:
+    """
+    Index conversations, replacing what was indexed for each, so the indexing can simply be run again.
+
+    Args:
+        conversations (Iterable[Conversation]): Conversations to index
+        index (ConversationSearchIndex): Index to fill
+
+    Returns:
+        int: Number of conversations indexed
+    """
+    count = 0
+    for conversation in conversations:
+        index.replace(conversation)
+        count += 1
+    return count
+
+
+def main(argv=None) -> int:
+    """
+    Command-line entry point for indexing stored conversations.
+    """
+    parser = argparse.ArgumentParser(description='Index stored conversations for full-text search.')
+    parser.add_argument('source', help='Conversations directory, or SQLite conversation database')
+    parser.add_argument('index', help='Path of the search index database')
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.source):
+        parser.error(f"source not found: {args.source}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    start = time.monotonic()
+    index = ConversationSearchIndex(args.index)
+    try:
+        if os.path.isdir(args.source):
+            # Read the files directly, so archived conversations are not moved back
+            count = index_conversations(iter_conversation_files(args.source, include_archived=True), index)
+        else:
+            storage = SQLiteConversationStorage(args.source)
+            try:
+                count = index_conversations(stored_conversations(storage), index)
+            finally:
+                storage.close()
+        messages = index.count()
+    finally:
+        index.close()
+    logger.info("Indexed %s conversations (%s messages) in %.1fs", count, messages, time.monotonic() - start)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,407 @@
+"""
+Conversation Search
+
+This module keeps a full-text index of conversation messages in a SQLite
+database, so conversations can be found by what was said in them.
+"""
+
+import os
+import re
+import math
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from models.conversation import Conversation, Message
+
+logger = logging.getLogger('wooagent')
+
+SEARCH_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        conversation_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        timestamp_us INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        tokens INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id)',
+    # Running totals for ranking, so searches need not count the whole table
+    '''
+    CREATE TABLE IF NOT EXISTS search_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        messages INTEGER NOT NULL,
+        tokens INTEGER NOT NULL
+    )
+    ''',
+    'INSERT OR IGNORE INTO search_totals (id, messages, tokens) VALUES (0, 0, 0)',
+)
+
+# The full-text index reads message text from the messages table instead of keeping a copy
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, content='messages', content_rowid='id', tokenize='porter unicode61')"
+)
+
+# Matches ranked per search; older matches beyond these are not considered
+SEARCH_CANDIDATES = 1000
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Seconds a word's document frequency is reused before it is counted again
+FREQUENCY_TTL = 300.0
+FREQUENCY_CACHE_SIZE = 10000
+
+# Words as the unicode61 tokenizer splits them, near enough for ranking
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Marks around matched words in highlighted text, for counting them
+MARK_START = '\x01'
+MARK_END = '\x02'
+MARKED_PATTERN = re.compile(f'{MARK_START}(.*?){MARK_END}', re.DOTALL)
+
+# Marks around matched words in snippets
+SNIPPET_START = '['
+SNIPPET_END = ']'
+SNIPPET_TOKENS = 16
+
+
+def _epoch_us(value: datetime) -> int:
+    return int(value.timestamp() * 1_000_000)
+
+
+def _query_words(text: str) -> List[str]:
+    """
+    Split free text into distinct lowercase words safe to quote in an FTS5 query.
+    """
+    words = [word.replace('"', '').lower() for word in text.split()]
+    return list(dict.fromkeys(word for word in words if word))
+
+
+def _closest_word(marked: str, words: List[str]) -> str:
+    """
+    Get the query word a highlighted span matched, judged by the longest shared prefix.
+    """
+    return max(words, key=lambda word: len(os.path.commonprefix([marked, word])))
+
+
+@dataclass
+class SearchHit:
+    """
+    A message matching a search, with the conversation it belongs to.
+    """
+    conversation_id: str
+    role: str
+    timestamp: datetime
+    snippet: str
+    # Relevance; higher is better
+    score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the hit to a dictionary format.
+
+        Returns:
+            Dict[str, Any]: Dictionary representation of the hit
+        """
+        return {
+            'conversation_id': self.conversation_id,
+            'role': self.role,
+            'timestamp': self.timestamp.isoformat(),
+            'snippet': self.snippet,
+            'score': round(self.score, 4)
+        }
+
+
+class ConversationSearchIndex:
+    """
+    Full-text index of conversation messages, ranked with BM25.
+
+    Messages are added one at a time as they arrive, and dropped with their
+    conversation. Search words are matched after stemming, so "refund" finds
+    "refunded". Only the newest ``candidates`` matches are ranked, and each
+    word's document frequency is cached for a while, which keeps searches for
+    common words fast however large the index grows. Without FTS5 in SQLite,
+    searches fall back to unranked substring matching.
+    """
+
+    def __init__(self, path: str = 'search.sqlite3', candidates: int = SEARCH_CANDIDATES):
+        """
+        Initialize the index, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+            candidates (int): Newest matches ranked per search
+        """
+        self.path = path
+        self.candidates = candidates
+        # Word -> (monotonic time counted, messages containing it)
+        self._frequencies: Dict[str, Tuple[float, int]] = {}
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # Worker processes share the index; wait out each other's writes
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        for statement in SEARCH_SCHEMA:
+            self._conn.execute(statement)
+        try:
+            self._conn.execute(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite was built without FTS5; conversation search falls back to LIKE")
+            self.has_fts = False
+
+    def add(self, conversation_id: str, message: Message):
+        """
+        Index a message added to a conversation.
+
+        Args:
+            conversation_id (str): ID of the conversation
+            message (Message): The message
+        """
+        with self._lock:
+            self._transaction(lambda: self._insert(conversation_id, [message]))
+
+    def replace(self, conversation: Conversation):
+        """
+        Index every message of a conversation, replacing what was indexed for it.
+
+        Args:
+            conversation (Conversation): The conversation
+        """
+        def write():
+            self._delete(conversation.id)
+            self._insert(conversation.id, conversation.messages)
+
+        with self._lock:
+            self._transaction(write)
+
+    def remove(self, conversation_id: str):
+        """
+        Drop the messages of a conversation from the index.
+
+        Args:
+            conversation_id (str): ID of the conversation
+        """
+        with self._lock:
+            self._transaction(lambda: self._delete(conversation_id))
+
+    def search(self, query: str, limit: int = 10, roles: Optional[Union[str, Sequence[str]]] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None,
+               conversation_id: Optional[str] = None) -> List[SearchHit]:
+        """
+        Find the messages best matching a query.
+
+        Args:
+            query (str): Words to look for; every word must appear
+            limit (int): Maximum number of hits
+            roles (Optional[Union[str, Sequence[str]]]): Only messages of these roles
+            since (Optional[datetime]): Only messages sent at or after this time
+            until (Optional[datetime]): Only messages sent before this time
+            conversation_id (Optional[str]): Only messages of this conversation
+
+        Returns:
+            List[SearchHit]: The matching messages, best first
+        """
+        words = _query_words(query)
+        if not words:
+            return []
+
+        conditions = []
+        params: List[Any] = []
+        if roles:
+            roles = [roles] if isinstance(roles, str) else list(roles)
+            conditions.append(f"m.role IN ({', '.join('?' for _ in roles)})")
+            params.extend(roles)
+        if since is not None:
+            conditions.append('m.timestamp_us >= ?')
+            params.append(_epoch_us(since))
+        if until is not None:
+            conditions.append('m.timestamp_us < ?')
+            params.append(_epoch_us(until))
+        if conversation_id is not None:
+            conditions.append('m.conversation_id = ?')
+            params.append(conversation_id)
+        filters = ''.join(f' AND {condition}' for condition in conditions)
+
+        with self._lock:
+            if self.has_fts:
+                match = ' '.join(f'"{word}"' for word in words)
+                # Rank the newest matches only, then cut snippets for the best of them
+                candidates = self._conn.execute(
+                    f'''
+                    SELECT m.id, m.conversation_id, m.role, m.timestamp_us, m.tokens,
+                           highlight(messages_fts, 0, ?, ?)
+                    FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+                    WHERE messages_fts MATCH ?{filters}
+                    ORDER BY messages_fts.rowid DESC LIMIT ?
+                    ''',
+                    [MARK_START, MARK_END, match] + params + [self.candidates]
+                ).fetchall()
+                if not candidates:
+                    return []
+
+                total_messages, total_tokens = self._conn.execute(
+                    'SELECT messages, tokens FROM search_totals').fetchone()
+                average_tokens = total_tokens / total_messages if total_messages else 1.0
+                weights = {word: self._weight(word, total_messages) for word in words}
+                # Highlighted spans repeat across messages; map each to its query word once
+                closest: Dict[str, str] = {}
+                scored = [
+                    (self._score(highlighted, tokens, average_tokens, weights, closest), message_id,
+                     conversation_id, role, timestamp_us)
+                    for message_id, conversation_id, role, timestamp_us, tokens, highlighted in candidates
+                ]
+                # A stable sort keeps newer messages first among equal scores
+                scored.sort(key=lambda hit: hit[0], reverse=True)
+                rows = [
+                    (conversation_id, role, timestamp_us, self._snippet(match, message_id), score)
+                    for score, message_id, conversation_id, role, timestamp_us in scored[:limit]
+                ]
+            else:
+                likes = ''.join(' AND m.content LIKE ?' for _ in words)
+                rows = self._conn.execute(
+                    f'''
+                    SELECT m.conversation_id, m.role, m.timestamp_us, substr(m.content, 1, 200), 0.0
+                    FROM messages m WHERE 1 = 1{likes}{filters}
+                    ORDER BY m.timestamp_us DESC LIMIT ?
+                    ''',
+                    [f"%{word}%" for word in words] + params + [limit]
+                ).fetchall()
+
+        return [
+            SearchHit(
+                conversation_id=conversation_id,
+                role=role,
+                timestamp=datetime.fromtimestamp(timestamp_us / 1_000_000),
+                snippet=snippet,
+                score=score
+            )
+            for conversation_id, role, timestamp_us, snippet, score in rows
+        ]
+
+    def count(self) -> int:
+        """
+        Count the indexed messages.
+
+        Returns:
+            int: Number of messages in the index
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+    def _weight(self, word: str, total_messages: int) -> float:
+        """
+        Get the inverse document frequency of a query word. The caller must hold the lock.
+        """
+        now = time.monotonic()
+        cached = self._frequencies.get(word)
+        if cached is not None and now - cached[0] < FREQUENCY_TTL:
+            frequency = cached[1]
+        else:
+            # Counting walks every message with the word, so the count is reused for a while
+            frequency = self._conn.execute(
+                'SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?', (f'"{word}"',)
+            ).fetchone()[0]
+            if len(self._frequencies) >= FREQUENCY_CACHE_SIZE:
+                self._frequencies.clear()
+            self._frequencies[word] = (now, frequency)
+        frequency = min(frequency, total_messages)
+        return math.log(1 + (total_messages - frequency + 0.5) / (frequency + 0.5))
+
+    @staticmethod
+    def _score(highlighted: str, tokens: int, average_tokens: float, weights: Dict[str, float],
+               closest: Dict[str, str]) -> float:
+        """
+        Score a matching message with BM25, counting the words marked in its highlighted text.
+        """
+        counts: Dict[str, int] = {}
+        for marked in MARKED_PATTERN.findall(highlighted):
+            word = closest.get(marked)
+            if word is None:
+                word = closest[marked] = _closest_word(marked.lower(), list(weights))
+            counts[word] = counts.get(word, 0) + 1
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * tokens / average_tokens)
+        return sum(weights[word] * count * (BM25_K1 + 1) / (count + norm) for word, count in counts.items())
+
+    def _snippet(self, match: str, message_id: int) -> str:
+        """
+        Cut the part of a message around the matched words. The caller must hold the lock.
+        """
+        row = self._conn.execute(
+            'SELECT snippet(messages_fts, 0, ?, ?, ?, ?) FROM messages_fts WHERE messages_fts MATCH ? AND rowid = ?',
+            (SNIPPET_START, SNIPPET_END, '...', SNIPPET_TOKENS, match, message_id)
+        ).fetchone()
+        return row[0] if row else ''
+
+    def _insert(self, conversation_id: str, messages: Iterable[Message]):
+        """
+        Add messages to both tables. The caller must hold the lock inside a transaction.
+        """
+        count = 0
+        tokens = 0
+        for message in messages:
+            length = len(TOKEN_PATTERN.findall(message.content))
+            cursor = self._conn.execute(
+                'INSERT INTO messages (conversation_id, role, timestamp_us, content, tokens) VALUES (?, ?, ?, ?, ?)',
+                (conversation_id, message.role, message.timestamp_us, message.content, length)
+            )
+            if self.has_fts:
+                self._conn.execute('INSERT INTO messages_fts (rowid, content) VALUES (?, ?)',
+                                   (cursor.lastrowid, message.content))
+            count += 1
+            tokens += length
+        self._conn.execute('UPDATE search_totals SET messages = messages + ?, tokens = tokens + ?', (count, tokens))
+
+    def _delete(self, conversation_id: str):
+        """
+        Remove a conversation's messages from both tables. The caller must hold the lock inside a transaction.
+        """
+        if self.has_fts:
+            # An external-content index is told which text to forget
+            self._conn.execute(
+                "INSERT INTO messages_fts (messages_fts, rowid, content) "
+                "SELECT 'delete', id, content FROM messages WHERE conversation_id = ?",
+                (conversation_id,)
+            )
+        self._conn.execute(
+            '''
+            UPDATE search_totals SET
+                messages = messages - (SELECT COUNT(*) FROM messages WHERE conversation_id = ?),
+                tokens = tokens - (SELECT COALESCE(SUM(tokens), 0) FROM messages WHERE conversation_id = ?)
+            ''',
+            (conversation_id, conversation_id)
+        )
+        self._conn.execute('DELETE FROM messages WHERE conversation_id = ?', (conversation_id,))
+
+    def _transaction(self, operation):
+        """
+        Run an operation in a write transaction. The caller must hold the lock.
+        """
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            operation()
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
@@ -0,0 +1,241 @@
+"""
+SQLite Conversation Storage
+
+This module stores conversations in a SQLite database, one row per message.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models.conversation import Conversation, ConversationSummary, LazyMessageList, Message
+from storage.base import ConversationStorage, VersionConflictError
+from storage.index import CONVERSATIONS_SCHEMA, UPSERT_SUMMARY_SQL, query_summaries, summary_row
+
+logger = logging.getLogger('wooagent')
+
+MESSAGES_SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS messages (
+        conversation_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        PRIMARY KEY (conversation_id, seq)
+    ) WITHOUT ROWID
+    ''',
+)
+
+INSERT_MESSAGE_SQL = 'INSERT INTO messages (conversation_id, seq, role, content, timestamp) VALUES (?, ?, ?, ?, ?)'
+
+
+class SQLiteConversationStorage(ConversationStorage):
+    """
+    Stores conversations in a SQLite database in WAL mode.
+
+    Conversation summaries live in a ``conversations`` table ordered by last
+    update, and messages in a ``messages`` table keyed by conversation and
+    sequence number, so appending a message is a single insert and listing
+    never reads message bodies.
+
+    Several processes on one host may share the database: each write checks
+    and bumps the conversation's ``version`` column in the same transaction.
+    WAL mode needs shared memory and working file locks, so the file must
+    not be shared between hosts or placed on a network file system.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = 'conversations.sqlite3'):
+        """
+        Initialize the SQLite storage, creating the database if needed.
+
+        Args:
+            path (str): Path to the SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        # Other processes may hold the write lock briefly
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        for statement in CONVERSATIONS_SCHEMA + MESSAGES_SCHEMA:
+            self._conn.execute(statement)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(conversations)')}
+        if 'version' not in columns:
+            try:
+                self._conn.execute('ALTER TABLE conversations ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+            except sqlite3.OperationalError:
+                # Another process starting at the same time added it first
+                pass
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT created_at, updated_at, metadata, version FROM conversations WHERE id = ?',
+                (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            message_rows = self._conn.execute(
+                'SELECT role, content, timestamp FROM messages WHERE conversation_id = ? ORDER BY seq',
+                (conversation_id,)
+            ).fetchall()
+
+        created_at, updated_at, metadata, version = row
+        return Conversation(
+            id=conversation_id,
+            messages=LazyMessageList(
+                {'role': role, 'content': content, 'timestamp': timestamp}
+                for role, content, timestamp in message_rows
+            ),
+            metadata=json.loads(metadata),
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            version=version
+        )
+
+    def version(self, conversation_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT version FROM conversations WHERE id = ?', (conversation_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def save(self, conversation: Conversation):
+        def write():
+            row = self._conn.execute(
+                'SELECT version FROM conversations WHERE id = ?', (conversation.id,)
+            ).fetchone()
+            stored = row[0] if row is not None else 0
+            if stored != conversation.version:
+                raise VersionConflictError(
+                    f"Conversation {conversation.id} is at version {stored}, not {conversation.version}"
+                )
+            self._write_conversation(conversation, stored + 1)
+
+        with self._lock:
+            self._transaction(write)
+        conversation.version += 1
+
+    def save_many(self, conversations: Iterable[Conversation], batch_size: int = 500) -> int:
+        """
+        Store many conversations, committing once per batch.
+
+        Args:
+            conversations (Iterable[Conversation]): Conversations to save
+            batch_size (int): Number of conversations written per transaction
+
+        Returns:
+            int: Number of conversations saved
+        """
+        count = 0
+        batch: List[Conversation] = []
+
+        def write_batch():
+            for conversation in batch:
+                self._write_conversation(conversation, conversation.version)
+
+        for conversation in conversations:
+            batch.append(conversation)
+            if len(batch) >= batch_size:
+                with self._lock:
+                    self._transaction(write_batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            with self._lock:
+                self._transaction(write_batch)
+            count += len(batch)
+
+        return count
+
+    def append(self, conversation: Conversation, message: Message):
+        def write():
+            row = self._conn.execute(
+                'SELECT message_count, version FROM conversations WHERE id = ?', (conversation.id,)
+            ).fetchone()
+            stored = row[1] if row is not None else 0
+            if stored != conversation.version:
+                raise VersionConflictError(
+                    f"Conversation {conversation.id} is at version {stored}, not {conversation.version}"
+                )
+            if row is None:
+                self._write_conversation(conversation, 1)
+                return
+
+            self._conn.execute(INSERT_MESSAGE_SQL, (
+                conversation.id, row[0], message.role, message.content, message.timestamp_utc.isoformat()
+            ))
+            self._conn.execute(
+                'UPDATE conversations SET message_count = message_count + 1, updated_at = ?, version = ? '
+                'WHERE id = ?',
+                (conversation.updated_at.isoformat(), stored + 1, conversation.id)
+            )
+
+        with self._lock:
+            self._transaction(write)
+        conversation.version += 1
+
+    def list(self, limit: int = 10, cursor: Optional[str] = None,
+             metadata_filter: Optional[Dict[str, Any]] = None) -> Tuple[List[ConversationSummary], Optional[str]]:
+        with self._lock:
+            return query_summaries(self._conn, limit, cursor, metadata_filter)
+
+    def delete(self, conversation_id: str) -> bool:
+        deleted = []
+
+        def write():
+            self._conn.execute('DELETE FROM messages WHERE conversation_id = ?', (conversation_id,))
+            cursor = self._conn.execute('DELETE FROM conversations WHERE id = ?', (conversation_id,))
+            deleted.append(cursor.rowcount > 0)
+
+        with self._lock:
+            self._transaction(write)
+        return deleted[0]
+
+    def expired_conversations(self, updated_before: datetime, limit: int = 100) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT id FROM conversations WHERE updated_at < ? ORDER BY updated_at, id LIMIT ?',
+                (updated_before.isoformat(), limit)
+            )]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _write_conversation(self, conversation: Conversation, version: int):
+        """
+        Replace a conversation and all of its messages. Must run inside a transaction.
+        """
+        self._conn.execute(UPSERT_SUMMARY_SQL, summary_row(conversation.summary()))
+        self._conn.execute('UPDATE conversations SET version = ? WHERE id = ?', (version, conversation.id))
+        self._conn.execute('DELETE FROM messages WHERE conversation_id = ?', (conversation.id,))
+        self._conn.executemany(INSERT_MESSAGE_SQL, (
+            (conversation.id, seq, msg.role, msg.content, msg.timestamp_utc.isoformat())
+            for seq, msg in enumerate(conversation.messages)
+        ))
+
+    def _transaction(self, operation):
+        """
+        Run an operation in a write transaction. The caller must hold the lock.
+        """
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            operation()
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
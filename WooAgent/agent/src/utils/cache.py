@@ -0,0 +1,320 @@
+"""
+Bounded Cache
+
+This module provides a thread-safe in-memory cache with LRU eviction,
+idle expiry and a size budget.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+V = TypeVar('V')
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters describing cache effectiveness.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the stats to a dictionary format.
+
+        Returns:
+            Dict[str, Any]: Dictionary representation of the stats
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hit_rate
+        }
+
+
+class _Entry(Generic[V]):
+    """
+    A cached value with its size estimate, last access time and optional expiry.
+    """
+    __slots__ = ('value', 'size', 'accessed_at', 'expires_at')
+
+    def __init__(self, value: V, size: int, accessed_at: float, expires_at: Optional[float] = None):
+        self.value = value
+        self.size = size
+        self.accessed_at = accessed_at
+        self.expires_at = expires_at
+
+
+class BoundedCache(Generic[V]):
+    """
+    Thread-safe LRU cache bounded by entry count, idle time and total size.
+
+    Entries idle for longer than ``ttl`` seconds expire, as do entries stored
+    with their own time-to-live once it runs out. When the cache holds
+    more than ``max_entries`` entries or more than ``max_bytes`` estimated bytes,
+    least recently used entries are evicted. ``on_evict`` is called for every
+    entry removed by eviction or expiry (not for explicit ``pop``), outside the
+    cache lock, so it may safely persist the value. Until it returns, ``get``
+    and ``peek`` still find the entry, so no reader sees it missing before it
+    has been persisted.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, sizeof: Optional[Callable[[V], int]] = None,
+                 on_evict: Optional[Callable[[Hashable, V], None]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries
+            ttl (Optional[float]): Seconds an entry may stay unused before it expires
+            max_bytes (Optional[int]): Maximum total estimated size of all entries
+            sizeof (Optional[Callable[[V], int]]): Estimates the size of a value in bytes
+            on_evict (Optional[Callable[[Hashable, V], None]]): Called with each evicted entry
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.on_evict = on_evict
+        self.stats = CacheStats()
+
+        self._entries: 'OrderedDict[Hashable, _Entry[V]]' = OrderedDict()
+        # Removed entries whose on_evict call has not returned yet
+        self._evicting: Dict[Hashable, V] = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return key in self._evicting
+            return not self._is_expired(entry, time.monotonic())
+
+    @property
+    def total_bytes(self) -> int:
+        """Total estimated size of all entries."""
+        return self._total_bytes
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key (Hashable): Cache key
+            default (Optional[V]): Value returned on a miss
+
+        Returns:
+            Optional[V]: The cached value, or ``default`` if absent or expired
+        """
+        expired = []
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry, now):
+                expired.append(self._retire(key))
+                self.stats.expirations += 1
+                entry = None
+
+            if entry is None and key in self._evicting:
+                self.stats.hits += 1
+                value = self._evicting[key]
+            elif entry is None:
+                self.stats.misses += 1
+                value = default
+            else:
+                self.stats.hits += 1
+                entry.accessed_at = now
+                self._entries.move_to_end(key)
+                value = entry.value
+
+        self._notify(expired)
+        return value
+
+    def peek(self, key: Hashable) -> Optional[V]:
+        """
+        Look up an entry without touching its recency or the stats.
+
+        Args:
+            key (Hashable): Cache key
+
+        Returns:
+            Optional[V]: The cached value, or None if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self._evicting.get(key)
+            if self._is_expired(entry, time.monotonic()):
+                return None
+            return entry.value
+
+    def put(self, key: Hashable, value: V, size: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Insert or replace an entry.
+
+        Args:
+            key (Hashable): Cache key
+            value (V): Value to cache
+            size (Optional[int]): Size estimate, computed with ``sizeof`` if omitted
+            ttl (Optional[float]): Seconds after which this entry expires, however often it is used
+        """
+        if size is None:
+            size = self.sizeof(value)
+
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None:
+                self._total_bytes -= existing.size
+
+            now = time.monotonic()
+            self._entries[key] = _Entry(value, size, now, now + ttl if ttl is not None else None)
+            self._total_bytes += size
+            evicted = self._enforce_bounds(keep=key)
+
+        self._notify(evicted)
+
+    def resize(self, key: Hashable, delta: int):
+        """
+        Adjust the size estimate of an entry after its value grew or shrank.
+
+        Args:
+            key (Hashable): Cache key
+            delta (int): Change in estimated size, in bytes
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.size += delta
+            self._total_bytes += delta
+            evicted = self._enforce_bounds(keep=key)
+
+        self._notify(evicted)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """
+        Remove an entry without calling ``on_evict``.
+
+        Args:
+            key (Hashable): Cache key
+
+        Returns:
+            Optional[V]: The removed value, or None if absent
+        """
+        with self._lock:
+            evicting = self._evicting.pop(key, None)
+            if key not in self._entries:
+                return evicting
+            return self._remove(key)
+
+    def keys(self) -> List[Hashable]:
+        """
+        Get the keys of all entries, least recently used first.
+
+        Returns:
+            List[Hashable]: Cache keys
+        """
+        with self._lock:
+            return list(self._entries.keys())
+
+    def expire(self) -> int:
+        """
+        Remove every expired entry.
+
+        Returns:
+            int: Number of expired entries
+        """
+        with self._lock:
+            expired = self._collect_expired(time.monotonic())
+        self._notify(expired)
+        return len(expired)
+
+    def clear(self):
+        """
+        Remove every entry, calling ``on_evict`` for each.
+        """
+        with self._lock:
+            evicted = [self._retire(key) for key in list(self._entries)]
+        self._notify(evicted)
+
+    def _is_expired(self, entry: _Entry, now: float) -> bool:
+        if entry.expires_at is not None and now >= entry.expires_at:
+            return True
+        return self.ttl is not None and now - entry.accessed_at > self.ttl
+
+    def _remove(self, key: Hashable) -> V:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        return entry.value
+
+    def _retire(self, key: Hashable) -> Tuple[Hashable, V]:
+        """
+        Remove an evicted or expired entry, keeping it visible until ``on_evict`` has handled it.
+        """
+        value = self._remove(key)
+        if self.on_evict is not None:
+            self._evicting[key] = value
+        return key, value
+
+    def _collect_expired(self, now: float) -> List[Tuple[Hashable, V]]:
+        """
+        Remove expired entries. The LRU end is the least recently accessed, so
+        scanning stops at the first entry that is still fresh; entries with their
+        own TTL further along are expired lazily when looked up.
+        """
+        expired = []
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._is_expired(entry, now):
+                break
+            expired.append(self._retire(key))
+            self.stats.expirations += 1
+        return expired
+
+    def _enforce_bounds(self, keep: Hashable) -> List[Tuple[Hashable, V]]:
+        """
+        Expire idle entries, then evict least recently used ones until within bounds.
+        The entry for ``keep`` is never evicted, even if it alone exceeds the budget.
+        """
+        removed = self._collect_expired(time.monotonic())
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes)):
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            removed.append(self._retire(key))
+            self.stats.evictions += 1
+        return removed
+
+    def _notify(self, removed: List[Tuple[Hashable, V]]):
+        if self.on_evict is None:
+            return
+        for key, value in removed:
+            try:
+                self.on_evict(key, value)
+            finally:
+                with self._lock:
+                    if self._evicting.get(key) is value:
+                        del self._evicting[key]
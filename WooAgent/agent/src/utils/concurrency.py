@@ -0,0 +1,235 @@
+"""
+Concurrency Helpers
+
+This module provides per-key locks, coalescing of duplicate concurrent
+requests, rate limiting and bounded fan-out for code running on worker threads.
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from utils.cache import BoundedCache
+
+logger = logging.getLogger('wooagent')
+
+T = TypeVar('T')
+
+
+class KeyedLocks:
+    """
+    A reentrant lock per key, created on demand and dropped when unused.
+
+    Holding the lock for a key serializes work on that key only, so different
+    keys proceed in parallel.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, Tuple[threading.RLock, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+    @contextmanager
+    def hold(self, key: Hashable, blocking: bool = True) -> Iterator[bool]:
+        """
+        Hold the lock for a key for the duration of the block.
+
+        Args:
+            key (Hashable): Key to lock
+            blocking (bool): Wait for another thread holding the lock; if False,
+                run the block without the lock instead
+
+        Yields:
+            bool: Whether the lock is held
+        """
+        with self._lock:
+            lock, users = self._locks.get(key) or (threading.RLock(), 0)
+            self._locks[key] = (lock, users + 1)
+
+        acquired = False
+        try:
+            acquired = lock.acquire(blocking)
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+            with self._lock:
+                lock, users = self._locks[key]
+                if users == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, users - 1)
+
+
+class RequestCoalescer:
+    """
+    Runs identical requests once.
+
+    A request whose key matches one still in flight waits for that request
+    and shares its result instead of running again. Successful results are
+    also remembered for ``window`` seconds, so a client retrying after its own
+    timeout gets the original result. Requests that raise are never remembered.
+    """
+
+    def __init__(self, window: float = 30.0, max_remembered: int = 1000):
+        """
+        Initialize the coalescer.
+
+        Args:
+            window (float): Seconds a completed result is reused for identical requests
+            max_remembered (int): Maximum number of completed results remembered
+        """
+        self.window = window
+        self.coalesced = 0
+
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._recent: BoundedCache[object] = BoundedCache(max_entries=max_remembered, ttl=window)
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, func: Callable[[], T],
+            is_current: Optional[Callable[[T], bool]] = None) -> T:
+        """
+        Run ``func`` unless an identical request is in flight or just completed.
+
+        Args:
+            key (Hashable): Identifies identical requests
+            func (Callable[[], T]): Performs the request
+            is_current (Optional[Callable[[T], bool]]): Checks that a remembered
+                result still applies; it is discarded and ``func`` run if not
+
+        Returns:
+            T: The result of this request or of the identical one it joined
+        """
+        remembered = self._recent.get(key) if self.window > 0 else None
+        if remembered is not None and (is_current is None or is_current(remembered)):
+            with self._lock:
+                self.coalesced += 1
+            return remembered
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            logger.info("Joined an identical request already in progress")
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            if self.window > 0:
+                self._recent.put(key, result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class RateLimiter:
+    """
+    Token bucket allowing ``rate`` operations per second, in bursts of up to ``burst``.
+
+    Callers that find the bucket empty are given increasing waits, so they
+    proceed in the order they asked, each one ``1 / rate`` seconds apart.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the limiter with a full bucket.
+
+        Args:
+            rate (float): Operations allowed per second on average
+            burst (Optional[float]): Operations allowed at once, defaults to one second's worth
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, possibly one not yet available.
+
+        Returns:
+            float: Seconds the caller must wait before proceeding
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Wait until the caller may proceed.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run_bounded(funcs: Sequence[Callable[[], T]], executor: Executor, max_concurrency: int,
+                timeout: Optional[float] = None) -> List[Future]:
+    """
+    Run functions on an executor, at most ``max_concurrency`` at a time.
+
+    Each function runs in a copy of the caller's context, so it sees the
+    caller's trace. A function still running ``timeout`` seconds after it
+    started is abandoned: its future is replaced by one failed with
+    TimeoutError, and it keeps its worker thread until it returns.
+
+    Args:
+        funcs (Sequence[Callable[[], T]]): Functions to run
+        executor (Executor): Executor to run them on
+        max_concurrency (int): Maximum number running at once
+        timeout (Optional[float]): Seconds each function may run
+
+    Returns:
+        List[Future]: A finished future per function, in the order given
+    """
+    futures: List[Optional[Future]] = [None] * len(funcs)
+    deadlines: Dict[Future, Tuple[int, float]] = {}
+    next_index = 0
+
+    while next_index < len(funcs) or deadlines:
+        while next_index < len(funcs) and len(deadlines) < max(1, max_concurrency):
+            future = executor.submit(contextvars.copy_context().run, funcs[next_index])
+            deadlines[future] = (next_index, time.monotonic() + timeout if timeout is not None else float('inf'))
+            next_index += 1
+
+        nearest = min(deadline for _, deadline in deadlines.values())
+        wait_for = None if nearest == float('inf') else max(0.0, nearest - time.monotonic())
+        done, _ = wait(deadlines, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            index, _ = deadlines.pop(future)
+            futures[index] = future
+
+        now = time.monotonic()
+        for future, (index, deadline) in list(deadlines.items()):
+            if deadline <= now:
+                del deadlines[future]
+                expired: Future = Future()
+                expired.set_exception(TimeoutError(f"Timed out after {timeout}s"))
+                futures[index] = expired
+
+    return futures
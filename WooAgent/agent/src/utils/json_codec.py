@@ -0,0 +1,93 @@
+"""
+JSON Codec
+
+This module provides a pluggable JSON serializer that uses orjson or msgspec
+when one is installed and falls back to the standard library.
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger('wooagent')
+
+# Codec names in order of preference
+CODECS = ('orjson', 'msgspec', 'json')
+
+
+class JSONCodec:
+    """
+    Encodes values to compact UTF-8 JSON and decodes them back.
+    """
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[Union[bytes, str]], Any]):
+        """
+        Initialize the codec.
+
+        Args:
+            name (str): Name of the underlying library
+            dumps (Callable[[Any], bytes]): Encodes a value to JSON bytes
+            loads (Callable[[Union[bytes, str]], Any]): Decodes JSON bytes or text
+        """
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"JSONCodec({self.name!r})"
+
+
+def _stdlib_codec() -> JSONCodec:
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return JSONCodec('json', dumps, json.loads)
+
+
+def _orjson_codec() -> JSONCodec:
+    import orjson
+    return JSONCodec('orjson', orjson.dumps, orjson.loads)
+
+
+def _msgspec_codec() -> JSONCodec:
+    import msgspec
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+    return JSONCodec('msgspec', encoder.encode, decoder.decode)
+
+
+_FACTORIES: Dict[str, Callable[[], JSONCodec]] = {
+    'orjson': _orjson_codec,
+    'msgspec': _msgspec_codec,
+    'json': _stdlib_codec,
+}
+_codecs: Dict[str, JSONCodec] = {}
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """
+    Get a JSON codec by name, or the fastest one available.
+
+    Args:
+        name (Optional[str]): 'orjson', 'msgspec' or 'json'; None picks the
+            first of these that is installed
+
+    Returns:
+        JSONCodec: The codec
+
+    Raises:
+        ValueError: If the name is unknown
+        ImportError: If the named library is not installed
+    """
+    if name is not None:
+        if name not in _FACTORIES:
+            raise ValueError(f"Unknown JSON codec '{name}', expected one of {', '.join(CODECS)}")
+        if name not in _codecs:
+            _codecs[name] = _FACTORIES[name]()
+        return _codecs[name]
+
+    for candidate in CODECS[:-1]:
+        try:
+            return get_codec(candidate)
+        except ImportError:
+            continue
+    return get_codec('json')
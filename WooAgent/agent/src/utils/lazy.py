@@ -0,0 +1,65 @@
+"""
+Lazy Imports
+
+This module defers importing heavy dependencies until they are first used,
+so the process can start serving before they are loaded.
+"""
+
+import importlib
+from typing import Any
+
+
+class LazyAttribute:
+    """
+    Stands in for a class or function of a module that is imported on first use.
+
+    Calling the stand-in or reading its attributes imports the module. The
+    attribute is looked up on every use, so patching it on its module still
+    takes effect.
+    """
+
+    def __init__(self, module: str, name: str):
+        """
+        Initialize the stand-in.
+
+        Args:
+            module (str): Name of the module to import
+            name (str): Name of the attribute in the module
+        """
+        self.module = module
+        self.name = name
+
+    def resolve(self) -> Any:
+        """
+        Import the module and get the attribute.
+
+        Returns:
+            Any: The attribute
+
+        Raises:
+            ImportError: If the module is not installed
+        """
+        return getattr(importlib.import_module(self.module), self.name)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self.module}.{self.name}>"
+
+
+def lazy_import(module: str, name: str) -> LazyAttribute:
+    """
+    Get a stand-in for an attribute of a module that is imported on first use.
+
+    Args:
+        module (str): Name of the module, e.g. 'openai'
+        name (str): Name of the attribute, e.g. 'OpenAI'
+
+    Returns:
+        LazyAttribute: The stand-in
+    """
+    return LazyAttribute(module, name)
@@ -2,21 +2,118 @@
 Logging Configuration
 
 This module sets up logging for the WooAgent application.
+
+Records are handed to a queue on the calling thread and written to the
+console and log file by a background listener, so request threads never wait
+on I/O. The log file holds one JSON object per line. Forked worker processes
+each switch to a log file of their own, so they never rotate the same file.
 """
 
 import os
+import copy
+import json
+import queue
+import atexit
+import random
 import logging
 import sys
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
 from dotenv import load_dotenv
 
+from utils.tracing import TraceIdFilter
+
+# Attributes every LogRecord has; anything else was passed with ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON objects.
+
+    Each object has ``timestamp``, ``level``, ``logger``, ``message`` and
+    ``trace_id``, plus ``exception`` and any fields passed with ``extra``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage(),
+            'trace_id': getattr(record, 'trace_id', '-'),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Passes only a fraction of DEBUG records; records at higher levels always pass.
+    """
+
+    def __init__(self, rate: float):
+        """
+        Initialize the filter.
+
+        Args:
+            rate (float): Fraction of DEBUG records to keep, from 0 to 1
+        """
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Queues records with their message and traceback rendered, but the format left to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
 def setup_logging():
     """
     Configure logging for the application.
     
+    Calling it again returns the logger configured the first time.
+    
+    Environment:
+        LOG_LEVEL: Minimum level to log (default info)
+        LOG_FILE: Path of the log file (default agent.log); worker processes write
+            to ``worker_log_file(LOG_FILE, index)``
+        LOG_FORMAT: Format of the log file, 'json' (default) or 'text'
+        LOG_QUEUE: Write records from a background thread (default true)
+        LOG_DEBUG_SAMPLE_RATE: Fraction of DEBUG records kept (default 1.0)
+    
     Returns:
         logging.Logger: Configured logger instance
     """
+    global _listener
+    
+    # Create logger
+    logger = logging.getLogger('wooagent')
+    if getattr(logger, '_wooagent_configured', False):
+        return logger
+    
     # Load environment variables if not already loaded
     load_dotenv()
     
@@ -27,20 +124,19 @@ def setup_logging():
     # Get log file path from environment or default to agent.log
     log_file = os.getenv('LOG_FILE', 'agent.log')
     
-    # Create logger
-    logger = logging.getLogger('wooagent')
     logger.setLevel(log_level)
     
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    # Create formatters
+    text_formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
+    file_formatter = text_formatter if os.getenv('LOG_FORMAT', 'json').lower() == 'text' else JSONFormatter()
     
     # Create console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(text_formatter)
     
     # Create file handler
     file_handler = RotatingFileHandler(
@@ -49,10 +145,106 @@ def setup_logging():
         backupCount=5
     )
     file_handler.setLevel(log_level)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(file_formatter)
     
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # Trace IDs and sampling are applied on the logging thread, where the
+    # request context is; the output handlers may run on the listener thread
+    filters = [TraceIdFilter()]
+    sample_rate = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0'))
+    if sample_rate < 1:
+        filters.append(DebugSamplingFilter(sample_rate))
     
+    if os.getenv('LOG_QUEUE', 'true').lower() == 'true':
+        queue_handler = _RecordQueueHandler(queue.SimpleQueue())
+        for log_filter in filters:
+            queue_handler.addFilter(log_filter)
+        _listener = QueueListener(queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_listener)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in (console_handler, file_handler):
+            for log_filter in filters:
+                handler.addFilter(log_filter)
+            logger.addHandler(handler)
+    
+    logger._wooagent_configured = True
     return logger
+
+
+def worker_log_file(path: str, index: int) -> str:
+    """
+    Get the log file of a worker process.
+
+    Args:
+        path (str): Log file of the supervisor, such as agent.log
+        index (int): Index of the worker
+
+    Returns:
+        str: Path with the worker index before the extension, such as agent-worker2.log
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}-worker{index}{ext}"
+
+
+def use_worker_log_file(index: int):
+    """
+    Write this process's log records to a file of its own.
+
+    Called in a forked worker process. The worker inherits the supervisor's
+    file handler, and rotating handlers in several processes would each rename
+    and truncate the file under the others, losing records.
+
+    Args:
+        index (int): Index of the worker
+    """
+    global _listener
+    logger = logging.getLogger('wooagent')
+    # The listener's handlers cannot be swapped while its thread writes to them
+    listener = _listener
+    if listener is not None:
+        listener.stop()
+    handlers = list(listener.handlers if listener is not None else logger.handlers)
+    for position, handler in enumerate(handlers):
+        if not isinstance(handler, RotatingFileHandler):
+            continue
+        worker_handler = RotatingFileHandler(
+            worker_log_file(handler.baseFilename, index),
+            maxBytes=handler.maxBytes,
+            backupCount=handler.backupCount
+        )
+        worker_handler.setLevel(handler.level)
+        worker_handler.setFormatter(handler.formatter)
+        for log_filter in handler.filters:
+            worker_handler.addFilter(log_filter)
+        handlers[position] = worker_handler
+        if listener is None:
+            logger.removeHandler(handler)
+            logger.addHandler(worker_handler)
+        handler.close()
+    if listener is not None:
+        _listener = QueueListener(listener.queue, *handlers, respect_handler_level=listener.respect_handler_level)
+        _listener.start()
+
+
+def shutdown_logging():
+    """
+    Write out queued records and stop the background listener.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener():
+    """
+    Start a listener in a forked worker process; the parent's thread does not exist there.
+    """
+    global _listener
+    if _listener is not None:
+        _listener = QueueListener(_listener.queue, *_listener.handlers,
+                                  respect_handler_level=_listener.respect_handler_level)
+        _listener.start()
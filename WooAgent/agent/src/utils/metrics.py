@@ -0,0 +1,341 @@
+"""
+Metrics
+
+This module provides counters and histograms rendered in the Prometheus text
+exposition format, and the metrics recorded by the agent.
+"""
+
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.tracing import current_trace
+
+# Latency buckets in seconds, from cache hits to slow model calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """
+    Base class of metrics with a fixed set of label names.
+    """
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            labelnames (Sequence[str]): Names of the labels every sample carries
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, constant_labels: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Render the metric in the Prometheus text format.
+
+        Args:
+            constant_labels (Optional[Dict[str, str]]): Labels added to every sample
+
+        Returns:
+            List[str]: Lines of the exposition, including HELP and TYPE
+        """
+        constant = constant_labels or {}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples(tuple(constant), tuple(constant.values())))
+        return lines
+
+    def _samples(self, constant_names: LabelValues, constant_values: LabelValues) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing count.
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """
+        Increase the count.
+
+        Args:
+            amount (float): Amount to add
+            **labels (str): Label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Get the current count for a set of label values."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, constant_names: LabelValues, constant_values: LabelValues) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        names = constant_names + self.labelnames
+        return [f"{self.name}{_format_labels(names, constant_values + key)} {_format_value(value)}"
+                for key, value in values]
+
+
+class Histogram(Metric):
+    """
+    A distribution of observed values in cumulative buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            labelnames (Sequence[str]): Names of the labels every sample carries
+            buckets (Sequence[float]): Upper bounds of the buckets, in increasing order
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (count per bucket, sum, count)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """
+        Record a value.
+
+        Args:
+            value (float): The observed value
+            **labels (str): Label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        """Get the number of values recorded for a set of label values."""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Record the duration of the block in seconds.
+
+        Args:
+            **labels (str): Label values
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self, constant_names: LabelValues, constant_values: LabelValues) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._values.items())
+        names = constant_names + self.labelnames
+        lines = []
+        for key, (counts, total, count) in values:
+            key = constant_values + key
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A set of metrics rendered together.
+
+    Constant labels, such as the worker process, are added to every sample
+    when rendering, so the metrics themselves need not know about them.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._constant_labels: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def set_constant_labels(self, **labels: str):
+        """
+        Set labels added to every sample rendered from now on.
+
+        Args:
+            **labels (str): Label values, such as ``worker='0'``
+        """
+        with self._lock:
+            self._constant_labels = {name: str(value) for name, value in labels.items()}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        Get a counter, creating it on first use.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            labelnames (Sequence[str]): Label names
+
+        Returns:
+            Counter: The counter
+        """
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Get a histogram, creating it on first use.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            labelnames (Sequence[str]): Label names
+            buckets (Sequence[float]): Upper bounds of the buckets
+
+        Returns:
+            Histogram: The histogram
+        """
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **options) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **options)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+
+        Returns:
+            str: The exposition text
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+            constant_labels = dict(self._constant_labels)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(constant_labels))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+TURN_SECONDS = REGISTRY.histogram(
+    'wooagent_turn_seconds', 'Duration of agent turns', ('outcome',))
+STAGE_SECONDS = REGISTRY.histogram(
+    'wooagent_turn_stage_seconds', 'Time agent turns spend in each stage', ('stage',))
+TOOL_CALL_SECONDS = REGISTRY.histogram(
+    'wooagent_tool_call_seconds', 'Duration of MCP tool calls', ('tool', 'cached'))
+STORAGE_SECONDS = REGISTRY.histogram(
+    'wooagent_storage_seconds', 'Duration of conversation storage operations', ('operation',))
+TOKENS = REGISTRY.counter(
+    'wooagent_tokens_total', 'Estimated tokens sent to and received from the model', ('kind',))
+ERRORS = REGISTRY.counter(
+    'wooagent_errors_total', 'Errors by where they occurred', ('stage',))
+
+
+def record_stage(stage: str, seconds: float):
+    """
+    Record time spent in a stage of a turn, in the stage histogram and the current trace.
+
+    Args:
+        stage (str): 'context', 'model', 'tools' or 'persistence'
+        seconds (float): Time spent
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str, histogram: Optional[Histogram] = None, **labels: str) -> Iterator[None]:
+    """
+    Record the duration of the block as a stage of the current turn.
+
+    Args:
+        stage (str): Name of the stage
+        histogram (Optional[Histogram]): Further histogram to record the duration in
+        **labels (str): Label values for that histogram
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        record_stage(stage, elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed, **labels)
+
+
+@contextmanager
+def timed_model_call() -> Iterator[None]:
+    """
+    Record the duration of the block as model time, excluding the tool calls made in it.
+
+    The agent calls tools while it runs, so their time is recorded under
+    'tools' and subtracted here to leave the time spent waiting for the model.
+    """
+    trace = current_trace()
+    tools_before = trace.stages.get('tools', 0.0) if trace else 0.0
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        tool_time = trace.stages.get('tools', 0.0) - tools_before if trace else 0.0
+        record_stage('model', max(0.0, elapsed - tool_time))
@@ -0,0 +1,481 @@
+"""
+Outbound Scheduling
+
+This module paces calls to the services the agent depends on (OpenAI and the
+MCP server): each upstream gets a token-bucket rate limit and concurrency cap
+served in priority order, retries with jittered exponential backoff that
+honors ``Retry-After``, and optionally a circuit breaker.
+"""
+
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger('wooagent')
+
+T = TypeVar('T')
+
+# Priority lanes; lower values are served first
+INTERACTIVE = 0
+BATCH = 1
+
+_priority: ContextVar[int] = ContextVar('wooagent_outbound_priority', default=INTERACTIVE)
+
+RETRIES = REGISTRY.counter(
+    'wooagent_outbound_retries_total', 'Outbound calls retried after a transient failure', ('upstream',))
+REJECTED = REGISTRY.counter(
+    'wooagent_outbound_rejected_total', 'Outbound calls refused without being sent', ('upstream', 'reason'))
+WAIT_SECONDS = REGISTRY.histogram(
+    'wooagent_outbound_wait_seconds', 'Time outbound calls wait for their turn', ('upstream', 'lane'))
+
+# Status codes worth retrying: rate limited, or the upstream or a proxy in front of it failing
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open.
+    """
+
+
+class UpstreamBusyError(Exception):
+    """
+    Raised when a call waits longer than allowed for its turn to an upstream.
+    """
+
+
+def current_priority() -> int:
+    """Get the priority lane of calls made in the current context."""
+    return _priority.get()
+
+
+@contextmanager
+def priority(lane: int) -> Iterator[None]:
+    """
+    Make outbound calls in the block, and the tool calls they fan out to, in a priority lane.
+
+    Args:
+        lane (int): INTERACTIVE or BATCH
+    """
+    token = _priority.set(lane)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for source in (error, getattr(error, 'response', None)):
+        for name in ('status_code', 'status', 'code'):
+            value = getattr(source, name, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Get the wait an upstream asked for in the ``Retry-After`` header of a failed call.
+
+    Args:
+        error (BaseException): The error the call raised
+
+    Returns:
+        Optional[float]: Seconds to wait, None if the error carries no such header
+    """
+    headers = getattr(error, 'headers', None) or getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        value = headers.get('retry-after-ms')
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Check whether a failed call may succeed if retried.
+
+    Args:
+        error (BaseException): The error the call raised
+
+    Returns:
+        bool: True for rate limiting, timeouts, connection failures and server errors
+    """
+    if isinstance(error, (CircuitOpenError, UpstreamBusyError)):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(error).__name__
+    return any(marker in name for marker in ('RateLimit', 'Timeout', 'Connection', 'Overloaded'))
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, deferring to the upstream's ``Retry-After``.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 20.0):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts (int): Attempts per call, including the first
+            base_delay (float): Upper bound of the first backoff, in seconds
+            max_delay (float): Longest wait between attempts, in seconds
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """
+        Get the wait before retrying a call.
+
+        Args:
+            attempt (int): Number of attempts made so far
+            error (BaseException): The error the last attempt raised
+
+        Returns:
+            float: Seconds to wait
+        """
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Stops calls to an upstream that keeps failing, then probes it.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail at once with CircuitOpenError. After ``reset_timeout`` seconds
+    one call is let through; its success closes the circuit and its failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the breaker, closed.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half-open'."""
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may be made, claiming the probe if one is due.
+
+        Returns:
+            bool: True if the call may go ahead
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Circuit opened after %s consecutive failures", self._failures)
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class _PriorityGate:
+    """
+    Admits callers by priority, then arrival, within a rate and concurrency limit.
+    """
+
+    def __init__(self, rate: Optional[float], burst: Optional[float], max_concurrency: Optional[int]):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else (rate or 1.0))
+        self.max_concurrency = max_concurrency
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._running = 0
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, lane: int, timeout: Optional[float]) -> bool:
+        """
+        Wait for a slot. Returns False if ``timeout`` seconds passed first.
+        """
+        ticket = (lane, next(self._sequence))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = self._next_admission(ticket)
+                    if wait == 0:
+                        heapq.heappop(self._waiting)
+                        self._running += 1
+                        return True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                # The next caller in line may now be at the head
+                self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self._running -= 1
+            self._condition.notify_all()
+
+    def _next_admission(self, ticket: Tuple[int, int]) -> Optional[float]:
+        """
+        Seconds until the ticket may go ahead: 0 now, None once something else changes.
+        """
+        if self._waiting[0] != ticket:
+            return None
+        if self.max_concurrency is not None and self._running >= self.max_concurrency:
+            return None
+        if self.rate is None:
+            return 0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+
+class Upstream:
+    """
+    Scheduling for the calls to one upstream service.
+    """
+
+    def __init__(self, name: str, rate: Optional[float] = None, burst: Optional[float] = None,
+                 max_concurrency: Optional[int] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, max_wait: Optional[float] = 60.0):
+        """
+        Initialize the upstream.
+
+        Args:
+            name (str): Name used in metrics and logs
+            rate (Optional[float]): Calls per second allowed on average; None for no limit
+            burst (Optional[float]): Calls allowed at once, defaults to one second's worth
+            max_concurrency (Optional[int]): Calls in progress at once; None for no limit
+            retry (Optional[RetryPolicy]): Retries of transient failures, defaults to 3 attempts
+            breaker (Optional[CircuitBreaker]): Circuit breaker, if any
+            max_wait (Optional[float]): Seconds a call may wait for its turn before UpstreamBusyError
+        """
+        self.name = name
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self._gate = _PriorityGate(rate, burst, max_concurrency)
+
+    def call(self, func: Callable[[], T], retryable: Optional[Callable[[BaseException], bool]] = None) -> T:
+        """
+        Make a call, waiting for its turn and retrying transient failures.
+
+        Args:
+            func (Callable[[], T]): Makes the call
+            retryable (Optional[Callable[[BaseException], bool]]): Further condition for
+                retrying, e.g. that the failed attempt changed nothing
+
+        Returns:
+            T: The call's result
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            UpstreamBusyError: If the call waited longer than ``max_wait``
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self._admit()
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            else:
+                self._succeeded()
+                return result
+            finally:
+                self._gate.release()
+            delay = self._failed(attempt, error, retryable)
+            if delay is None:
+                raise error
+            time.sleep(delay)
+
+    async def call_async(self, func: Callable[[], Any],
+                         retryable: Optional[Callable[[BaseException], bool]] = None) -> Any:
+        """
+        Make a call returning an awaitable, waiting for its turn and retrying transient failures.
+
+        Args:
+            func (Callable[[], Any]): Starts the call
+            retryable (Optional[Callable[[BaseException], bool]]): Further condition for retrying
+
+        Returns:
+            Any: The call's result
+        """
+        lane = current_priority()
+        attempt = 0
+        while True:
+            attempt += 1
+            await asyncio.to_thread(self._admit, lane)
+            try:
+                result = await func()
+            except Exception as e:
+                error = e
+            else:
+                self._succeeded()
+                return result
+            finally:
+                self._gate.release()
+            delay = self._failed(attempt, error, retryable)
+            if delay is None:
+                raise error
+            await asyncio.sleep(delay)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Hold a turn to call the upstream for the duration of the block, without retries.
+
+        For calls that cannot be repeated once started, such as a streamed reply.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            UpstreamBusyError: If the call waited longer than ``max_wait``
+        """
+        self._admit()
+        try:
+            yield
+        except Exception as e:
+            self._failed(self.retry.max_attempts, e, None)
+            raise
+        else:
+            self._succeeded()
+        finally:
+            self._gate.release()
+
+    def _admit(self, lane: Optional[int] = None):
+        """
+        Wait for the call's turn. On return the caller holds a slot it must release.
+        """
+        lane = current_priority() if lane is None else lane
+        started = time.perf_counter()
+        admitted = self._gate.acquire(lane, self.max_wait)
+        WAIT_SECONDS.observe(time.perf_counter() - started, upstream=self.name,
+                             lane='batch' if lane >= BATCH else 'interactive')
+        if not admitted:
+            REJECTED.inc(upstream=self.name, reason='busy')
+            raise UpstreamBusyError(f"Timed out waiting to call {self.name}")
+
+        if self.breaker is not None and not self.breaker.allow():
+            self._gate.release()
+            REJECTED.inc(upstream=self.name, reason='circuit_open')
+            raise CircuitOpenError(f"{self.name} is unavailable, please retry shortly")
+
+    def _succeeded(self):
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def _failed(self, attempt: int, error: Exception,
+                retryable: Optional[Callable[[BaseException], bool]]) -> Optional[float]:
+        """
+        Record a failed attempt and get the wait before retrying, or None to give up.
+        """
+        transient = is_transient(error)
+        if self.breaker is not None:
+            if transient:
+                self.breaker.record_failure()
+            else:
+                # The upstream answered; the request itself was at fault
+                self.breaker.record_success()
+        if not transient or attempt >= self.retry.max_attempts or (retryable and not retryable(error)):
+            return None
+        delay = self.retry.delay(attempt, error)
+        RETRIES.inc(upstream=self.name)
+        logger.warning("Call to %s failed (%s), retry %s in %.2fs", self.name, error, attempt, delay)
+        return delay
+
+
+class OutboundScheduler:
+    """
+    The upstreams outbound calls are scheduled for, by name.
+    """
+
+    def __init__(self, *upstreams: Upstream):
+        """
+        Initialize the scheduler.
+
+        Args:
+            *upstreams (Upstream): Upstreams to schedule calls for
+        """
+        self._upstreams: Dict[str, Upstream] = {upstream.name: upstream for upstream in upstreams}
+
+    def __getitem__(self, name: str) -> Upstream:
+        return self._upstreams[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._upstreams
+
+    def get(self, name: str) -> Optional[Upstream]:
+        """Get an upstream by name, None if calls to it are not scheduled."""
+        return self._upstreams.get(name)
@@ -0,0 +1,49 @@
+"""
+Token Counting
+
+This module estimates how many model tokens a piece of text uses.
+"""
+
+from functools import lru_cache
+
+# Tokens the chat format adds around every message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Average characters per token for English text, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """
+    Load the tiktoken encoding for a model, or None if tiktoken is not installed.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text: str, model: str = 'gpt-4') -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Uses tiktoken when it is installed and falls back to a character-based
+    estimate otherwise.
+
+    Args:
+        text (str): Text to measure
+        model (str): Model whose tokenizer to use
+
+    Returns:
+        int: Number of tokens
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
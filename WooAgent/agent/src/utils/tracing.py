@@ -0,0 +1,128 @@
+"""
+Request Tracing
+
+This module tracks a trace ID for the request being handled, so log records
+from every layer of a turn can be correlated, and collects the time the turn
+spends in each stage.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+_current: ContextVar[Optional['Trace']] = ContextVar('wooagent_trace', default=None)
+
+
+def new_trace_id() -> str:
+    """
+    Generate a trace ID.
+
+    Returns:
+        str: 16 hexadecimal characters
+    """
+    return uuid.uuid4().hex[:16]
+
+
+class Trace:
+    """
+    The trace ID of a request and the seconds spent in each stage of it.
+
+    Stages may be recorded from several threads, e.g. tool calls made by the
+    agent, so the totals are updated under a lock.
+    """
+
+    def __init__(self, trace_id: Optional[str] = None):
+        """
+        Initialize the trace.
+
+        Args:
+            trace_id (Optional[str]): ID to use, a new one if not given
+        """
+        self.trace_id = trace_id or new_trace_id()
+        self.started_at = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        """
+        Add time spent in a stage.
+
+        Args:
+            stage (str): Name of the stage
+            seconds (float): Time spent
+        """
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        """Seconds since the trace started."""
+        return time.monotonic() - self.started_at
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        """
+        Get the total and per-stage durations.
+
+        Returns:
+            Dict[str, float]: Milliseconds per stage, plus 'total'
+        """
+        with self._lock:
+            breakdown = {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+        breakdown['total'] = round(self.elapsed() * 1000, 1)
+        return breakdown
+
+
+def current_trace() -> Optional[Trace]:
+    """
+    Get the trace of the request being handled.
+
+    Returns:
+        Optional[Trace]: The trace, None outside of a traced request
+    """
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """
+    Get the trace ID of the request being handled.
+
+    Returns:
+        Optional[str]: The trace ID, None outside of a traced request
+    """
+    trace = _current.get()
+    return trace.trace_id if trace else None
+
+
+@contextmanager
+def start_trace(trace_id: Optional[str] = None) -> Iterator[Trace]:
+    """
+    Trace the code in the block.
+
+    The new trace keeps the ID of the enclosing trace unless one is given,
+    so a turn traced inside a traced HTTP request logs the request's ID.
+
+    Args:
+        trace_id (Optional[str]): ID to use
+
+    Yields:
+        Trace: The active trace
+    """
+    trace = Trace(trace_id or current_trace_id())
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+class TraceIdFilter(logging.Filter):
+    """
+    Adds the current trace ID to log records as ``trace_id`` ('-' if none).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or '-'
+        return True
@@ -0,0 +1,13 @@
+"""
+Test Configuration
+
+Puts the agent's source directory on the import path so that test modules
+can import packages the same way ``src/main.py`` does.
+"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
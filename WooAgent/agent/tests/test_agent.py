@@ -50,14 +50,16 @@ class TestAgent(unittest.TestCase):
         
         # Assert that the Agent was initialized with the correct parameters
         mock_agent.assert_called_once()
-        self.assertEqual(mock_agent.call_args[1]['client'], mock_openai_instance)
+        self.assertIs(mock_agent.call_args[1]['client'].client, mock_openai_instance)
         self.assertEqual(mock_agent.call_args[1]['model'], "gpt-4")
         
         # Assert that the MCPTool was initialized with the correct server URL
         mock_mcp_tool.assert_called_once_with("WooCommerceTools", server_url="http://localhost:3000")
         
         # Assert that the tool was registered with the agent
-        mock_agent_instance.register_tool.assert_called_once_with(mock_mcp_tool_instance)
+        mock_agent_instance.register_tool.assert_called_once()
+        registered_tool = mock_agent_instance.register_tool.call_args[0][0]
+        self.assertIs(registered_tool.tool, mock_mcp_tool_instance)
         
         # Assert that the system prompt was set
         mock_agent_instance.set_system_prompt.assert_called_once()
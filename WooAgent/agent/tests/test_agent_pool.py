@@ -0,0 +1,91 @@
+"""
+Agent Pool Tests
+
+This module contains tests for pooling agents and their MCP connections.
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+from services.agent_pool import AgentPool
+
+
+class TestAgentPool(unittest.TestCase):
+    """
+    Test cases for the agent pool.
+    """
+
+    def _pool(self, **options):
+        self.tools = []
+
+        def connect():
+            tool = MagicMock()
+            self.tools.append(tool)
+            return tool
+
+        return AgentPool(connect, lambda tool: MagicMock(tool=tool), **options)
+
+    def test_agents_are_reused(self):
+        """
+        Test that sequential checkouts reuse one agent and one MCP connection.
+        """
+        pool = self._pool(size=4)
+        with pool.checkout() as first:
+            pass
+        with pool.checkout() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.tools), 1)
+        self.assertEqual(pool.stats.created, 1)
+
+    def test_concurrent_checkouts_get_distinct_agents(self):
+        """
+        Test that agents checked out at the same time do not share a connection.
+        """
+        pool = self._pool(size=2)
+        with pool.checkout() as first, pool.checkout() as second:
+            self.assertIsNot(first, second)
+        self.assertEqual(len(self.tools), 2)
+
+    def test_failed_connection_is_replaced(self):
+        """
+        Test that a connection whose health check fails after an error is reconnected.
+        """
+        pool = self._pool(size=1)
+        with self.assertRaises(ConnectionResetError):
+            with pool.checkout():
+                raise ConnectionResetError('connection reset')
+        self.tools[0].health_check.return_value = False
+
+        with pool.checkout() as agent:
+            self.assertIs(agent.tool, self.tools[1])
+        self.tools[0].close.assert_called_once()
+        self.assertEqual(pool.stats.reconnects, 1)
+
+    def test_model_errors_do_not_trigger_a_health_check(self):
+        """
+        Test that only connection errors make the next checkout check the connection.
+        """
+        class RateLimitError(Exception):
+            status_code = 429
+
+        pool = self._pool(size=1, health_check_interval=60)
+        for error in (RateLimitError('rate limited'), RuntimeError('the fast model cannot do that')):
+            with self.assertRaises(type(error)):
+                with pool.checkout():
+                    raise error
+            with pool.checkout():
+                pass
+        self.tools[0].health_check.assert_not_called()
+
+        with self.assertRaises(TimeoutError):
+            with pool.checkout():
+                raise TimeoutError('MCP server did not answer')
+        with pool.checkout():
+            pass
+        self.tools[0].health_check.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Answer Cache Tests
+
+This module contains tests for answering repeated questions from the cache.
+"""
+
+import unittest
+
+from models.conversation import Conversation
+from services.answer_cache import LATENCY_SAVED_SECONDS, LOOKUPS, AnswerCache
+
+
+class TestAnswerCache(unittest.TestCase):
+    """
+    Test cases for the answer cache.
+    """
+
+    def setUp(self):
+        self.generations = {}
+        self.cache = AnswerCache(ttl=60, data_version=lambda: dict(self.generations))
+        self.conversation = Conversation(id='c1')
+
+    def test_repeated_question_is_answered_until_data_changes(self):
+        """
+        Test that a normalized repeat is served, and becomes stale after a mutation.
+        """
+        self.cache.store(self.conversation, 'Show me recent orders', 'Orders: #1, #2', {}, 1500)
+
+        self.assertEqual(self.cache.lookup(Conversation(id='c2'), 'show me recent orders?'), 'Orders: #1, #2')
+        self.assertEqual(self.cache.stats.latency_saved_ms, 1500)
+
+        self.generations['order'] = 1
+        self.assertIsNone(self.cache.lookup(self.conversation, 'Show me recent orders'))
+        self.assertEqual(self.cache.stats.stale, 1)
+
+    def test_mutating_and_follow_up_questions_bypass_the_cache(self):
+        """
+        Test that mutating intents, follow-ups and opted-out conversations are never cached.
+        """
+        self.cache.store(self.conversation, 'Update the stock of Product X to 50', 'Done', {}, 900)
+        self.cache.store(self.conversation, 'What is its price', '$25', {}, 900)
+        self.assertIsNone(self.cache.lookup(self.conversation, 'Update the stock of Product X to 50'))
+        self.assertIsNone(self.cache.lookup(self.conversation, 'What is its price'))
+
+        opted_out = Conversation(id='c3', metadata={'answer_cache': False})
+        self.cache.store(self.conversation, 'List all active coupons', 'SUMMER2025', {}, 700)
+        self.assertIsNone(self.cache.lookup(opted_out, 'List all active coupons'))
+        self.assertEqual(self.cache.stats.bypassed, 3)
+
+    def test_replies_are_not_shared_between_conversations(self):
+        """
+        Test that confirmations, short replies and answers to the agent's questions are never cached.
+        """
+        first = Conversation(id='c1')
+        self.cache.store(first, 'yes', 'Refunded order #12', {}, 800)
+        self.cache.store(first, 'the first', 'Refunded order #12', {}, 800)
+        first.add_message('assistant', 'Shall I refund order #12?')
+
+        second = Conversation(id='c2')
+        second.add_message('assistant', 'Shall I cancel order #7?')
+        second.add_message('user', 'Yes!')
+        self.assertIsNone(self.cache.lookup(second, 'Yes!'))
+        self.assertIsNone(self.cache.lookup(second, 'the first'))
+
+        # A full question is still not cached when it answers the agent's question
+        self.cache.store(first, 'Show me recent orders', 'Orders: #1', {}, 800)
+        self.assertIsNone(self.cache.lookup(Conversation(id='c3'), 'Show me recent orders'))
+
+    def test_similar_question_matches_by_embedding(self):
+        """
+        Test that a question with a close embedding is served when an embedder is configured.
+        """
+        vectors = {
+            'show me recent orders': [1.0, 0.0],
+            'show me the latest orders': [0.98, 0.05],
+            'list customers': [0.0, 1.0]
+        }
+        cache = AnswerCache(ttl=60, embedder=lambda text: vectors[text])
+        cache.store(self.conversation, 'Show me recent orders', 'Orders: #1', {}, 1200)
+
+        self.assertEqual(cache.lookup(self.conversation, 'Show me the latest orders'), 'Orders: #1')
+        self.assertIsNone(cache.lookup(self.conversation, 'List customers'))
+        self.assertEqual(cache.stats.semantic_hits, 1)
+
+
+    def test_lookups_are_counted_in_the_metrics_registry(self):
+        """
+        Test that lookup outcomes and the time hits saved are exported as metrics.
+        """
+        before = {outcome: LOOKUPS.value(outcome=outcome) for outcome in ('exact_hit', 'miss', 'bypassed')}
+        saved_before = LATENCY_SAVED_SECONDS.value()
+
+        self.cache.lookup(self.conversation, 'Show me recent orders')
+        self.cache.store(self.conversation, 'Show me recent orders', 'Orders: #1, #2', {}, 1500)
+        self.cache.lookup(Conversation(id='c2'), 'show me recent orders')
+        self.cache.lookup(self.conversation, 'Cancel order #1 please')
+
+        for outcome in before:
+            self.assertEqual(LOOKUPS.value(outcome=outcome) - before[outcome], 1, outcome)
+        self.assertAlmostEqual(LATENCY_SAVED_SECONDS.value() - saved_before, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+Conversation Archive Tests
+
+This module contains tests for archiving idle conversations and deleting
+those past retention.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from models.conversation import Conversation
+from services.conversation_service import ConversationService
+from services.storage_maintenance import StorageMaintenance
+from storage import ConversationArchive, FileConversationStorage
+
+
+class TestConversationArchive(unittest.TestCase):
+    """
+    Test cases for the cold tier of the file storage and its maintenance.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def test_idle_conversations_are_archived_and_rehydrated(self):
+        """
+        Test that an idle conversation leaves the storage directory, is still listed,
+        and is moved back with its messages when loaded.
+        """
+        service = ConversationService(self.storage_dir)
+        conversation_id = service.create_conversation({'channel': 'web'}).id
+        service.add_message(conversation_id, 'user', 'Where is order #12?')
+        service.add_message(conversation_id, 'assistant', 'It shipped yesterday.')
+
+        maintenance = StorageMaintenance(service, archive_after=60)
+        counts = maintenance.run_once(now=datetime.now() + timedelta(hours=1))
+        self.assertEqual(counts, {'deleted': 0, 'archived': 1})
+        self.assertFalse(os.path.exists(os.path.join(self.storage_dir, f"{conversation_id}.json")))
+        self.assertEqual([s.id for s in service.list_conversation_summaries()[0]], [conversation_id])
+
+        conversation = service.get_conversation(conversation_id)
+        self.assertEqual([m.content for m in conversation.messages], ['Where is order #12?', 'It shipped yesterday.'])
+        self.assertEqual(conversation.metadata, {'channel': 'web'})
+        self.assertTrue(os.path.exists(os.path.join(self.storage_dir, f"{conversation_id}.json")))
+        self.assertNotIn(conversation_id, service.storage.archive_store)
+
+        service.add_message(conversation_id, 'user', 'Thanks')
+        service.close()
+        reopened = FileConversationStorage(self.storage_dir)
+        self.assertEqual(len(reopened.get(conversation_id).messages), 3)
+        reopened.close()
+
+    def test_retention_deletes_active_and_archived_conversations(self):
+        """
+        Test that conversations past retention are deleted wherever they are, and recent ones kept.
+        """
+        service = ConversationService(self.storage_dir)
+        old_ids = []
+        for _ in range(3):
+            conversation_id = service.create_conversation().id
+            service.add_message(conversation_id, 'user', 'hello')
+            old_ids.append(conversation_id)
+        service.storage.archive(old_ids[0])
+
+        later = datetime.now() + timedelta(days=2)
+        recent = service.create_conversation()
+        recent.updated_at = later
+        service.save_conversation(recent)
+
+        counts = StorageMaintenance(service, retain_for=86400, batch_size=2).run_once(now=later)
+        self.assertEqual(counts['deleted'], 3)
+        self.assertEqual([s.id for s in service.list_conversation_summaries()[0]], [recent.id])
+        for conversation_id in old_ids:
+            self.assertIsNone(service.get_conversation(conversation_id))
+        self.assertEqual(service.storage.archive_store.stats()['conversations'], 0)
+        service.close()
+
+    def test_segments_are_dropped_when_unused(self):
+        """
+        Test that records compress into shared segments that are deleted once nothing points to them.
+        """
+        archive_dir = os.path.join(self.storage_dir, 'archive')
+        archive = ConversationArchive(archive_dir, compression='gzip', segment_max_bytes=1)
+        conversations = []
+        for index in range(3):
+            conversation = Conversation(id=f'conversation-{index}')
+            conversation.add_message('user', 'Show me the Blue Hoodie ' * 50)
+            conversation.add_message('assistant', f'Reply {index}')
+            archive.put(conversation)
+            conversations.append(conversation)
+
+        stats = archive.stats()
+        self.assertEqual((stats['conversations'], stats['segments']), (3, 3))
+        self.assertLess(stats['bytes'], 3 * len('Show me the Blue Hoodie ' * 50))
+        self.assertEqual(archive.get(conversations[1].id).messages[1].content, 'Reply 1')
+
+        self.assertTrue(archive.remove(conversations[0].id))
+        self.assertFalse(archive.remove(conversations[0].id))
+        self.assertEqual(archive.stats()['segments'], 2)
+        # The segment being written to is kept until it is full
+        archive.remove(conversations[2].id)
+        self.assertEqual(archive.stats()['segments'], 2)
+        self.assertEqual([s.id for s in archive.summaries()], [conversations[1].id])
+        archive.close()
+
+    def test_mostly_unused_segments_are_compacted(self):
+        """
+        Test that a segment whose records are mostly gone has the rest moved out and is deleted.
+        """
+        archive_dir = os.path.join(self.storage_dir, 'archive')
+        archive = ConversationArchive(archive_dir, compression='gzip')
+        for index in range(5):
+            conversation = Conversation(id=f'conversation-{index}')
+            conversation.add_message('user', f'Show me order #{index} ' * 20)
+            archive.put(conversation)
+        archive.close()
+
+        # A new instance writes to a new segment, leaving the first one closed
+        archive = ConversationArchive(archive_dir, compression='gzip')
+        for index in range(2):
+            archive.remove(f'conversation-{index}')
+        stats = archive.stats()
+        self.assertEqual(stats['segments'], 1)
+        self.assertGreater(stats['dead_bytes'], 0)
+
+        # Two of five records left is below the default ratio of one half
+        archive.remove('conversation-2')
+        stats = archive.stats()
+        self.assertEqual((stats['conversations'], stats['segments'], stats['dead_bytes']), (2, 1, 0))
+        for index in range(3, 5):
+            self.assertEqual(archive.get(f'conversation-{index}').messages[0].content,
+                             f'Show me order #{index} ' * 20)
+        archive.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
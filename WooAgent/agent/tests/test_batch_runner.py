@@ -0,0 +1,146 @@
+"""
+Batch Runner Tests
+
+This module contains tests for running agent tasks in bulk.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.agent_service import AgentService
+from services.batch_runner import BatchRunner, load_tasks
+from services.conversation_service import ConversationService
+from utils.concurrency import RateLimiter
+
+
+class FakeAgentService:
+    """
+    Stand-in for AgentService that fails messages containing 'fail'.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def process_message(self, conversation_id, message, request_id=None):
+        with self._lock:
+            self.messages.append(message)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        if 'fail' in message:
+            return {'conversation_id': 'c', 'response': 'sorry', 'error': 'boom', 'success': False}
+        return {'conversation_id': conversation_id or 'c', 'response': f"done: {message}", 'success': True}
+
+    def create_new_conversation(self, metadata=None):
+        return {'conversation_id': f"meta-{metadata['batch_task_id']}"}
+
+
+class TestBatchRunner(unittest.TestCase):
+    """
+    Test cases for the batch runner.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tasks_path = os.path.join(self.temp_dir, 'tasks.jsonl')
+        self.results_path = os.path.join(self.temp_dir, 'results.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write_tasks(self, tasks):
+        with open(self.tasks_path, 'w') as f:
+            f.write('\n'.join(json.dumps(task) for task in tasks) + '\n')
+
+    def _results(self):
+        with open(self.results_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_runs_tasks_with_bounded_concurrency(self):
+        """
+        Test that every task gets a result line and ``concurrency`` tasks run at once.
+        """
+        self._write_tasks([{'message': f"task {i}"} for i in range(10)] +
+                          [{'id': 'tagged', 'message': 'with metadata', 'metadata': {'job': 'x'}}])
+        agent_service = FakeAgentService()
+
+        summary = BatchRunner(agent_service, concurrency=3).run(load_tasks(self.tasks_path), self.results_path)
+
+        self.assertEqual(summary.succeeded, 11)
+        self.assertEqual(agent_service.max_running, 3)
+        results = {result['id']: result for result in self._results()}
+        self.assertEqual(sorted(results), sorted([str(i) for i in range(1, 11)] + ['tagged']))
+        self.assertEqual(results['tagged']['conversation_id'], 'meta-tagged')
+        self.assertEqual(results['1']['conversation_id'], 'meta-1')
+
+    @patch('services.agent_service.get_openai_client', MagicMock())
+    @patch('services.agent_service.MCPTool', MagicMock())
+    @patch('services.agent_service.Agent')
+    def test_tasks_run_concurrently_through_the_agent_service(self, mock_agent):
+        """
+        Test that tasks without a conversation run at the same time in a real agent service.
+        """
+        all_running = threading.Barrier(3, timeout=5)
+
+        def run(message, *args, **kwargs):
+            # Fails with BrokenBarrierError unless all three tasks are running
+            all_running.wait()
+            return f"done: {message}"
+
+        mock_agent.return_value.run.side_effect = run
+        self._write_tasks([{'message': f"task {i}"} for i in range(3)])
+        agent_service = AgentService('key', 'http://localhost:3000', startup='lazy', agent_pool_size=3,
+                                     conversation_service=ConversationService(os.path.join(self.temp_dir, 'c')))
+
+        summary = BatchRunner(agent_service, concurrency=3).run(load_tasks(self.tasks_path), self.results_path)
+
+        self.assertEqual(summary.succeeded, 3)
+        self.assertEqual(len({result['conversation_id'] for result in self._results()}), 3)
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+    def test_resume_skips_succeeded_tasks(self):
+        """
+        Test that rerunning with the same results file runs only the tasks that did not succeed.
+        """
+        self._write_tasks([{'id': 'a', 'message': 'one'}, {'id': 'b', 'message': 'please fail'},
+                           {'id': 'c', 'message': 'three'}])
+        with open(self.results_path, 'w') as f:
+            f.write(json.dumps({'id': 'a', 'success': True}) + '\n')
+            f.write(json.dumps({'id': 'b', 'success': False}) + '\n')
+            f.write('{"id": "c", "succ')  # cut off by an interruption
+
+        agent_service = FakeAgentService()
+        summary = BatchRunner(agent_service, concurrency=2).run(load_tasks(self.tasks_path), self.results_path)
+
+        self.assertEqual(sorted(agent_service.messages), ['please fail', 'three'])
+        self.assertEqual((summary.succeeded, summary.failed, summary.skipped), (1, 1, 1))
+        lines = open(self.results_path).read().splitlines()
+        self.assertEqual(sorted(json.loads(line)['id'] for line in lines[3:]), ['b', 'c'])
+
+    def test_rate_limiter_spaces_acquisitions(self):
+        """
+        Test that callers beyond the burst wait one interval each.
+        """
+        limiter = RateLimiter(rate=100, burst=2)
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        # Two from the burst, then four at 10ms intervals
+        self.assertGreaterEqual(time.monotonic() - started, 0.035)
+        self.assertGreater(limiter.reserve(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Catalog Tests
+
+This module contains tests for the local catalog mirror and its sync.
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from services.catalog_sync import CatalogSync, CatalogTool
+from storage.catalog import CatalogMirror
+
+
+def _product(product_id, name, sku, modified):
+    return {'id': product_id, 'name': name, 'sku': sku, 'date_modified_gmt': modified}
+
+
+class TestCatalog(unittest.TestCase):
+    """
+    Test cases for the catalog mirror, sync and tool wrapper.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mirror = CatalogMirror(os.path.join(self.temp_dir, 'catalog.sqlite3'), max_age=300)
+
+    def tearDown(self):
+        self.mirror.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_search_requires_a_fresh_sync(self):
+        """
+        Test that search answers only once the entity type has been synced and reconciled.
+        """
+        self.mirror.upsert('product', [
+            _product(1, 'Blue Hoodie', 'HD-1', '2025-01-01T00:00:00'),
+            _product(2, 'Red Shirt', 'SH-2', '2025-01-02T00:00:00'),
+        ])
+        self.assertIsNone(self.mirror.search('product', 'hood'))
+
+        self.mirror.mark_synced('product', '2025-01-02T00:00:00')
+        # Polling for changes alone cannot tell whether a record was deleted
+        self.assertIsNone(self.mirror.search('product', 'hood'))
+        self.mirror.reconcile('product', [1, 2], time.time())
+        self.assertEqual([p['id'] for p in self.mirror.search('product', 'hood')], [1])
+        self.assertEqual([p['id'] for p in self.mirror.search('product', 'SH-2')], [2])
+
+        self.mirror.max_age = 0
+        self.assertIsNone(self.mirror.search('product', 'hood'))
+        self.assertIsNone(self.mirror.get('product', 1))
+
+    def test_sync_pages_then_asks_for_changes_only(self):
+        """
+        Test that the first sync copies every page and later ones pass ``modified_after``.
+        """
+        pages = {
+            1: [_product(1, 'A', 'A-1', '2025-01-01T00:00:00'), _product(2, 'B', 'B-1', '2025-01-03T00:00:00')],
+            2: [_product(3, 'C', 'C-1', '2025-01-02T00:00:00')],
+        }
+        requests = []
+
+        def fetch(collection, params):
+            requests.append((collection, dict(params)))
+            if collection != 'products':
+                return []
+            if params.get('_fields') == 'id':
+                # Product 3 has since been deleted
+                return [{'id': 1}, {'id': 2}] if params['page'] == 1 else []
+            return pages.get(params['page'], []) if 'modified_after' not in params else []
+
+        sync = CatalogSync(self.mirror, 'http://mcp', page_size=2, fetch=fetch)
+        self.assertEqual(sync.sync_entity('product'), 3)
+        self.assertEqual(self.mirror.count('product'), 3)
+        self.assertEqual(self.mirror.sync_cursor('product'), '2025-01-03T00:00:00')
+        self.assertEqual([params['page'] for _, params in requests], [1, 2])
+
+        requests.clear()
+        sync.sync_entity('product')
+        self.assertEqual(requests[0][1]['modified_after'], '2025-01-03T00:00:00')
+        self.assertIsNotNone(self.mirror.get('product', 3))
+
+        sync.reconcile_interval = 0
+        sync.sync_all()
+        self.assertIsNone(self.mirror.get('product', 3))
+        self.assertEqual(self.mirror.count('product'), 2)
+
+        sync.apply_webhook('product.deleted', {'id': 2})
+        self.assertIsNone(self.mirror.get('product', 2))
+
+    def test_tool_serves_fresh_records_and_falls_back_live(self):
+        """
+        Test that lookups are answered from the mirror, and misses go live and are copied in.
+        """
+        self.mirror.upsert('product', [_product(1, 'Blue Hoodie', 'HD-1', '2025-01-01T00:00:00')])
+        live = MagicMock()
+        live.call_tool.side_effect = lambda name, arguments: {
+            'content': [{'type': 'text', 'text': json.dumps(_product(arguments.get('id'), 'Live', 'L-1', None))}]
+        }
+        tool = CatalogTool(live, self.mirror)
+
+        result = tool.call_tool('get_product', {'id': 1})
+        self.assertEqual(json.loads(result['content'][0]['text'])['name'], 'Blue Hoodie')
+        live.call_tool.assert_not_called()
+
+        tool.call_tool('get_product', {'id': 5})
+        self.assertEqual(live.call_tool.call_count, 1)
+        self.assertEqual(self.mirror.get('product', 5)['name'], 'Live')
+
+        tool.call_tool('update_product', {'id': 1, 'regular_price': '30'})
+        self.assertIsNone(self.mirror.get('product', 1))
+
+        # A refund restocks the order's products and changes its customer's totals
+        self.mirror.upsert('product', [_product(7, 'Cap', 'CP-7', None)])
+        self.mirror.upsert('customer', [{'id': 3, 'email': 'jo@example.com'}])
+        self.mirror.upsert('order', [{'id': 9, 'customer_id': 3, 'line_items': [{'product_id': 7}]}])
+        tool.call_tool('create_order_refund', {'order_id': 9, 'amount': '10'})
+        self.assertIsNone(self.mirror.get('order', 9))
+        self.assertIsNone(self.mirror.get('product', 7))
+        self.assertIsNone(self.mirror.get('customer', 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Concurrency Tests
+
+This module contains tests for per-key locks and request coalescing.
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from services.agent_service import AgentService
+from services.conversation_service import ConversationService
+from utils.concurrency import KeyedLocks, RequestCoalescer
+
+
+class TestConcurrency(unittest.TestCase):
+    """
+    Test cases for the concurrency helpers.
+    """
+
+    def test_keyed_lock_serializes_one_key_only(self):
+        """
+        Test that holders of one key run one at a time while other keys proceed.
+        """
+        locks = KeyedLocks()
+        active = {'a': 0, 'b': 0}
+        overlaps = []
+
+        def work(key):
+            with locks.hold(key):
+                active[key] += 1
+                overlaps.append(active[key])
+                time.sleep(0.01)
+                active[key] -= 1
+
+        threads = [threading.Thread(target=work, args=(key,)) for key in 'aabba']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(overlaps), 1)
+        self.assertEqual(len(locks), 0)
+
+    def test_keyed_lock_can_be_tried_without_waiting(self):
+        """
+        Test that a non-blocking hold reports a key held by another thread and leaves no lock behind.
+        """
+        locks = KeyedLocks()
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with locks.hold('a'):
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait(5)
+        with locks.hold('a', blocking=False) as acquired:
+            self.assertFalse(acquired)
+        with locks.hold('b', blocking=False) as acquired:
+            self.assertTrue(acquired)
+        release.set()
+        holder.join()
+
+        with locks.hold('a', blocking=False) as acquired:
+            self.assertTrue(acquired)
+        self.assertEqual(len(locks), 0)
+
+    def test_duplicate_in_flight_request_runs_once(self):
+        """
+        Test that a duplicate arriving while the original runs shares its result.
+        """
+        coalescer = RequestCoalescer(window=0)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def run():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return 'reply'
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(coalescer.run('k', run)))
+        first.start()
+        started.wait(timeout=5)
+        second = threading.Thread(target=lambda: results.append(coalescer.run('k', run)))
+        second.start()
+        time.sleep(0.05)
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(results, ['reply', 'reply'])
+        self.assertEqual(len(calls), 1)
+
+    def test_recent_result_is_reused_while_current(self):
+        """
+        Test that a retry after completion reuses the result unless it is no longer current.
+        """
+        coalescer = RequestCoalescer(window=30)
+        calls = []
+
+        def run():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(coalescer.run('k', run), 1)
+        self.assertEqual(coalescer.run('k', run), 1)
+        self.assertEqual(coalescer.run('k', run, is_current=lambda result: False), 2)
+        self.assertEqual(coalescer.coalesced, 1)
+
+    @patch('services.agent_service.get_openai_client', MagicMock())
+    @patch('services.agent_service.MCPTool', MagicMock())
+    @patch('services.agent_service.Agent')
+    def test_new_conversation_turns_run_concurrently(self, mock_agent):
+        """
+        Test that turns starting new conversations do not wait for each other.
+        """
+        both_running = threading.Barrier(2, timeout=5)
+
+        def run(message, *args, **kwargs):
+            # Fails with BrokenBarrierError if the turns run one at a time
+            both_running.wait()
+            return f"echo: {message}"
+
+        mock_agent.return_value.run.side_effect = run
+        storage_dir = tempfile.mkdtemp()
+        agent_service = AgentService('key', 'http://localhost:3000', startup='lazy', agent_pool_size=2,
+                                     conversation_service=ConversationService(storage_dir))
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda m=message: results.append(agent_service.process_message('', m)))
+            for message in ('first', 'second')
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(len({result['conversation_id'] for result in results}), 2)
+        agent_service.close()
+        agent_service.conversation_service.close()
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Context Builder Tests
+
+This module contains tests for token-budgeted conversation context.
+"""
+
+import unittest
+
+from models.conversation import Conversation
+from services.context_builder import ContextBuilder, SUMMARY_PREFIX
+
+
+def count_words(text):
+    return len(text.split())
+
+
+class TestContextBuilder(unittest.TestCase):
+    """
+    Test cases for the context builder.
+    """
+
+    def _conversation(self, turns):
+        conversation = Conversation(id='c1')
+        for i in range(turns):
+            conversation.add_message('user', f"question {i} " + 'word ' * 20)
+            conversation.add_message('assistant', f"answer {i} " + 'word ' * 20)
+        return conversation
+
+    def test_short_history_is_sent_unchanged(self):
+        """
+        Test that a history within budget is sent in full, without error notices.
+        """
+        conversation = self._conversation(2)
+        conversation.add_message('system', 'Error processing message: timeout')
+        builder = ContextBuilder(max_tokens=1000, token_counter=count_words)
+
+        context = builder.build(conversation)
+        self.assertEqual([m['role'] for m in context], ['user', 'assistant', 'user', 'assistant'])
+
+    def test_long_history_is_summarized(self):
+        """
+        Test that older turns are summarized and the newest ones kept within budget.
+        """
+        conversation = self._conversation(20)
+        builder = ContextBuilder(max_tokens=300, system_prompt='word ' * 50,
+                                 summary_max_tokens=60, token_counter=count_words)
+
+        context = builder.build(conversation)
+        self.assertTrue(context[0]['content'].startswith(SUMMARY_PREFIX))
+        self.assertEqual(context[-1]['content'], conversation.messages[-1].content)
+        self.assertLessEqual(sum(count_words(m['content']) + 4 for m in context) + 54, 300)
+
+    def test_token_counts_are_cached_per_message(self):
+        """
+        Test that each message is only counted once across turns.
+        """
+        calls = []
+
+        def counter(text):
+            calls.append(text)
+            return count_words(text)
+
+        conversation = self._conversation(5)
+        builder = ContextBuilder(max_tokens=10000, token_counter=counter)
+        builder.build(conversation)
+        counted = len(calls)
+
+        conversation.add_message('user', 'one more question')
+        builder.build(conversation)
+        self.assertEqual(len(calls), counted + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
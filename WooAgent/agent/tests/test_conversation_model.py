@@ -0,0 +1,89 @@
+"""
+Conversation Model Tests
+
+This module contains tests for the compact message representation.
+"""
+
+import os
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from models.conversation import Conversation, LazyMessageList, Message
+
+
+class TestConversationModel(unittest.TestCase):
+    """
+    Test cases for messages and lazily decoded conversations.
+    """
+
+    def _stored_conversation(self, count):
+        conversation = Conversation(id='c1')
+        for i in range(count):
+            conversation.add_message('user' if i % 2 == 0 else 'assistant', f"message {i}")
+        return conversation.to_dict()
+
+    def test_message_round_trips_timestamp(self):
+        """
+        Test that epoch timestamps convert back to the same datetime.
+        """
+        timestamp = datetime(2025, 3, 14, 15, 9, 26, 535897)
+        message = Message('user', 'hello', timestamp=timestamp)
+
+        self.assertEqual(message.timestamp, timestamp)
+        self.assertEqual(Message.from_dict(message.to_dict()), message)
+        self.assertIs(message.role, Message('user', 'again').role)
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), 'needs time.tzset')
+    def test_timestamps_in_the_repeated_dst_hour_round_trip(self):
+        """
+        Test that a message sent in the second 01:30 of a DST fall-back keeps its instant when serialized.
+        """
+        # Runs after patch.dict has restored the environment
+        self.addCleanup(time.tzset)
+        with patch.dict(os.environ, {'TZ': 'America/New_York'}):
+            time.tzset()
+            sent_at = datetime(2025, 11, 2, 6, 30, tzinfo=timezone.utc)
+            message = Message('user', 'hello', timestamp=sent_at)
+            local = message.timestamp
+
+            self.assertEqual((local.hour, local.minute, local.fold), (1, 30, 1))
+            self.assertEqual(Message('user', 'hello', timestamp=local), message)
+            self.assertEqual(Message.from_dict(message.to_dict()), message)
+            self.assertEqual(message.timestamp_utc, sent_at)
+
+    def test_conversation_has_no_instance_dict(self):
+        """
+        Test that conversations use slots rather than a per-instance dictionary.
+        """
+        self.assertFalse(hasattr(Conversation(id='c1'), '__dict__'))
+
+    def test_loading_decodes_only_what_is_read(self):
+        """
+        Test that counting, appending and reading the tail leave older messages undecoded.
+        """
+        conversation = Conversation.from_dict(self._stored_conversation(5000))
+        self.assertIsInstance(conversation.messages, LazyMessageList)
+
+        conversation.add_message('user', 'one more')
+        tail = conversation.messages[-3:]
+
+        self.assertEqual(len(conversation.messages), 5001)
+        self.assertEqual([m.content for m in tail], ['message 4998', 'message 4999', 'one more'])
+        decoded = sum(isinstance(item, Message) for item in conversation.messages._items)
+        self.assertEqual(decoded, 3)
+
+    def test_serializing_keeps_undecoded_messages(self):
+        """
+        Test that a loaded conversation serializes to the data it was loaded from.
+        """
+        data = self._stored_conversation(10)
+        conversation = Conversation.from_dict(data)
+        conversation.messages[3]
+
+        self.assertEqual(conversation.to_dict(), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,340 @@
+"""
+Conversation Service Tests
+
+This module contains tests for conversation persistence.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from services.conversation_service import ConversationService
+from storage import SQLiteConversationStorage
+from storage.journal import ConversationJournal
+from storage.migrate import migrate_directory
+
+
+class TestConversationService(unittest.TestCase):
+    """
+    Test cases for the conversation service.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def _journal_lines(self, conversation_id):
+        path = os.path.join(self.storage_dir, f"{conversation_id}.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return f.read().splitlines()
+
+    def test_messages_are_journaled_and_replayed(self):
+        """
+        Test that messages after the first are appended to the journal and reloaded.
+        """
+        service = ConversationService(self.storage_dir)
+        conversation = service.create_conversation({'source': 'test'})
+        for i in range(5):
+            service.add_message(conversation.id, 'user', f"message {i}")
+
+        # The first message writes the snapshot, the rest go to the journal
+        self.assertEqual(len(self._journal_lines(conversation.id)), 4)
+
+        reloaded = ConversationService(self.storage_dir).get_conversation(conversation.id)
+        self.assertEqual([m.content for m in reloaded.messages], [f"message {i}" for i in range(5)])
+        self.assertEqual(reloaded.metadata, {'source': 'test'})
+
+    def test_journal_is_compacted_into_snapshot(self):
+        """
+        Test that the journal is folded into the snapshot at the threshold.
+        """
+        service = ConversationService(self.storage_dir, compact_threshold=3)
+        conversation = service.create_conversation()
+        for i in range(4):
+            service.add_message(conversation.id, 'user', f"message {i}")
+
+        self.assertEqual(self._journal_lines(conversation.id), [])
+        with open(os.path.join(self.storage_dir, f"{conversation.id}.json")) as f:
+            self.assertEqual(len(json.load(f)['messages']), 4)
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), 'needs /proc to name synced files')
+    def test_compaction_syncs_snapshot_before_dropping_journal(self):
+        """
+        Test that with fsync enabled the snapshot and its directory are synced while the journal still exists.
+        """
+        service = ConversationService(self.storage_dir, compact_threshold=3, fsync='always')
+        conversation = service.create_conversation()
+        service.add_message(conversation.id, 'user', 'message 0')
+        journal_path = os.path.join(self.storage_dir, f"{conversation.id}.jsonl")
+        synced_paths = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            synced_paths.append((os.readlink(f"/proc/self/fd/{fd}"), os.path.exists(journal_path)))
+            real_fsync(fd)
+
+        with patch('os.fsync', side_effect=fsync):
+            for i in range(1, 4):
+                service.add_message(conversation.id, 'user', f"message {i}")
+
+        self.assertEqual(self._journal_lines(conversation.id), [])
+        snapshot_path = os.path.realpath(os.path.join(self.storage_dir, f"{conversation.id}.json"))
+        storage_dir = os.path.realpath(self.storage_dir)
+        self.assertIn((f"{snapshot_path}.tmp", True), synced_paths)
+        self.assertIn((storage_dir, True), synced_paths)
+        service.close()
+
+    def test_legacy_indented_files_are_read(self):
+        """
+        Test that snapshots and journals in the older dictionary form still load.
+        """
+        conversation_id = 'legacy'
+        with open(os.path.join(self.storage_dir, f"{conversation_id}.json"), 'w') as f:
+            json.dump({
+                'id': conversation_id,
+                'messages': [{'role': 'user', 'content': 'hi', 'timestamp': '2025-01-02T03:04:05.000006'}],
+                'metadata': {},
+                'created_at': '2025-01-02T03:04:05',
+                'updated_at': '2025-01-02T03:04:05'
+            }, f, indent=2)
+        with open(os.path.join(self.storage_dir, f"{conversation_id}.jsonl"), 'w') as f:
+            f.write(json.dumps({'role': 'assistant', 'content': 'hello', 'timestamp': '2025-01-02T03:04:09'}) + '\n')
+
+        service = ConversationService(self.storage_dir)
+        conversation = service.get_conversation(conversation_id)
+        self.assertEqual([m.content for m in conversation.messages], ['hi', 'hello'])
+        self.assertEqual(conversation.messages[0].timestamp.microsecond, 6)
+
+        # Rewriting the snapshot switches it to the compact form
+        service.save_conversation(conversation)
+        with open(os.path.join(self.storage_dir, f"{conversation_id}.json")) as f:
+            self.assertEqual(json.load(f)['messages'][1][:2], ['assistant', 'hello'])
+
+    def test_write_behind_flushes_on_close(self):
+        """
+        Test that queued write-behind entries are persisted when the service closes.
+        """
+        service = ConversationService(self.storage_dir, write_behind=True, flush_interval=60)
+        conversation = service.create_conversation()
+        for i in range(3):
+            service.add_message(conversation.id, 'assistant', f"reply {i}")
+        service.close()
+
+        reloaded = ConversationService(self.storage_dir).get_conversation(conversation.id)
+        self.assertEqual(len(reloaded.messages), 3)
+
+    def test_unsaved_conversation_is_saved_on_eviction(self):
+        """
+        Test that the cache stays bounded and evicted conversations survive.
+        """
+        service = ConversationService(self.storage_dir, max_cached=2)
+        conversations = [service.create_conversation({'n': i}) for i in range(3)]
+
+        self.assertEqual(len(service.active_conversations), 2)
+        self.assertEqual(service.cache_stats()['evictions'], 1)
+
+        reloaded = service.get_conversation(conversations[0].id)
+        self.assertEqual(reloaded.metadata, {'n': 0})
+
+    def test_conversation_stays_visible_while_its_eviction_saves_it(self):
+        """
+        Test that a lookup racing the save of an evicted conversation still finds it.
+        """
+        service = ConversationService(self.storage_dir, max_cached=1)
+        first = service.create_conversation({'n': 0})
+        saving, release = threading.Event(), threading.Event()
+        real_save = service.storage.save
+
+        def slow_save(conversation):
+            saving.set()
+            release.wait(5)
+            real_save(conversation)
+
+        with patch.object(service.storage, 'save', side_effect=slow_save):
+            creator = threading.Thread(target=service.create_conversation)
+            creator.start()
+            self.assertTrue(saving.wait(5))
+            self.assertIs(service.get_conversation(first.id), first)
+            release.set()
+            creator.join()
+
+        self.assertNotIn(first.id, service.active_conversations)
+        self.assertEqual(service.get_conversation(first.id).metadata, {'n': 0})
+
+    def test_listing_does_not_fill_cache(self):
+        """
+        Test that listing conversations does not pull them into the cache.
+        """
+        service = ConversationService(self.storage_dir)
+        for i in range(3):
+            conversation = service.create_conversation()
+            service.add_message(conversation.id, 'user', f"message {i}")
+
+        fresh = ConversationService(self.storage_dir)
+        self.assertEqual(len(fresh.list_conversations(limit=10)), 3)
+        self.assertEqual(len(fresh.active_conversations), 0)
+
+    def test_summaries_are_paginated_and_filtered(self):
+        """
+        Test listing summaries from the index with cursors and metadata filters.
+        """
+        service = ConversationService(self.storage_dir)
+        ids = []
+        for i in range(5):
+            conversation = service.create_conversation({'store': 'a' if i % 2 == 0 else 'b'})
+            service.add_message(conversation.id, 'user', 'hello')
+            service.add_message(conversation.id, 'assistant', 'hi')
+            ids.append(conversation.id)
+
+        first, cursor = service.list_conversation_summaries(limit=3)
+        second, last_cursor = service.list_conversation_summaries(limit=3, cursor=cursor)
+        self.assertEqual([s.id for s in first + second], list(reversed(ids)))
+        self.assertIsNone(last_cursor)
+        self.assertEqual(first[0].message_count, 2)
+
+        filtered, _ = service.list_conversation_summaries(limit=10, metadata_filter={'store': 'a'})
+        self.assertEqual(len(filtered), 3)
+
+    def test_index_is_rebuilt_from_files(self):
+        """
+        Test that a missing index is rebuilt from the conversation files.
+        """
+        service = ConversationService(self.storage_dir)
+        conversation = service.create_conversation()
+        for i in range(3):
+            service.add_message(conversation.id, 'user', f"message {i}")
+        service.close()
+        for suffix in ('', '-wal', '-shm'):
+            path = os.path.join(self.storage_dir, f"index.sqlite3{suffix}")
+            if os.path.exists(path):
+                os.remove(path)
+
+        summaries, _ = ConversationService(self.storage_dir).list_conversation_summaries()
+        self.assertEqual([(s.id, s.message_count) for s in summaries], [(conversation.id, 3)])
+
+
+class TestSQLiteConversationStorage(unittest.TestCase):
+    """
+    Test cases for the SQLite storage backend.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.storage_dir, 'conversations.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def test_messages_are_stored_as_rows(self):
+        """
+        Test that conversations round-trip through the SQLite backend.
+        """
+        service = ConversationService(storage=SQLiteConversationStorage(self.db_path))
+        conversation = service.create_conversation({'store': 'a'})
+        for i in range(4):
+            service.add_message(conversation.id, 'user', f"message {i}")
+        service.close()
+
+        storage = SQLiteConversationStorage(self.db_path)
+        reloaded = storage.get(conversation.id)
+        self.assertEqual([m.content for m in reloaded.messages], [f"message {i}" for i in range(4)])
+        summaries, _ = storage.list(metadata_filter={'store': 'a'})
+        self.assertEqual(summaries[0].message_count, 4)
+
+        self.assertTrue(storage.delete(conversation.id))
+        self.assertIsNone(storage.get(conversation.id))
+
+    def test_migrate_file_directory(self):
+        """
+        Test importing a file storage directory into SQLite.
+        """
+        files_dir = os.path.join(self.storage_dir, 'files')
+        service = ConversationService(files_dir)
+        ids = []
+        for i in range(3):
+            conversation = service.create_conversation()
+            service.add_message(conversation.id, 'user', 'hello')
+            service.add_message(conversation.id, 'assistant', 'hi')
+            ids.append(conversation.id)
+        service.close()
+
+        target = SQLiteConversationStorage(self.db_path)
+        self.assertEqual(migrate_directory(files_dir, target), 3)
+        self.assertEqual(len(target.get(ids[0]).messages), 2)
+
+
+
+class TestConversationJournal(unittest.TestCase):
+    """
+    Test cases for the conversation journal's durability.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.synced = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            self.synced.append(os.readlink(f"/proc/self/fd/{fd}"))
+            real_fsync(fd)
+
+        fsync_patch = patch('os.fsync', side_effect=fsync)
+        fsync_patch.start()
+        self.addCleanup(fsync_patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def test_periodic_fsync_runs_without_further_writes(self):
+        """
+        Test that a lone append is synced within the interval even without write-behind.
+        """
+        journal = ConversationJournal(self.storage_dir, fsync='periodic', fsync_interval=0.05)
+        journal.append('c1', {'content': 'hello'})
+        self.assertEqual(self.synced, [])
+
+        deadline = time.monotonic() + 2
+        while not self.synced and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.synced, [journal.journal_path('c1')])
+        journal.close()
+
+    def test_close_syncs_before_the_interval(self):
+        """
+        Test that closing the journal fsyncs written appends however recently the last sync ran.
+        """
+        journal = ConversationJournal(self.storage_dir, write_behind=True, flush_interval=60,
+                                      fsync='periodic', fsync_interval=60)
+        journal.append('c1', {'content': 'hello'})
+        journal.close()
+        self.assertEqual(self.synced, [journal.journal_path('c1')])
+
+    def test_failed_flush_keeps_appends_queued(self):
+        """
+        Test that appends a flush could not write are kept and written by the next flush.
+        """
+        journal = ConversationJournal(self.storage_dir, write_behind=True, flush_interval=60)
+        journal.append('c1', {'content': 'one'})
+        journal.append('c1', {'content': 'two'})
+        with patch('storage.journal.open', side_effect=OSError('No space left on device'), create=True):
+            with self.assertRaises(OSError):
+                journal.flush()
+        journal.append('c1', {'content': 'three'})
+        self.assertEqual([record['content'] for record in journal.read('c1')], ['one', 'two', 'three'])
+
+        journal.close()
+        with open(journal.journal_path('c1')) as f:
+            self.assertEqual([json.loads(line)['content'] for line in f], ['one', 'two', 'three'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Logging Configuration Tests
+
+This module contains tests for the queued JSON logging setup.
+"""
+
+import os
+import sys
+import json
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from utils.logging_config import (DebugSamplingFilter, JSONFormatter, setup_logging, shutdown_logging,
+                                  use_worker_log_file)
+from utils.tracing import start_trace
+
+
+class TestLoggingConfig(unittest.TestCase):
+    """
+    Test cases for the logging setup.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.temp_dir.name, 'agent.log')
+        self.logger = logging.getLogger('wooagent')
+        self.saved_handlers = self.logger.handlers[:]
+        self.saved_level = self.logger.level
+        self.logger.handlers = []
+
+    def tearDown(self):
+        shutdown_logging()
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = self.saved_handlers
+        self.logger.setLevel(self.saved_level)
+        if hasattr(self.logger, '_wooagent_configured'):
+            del self.logger._wooagent_configured
+        self.temp_dir.cleanup()
+
+    def test_queued_json_lines_and_idempotent_setup(self):
+        """
+        Test that records reach the file as JSON lines with the trace ID, and setup runs once.
+        """
+        env = {'LOG_FILE': self.log_file, 'LOG_LEVEL': 'info', 'LOG_QUEUE': 'true'}
+        with patch.dict(os.environ, env), patch('sys.stdout'):
+            logger = setup_logging()
+            self.assertIs(setup_logging(), logger)
+            self.assertEqual(len(logger.handlers), 1)
+
+            with start_trace('req-42'):
+                logger.info("Saved %s messages", 3, extra={'conversation_id': 'c1'})
+            logger.debug("not logged at info level")
+            shutdown_logging()
+
+        with open(self.log_file) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['message'], 'Saved 3 messages')
+        self.assertEqual(entries[0]['trace_id'], 'req-42')
+        self.assertEqual(entries[0]['conversation_id'], 'c1')
+        self.assertEqual(entries[0]['level'], 'info')
+
+    def test_workers_log_to_their_own_files(self):
+        """
+        Test that a worker's records go to a file named by its index, not the supervisor's file.
+        """
+        for queued in ('true', 'false'):
+            with self.subTest(queued=queued):
+                env = {'LOG_FILE': self.log_file, 'LOG_LEVEL': 'info', 'LOG_QUEUE': queued}
+                with patch.dict(os.environ, env), patch('sys.stdout'):
+                    logger = setup_logging()
+                    use_worker_log_file(2)
+                    logger.info("Worker record")
+                    shutdown_logging()
+
+                with open(self.log_file) as f:
+                    self.assertEqual(f.read(), '')
+                worker_file = os.path.join(self.temp_dir.name, 'agent-worker2.log')
+                with open(worker_file) as f:
+                    self.assertEqual(json.loads(f.read())['message'], 'Worker record')
+                self.tearDown()
+                self.setUp()
+
+    def test_json_formatter_includes_exception(self):
+        """
+        Test that exceptions are kept in a single JSON line.
+        """
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = self.logger.makeRecord('wooagent', logging.ERROR, __file__, 1, 'failed', None,
+                                            sys.exc_info())
+        line = JSONFormatter().format(record)
+        self.assertNotIn('\n', line)
+        self.assertIn('ValueError: boom', json.loads(line)['exception'])
+
+    def test_debug_sampling(self):
+        """
+        Test that only DEBUG records are sampled.
+        """
+        sampler = DebugSamplingFilter(0.0)
+        debug = logging.LogRecord('wooagent', logging.DEBUG, __file__, 1, 'hit', None, None)
+        warning = logging.LogRecord('wooagent', logging.WARNING, __file__, 1, 'slow', None, None)
+        self.assertFalse(sampler.filter(debug))
+        self.assertTrue(sampler.filter(warning))
+        self.assertTrue(DebugSamplingFilter(1.0).filter(debug))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Metrics Tests
+
+This module contains tests for the metrics registry and request tracing.
+"""
+
+import logging
+import threading
+import time
+import unittest
+
+from utils.metrics import MetricsRegistry, record_stage, timed_model_call
+from utils.tracing import TraceIdFilter, current_trace_id, start_trace
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test cases for metrics and tracing.
+    """
+
+    def test_render_prometheus_text(self):
+        """
+        Test that counters and cumulative histogram buckets are rendered in the text format.
+        """
+        registry = MetricsRegistry()
+        errors = registry.counter('test_errors_total', 'Errors', ('stage',))
+        latency = registry.histogram('test_seconds', 'Latency', ('op',), buckets=(0.1, 1.0))
+        errors.inc(stage='tool')
+        errors.inc(2, stage='tool')
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, op='save')
+
+        text = registry.render()
+        self.assertIn('# TYPE test_errors_total counter', text)
+        self.assertIn('test_errors_total{stage="tool"} 3', text)
+        self.assertIn('test_seconds_bucket{op="save",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{op="save",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{op="save",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count{op="save"} 3', text)
+        self.assertIs(registry.counter('test_errors_total', 'Errors', ('stage',)), errors)
+        with self.assertRaises(ValueError):
+            errors.inc(kind='other')
+
+        registry.set_constant_labels(worker=2)
+        text = registry.render()
+        self.assertIn('test_errors_total{worker="2",stage="tool"} 3', text)
+        self.assertIn('test_seconds_bucket{worker="2",op="save",le="+Inf"} 3', text)
+
+    def test_model_time_excludes_tool_calls(self):
+        """
+        Test that tool time recorded during a model call is not counted as model time.
+        """
+        with start_trace() as trace:
+            with timed_model_call():
+                time.sleep(0.02)
+                record_stage('tools', 0.015)
+
+        self.assertAlmostEqual(trace.stages['tools'], 0.015)
+        self.assertLess(trace.stages['model'], 0.015)
+        self.assertIn('total', trace.breakdown_ms())
+
+    def test_trace_id_scoping_and_log_filter(self):
+        """
+        Test that nested traces inherit the trace ID and log records carry it.
+        """
+        self.assertIsNone(current_trace_id())
+        with start_trace('req-1') as outer:
+            with start_trace() as inner:
+                self.assertEqual(inner.trace_id, 'req-1')
+                self.assertIsNot(inner, outer)
+                record = logging.LogRecord('wooagent', logging.INFO, __file__, 1, 'msg', None, None)
+                TraceIdFilter().filter(record)
+                self.assertEqual(record.trace_id, 'req-1')
+
+            # Threads do not inherit the trace unless the context is copied
+            seen = []
+            thread = threading.Thread(target=lambda: seen.append(current_trace_id()))
+            thread.start()
+            thread.join()
+            self.assertEqual(seen, [None])
+        self.assertIsNone(current_trace_id())
+
+
+if __name__ == '__main__':
+    unittest.main()
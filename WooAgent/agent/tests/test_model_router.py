@@ -0,0 +1,182 @@
+"""
+Model Router Tests
+
+This module contains tests for routing turns between the fast and full models.
+"""
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from services.agent_service import AgentService
+from services.conversation_service import ConversationService
+from services.model_router import FAST, FULL, ModelRouter, ModelTier, classify_message
+from utils.outbound import OutboundScheduler, RetryPolicy, Upstream
+
+
+class RateLimitError(Exception):
+    """
+    Imitates an API client's rate limit error.
+    """
+
+    status_code = 429
+
+
+class FakeAgent:
+    """
+    Stand-in for an agent whose replies are chosen by the test.
+    """
+
+    def __init__(self, client=None, model=None, tools=None):
+        self.client = client
+        self.model = model
+        self.tools = []
+        self.reply = None
+
+    def register_tool(self, tool):
+        self.tools.append(tool)
+
+    def set_system_prompt(self, prompt):
+        self.prompt = prompt
+
+    def run(self, message, context=None):
+        return self.reply(self) if callable(self.reply) else self.reply
+
+
+class TestModelRouter(unittest.TestCase):
+    """
+    Test cases for the model router.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def test_heuristics_route_lookups_to_the_fast_tier(self):
+        """
+        Test that plain lookups go to the fast tier and writes, multi-step requests and confirmations do not.
+        """
+        self.assertEqual(classify_message("What's the price of the Blue Hoodie?").tier, FAST)
+        self.assertEqual(classify_message('Show me order #1234').tier, FAST)
+        self.assertEqual(classify_message('Refund order #1234').reason, 'write')
+        self.assertEqual(classify_message('List low-stock products, then restock them').tier, FULL)
+        self.assertEqual(classify_message('yes, go ahead').reason, 'confirmation')
+        self.assertIsNone(classify_message('Hoodies for the autumn campaign'))
+
+    def test_unplaced_messages_use_the_classifier(self):
+        """
+        Test that the classifier decides what the heuristics cannot, and that a single tier skips routing.
+        """
+        full = ModelTier(FULL, 'gpt-4', 'prompt')
+        fast = ModelTier(FAST, 'gpt-4o-mini', 'prompt', frozenset({'get_product'}))
+        classifier = MagicMock(return_value=FAST)
+
+        router = ModelRouter(full, fast, classifier=classifier)
+        self.assertEqual(router.route('Hoodies for the autumn campaign').reason, 'classifier')
+        self.assertEqual(router.route('Delete coupon SUMMER').tier, FULL)
+        classifier.assert_called_once_with('Hoodies for the autumn campaign')
+
+        self.assertEqual(ModelRouter(full).route('Show me order #1234').reason, 'single_tier')
+
+    @patch('services.agent_service.MCPTool', MagicMock())
+    @patch('services.agent_service.get_openai_client', MagicMock())
+    @patch('services.agent_service.Agent', FakeAgent)
+    def test_fast_tier_escalates_to_the_full_model(self):
+        """
+        Test that a fast-tier run reaching for a write tool, or declining, is rerun on the full model.
+        """
+        agent_service = AgentService('key', 'http://localhost:3000', fast_model='gpt-4o-mini',
+                                     conversation_service=ConversationService(self.storage_dir),
+                                     answer_cache_ttl=0)
+        with agent_service.agent_pool.checkout() as agents:
+            self.assertEqual((agents[FAST].model, agents[FULL].model), ('gpt-4o-mini', 'gpt-4'))
+            agents[FAST].reply = lambda agent: agent.tools[0].call_tool('update_order', {'id': 1})
+            agents[FULL].reply = 'Order updated'
+
+        result = agent_service.process_message('', 'What is the status of order #1?')
+        self.assertEqual(result['response'], 'Order updated')
+
+        with agent_service.agent_pool.checkout() as agents:
+            agents[FAST].reply = 'ESCALATE'
+        result = agent_service.process_message(result['conversation_id'], 'Show me order #2')
+        self.assertEqual(result['response'], 'Order updated')
+
+        with agent_service.agent_pool.checkout() as agents:
+            agents[FAST].reply = 'Order #3 is processing'
+            agents[FULL].reply = None
+        result = agent_service.process_message(result['conversation_id'], 'Show me order #3')
+        self.assertEqual(result['response'], 'Order #3 is processing')
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+    @patch('services.agent_service.MCPTool', MagicMock())
+    @patch('services.agent_service.Agent', FakeAgent)
+    def test_fast_tier_escalates_without_retrying(self):
+        """
+        Test that a failed fast-tier model request is not retried but hands the turn to the full model.
+        """
+        requested = []
+
+        def create(model, messages):
+            requested.append(model)
+            if model == 'gpt-4o-mini':
+                raise RateLimitError('rate limited')
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='Full reply',
+                                                                                    tool_calls=None))])
+
+        client = MagicMock()
+        client.chat.completions.create.side_effect = create
+        scheduler = OutboundScheduler(Upstream('openai', retry=RetryPolicy(max_attempts=3, base_delay=0.001)),
+                                      Upstream('mcp'))
+        with patch('services.agent_service.get_openai_client', MagicMock(return_value=client)):
+            agent_service = AgentService('key', 'http://localhost:3000', fast_model='gpt-4o-mini',
+                                         scheduler=scheduler,
+                                         conversation_service=ConversationService(self.storage_dir),
+                                         answer_cache_ttl=0)
+        with agent_service.agent_pool.checkout() as agents:
+            for agent in agents.values():
+                agent.reply = lambda agent: agent.client.chat.completions.create(
+                    model=agent.model, messages=[]).choices[0].message.content
+
+        result = agent_service.process_message('', 'Show me order #1')
+        self.assertEqual(result['response'], 'Full reply')
+        self.assertEqual(requested, ['gpt-4o-mini', 'gpt-4'])
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+    @patch('services.agent_service.MCPTool', MagicMock())
+    @patch('services.agent_service.Agent', FakeAgent)
+    def test_streaming_turn_routes_before_taking_the_openai_slot(self):
+        """
+        Test that a streamed turn's classifier call does not wait on the slot the turn itself holds.
+        """
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices[0].message.content = 'fast'
+        scheduler = OutboundScheduler(Upstream('openai', max_concurrency=1, max_wait=0.5), Upstream('mcp'))
+        with patch('services.agent_service.get_openai_client', MagicMock(return_value=client)):
+            agent_service = AgentService('key', 'http://localhost:3000', fast_model='gpt-4o-mini',
+                                         router_model='gpt-4o-mini', scheduler=scheduler,
+                                         conversation_service=ConversationService(self.storage_dir),
+                                         answer_cache_ttl=0)
+            with agent_service.agent_pool.checkout() as agents:
+                agents[FAST].reply = 'Fast reply'
+                agents[FULL].reply = 'Full reply'
+
+            async def stream():
+                return [event async for event in agent_service.stream_message('', 'Hoodies for the autumn campaign')]
+
+            events = asyncio.run(stream())
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(events[-1]['response'], 'Fast reply')
+        client.chat.completions.create.assert_called_once()
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Outbound Scheduling Tests
+
+This module contains tests for retries, circuit breaking and priority lanes
+of calls to upstream services.
+"""
+
+import time
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from services.agent_client import AgentClient
+from utils.outbound import (BATCH, INTERACTIVE, CircuitBreaker, CircuitOpenError, RetryPolicy, Upstream,
+                            UpstreamBusyError, priority, retry_after)
+
+
+class RateLimitError(Exception):
+    """
+    Imitates an API client's rate limit error carrying the response headers.
+    """
+
+    def __init__(self, retry_after_seconds):
+        super().__init__('rate limited')
+        self.status_code = 429
+        self.headers = {'retry-after': str(retry_after_seconds)}
+
+
+class TestOutbound(unittest.TestCase):
+    """
+    Test cases for the outbound scheduler.
+    """
+
+    def test_transient_failures_are_retried_after_retry_after(self):
+        """
+        Test that rate-limited calls are retried after the requested wait, and other errors are not.
+        """
+        upstream = Upstream('openai', retry=RetryPolicy(max_attempts=3, base_delay=0.001))
+        attempts = []
+
+        def flaky():
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                raise RateLimitError(0.02)
+            return 'ok'
+
+        self.assertEqual(upstream.call(flaky), 'ok')
+        self.assertEqual(len(attempts), 3)
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.02)
+        self.assertEqual(retry_after(RateLimitError(1.5)), 1.5)
+
+        calls = []
+
+        def invalid():
+            calls.append(1)
+            raise ValueError('bad request')
+
+        with self.assertRaises(ValueError):
+            upstream.call(invalid)
+        self.assertEqual(len(calls), 1)
+
+        # A failed attempt the caller marks unsafe to repeat is not retried
+        def limited():
+            calls.append(1)
+            raise RateLimitError(0)
+
+        with self.assertRaises(RateLimitError):
+            upstream.call(limited, retryable=lambda error: False)
+        self.assertEqual(len(calls), 2)
+
+    def test_circuit_opens_and_probes(self):
+        """
+        Test that consecutive failures open the circuit and a successful probe closes it.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        upstream = Upstream('mcp', retry=RetryPolicy(max_attempts=1), breaker=breaker)
+
+        def down():
+            raise ConnectionError('refused')
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                upstream.call(down)
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            upstream.call(lambda: 'not sent')
+
+        time.sleep(0.06)
+        self.assertEqual(upstream.call(lambda: 'probe'), 'probe')
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_interactive_calls_go_before_waiting_batch_calls(self):
+        """
+        Test that when the upstream is saturated, interactive callers are admitted ahead of batch ones.
+        """
+        upstream = Upstream('openai', max_concurrency=1)
+        release = threading.Event()
+        order = []
+
+        def occupy():
+            upstream.call(release.wait)
+
+        def enqueue(lane, label):
+            with priority(lane):
+                upstream.call(lambda: order.append(label))
+
+        blocker = threading.Thread(target=occupy)
+        blocker.start()
+        time.sleep(0.02)
+        threads = [threading.Thread(target=enqueue, args=(BATCH, 'batch'))]
+        threads[0].start()
+        time.sleep(0.02)
+        threads.append(threading.Thread(target=enqueue, args=(INTERACTIVE, 'interactive')))
+        threads[1].start()
+        time.sleep(0.02)
+
+        release.set()
+        for thread in [blocker] + threads:
+            thread.join(timeout=2)
+        self.assertEqual(order, ['interactive', 'batch'])
+
+
+    def test_agent_model_requests_release_the_upstream_before_tool_calls(self):
+        """
+        Test that an agent holds its OpenAI turn for each model request only, retrying it alone.
+        """
+        upstream = Upstream('openai', max_concurrency=1, max_wait=0.05,
+                            retry=RetryPolicy(max_attempts=2, base_delay=0.001))
+        calls = [('get_order', '{"id": 1}'), ('get_order', '{"id": 2}')]
+        step = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[
+            SimpleNamespace(function=SimpleNamespace(name=name, arguments=arguments)) for name, arguments in calls
+        ]))])
+        chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(tool_calls=[
+            SimpleNamespace(index=index, function=SimpleNamespace(name=name, arguments=arguments))
+        ]))]) for index, (name, arguments) in enumerate(calls)]
+        client = MagicMock()
+        client.chat.completions.create.side_effect = [RateLimitError(0), step, iter(chunks)]
+
+        def upstream_free():
+            try:
+                return upstream.call(lambda: True)
+            except UpstreamBusyError:
+                return False
+
+        tool = MagicMock()
+        tool.prefetch.side_effect = lambda step_calls: self.assertTrue(upstream_free())
+        agent_client = AgentClient(client, tool, upstream)
+
+        self.assertIs(agent_client.chat.completions.create(model='gpt-4', messages=[]), step)
+        relayed = []
+        for chunk in agent_client.chat.completions.create(model='gpt-4', messages=[], stream=True):
+            relayed.append(chunk)
+            self.assertFalse(upstream_free())
+
+        self.assertEqual(relayed, chunks)
+        self.assertEqual(client.chat.completions.create.call_count, 3)
+        expected = [('get_order', {'id': 1}), ('get_order', {'id': 2})]
+        self.assertEqual([call.args[0] for call in tool.prefetch.call_args_list], [expected, expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Conversation Search Tests
+
+This module contains tests for the full-text index of conversation messages
+and searching it through the services.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from services.agent_service import AgentService
+from services.conversation_service import ConversationService
+from storage import ConversationSearchIndex
+
+
+class TestConversationSearch(unittest.TestCase):
+    """
+    Test cases for indexing and searching conversation messages.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.storage_dir, 'search', 'search.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def test_added_messages_are_found_ranked_and_dropped_with_conversation(self):
+        """
+        Test that messages are indexed as they are added, ranked with snippets, and removed on delete.
+        """
+        service = ConversationService(self.storage_dir, search_index=ConversationSearchIndex(self.index_path))
+        first = service.create_conversation().id
+        service.add_message(first, 'user', 'Please refund order #1042, the hoodie arrived torn')
+        service.add_message(first, 'assistant', 'I refunded order #1042. The refund takes 3 days.')
+        second = service.create_conversation().id
+        service.add_message(second, 'user', 'Where is my order #77?')
+
+        hits = service.search_conversations('refund order')
+        self.assertEqual([hit.conversation_id for hit in hits], [first, first])
+        self.assertGreater(hits[0].score, hits[1].score)
+        self.assertIn('[refunded]', hits[0].snippet)
+        self.assertEqual(service.search_conversations('order #77')[0].conversation_id, second)
+        self.assertEqual(service.search_conversations('blue socks'), [])
+
+        service.delete_conversation(first)
+        self.assertEqual(service.search_conversations('refund'), [])
+        self.assertEqual(service.search_index.count(), 1)
+        service.close()
+
+        disabled = ConversationService(self.storage_dir)
+        self.assertIsNone(disabled.search_conversations('order'))
+        disabled.close()
+
+    def test_filters_and_candidate_window(self):
+        """
+        Test role, time and conversation filters, and that only the newest matches are ranked.
+        """
+        index = ConversationSearchIndex(self.index_path, candidates=2)
+        service = ConversationService(self.storage_dir, search_index=index)
+        conversation_ids = []
+        for text in ('hoodie out of stock', 'hoodie back in stock', 'hoodie in stock, ordered'):
+            conversation_id = service.create_conversation().id
+            service.add_message(conversation_id, 'user', 'Is the hoodie in stock?')
+            service.add_message(conversation_id, 'assistant', text)
+            conversation_ids.append(conversation_id)
+
+        self.assertEqual(len(index.search('stock', limit=10)), 2)
+        index.candidates = 10
+        self.assertEqual(len(index.search('stock', limit=10)), 6)
+        self.assertEqual({hit.role for hit in index.search('stock', roles='assistant')}, {'assistant'})
+        self.assertEqual(len(index.search('stock', conversation_id=conversation_ids[1])), 2)
+
+        now = datetime.now()
+        self.assertEqual(index.search('stock', until=now - timedelta(hours=1)), [])
+        self.assertEqual(len(index.search('stock', limit=10, since=now - timedelta(hours=1))), 6)
+        service.close()
+
+    def test_agent_service_validates_filters(self):
+        """
+        Test that the agent service parses ISO dates and rejects unknown filters.
+        """
+        service = ConversationService(self.storage_dir, search_index=ConversationSearchIndex(self.index_path))
+        conversation_id = service.create_conversation().id
+        service.add_message(conversation_id, 'user', 'Cancel my subscription')
+        agent_service = AgentService('key', 'http://localhost:3000', startup='lazy', conversation_service=service)
+
+        since = (datetime.now() - timedelta(minutes=5)).isoformat()
+        found = agent_service.search_conversations('cancel', filters={'role': 'user', 'since': since})
+        self.assertTrue(found['enabled'])
+        self.assertEqual([result['conversation_id'] for result in found['results']], [conversation_id])
+
+        with self.assertRaises(ValueError):
+            agent_service.search_conversations('cancel', filters={'until': 'yesterday'})
+        with self.assertRaises(ValueError):
+            agent_service.search_conversations('cancel', filters={'customer': 'jo'})
+        agent_service.close()
+        service.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+"""
+Server Tests
+
+This module contains tests for the agent HTTP server.
+"""
+
+import os
+import hmac
+import json
+import socket
+import shutil
+import tempfile
+import base64
+import asyncio
+import hashlib
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import AioHTTPTestCase
+
+from api.server import _start_metrics_server, _stop_metrics_server, create_app
+from services.batch_runner import run_on_server
+from utils.outbound import BATCH, current_priority
+from utils.tracing import current_trace_id
+
+
+class FakeAgentService:
+    """
+    Minimal stand-in for AgentService that blocks until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.conversations = {}
+        self.trace_ids = []
+        self.lanes = []
+        self.ready = False
+
+    def process_message(self, conversation_id, message, request_id=None):
+        self.trace_ids.append(current_trace_id())
+        self.lanes.append(current_priority())
+        self.release.wait(timeout=5)
+        return {'conversation_id': conversation_id, 'response': f"echo: {message}", 'success': True}
+
+    async def stream_message(self, conversation_id, message, executor=None):
+        yield {'type': 'start', 'conversation_id': conversation_id}
+        for word in message.split():
+            yield {'type': 'delta', 'content': word}
+        yield {'type': 'done', 'conversation_id': conversation_id, 'response': message, 'success': True}
+
+    def list_conversations_page(self, limit=10, cursor=None, metadata_filter=None):
+        return {'conversations': [{'id': cid} for cid in list(self.conversations)[:limit]], 'next_cursor': None}
+
+    def get_conversation_history(self, conversation_id):
+        return self.conversations.get(conversation_id)
+
+    def create_new_conversation(self, metadata=None):
+        self.conversations['c1'] = []
+        return {'conversation_id': 'c1', 'created_at': '2025-01-01T00:00:00'}
+
+    def search_conversations(self, query, limit=10, filters=None):
+        return {'enabled': True, 'results': [{'query': query, 'limit': limit, 'filters': filters}]}
+
+
+class TestAgentServer(AioHTTPTestCase):
+    """
+    Test cases for the agent HTTP server.
+    """
+
+    async def get_application(self):
+        self.agent_service = FakeAgentService()
+        self.catalog_sync = MagicMock()
+        self.catalog_sync.apply_webhook.return_value = True
+        return create_app(self.agent_service, max_workers=1, max_queue=1,
+                          catalog_sync=self.catalog_sync, webhook_secret='secret')
+
+    async def test_message_round_trip(self):
+        """
+        Test that a message is processed and the agent's reply returned.
+        """
+        self.agent_service.release.set()
+        resp = await self.client.post('/message', json={'conversation_id': 'c1', 'message': 'hi'})
+        self.assertEqual(resp.status, 200)
+        data = await resp.json()
+        self.assertEqual(data['response'], 'echo: hi')
+
+    async def test_trace_id_reaches_worker_thread(self):
+        """
+        Test that the caller's request ID is the trace ID of the turn and is echoed back.
+        """
+        self.agent_service.release.set()
+        resp = await self.client.post('/message', json={'message': 'hi'}, headers={'X-Request-ID': 'abc123'})
+        self.assertEqual(resp.headers['X-Request-ID'], 'abc123')
+        self.assertEqual(self.agent_service.trace_ids, ['abc123'])
+
+    async def test_metrics_endpoint(self):
+        """
+        Test that metrics are served in the Prometheus text format.
+        """
+        resp = await self.client.get('/metrics')
+        self.assertEqual(resp.status, 200)
+        self.assertTrue(resp.headers['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE wooagent_turn_seconds histogram', await resp.text())
+
+    async def test_liveness_and_readiness(self):
+        """
+        Test that the server is live while the agent connects, and ready once it has.
+        """
+        resp = await self.client.get('/health/live')
+        self.assertEqual(resp.status, 200)
+        resp = await self.client.get('/health/ready')
+        self.assertEqual(resp.status, 503)
+        self.assertEqual((await resp.json())['status'], 'starting')
+
+        self.agent_service.ready = True
+        resp = await self.client.get('/health/ready')
+        self.assertEqual(resp.status, 200)
+
+    async def test_message_required(self):
+        """
+        Test that a request without a message is rejected.
+        """
+        resp = await self.client.post('/message', json={'conversation_id': 'c1'})
+        self.assertEqual(resp.status, 400)
+
+    async def test_backpressure_when_queue_full(self):
+        """
+        Test that requests beyond the worker and queue limits get a 429.
+        """
+        requests = [
+            asyncio.ensure_future(self.client.post('/message', json={'message': f"m{i}"}))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.1)
+
+        resp = await self.client.post('/message', json={'message': 'overflow'})
+        self.assertEqual(resp.status, 429)
+        self.assertIn('Retry-After', resp.headers)
+
+        self.agent_service.release.set()
+        statuses = [r.status for r in await asyncio.gather(*requests)]
+        self.assertEqual(statuses, [200, 200])
+
+    async def test_message_stream(self):
+        """
+        Test that a streamed reply arrives as server-sent events.
+        """
+        resp = await self.client.post('/message/stream', json={'conversation_id': 'c1', 'message': 'hello there'})
+        self.assertEqual(resp.headers['Content-Type'], 'text/event-stream')
+        body = await resp.text()
+        events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+        self.assertEqual(events, ['start', 'delta', 'delta', 'done'])
+
+    async def test_conversation_endpoints(self):
+        """
+        Test creating, listing and fetching conversations.
+        """
+        resp = await self.client.post('/conversations', json={'metadata': {'source': 'test'}})
+        self.assertEqual(resp.status, 201)
+
+        resp = await self.client.get('/conversations', params={'limit': 5})
+        self.assertEqual(await resp.json(), [{'id': 'c1'}])
+
+        resp = await self.client.get('/conversations/c1')
+        self.assertEqual((await resp.json())['messages'], [])
+
+        resp = await self.client.get('/conversations/missing')
+        self.assertEqual(resp.status, 404)
+
+    async def test_search_endpoint(self):
+        """
+        Test that searches pass their filters on and invalid parameters are rejected.
+        """
+        resp = await self.client.get('/search', params=[('q', 'refund'), ('role', 'user'), ('role', 'assistant'),
+                                                         ('since', '2025-01-01')])
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(await resp.json(), [{
+            'query': 'refund', 'limit': 10, 'filters': {'since': '2025-01-01', 'role': ['user', 'assistant']}
+        }])
+
+        resp = await self.client.get('/search')
+        self.assertEqual(resp.status, 400)
+        resp = await self.client.get('/search', params={'q': 'refund', 'limit': 0})
+        self.assertEqual(resp.status, 400)
+
+    async def test_woocommerce_webhook_requires_signature(self):
+        """
+        Test that signed webhook deliveries reach the catalog sync and unsigned ones are refused.
+        """
+        body = b'{"id": 7, "name": "Hoodie"}'
+        signature = base64.b64encode(hmac.new(b'secret', body, hashlib.sha256).digest()).decode('ascii')
+
+        resp = await self.client.post('/webhooks/woocommerce', data=body,
+                                      headers={'X-WC-Webhook-Topic': 'product.updated'})
+        self.assertEqual(resp.status, 401)
+
+        resp = await self.client.post('/webhooks/woocommerce', data=body, headers={
+            'X-WC-Webhook-Topic': 'product.updated',
+            'X-WC-Webhook-Signature': signature
+        })
+        self.assertEqual(resp.status, 200)
+        self.catalog_sync.apply_webhook.assert_called_once_with('product.updated', {'id': 7, 'name': 'Hoodie'})
+
+    async def test_batch_runs_in_the_server_process(self):
+        """
+        Test that a batch submitted to the server runs in its batch lane and its results are streamed back.
+        """
+        self.agent_service.release.set()
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        results_path = os.path.join(temp_dir, 'results.jsonl')
+        with open(results_path, 'w') as f:
+            f.write(json.dumps({'id': 'done', 'success': True}) + '\n')
+        tasks = [{'id': 'done', 'message': 'skipped'}, {'id': '2', 'message': 'one'}, {'id': 'x', 'message': 'two'}]
+
+        summary = await asyncio.get_running_loop().run_in_executor(
+            None, run_on_server, str(self.client.make_url('')), tasks, results_path)
+
+        self.assertEqual((summary.succeeded, summary.failed, summary.skipped), (2, 0, 1))
+        with open(results_path) as f:
+            results = [json.loads(line) for line in f][1:]
+        self.assertEqual(sorted(result['id'] for result in results), ['2', 'x'])
+        self.assertEqual(sorted(result['response'] for result in results), ['echo: one', 'echo: two'])
+        self.assertEqual(self.agent_service.lanes, [BATCH, BATCH])
+
+        resp = await self.client.post('/batch', json={'tasks': [{'id': 'no message'}]})
+        self.assertEqual(resp.status, 400)
+
+
+class TestWorkerMetrics(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for the metrics port of a worker process.
+    """
+
+    async def test_worker_serves_its_metrics_on_its_own_port(self):
+        """
+        Test that the metrics server starts with the application and stops with it.
+        """
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+
+        app = web.Application()
+        await _start_metrics_server('127.0.0.1', port)(app)
+        try:
+            async with ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{port}/metrics') as resp:
+                    self.assertEqual(resp.status, 200)
+                    self.assertIn('# TYPE wooagent_turn_seconds histogram', await resp.text())
+                async with session.get(f'http://127.0.0.1:{port}/message') as resp:
+                    self.assertEqual(resp.status, 404)
+        finally:
+            await _stop_metrics_server(app)
+
+
+if __name__ == '__main__':
+    unittest.main()
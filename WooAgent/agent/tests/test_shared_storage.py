@@ -0,0 +1,103 @@
+"""
+Shared Storage Tests
+
+This module contains tests for conversations and caches shared between
+worker processes.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from services.conversation_service import ConversationService
+from services.tool_cache import ToolResultCache
+from storage import SharedGenerations, SQLiteConversationStorage
+from storage.base import VersionConflictError
+
+
+class TestSharedStorage(unittest.TestCase):
+    """
+    Test cases for optimistic versioning and cross-process cache invalidation.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'conversations.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_stale_writes_are_refused(self):
+        """
+        Test that writing a conversation changed by another connection raises a version conflict.
+        """
+        first = SQLiteConversationStorage(self.db_path)
+        second = SQLiteConversationStorage(self.db_path)
+        service = ConversationService(storage=first)
+        conversation = service.create_conversation()
+        service.add_message(conversation.id, 'user', 'hello')
+        self.assertEqual(conversation.version, 1)
+
+        stale = second.get(conversation.id)
+        current = second.get(conversation.id)
+        current.add_message('assistant', 'hi')
+        second.append(current, current.messages[-1])
+        self.assertEqual((current.version, second.version(conversation.id)), (2, 2))
+
+        stale.add_message('assistant', 'conflicting')
+        with self.assertRaises(VersionConflictError):
+            second.append(stale, stale.messages[-1])
+        with self.assertRaises(VersionConflictError):
+            second.save(stale)
+        self.assertEqual([m.content for m in second.get(conversation.id).messages], ['hello', 'hi'])
+        first.close()
+        second.close()
+
+    def test_services_see_each_others_messages(self):
+        """
+        Test that a cached conversation is reloaded after another service changes it,
+        and a conflicting message is added to the stored state.
+        """
+        first = ConversationService(storage=SQLiteConversationStorage(self.db_path))
+        second = ConversationService(storage=SQLiteConversationStorage(self.db_path))
+        conversation_id = first.create_conversation().id
+        first.add_message(conversation_id, 'user', 'one')
+
+        second.add_message(conversation_id, 'assistant', 'two')
+        self.assertEqual([m.content for m in first.get_conversation(conversation_id).messages], ['one', 'two'])
+
+        # A change between the lookup check and the write conflicts and is reapplied
+        second.add_message(conversation_id, 'user', 'three')
+        first.storage.shared = False
+        message = first.add_message(conversation_id, 'assistant', 'four')
+        self.assertEqual(message.content, 'four')
+        stored = second.storage.get(conversation_id)
+        self.assertEqual([m.content for m in stored.messages], ['one', 'two', 'three', 'four'])
+        self.assertEqual(first.get_conversation(conversation_id).version, stored.version)
+        first.close()
+        second.close()
+
+    def test_mutations_invalidate_other_workers_caches(self):
+        """
+        Test that a mutation recorded by one tool cache drops results another cached.
+        """
+        path = os.path.join(self.temp_dir, 'generations.sqlite3')
+        here = ToolResultCache(shared=SharedGenerations(path), poll_interval=0)
+        there = ToolResultCache(shared=SharedGenerations(path), poll_interval=0)
+        there.put('get_product', {'id': 7}, {'id': 7, 'stock': 3})
+        there.put('list_coupons', None, [{'code': 'SUMMER'}])
+        before = there.generations()
+
+        here.record_mutation('create_order', {'product_id': 7})
+
+        self.assertEqual(there.get('get_product', {'id': 7}), (False, None))
+        self.assertTrue(there.get('list_coupons', None)[0])
+        self.assertNotEqual(there.generations(), before)
+        # A result read before the mutation is not cached afterwards
+        there.put('get_product', {'id': 7}, {'id': 7, 'stock': 3}, generation=before.get('product', 0))
+        self.assertEqual(there.get('get_product', {'id': 7}), (False, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Startup Tests
+
+This module contains tests for starting the agent service without waiting
+for its dependencies.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import subprocess
+from unittest.mock import MagicMock, patch
+
+from services.agent_service import AgentService
+from services.conversation_service import ConversationService
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Test cases for lazy and background startup.
+    """
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    def _agent_service(self, startup):
+        return AgentService('key', 'http://localhost:3000', startup=startup,
+                            conversation_service=ConversationService(self.storage_dir))
+
+    @patch('services.agent_service.get_openai_client', MagicMock())
+    @patch('services.agent_service.Agent')
+    @patch('services.agent_service.MCPTool')
+    def test_lazy_startup_connects_on_first_request(self, mock_mcp_tool, mock_agent):
+        """
+        Test that a lazily started service connects no agent until a message arrives.
+        """
+        mock_agent.return_value.run.return_value = 'Hello'
+        agent_service = self._agent_service('lazy')
+        self.assertTrue(agent_service.ready)
+        mock_mcp_tool.assert_not_called()
+
+        result = agent_service.process_message('', 'Hi')
+        self.assertEqual(result['response'], 'Hello')
+        self.assertEqual(mock_mcp_tool.call_count, 1)
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+    @patch('services.agent_service.WARM_UP_RETRY_DELAY', 0.01)
+    @patch('services.agent_service.get_openai_client', MagicMock())
+    @patch('services.agent_service.Agent', MagicMock())
+    @patch('services.agent_service.MCPTool')
+    def test_background_warm_up_retries_until_connected(self, mock_mcp_tool):
+        """
+        Test that a background warm-up keeps trying while the MCP server is unreachable.
+        """
+        mock_mcp_tool.side_effect = [ConnectionError('refused'), ConnectionError('refused'), MagicMock()]
+        agent_service = self._agent_service('background')
+
+        deadline = time.monotonic() + 5
+        while not agent_service.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(agent_service.ready)
+        self.assertEqual(mock_mcp_tool.call_count, 3)
+        with self.assertRaises(ValueError):
+            self._agent_service('later')
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+    def test_importing_main_has_no_side_effects(self):
+        """
+        Test that importing the entry point neither configures logging nor loads the agents SDK.
+        """
+        code = (
+            "import sys, logging, main; "
+            "print(len(logging.getLogger('wooagent').handlers), "
+            "'openai' in sys.modules, 'openai_agents' in sys.modules)"
+        )
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join([SRC_DIR] + sys.path)}
+        output = subprocess.run([sys.executable, '-c', code], cwd=self.storage_dir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split(), ['0', 'False', 'False'])
+        self.assertFalse(os.path.exists(os.path.join(self.storage_dir, 'agent.log')))
+
+
+if __name__ == '__main__':
+    unittest.main()
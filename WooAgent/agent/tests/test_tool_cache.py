@@ -0,0 +1,216 @@
+"""
+Tool Cache Tests
+
+This module contains tests for caching read-only tool results.
+"""
+
+import json
+import shutil
+import tempfile
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from services.agent_service import AgentService
+from services.conversation_service import ConversationService
+from services.tool_cache import CachedMCPTool, ToolResultCache
+
+
+class TestToolCache(unittest.TestCase):
+    """
+    Test cases for the tool result cache.
+    """
+
+    def setUp(self):
+        self.mcp_tool = MagicMock()
+        self.mcp_tool.call_tool.side_effect = lambda name, arguments: {'tool': name, 'arguments': arguments}
+        self.cache = ToolResultCache()
+        self.tool = CachedMCPTool(self.mcp_tool, self.cache)
+
+    def test_read_only_calls_are_cached_by_canonical_arguments(self):
+        """
+        Test that equivalent read-only calls reach the MCP server once.
+        """
+        self.tool.call_tool('list_products', {'per_page': 10, 'category': 'shirts'})
+        self.tool.call_tool('list_products', {'category': 'shirts', 'per_page': 10, 'search': None})
+        self.tool.call_tool('get_product', {'id': 12})
+        self.tool.call_tool('get_product', {'id': '12'})
+
+        self.assertEqual(self.mcp_tool.call_tool.call_count, 2)
+        self.assertEqual(self.cache.stats.hits, 2)
+
+    def test_mutation_invalidates_the_same_entity(self):
+        """
+        Test that a mutating tool drops results for its entity and lists, but not other entities.
+        """
+        self.tool.call_tool('get_product', {'id': 12})
+        self.tool.call_tool('get_product', {'id': 13})
+        self.tool.call_tool('list_products', {})
+        self.tool.call_tool('list_coupons', {})
+
+        self.tool.call_tool('update_product_stock', {'id': 12, 'stock_quantity': 5})
+
+        self.tool.call_tool('get_product', {'id': 12})
+        self.tool.call_tool('get_product', {'id': 13})
+        self.tool.call_tool('list_products', {})
+        self.tool.call_tool('list_coupons', {})
+
+        called = [call[0][0] for call in self.mcp_tool.call_tool.call_args_list]
+        self.assertEqual(called.count('get_product'), 3)
+        self.assertEqual(called.count('list_products'), 2)
+        self.assertEqual(called.count('list_coupons'), 1)
+
+    def test_order_mutation_invalidates_products(self):
+        """
+        Test that changing an order drops cached products, whose stock it may change.
+        """
+        self.tool.call_tool('get_product', {'id': 12})
+        self.tool.call_tool('create_order_refund', {'order_id': 99, 'amount': '5.00'})
+        self.tool.call_tool('get_product', {'id': 12})
+
+        self.assertEqual(self.mcp_tool.call_tool.call_count, 3)
+
+    def test_read_overlapping_a_mutation_is_not_cached(self):
+        """
+        Test that a result read before a mutation finished is not stored.
+        """
+        generation = self.cache.generation('get_coupon')
+        self.cache.record_mutation('delete_coupon', {'id': 7})
+        self.cache.put('get_coupon', {'id': 7}, {'id': 7}, generation=generation)
+
+        self.assertEqual(self.cache.get('get_coupon', {'id': 7}), (False, None))
+
+    def test_results_expire_after_their_tool_ttl(self):
+        """
+        Test that per-tool TTLs apply and errors are never cached.
+        """
+        cache = ToolResultCache(ttls={'list_orders': 0.01})
+        cache.put('list_orders', {}, ['order'])
+        cache.put('get_order', {'id': 1}, {'isError': True})
+
+        self.assertEqual(cache.get('list_orders', {}), (True, ['order']))
+        time.sleep(0.02)
+        self.assertEqual(cache.get('list_orders', {}), (False, None))
+        self.assertEqual(cache.get('get_order', {'id': 1}), (False, None))
+
+
+class TestToolCallBatch(unittest.TestCase):
+    """
+    Test cases for concurrent tool call batches.
+    """
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        self.events = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def slow_tool(self, delay=0.1):
+        def call_tool(name, arguments):
+            with self.lock:
+                self.events.append(('start', name))
+            time.sleep(arguments.get('delay', delay))
+            with self.lock:
+                self.events.append(('end', name))
+            return {'tool': name, 'id': arguments.get('id')}
+        tool = MagicMock()
+        tool.call_tool.side_effect = call_tool
+        return tool
+
+    def test_read_only_calls_run_concurrently_in_order(self):
+        """
+        Test that independent lookups take about as long as the slowest one and keep their order.
+        """
+        tool = CachedMCPTool(self.slow_tool(), ToolResultCache(), executor=self.executor, fan_out=5)
+        started = time.monotonic()
+        results = tool.call_tools([('get_order', {'id': i}) for i in range(5)])
+        elapsed = time.monotonic() - started
+
+        self.assertEqual([r['id'] for r in results], list(range(5)))
+        self.assertLess(elapsed, 0.3)
+
+    def test_mutating_call_is_a_barrier(self):
+        """
+        Test that a mutating call starts after earlier reads finish and before later reads start.
+        """
+        tool = CachedMCPTool(self.slow_tool(0.05), ToolResultCache(), executor=self.executor, fan_out=4)
+        tool.call_tools([
+            ('get_product', {'id': 1}),
+            ('get_product', {'id': 2}),
+            ('update_product', {'id': 1}),
+            ('get_product', {'id': 1}),
+        ])
+
+        update_start = self.events.index(('start', 'update_product'))
+        update_end = self.events.index(('end', 'update_product'))
+        self.assertEqual([e for e in self.events[:update_start] if e[0] == 'end'], [('end', 'get_product')] * 2)
+        self.assertEqual(self.events[update_end + 1], ('start', 'get_product'))
+
+    def test_timed_out_call_yields_error_result(self):
+        """
+        Test that a call exceeding the timeout is reported without failing the batch.
+        """
+        tool = CachedMCPTool(self.slow_tool(), ToolResultCache(), executor=self.executor,
+                             fan_out=2, call_timeout=0.1)
+        results = tool.call_tools([('get_order', {'id': 1, 'delay': 0.01}), ('get_order', {'id': 2, 'delay': 1})])
+
+        self.assertEqual(results[0]['id'], 1)
+        self.assertTrue(results[1]['isError'])
+
+
+    def test_model_step_lookups_run_concurrently_in_a_turn(self):
+        """
+        Test that the lookups one model response asks for run together when the agent makes them in turn.
+        """
+        mcp_tool = self.slow_tool()
+        step = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[
+            SimpleNamespace(function=SimpleNamespace(name='get_order', arguments=json.dumps({'id': i})))
+            for i in range(3)
+        ]))])
+
+        class SequentialAgent:
+            """Stand-in for the agent SDK, making a step's tool calls one after another."""
+
+            def __init__(self, client=None, model=None, tools=None):
+                self.client = client
+
+            def register_tool(self, tool):
+                self.tool = tool
+
+            def set_system_prompt(self, prompt):
+                pass
+
+            def run(self, message, context=None):
+                response = self.client.chat.completions.create(model='gpt-4', messages=[])
+                results = [self.tool.call_tool(call.function.name, json.loads(call.function.arguments))
+                           for call in response.choices[0].message.tool_calls]
+                return ', '.join(f"order {result['id']}" for result in results)
+
+        client = MagicMock()
+        client.chat.completions.create.return_value = step
+        storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, storage_dir, ignore_errors=True)
+        with patch('services.agent_service.MCPTool', MagicMock(return_value=mcp_tool)), \
+                patch('services.agent_service.get_openai_client', MagicMock(return_value=client)), \
+                patch('services.agent_service.Agent', SequentialAgent):
+            agent_service = AgentService('key', 'http://localhost:3000', tool_fan_out=3,
+                                         conversation_service=ConversationService(storage_dir),
+                                         answer_cache_ttl=0, startup='lazy')
+            started = time.monotonic()
+            result = agent_service.process_message('', 'Show me orders 0, 1 and 2')
+            elapsed = time.monotonic() - started
+        agent_service.close()
+        agent_service.conversation_service.close()
+
+        self.assertEqual(result['response'], 'order 0, order 1, order 2')
+        self.assertEqual(mcp_tool.call_tool.call_count, 3)
+        self.assertLess(elapsed, 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,7 @@ export default function Chat() {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [initialLoading, setInitialLoading] = useState(true);
   const [error, setError] = useState(null);
   const [currentConversationId, setCurrentConversationId] = useState(null);
@@ -92,26 +93,77 @@ export default function Chat() {
     setError(null);
 
     try {
-      const response = await axios.post(`${API_URL}/api/chat/message`, {
-        conversationId: currentConversationId,
-        message: input,
+      // Stream the reply so it shows up as soon as the agent starts answering
+      const response = await fetch(`${API_URL}/api/chat/message/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          conversationId: currentConversationId,
+          message: input,
+        }),
       });
 
-      if (response.data.success) {
-        const agentMessage = {
-          role: 'assistant',
-          content: response.data.data.response,
-          timestamp: new Date().toISOString(),
-        };
-        setMessages((prev) => [...prev, agentMessage]);
-      } else {
-        setError('Failed to get response from agent');
+      if (!response.ok || !response.body) {
+        throw new Error(`Unexpected response status ${response.status}`);
+      }
+
+      const updateReply = (update) => {
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, ...update(last) }];
+        });
+      };
+
+      let replyStarted = false;
+      const startReply = () => {
+        if (replyStarted) return;
+        replyStarted = true;
+        setStreaming(true);
+        setMessages((prev) => [
+          ...prev,
+          { role: 'assistant', content: '', timestamp: new Date().toISOString() },
+        ]);
+      };
+
+      const handleEvent = (event) => {
+        if (event.type === 'delta') {
+          startReply();
+          updateReply((reply) => ({ content: reply.content + event.content }));
+        } else if (event.type === 'done') {
+          startReply();
+          // The final reply is authoritative, e.g. if the agent could not stream
+          updateReply(() => ({ content: event.response }));
+        } else if (event.type === 'error') {
+          startReply();
+          updateReply(() => ({ content: event.response }));
+          setError('Failed to get response from agent');
+        }
+      };
+
+      // Parse server-sent events: blank-line separated blocks with a "data:" line
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        blocks.forEach((block) => {
+          const dataLine = block.split('\n').find((line) => line.startsWith('data: '));
+          if (dataLine) {
+            handleEvent(JSON.parse(dataLine.slice('data: '.length)));
+          }
+        });
       }
     } catch (error) {
       console.error('Error sending message:', error);
       setError('Failed to communicate with agent. Please try again.');
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -205,7 +257,7 @@ export default function Chat() {
               </Box>
             ))
           )}
-          {loading && (
+          {loading && !streaming && (
             <Box className="chat-message agent-message" alignSelf="flex-start">
               <Box className="typing-indicator">
                 <span></span>
@@ -46,6 +46,48 @@ exports.sendMessage = async (req, res, next) => {
   }
 };
 
+/**
+ * Send a message to the agent and stream the reply as server-sent events
+ * 
+ * @param {Object} req - Express request object
+ * @param {Object} res - Express response object
+ * @param {Function} next - Express next middleware function
+ */
+exports.streamMessage = async (req, res, next) => {
+  try {
+    const { conversationId, message } = req.body;
+    
+    if (!message) {
+      return res.status(400).json({
+        success: false,
+        message: 'Message is required'
+      });
+    }
+    
+    const stream = await agentService.streamMessage(conversationId, message);
+    
+    res.status(200);
+    res.set({
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no'
+    });
+    res.flushHeaders();
+    
+    // Stop reading from the agent if the client goes away
+    req.on('close', () => stream.destroy());
+    stream.on('error', (error) => {
+      req.logger.error(`Error streaming message: ${error.message}`);
+      res.end();
+    });
+    stream.pipe(res);
+  } catch (error) {
+    req.logger.error(`Error streaming message: ${error.message}`);
+    next(error);
+  }
+};
+
 /**
  * Get list of conversations
  * 
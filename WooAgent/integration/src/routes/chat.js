@@ -15,6 +15,13 @@ const chatController = require('../controllers/chat.controller');
  */
 router.post('/message', chatController.sendMessage);
 
+/**
+ * @route   POST /api/chat/message/stream
+ * @desc    Send a message to the agent and stream the reply as server-sent events
+ * @access  Public
+ */
+router.post('/message/stream', chatController.streamMessage);
+
 /**
  * @route   GET /api/chat/conversations
  * @desc    Get list of conversations
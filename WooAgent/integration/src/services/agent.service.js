@@ -55,6 +55,46 @@ exports.sendMessage = async (conversationId, message) => {
   }
 };
 
+/**
+ * Send a message to the agent and stream the reply
+ * 
+ * The agent answers with server-sent events (start, delta, tool-call events,
+ * then done or error). The returned stream yields the raw event stream so it
+ * can be piped straight to the client.
+ * 
+ * @param {string} conversationId - Conversation ID (optional)
+ * @param {string} message - Message to send
+ * @returns {Promise<stream.Readable>} - Server-sent event stream
+ */
+exports.streamMessage = async (conversationId, message) => {
+  try {
+    // If no conversation ID is provided, create a new one
+    if (!conversationId) {
+      const newConversation = await this.createConversation();
+      conversationId = newConversation.conversation_id;
+    }
+    
+    // No overall timeout: a stream stays open for as long as the agent is replying
+    const response = await agentApi.post('/message/stream', {
+      conversation_id: conversationId,
+      message
+    }, {
+      responseType: 'stream',
+      timeout: 0
+    });
+    
+    return response.data;
+  } catch (error) {
+    if (error.response) {
+      throw new Error(`Agent API error: ${error.response.status}`);
+    } else if (error.request) {
+      throw new Error('Agent API is not responding. Please check if the agent is running.');
+    } else {
+      throw new Error(`Error sending message to agent: ${error.message}`);
+    }
+  }
+};
+
 /**
  * Get list of conversations
  * 
@@ -10,12 +10,16 @@ const { promisify } = require('util');
 const readFileAsync = promisify(fs.readFile);
 const writeFileAsync = promisify(fs.writeFile);
 const accessAsync = promisify(fs.access);
+const readdirAsync = promisify(fs.readdir);
 
 // Log file paths
 const INTEGRATION_LOG_FILE = path.join(process.cwd(), 'integration.log');
-const AGENT_LOG_FILE = path.join(process.cwd(), '..', 'agent', 'agent.log');
+const AGENT_LOG_DIR = path.join(process.cwd(), '..', 'agent');
 const MCP_LOG_FILE = path.join(process.cwd(), '..', 'mcp-server', 'mcp-server.log');
 
+// The agent's own log, and those of its worker processes when it runs several (agent-worker0.log, ...)
+const AGENT_LOG_PATTERN = /^agent(-worker\d+)?\.log$/;
+
 /**
  * Check if a file exists
  * 
@@ -68,6 +72,31 @@ const readLogFile = async (filePath, limit) => {
   }
 };
 
+/**
+ * List the agent's log files
+ * 
+ * @returns {Promise<Array<string>>} - Paths of the supervisor's and every worker's log file
+ */
+const agentLogFiles = async () => {
+  try {
+    const names = await readdirAsync(AGENT_LOG_DIR);
+    return names.filter(name => AGENT_LOG_PATTERN.test(name)).sort().map(name => path.join(AGENT_LOG_DIR, name));
+  } catch (error) {
+    return [];
+  }
+};
+
+/**
+ * Get the time of a log entry
+ * 
+ * @param {Object} entry - Log entry
+ * @returns {number} - Milliseconds since the epoch, 0 if the entry has no valid timestamp
+ */
+const entryTime = (entry) => {
+  const time = Date.parse(entry.timestamp);
+  return Number.isNaN(time) ? 0 : time;
+};
+
 /**
  * Clear log file
  * 
@@ -122,7 +151,10 @@ exports.getLogs = async (limit = 100) => {
  */
 exports.getAgentLogs = async (limit = 100) => {
   try {
-    return await readLogFile(AGENT_LOG_FILE, limit);
+    // Merge the most recent entries of every file, oldest first
+    const files = await agentLogFiles();
+    const logs = await Promise.all(files.map(file => readLogFile(file, limit)));
+    return logs.flat().sort((a, b) => entryTime(a) - entryTime(b)).slice(-limit);
   } catch (error) {
     throw new Error(`Error getting agent logs: ${error.message}`);
   }
@@ -165,7 +197,8 @@ exports.getMcpLogs = async (limit = 100) => {
 exports.clearLogs = async (type) => {
   try {
     if (!type || type === 'agent') {
-      await clearLogFile(AGENT_LOG_FILE);
+      const files = await agentLogFiles();
+      await Promise.all(files.map(clearLogFile));
     }
     
     if (!type || type === 'integration') {
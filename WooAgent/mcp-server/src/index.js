@@ -125,6 +125,27 @@ app.put('/api/orders/:id', async (req, res) => {
   }
 });
 
+// Customers
+app.get('/api/customers', async (req, res) => {
+  try {
+    const response = await woocommerce.get('customers', req.query);
+    res.json(response.data);
+  } catch (error) {
+    console.error('Error fetching customers:', error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
+app.get('/api/customers/:id', async (req, res) => {
+  try {
+    const response = await woocommerce.get(`customers/${req.params.id}`);
+    res.json(response.data);
+  } catch (error) {
+    console.error(`Error fetching customer ${req.params.id}:`, error);
+    res.status(500).json({ error: error.message });
+  }
+});
+
 // Coupons
 app.get('/api/coupons', async (req, res) => {
   try {